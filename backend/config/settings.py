@@ -55,6 +55,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.pii.PIIDecryptionMiddleware", # memo de PII decifrada, só durante a requisição
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -142,6 +143,25 @@ CELERY_TASK_QUEUES = (
     Queue("notifications", routing_key="notifications"), # Nudges e alertas
 )
 
+# --- Cache ---
+# 'default' segue local ao processo (o django-crypto-fields guarda segredos nele: não vão ao Redis).
+# 'rbac' é compartilhado entre processos: permissões compiladas por usuário (ver core/rbac.py).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "rbac": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("RBAC_CACHE_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/1"),
+        "KEY_PREFIX": "vitalia",
+    },
+}
+RBAC_CACHE_ALIAS = os.getenv("RBAC_CACHE_ALIAS", "rbac")
+RBAC_CACHE_TTL_SECONDS = int(os.getenv("RBAC_CACHE_TTL_SECONDS", "3600"))
+# Memo local por processo na frente do Redis: uma alteração feita em outro processo vale
+# aqui em até este prazo (0 desliga o memo local: uma ida ao Redis por checagem)
+RBAC_LOCAL_TTL_SECONDS = float(os.getenv("RBAC_LOCAL_TTL_SECONDS", "30"))
+# Regras de DataAccessGrant por (usuário, dono) no mesmo cache (ver core/grants.py)
+GRANT_CACHE_TTL_SECONDS = int(os.getenv("GRANT_CACHE_TTL_SECONDS", "60"))
+
 # --- Channels (WebSocket) ---
 CHANNEL_LAYERS = {
     "default": {
@@ -160,6 +180,23 @@ if not KEY_PATH:
 if DEBUG:
     AUTO_CREATE_KEYS = True
 
+# Chave HMAC do Blind Index (search_tokens; ver core/utils.py). Padrão: SECRET_KEY (tokens existentes).
+# Rotação: nova chave em BLIND_INDEX_KEY, a antiga em BLIND_INDEX_PREVIOUS_KEY (a busca aceita as duas)
+# até o rebuild_blind_index terminar; depois esvazie BLIND_INDEX_PREVIOUS_KEY.
+BLIND_INDEX_KEY = os.getenv("BLIND_INDEX_KEY") or SECRET_KEY
+BLIND_INDEX_PREVIOUS_KEY = os.getenv("BLIND_INDEX_PREVIOUS_KEY", "")
+
+# Blind index de prefixos do nome (typeahead; ver core/utils.py). Opt-in: cada prefixo
+# indexado revela ao banco quais perfis compartilham aquele início de nome.
+BLIND_PREFIX_INDEX_ENABLED = os.getenv("BLIND_PREFIX_INDEX_ENABLED", "False") == "True"
+BLIND_PREFIX_MIN_CHARS = int(os.getenv("BLIND_PREFIX_MIN_CHARS", "3"))
+BLIND_PREFIX_MAX_CHARS = int(os.getenv("BLIND_PREFIX_MAX_CHARS", "8"))
+BLIND_PREFIX_MAX_PARTS = int(os.getenv("BLIND_PREFIX_MAX_PARTS", "4"))  # partes do nome indexadas
+
+# Criptografia em envelope da PII (AES-GCM por tenant; ver core/envelope.py). Cache da chave ativa
+# de cada tenant: após uma rotação, outros processos adotam a nova versão em até este prazo.
+ENVELOPE_ACTIVE_KEY_TTL_SECONDS = int(os.getenv("ENVELOPE_ACTIVE_KEY_TTL_SECONDS", "300"))
+
 # --- CORS (Frontend) ---
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -172,6 +209,54 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
 OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL")
 OLLAMA_GENERATION_MODEL = os.getenv("OLLAMA_GENERATION_MODEL")
 
+# Cache de respostas do LLM (opt-in por comando via --llm-cache; ver core/llm_cache.py)
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))  # 7 dias
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "512"))
+# Reaproveita análises idênticas de receitas (o signal re-dispara a análise a cada save em DRAFT/PENDING)
+LLM_CACHE_RECIPE_ANALYSIS = os.getenv("LLM_CACHE_RECIPE_ANALYSIS", "False") == "True"
+
+# Rastreio de chamadas ao LLM (tokens/latência por caller e organização; ver core/llm_tracing.py)
+LLM_TRACING_ENABLED = os.getenv("LLM_TRACING_ENABLED", "True") == "True"
+LLM_TRACING_BATCH_SIZE = int(os.getenv("LLM_TRACING_BATCH_SIZE", "200"))
+LLM_TRACING_FLUSH_SECONDS = float(os.getenv("LLM_TRACING_FLUSH_SECONDS", "5"))
+
+# Backend de retrieval do RAG: 'pgvector' (padrão) ou 'memory' (snapshot float16 mmap; ver core/vector_store.py)
+RAG_RETRIEVAL_BACKEND = os.getenv("RAG_RETRIEVAL_BACKEND", "pgvector")
+RAG_VECTOR_SNAPSHOT_DIR = os.getenv("RAG_VECTOR_SNAPSHOT_DIR", str(BASE_DIR / "vector_snapshots"))
+RAG_VECTOR_IVF_LISTS = int(os.getenv("RAG_VECTOR_IVF_LISTS", "0"))  # 0 = scan completo (exato)
+RAG_VECTOR_IVF_NPROBE = int(os.getenv("RAG_VECTOR_IVF_NPROBE", "8"))
+RAG_VECTOR_RELOAD_SECONDS = float(os.getenv("RAG_VECTOR_RELOAD_SECONDS", "5"))
+# Espera após um Document ficar COMPLETED antes de reconstruir (agrupa ingestões em sequência)
+RAG_VECTOR_REBUILD_DELAY_SECONDS = int(os.getenv("RAG_VECTOR_REBUILD_DELAY_SECONDS", "30"))
+# Orçamento (tokens estimados) do contexto do query_with_rag; 0 = chunks inteiros (ver core/context_builder.py).
+# Opt-in: pontuar as frases é um /api/embed extra no modelo de 4096 dims a cada pergunta
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "0"))
+# Diversificação MMR do top-k (λ=1: só relevância; menor: penaliza chunks quase duplicados)
+RAG_MMR_ENABLED = os.getenv("RAG_MMR_ENABLED", "False") == "True"
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+RAG_MMR_CANDIDATES = int(os.getenv("RAG_MMR_CANDIDATES", "50"))
+# Espaço vetorial lido pelo RAG e gravado pela ingestão (ver core/embedding_spaces.py).
+# Vazio = coluna DocumentChunk.embedding (OLLAMA_EMBEDDING_MODEL); trocar o valor é o cutover.
+RAG_EMBEDDING_SPACE = os.getenv("RAG_EMBEDDING_SPACE", "")
+# Re-embedding em sombra (reembed_chunks): textos por chamada /api/embed e vazão máxima (0 = sem limite)
+REEMBED_BATCH_SIZE = int(os.getenv("REEMBED_BATCH_SIZE", "32"))
+REEMBED_RATE_PER_MINUTE = float(os.getenv("REEMBED_RATE_PER_MINUTE", "600"))
+# Manutenção dos índices ANN (vector_index_maintenance; ver core/vector_maintenance.py)
+VECTOR_INDEX_SAMPLE_QUERIES = int(os.getenv("VECTOR_INDEX_SAMPLE_QUERIES", "50"))
+VECTOR_INDEX_TARGET_RECALL = float(os.getenv("VECTOR_INDEX_TARGET_RECALL", "0.95"))  # sintonia de ef_search/probes
+VECTOR_INDEX_REBUILD_BELOW = float(os.getenv("VECTOR_INDEX_REBUILD_BELOW", "0.85"))  # REINDEX CONCURRENTLY
+
+# Quase-duplicatas na ingestão (MinHash/LSH; ver core/near_duplicates.py). Padrão por execução:
+# --dedup/--no-dedup no ingest_knowledge_book, argumento 'dedup' da task de ingestão
+INGEST_DEDUP_ENABLED = os.getenv("INGEST_DEDUP_ENABLED", "False") == "True"
+INGEST_DEDUP_THRESHOLD = float(os.getenv("INGEST_DEDUP_THRESHOLD", "0.85"))  # Jaccard estimado
+# Portão de qualidade antes da vetorização (ver core/chunk_quality.py); reprovados vão para RejectedChunk
+INGEST_QUALITY_GATE_ENABLED = os.getenv("INGEST_QUALITY_GATE_ENABLED", "False") == "True"
+
+# Itens em andamento nos comandos de auditoria/enriquecimento em pipeline (ver core/pipeline.py).
+# Acima de OLLAMA_NUM_PARALLEL do servidor, as gerações só enfileiram no Ollama.
+AUDIT_PIPELINE_CONCURRENCY = int(os.getenv("AUDIT_PIPELINE_CONCURRENCY", "4"))
+
 # --- Configurações do Unstructured API ---
 UNSTRUCTURED_API_URL = os.getenv("UNSTRUCTURED_API_URL")
 
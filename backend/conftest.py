@@ -0,0 +1,51 @@
+# backend/conftest.py
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def disable_llm_tracing(settings):
+    """
+    O rastreio de chamadas ao LLM grava em lote a partir de uma thread própria (fora da
+    transação do teste). Desligado por padrão; testes de tracing religam explicitamente.
+    """
+    settings.LLM_TRACING_ENABLED = False
+
+
+@pytest.fixture(autouse=True)
+def rbac_cache(settings):
+    """
+    Permissões compiladas no cache local do processo em vez do Redis: ids de usuário se
+    repetem entre execuções da suíte (banco de teste recriado) e achariam chaves antigas.
+    """
+    from django.core.cache import caches
+    from core.rbac import clear_local_cache
+
+    settings.RBAC_CACHE_ALIAS = "default"
+    caches["default"].clear()
+    clear_local_cache()
+    yield
+    clear_local_cache()
+
+
+@pytest.fixture
+def fake_ai_services(settings):
+    """
+    Sobe Fake Ollama + Fake Unstructured em portas livres e aponta os clients para eles.
+    Retorna (ollama, unstructured) — ver core/fake_services.py.
+    """
+    from core.clients import ollama_client, unstructured_client
+    from core.fake_services import FakeOllamaServer, FakeUnstructuredServer
+
+    with FakeOllamaServer() as ollama, FakeUnstructuredServer() as unstructured:
+        original = (ollama_client.base_url, ollama_client._model_digests, unstructured_client.api_url)
+
+        settings.OLLAMA_BASE_URL = ollama.base_url
+        settings.UNSTRUCTURED_API_URL = unstructured.api_url
+        ollama_client.base_url = ollama.base_url
+        ollama_client._model_digests = {}
+        unstructured_client.api_url = unstructured.api_url
+        try:
+            yield ollama, unstructured
+        finally:
+            ollama_client.base_url, ollama_client._model_digests, unstructured_client.api_url = original
@@ -2,6 +2,7 @@
 
 import json
 from django.contrib import admin
+from django.conf import settings
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 from django.utils.html import format_html
@@ -12,8 +13,13 @@ from .models import (
     Organization, Team, UserProfile, Role, Permission,
     ParticipantProfile, ProfessionalProfile,
     ConsentLog, DataAccessGrant, AuditLog,
-    Document, DocumentChunk
+    Document, DocumentChunk, RejectedChunk, EmbeddingSpace, LLMCacheEntry, LLMCallTrace,
+    DataEncryptionKey
 )
+from .chunk_quality import approve_rejected_chunks
+from .embedding_spaces import coverage
+from .pii import BatchDecryptAdminMixin, profile_names
+from .utils import blind_index_lookup, generate_search_tokens, identifier_lookup
 
 # =========================================================
 # MIXINS & UTILS
@@ -121,24 +127,29 @@ class DocumentAdmin(BaseAdmin):
 
     def chunks_stats(self, obj):
         count = obj.chunks.count()
+        duplicates = obj.chunks.filter(duplicate_of__isnull=False).count()
         return format_html(
             """<div style="background: #f0fdf4; padding: 10px; border: 1px solid #bbf7d0; border-radius: 6px; color: #166534;">
                 <strong>Total de Vetores:</strong> {}<br>
+                <strong>Quase-duplicatas (sem vetor):</strong> {} ({})<br>
                 <strong>Modelo:</strong> llama3
             </div>""",
-            count
+            count - duplicates, duplicates, f"{duplicates / count:.1%}" if count else "0%"
         )
     chunks_stats.short_description = "Resumo"
 
 @admin.register(DocumentChunk)
 class DocumentChunkAdmin(BaseAdmin):
-    list_display = ('short_content', 'document_link', 'page_number')
-    list_filter = ('document__organization', 'document') # Agrupamento por documento
+    list_display = ('short_content', 'document_link', 'page_number', 'language', 'is_table', 'has_vision')
+    list_filter = ('document__organization', 'document', 'is_table', 'has_vision', 'language', ('duplicate_of', admin.EmptyFieldListFilter)) # Agrupamento por documento
     search_fields = ('content', 'document__file_name')
     
     # Ocultamos o campo 'metadata' cru (JSONWidget) e mostramos apenas o 'metadata_pretty'
     exclude = ('embedding', 'metadata') 
-    readonly_fields = ('document', 'page_number', 'metadata_pretty')
+    readonly_fields = (
+        'document', 'page_number', 'page_start', 'page_end', 'source', 'language',
+        'is_table', 'has_vision', 'ingested_at', 'duplicate_of', 'metadata_pretty'
+    )
 
     def short_content(self, obj):
         return obj.content[:80] + "..."
@@ -153,6 +164,106 @@ class DocumentChunkAdmin(BaseAdmin):
         return json_prettify(obj.metadata)
     metadata_pretty.short_description = "Metadados"
 
+@admin.register(RejectedChunk)
+class RejectedChunkAdmin(BaseAdmin):
+    """Chunks reprovados no portão de qualidade da ingestão, aguardando revisão."""
+    list_display = ('short_content', 'document', 'page_number', 'quality_score', 'reasons_display', 'created_at')
+    list_filter = ('document',)
+    search_fields = ('content', 'document__file_name')
+    ordering = ('-quality_score',)
+    exclude = ('metadata',)
+    readonly_fields = ('document', 'content', 'page_number', 'quality_score', 'reasons', 'created_at', 'metadata_pretty')
+    actions = ['approve_and_embed']
+
+    def short_content(self, obj):
+        return obj.content[:80] + "..."
+    short_content.short_description = "Conteúdo"
+
+    def reasons_display(self, obj):
+        return ", ".join(obj.reasons)
+    reasons_display.short_description = "Motivos"
+
+    def metadata_pretty(self, obj):
+        return json_prettify(obj.metadata)
+    metadata_pretty.short_description = "Metadados"
+
+    @admin.action(description="Aprovar: vetorizar e mover para os chunks do documento")
+    def approve_and_embed(self, request, queryset):
+        approved = approve_rejected_chunks(queryset)
+        self.message_user(request, f"{approved} chunk(s) aprovados e vetorizados.")
+
+@admin.register(EmbeddingSpace)
+class EmbeddingSpaceAdmin(BaseAdmin):
+    """Espaços vetoriais (core.embedding_spaces). O ativo é o de RAG_EMBEDDING_SPACE."""
+    list_display = ('name', 'model', 'dimensions', 'is_active', 'coverage_display', 'created_at')
+    readonly_fields = ('name', 'model', 'dimensions', 'created_at')
+
+    def is_active(self, obj):
+        return obj.name == settings.RAG_EMBEDDING_SPACE
+    is_active.boolean = True
+    is_active.short_description = "Ativo"
+
+    def coverage_display(self, obj):
+        covered, total = coverage(obj)
+        return f"{covered}/{total} ({covered / total:.0%})" if total else "-"
+    coverage_display.short_description = "Cobertura"
+
+@admin.register(DataEncryptionKey)
+class DataEncryptionKeyAdmin(BaseAdmin):
+    """Versões das chaves de dados do envelope (core.envelope). A chave em si nunca é exibida."""
+    list_display = ('organization', 'version', 'is_active', 'created_at', 'retired_at')
+    list_filter = ('is_active', 'organization')
+    fields = ('organization', 'version', 'is_active', 'created_at', 'retired_at')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False  # criadas/rotacionadas por core.envelope (migrate_envelope_encryption --rotate-keys)
+
+    def has_delete_permission(self, request, obj=None):
+        return False  # apagar uma versão torna ilegíveis os valores cifrados com ela
+
+@admin.register(LLMCacheEntry)
+class LLMCacheEntryAdmin(BaseAdmin):
+    list_display = ('short_key', 'namespace', 'model', 'hit_count', 'size_kb', 'last_hit_at', 'expires_at')
+    list_filter = ('namespace', 'model')
+    search_fields = ('key',)
+    readonly_fields = ('key', 'namespace', 'model', 'size_bytes', 'hit_count', 'created_at', 'last_hit_at', 'expires_at', 'response_pretty')
+    exclude = ('response',)
+
+    def short_key(self, obj):
+        return obj.key[:16]
+    short_key.short_description = "Chave"
+
+    def size_kb(self, obj):
+        return f"{obj.size_bytes / 1024:.1f} KB"
+    size_kb.short_description = "Tamanho"
+
+    def response_pretty(self, obj):
+        return json_prettify(obj.response)
+    response_pretty.short_description = "Resposta"
+
+@admin.register(LLMCallTrace)
+class LLMCallTraceAdmin(BaseAdmin):
+    """Leitura apenas. Agregações (p50/p95, tokens/s) ficam em /api/v1/core/llm-usage/."""
+    list_display = ('created_at', 'caller', 'model', 'organization', 'outcome', 'latency_fmt', 'prompt_eval_count', 'eval_count', 'tokens_per_second')
+    list_filter = ('caller', 'outcome', 'model', 'organization')
+    date_hierarchy = 'created_at'
+    readonly_fields = [f.name for f in LLMCallTrace._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def latency_fmt(self, obj):
+        return f"{obj.latency_ms:.0f} ms"
+    latency_fmt.short_description = "Latência"
+    latency_fmt.admin_order_field = 'latency_ms'
+
+    def tokens_per_second(self, obj):
+        if not obj.eval_duration_ns:
+            return "-"
+        return f"{obj.eval_count / (obj.eval_duration_ns / 1e9):.1f}"
+    tokens_per_second.short_description = "Tokens/s"
+
 # =========================================================
 # 2. IDENTIDADE E ORGANIZAÇÃO (B2B)
 # =========================================================
@@ -246,10 +357,10 @@ class ProfessionalDataInline(admin.StackedInline):
     fields = ('professional_level', 'reputation_score', 'is_verified', 'specialties')
 
 @admin.register(UserProfile)
-class UserProfileAdmin(BaseAdmin):
-    list_display = ('user_link', 'full_name', 'primary_organization', 'role_list')
+class UserProfileAdmin(BatchDecryptAdminMixin, BaseAdmin):
+    list_display = ('user_link', 'display_name', 'primary_organization', 'role_list')
     list_filter = ('primary_organization', 'roles') # Agrupamento por organização
-    search_fields = ('user__username', 'full_name', 'cpf')
+    search_fields = ('user__username',)  # nome, CPF e telefone: Blind Index (get_search_results)
     filter_horizontal = ('roles', 'teams')
     inlines = [ParticipantDataInline, ProfessionalDataInline]
     
@@ -263,11 +374,31 @@ class UserProfileAdmin(BaseAdmin):
         })
     )
 
+    decrypted_user_fields = ('user_id',)
+
+    def get_queryset(self, request):
+        # PII fica adiada: a lista decifra só os nomes, em lote (ver core/pii.py)
+        return super().get_queryset(request).select_related('user').defer('full_name', 'cpf', 'phone_number')
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if not term:
+            return results, may_have_duplicates
+        lookup = identifier_lookup(term) or blind_index_lookup('search_tokens', generate_search_tokens, term)
+        if lookup:
+            results |= queryset.filter(lookup)
+        return results, may_have_duplicates
+
     def user_link(self, obj):
         url = reverse("admin:auth_user_change", args=[obj.user.id])
         return format_html('<a href="{}">{}</a>', url, obj.user.username)
     user_link.short_description = "Conta de Acesso"
 
+    def display_name(self, obj):
+        return profile_names([obj.user_id])[obj.user_id]
+    display_name.short_description = "Nome"
+
     def role_list(self, obj):
         return ", ".join([r.name for r in obj.roles.all()])
     role_list.short_description = "Papéis"
@@ -282,13 +413,19 @@ class UserProfileInline(admin.StackedInline):
     fields = ('full_name', 'primary_organization', 'roles')
 #    readonly_fields = ('full_name', 'primary_organization', 'roles')
 
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(BatchDecryptAdminMixin, BaseUserAdmin):
     inlines = (UserProfileInline,)
     list_display = ('username', 'email', 'get_full_name_vitalia', 'get_org', 'is_active')
     list_filter = ('is_active', 'is_staff', 'profile__roles', 'profile__primary_organization')
-    
+    decrypted_user_fields = ('pk',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('profile__primary_organization').defer(
+            'profile__full_name', 'profile__cpf', 'profile__phone_number'
+        )
+
     def get_full_name_vitalia(self, obj):
-        return getattr(obj.profile, 'full_name', '-')
+        return profile_names([obj.pk])[obj.pk] or '-'
     get_full_name_vitalia.short_description = "Nome Real"
 
     def get_org(self, obj):
@@ -322,7 +459,7 @@ class PermissionAdmin(BaseAdmin):
 class DataAccessGrantAdmin(BaseAdmin):
     list_display = ('owner', 'target_summary', 'grantee_display', 'status_badge', 'created_at')
     list_filter = ('created_at',)
-    search_fields = ('owner__username', 'owner__profile__full_name')
+    search_fields = ('owner__username',)
     readonly_fields = ('created_at', 'json_permissions')
 
     def target_summary(self, obj):
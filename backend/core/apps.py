@@ -9,10 +9,15 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
-        try:
-            import core.signals
-        except ImportError:
-            pass
+        # Sem os receivers, caches de RBAC, expansão de grants e chaves de envelope ficariam desatualizados: um erro
+        # de importação aqui precisa derrubar o processo
+        import core.signals  # noqa: F401
+
+        # Vetores pgvector como np.float32 em todas as conexões (ver core/vector_io.py)
+        from django.db.backends.signals import connection_created
+        from core.vector_io import register_vector_adapters, register_vector_param_adapter
+        register_vector_param_adapter()
+        connection_created.connect(register_vector_adapters, dispatch_uid="core.register_vector_adapters")
 
         # --- FIX DEFINITIVO: Psycopg2 Memoryview -> Bytes ---
         try:
@@ -0,0 +1,154 @@
+# backend/core/blind_index.py em 2026-10-19 19:40
+
+"""
+Reconstrução em lote dos Blind Indexes do UserProfile (nome: search_tokens / search_prefix_tokens;
+identificadores: cpf_index / phone_index).
+
+Os tokens dependem da BLIND_INDEX_KEY, de STOPWORDS/normalize_text, da normalização de CPF/telefone
+e dos limites de prefixo (core/utils.py); mudar qualquer um deixa os tokens gravados obsoletos. Re-salvar perfil a perfil
+custa um UPDATE completo (e uma re-criptografia) por linha; aqui:
+
+    1. Os perfis são lidos por cursor do lado do servidor (.iterator), com o full_name ainda
+       CPF e telefone ainda cifrados (Cast para texto: o campo não decifra no carregamento).
+    2. Decifrar + tokenizar (a parte cara, RSA/AES por linha) roda em um pool de processos.
+    3. Só os perfis cujos tokens mudaram são gravados, em bulk_update por lote. Antes de gravar,
+       o lote é relido com SELECT ... FOR UPDATE: perfis salvos entre a leitura e a escrita
+       (texto cifrado diferente) já têm tokens novos do save() e não são sobrescritos.
+
+Rotação da chave sem busca quebrada (janela de leitura dupla):
+
+    1. BLIND_INDEX_KEY=<nova> e BLIND_INDEX_PREVIOUS_KEY=<antiga> + restart
+       (a busca aceita as duas; novos saves já gravam com a nova)
+    2. rebuild_blind_index
+    3. BLIND_INDEX_PREVIOUS_KEY vazio + restart
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+ENCRYPTED_SOURCES = ('full_name', 'cpf', 'phone_number')
+INDEX_FIELDS = ('search_tokens', 'search_prefix_tokens', 'cpf_index', 'phone_index')
+
+
+@dataclass
+class RebuildStats:
+    scanned: int = 0
+    updated: int = 0
+    skipped: int = 0  # editados durante a reconstrução (o save() já gravou os tokens)
+    elapsed: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+
+def _init_worker():
+    # Processos 'spawn' não herdam o Django configurado (nem conexões do pai)
+    import django
+    django.setup()
+
+
+def tokenize_rows(rows: list[tuple]) -> list[tuple]:
+    """
+    (pk, *ENCRYPTED_SOURCES cifrados, *INDEX_FIELDS atuais) -> (pk, cifrados, {campo: valor})
+    só dos perfis cujos índices mudaram. Roda nos workers.
+    """
+    from core.models import UserProfile
+    from core.utils import profile_blind_indexes
+
+    fields = [UserProfile._meta.get_field(name) for name in ENCRYPTED_SOURCES]
+    changed = []
+    for pk, *values in rows:
+        ciphertexts, current = values[:len(fields)], values[len(fields):]
+        plain = [field.from_db_value(value, None, None) if value else None for field, value in zip(fields, ciphertexts)]
+        indexes = profile_blind_indexes(*plain)
+        if [indexes[name] for name in INDEX_FIELDS] != current:
+            changed.append((pk, ciphertexts, indexes))
+    return changed
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def rebuild_blind_indexes(batch_size: int = DEFAULT_BATCH_SIZE, workers: int = None,
+                       progress: Optional[Callable[[RebuildStats], None]] = None) -> RebuildStats:
+    """
+    Recalcula os Blind Indexes de todos os perfis com a configuração atual. workers <= 1 tokeniza
+    no próprio processo; com o pool, no máximo 2 lotes por worker ficam em voo (memória
+    limitada, independente do tamanho da tabela). Idempotente: rodar de novo não grava nada.
+    """
+    from django.db import transaction
+    from django.db.models import TextField
+    from django.db.models.functions import Cast
+    from core.models import UserProfile
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    stats = RebuildStats()
+    started = time.monotonic()
+
+    ciphertexts = {f'{name}_cipher': Cast(name, output_field=TextField()) for name in ENCRYPTED_SOURCES}
+    rows = (
+        UserProfile.objects.order_by('pk')
+        .annotate(**ciphertexts)
+        .values_list('pk', *ciphertexts, *INDEX_FIELDS)
+        .iterator(chunk_size=batch_size)
+    )
+
+    def write(scanned, changed):
+        fresh = []
+        if changed:
+            with transaction.atomic():
+                # Relê sob lock: só grava se o texto cifrado ainda é o que foi tokenizado
+                current = {
+                    pk: list(values) for pk, *values in
+                    UserProfile.objects.select_for_update().filter(pk__in=[pk for pk, _, _ in changed])
+                    .annotate(**ciphertexts).values_list('pk', *ciphertexts)
+                }
+                fresh = [(pk, indexes) for pk, sources, indexes in changed if current.get(pk) == list(sources)]
+                UserProfile.objects.bulk_update(
+                    [UserProfile(pk=pk, **indexes) for pk, indexes in fresh],
+                    INDEX_FIELDS, batch_size=batch_size,
+                )
+        stats.scanned += scanned
+        stats.updated += len(fresh)
+        stats.skipped += len(changed) - len(fresh)
+        stats.elapsed = time.monotonic() - started
+        if progress:
+            progress(stats)
+
+    if workers <= 1:
+        for batch in _batches(rows, batch_size):
+            write(len(batch), tokenize_rows(batch))
+    else:
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker) as executor:
+            for batch in _batches(rows, batch_size):
+                pending.append((len(batch), executor.submit(tokenize_rows, batch)))
+                if len(pending) >= workers * 2:
+                    scanned, future = pending.popleft()
+                    write(scanned, future.result())
+            while pending:
+                scanned, future = pending.popleft()
+                write(scanned, future.result())
+
+    logger.info("Blind index reconstruído: %s perfis lidos, %s atualizados.", stats.scanned, stats.updated)
+    return stats
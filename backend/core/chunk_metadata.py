@@ -0,0 +1,180 @@
+# backend/core/chunk_metadata.py em 2026-10-19 14:00
+
+"""
+Atributos de DocumentChunk promovidos do JSON 'metadata' para colunas indexadas
+(is_table, has_vision, source, language, page_start/page_end, ingested_at) e o
+filtro de retrieval que os usa (ChunkFilter).
+
+O filtro é aplicado DENTRO da busca vetorial (pré-filtragem): no pgvector vira WHERE da
+mesma consulta ORDER BY distância; no backend em memória vira máscara NumPy sobre as
+colunas do snapshot. Assim "só tabelas" devolve as 5 tabelas mais próximas, e não as
+tabelas que por acaso estavam entre os 5 chunks mais próximos.
+"""
+
+import re
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+PROMOTED_FIELDS = ['is_table', 'has_vision', 'source', 'language', 'page_start', 'page_end', 'ingested_at']
+
+PAGE_MARKER = re.compile(r'PÁG (\d+)')
+
+# Códigos da Unstructured API (ISO 639-3) -> ISO 639-1
+UNSTRUCTURED_LANGUAGES = {'por': 'pt', 'eng': 'en', 'spa': 'es'}
+
+LANGUAGE_STOPWORDS = {
+    'pt': {'de', 'do', 'da', 'dos', 'das', 'que', 'não', 'uma', 'para', 'com', 'os', 'as', 'no', 'na', 'pelo', 'pela', 'são', 'é'},
+    'en': {'the', 'of', 'and', 'to', 'is', 'in', 'that', 'with', 'for', 'are', 'this', 'by', 'from', 'which'},
+    'es': {'el', 'los', 'las', 'del', 'que', 'y', 'con', 'por', 'una', 'para', 'es', 'se', 'lo', 'al'},
+}
+
+
+def detect_language(text: str, min_hits: int = 3) -> str:
+    """Idioma dominante por contagem de stopwords ('' se inconclusivo). Suficiente para pt/en/es."""
+    words = re.findall(r"[a-zà-úç]+", (text or "").lower()[:4000])
+    scores = {lang: sum(1 for w in words if w in stopwords) for lang, stopwords in LANGUAGE_STOPWORDS.items()}
+    language, hits = max(scores.items(), key=lambda item: item[1])
+    return language if hits >= min_hits else ""
+
+
+def page_span(content: str, page_number: Optional[int]) -> tuple[Optional[int], Optional[int]]:
+    """Primeira e última página cobertas pelo chunk (marcadores '=== PÁG n ===' da ingestão)."""
+    pages = [int(p) for p in PAGE_MARKER.findall(content or "")]
+    if page_number is not None:
+        pages.append(page_number)
+    if not pages:
+        return None, None
+    return min(pages), max(pages)
+
+
+def _metadata_language(metadata: dict) -> str:
+    language = metadata.get('language')
+    if language:
+        return str(language)[:8]
+    for code in metadata.get('languages') or []:
+        if code in UNSTRUCTURED_LANGUAGES:
+            return UNSTRUCTURED_LANGUAGES[code]
+    return ""
+
+
+def promote_chunk_metadata(chunk, default_source: str = "", ingested_at: Optional[datetime] = None):
+    """
+    Preenche as colunas promovidas a partir de chunk.metadata/conteúdo. Não salva
+    (as ingestões usam bulk_create; o backfill usa bulk_update com PROMOTED_FIELDS).
+    """
+    metadata = chunk.metadata or {}
+    content = chunk.content or ""
+
+    chunk.is_table = bool(metadata.get('is_table', "### TABELA" in content))
+    chunk.has_vision = bool(metadata.get('has_vision', "[DESCRIÇÃO VISUAL IA" in content))
+    chunk.source = str(metadata.get('source') or metadata.get('filename') or default_source or "")[:255]
+    chunk.language = _metadata_language(metadata) or detect_language(content)
+    chunk.page_start, chunk.page_end = page_span(content, chunk.page_number)
+
+    parsed = parse_datetime(metadata['ingestion_date']) if metadata.get('ingestion_date') else None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    chunk.ingested_at = parsed or ingested_at or timezone.now()
+    return chunk
+
+
+class ChunkFilter:
+    """
+    Filtro de retrieval sobre as colunas promovidas. Todos os critérios são combinados com AND.
+
+        ChunkFilter(tables_only=True)                   # só tabelas
+        ChunkFilter(document_ids=[doc.id])              # só este livro
+        ChunkFilter(vision_only=True, language='pt')    # descrições de visão em português
+        ChunkFilter(pages=(120, 140))                   # chunks que tocam as páginas 120-140
+    """
+
+    def __init__(
+        self,
+        tables_only: bool = False,
+        vision_only: bool = False,
+        document_ids: Optional[Iterable] = None,
+        sources: Optional[Iterable[str]] = None,
+        language: Optional[str] = None,
+        pages: Optional[tuple[int, int]] = None,
+    ):
+        self.tables_only = tables_only
+        self.vision_only = vision_only
+        self.document_ids = [str(d) for d in document_ids] if document_ids else None
+        self.sources = list(sources) if sources else None
+        self.language = language or None
+        self.pages = pages
+
+    def __bool__(self):
+        return any([self.tables_only, self.vision_only, self.document_ids, self.sources, self.language, self.pages])
+
+    def __repr__(self):
+        active = {k: v for k, v in vars(self).items() if v}
+        return f"ChunkFilter({active})"
+
+    def to_q(self) -> Q:
+        q = Q()
+        if self.tables_only:
+            q &= Q(is_table=True)
+        if self.vision_only:
+            q &= Q(has_vision=True)
+        if self.document_ids:
+            q &= Q(document_id__in=self.document_ids)
+        if self.sources:
+            q &= Q(source__in=self.sources)
+        if self.language:
+            q &= Q(language=self.language)
+        if self.pages:
+            first, last = self.pages
+            q &= Q(page_start__lte=last, page_end__gte=first)
+        return q
+
+    def retrieval_q(self) -> Q:
+        """
+        to_q() para a busca vetorial. Quase-duplicatas (core.near_duplicates) não têm vetor e
+        apontam para um canônico, muitas vezes de outro documento: o canônico também casa
+        quando alguma de suas duplicatas satisfaz o filtro (ex: "só a 2ª edição").
+        """
+        q = self.to_q()
+        if not q:
+            return q
+        return q | Q(id__in=self._duplicates().values('duplicate_of_id'))
+
+    def canonical_ids(self) -> list:
+        """Canônicos alcançados só via quase-duplicatas (para o índice em memória)."""
+        if not self:
+            return []
+        return list(self._duplicates().values_list('duplicate_of_id', flat=True).distinct())
+
+    def _duplicates(self):
+        from core.models import DocumentChunk
+        return DocumentChunk.objects.filter(self.to_q(), duplicate_of__isnull=False)
+
+    def mask(self, attributes: dict) -> np.ndarray:
+        """Máscara booleana sobre as colunas do snapshot em memória (core.vector_store)."""
+        mask = np.ones(len(attributes['is_table']), dtype=bool)
+        if self.tables_only:
+            mask &= attributes['is_table']
+        if self.vision_only:
+            mask &= attributes['has_vision']
+        if self.document_ids:
+            wanted = np.array([_uuid_bytes(d) for d in self.document_ids], dtype='V16')
+            mask &= np.isin(attributes['document'].view('V16').ravel(), wanted)
+        if self.sources:
+            codes = [i for i, s in enumerate(attributes['sources']) if s in self.sources]
+            mask &= np.isin(attributes['source_code'], codes)
+        if self.language:
+            mask &= attributes['language'] == self.language.encode()
+        if self.pages:
+            first, last = self.pages
+            mask &= (attributes['page_start'] >= 0) & (attributes['page_start'] <= last) & (attributes['page_end'] >= first)
+        return mask
+
+
+def _uuid_bytes(value) -> bytes:
+    return uuid.UUID(str(value)).bytes
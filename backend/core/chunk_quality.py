@@ -0,0 +1,140 @@
+# backend/core/chunk_quality.py em 2026-10-19 17:20
+
+"""
+Portão de qualidade dos chunks antes da vetorização (só CPU, sem chamadas ao Ollama).
+
+OCR ruim, restos de layout ("........ 42", "|||||") e descrições de visão vazias
+("Não encontrado.") custavam um embedding cada e poluíam o retrieval. Cada chunk recebe
+sinais baratos (proporção de letras, sequências de caracteres repetidos, idioma detectado,
+densidade de stopwords) e a decisão vai para chunk.metadata['quality']. Os reprovados
+não são embedados: ficam em RejectedChunk para revisão no admin.
+
+Idioma e stopwords sozinhos não reprovam: listas de estruturas, legendas e nomenclatura
+latina (Terminologia Anatomica) não têm idioma detectável nem stopwords e são conteúdo
+central do hub. Só contam junto de um sinal de OCR/layout (poucas letras ou repetição).
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from core.chunk_metadata import LANGUAGE_STOPWORDS, detect_language
+
+MIN_WORDS = 5
+MIN_ALPHA_RATIO = 0.5
+MAX_REPEATED_RATIO = 0.2
+MIN_STOPWORD_DENSITY = 0.05
+# Abaixo disso não há evidência suficiente para julgar idioma/stopwords (itens de lista, legendas)
+LANGUAGE_MIN_WORDS = 20
+
+# Respostas "vazias" do modelo de visão / OCR
+PLACEHOLDERS = {'não encontrado', 'nao encontrado', 'not found', 'n/a', 'sem conteúdo', 'no text', 'imagem em branco'}
+
+_LABELS = re.compile(r'\[(?:DESCRIÇÃO VISUAL IA|CONTEÚDO OCR)\]:|> Transcrição IA:|### TABELA PÁG \d+|=== PÁG \d+ ===')
+# Linhas separadoras de tabela Markdown (|---|:---:|) não são "lixo" de OCR
+_TABLE_RULE = re.compile(r'^\s*\|?[\s:\-|]+\|?\s*$', re.MULTILINE)
+_REPEATED_RUN = re.compile(r'(\S)\1{4,}')
+_WORD = re.compile(r"[a-zà-úç]+")
+
+
+@dataclass
+class QualityVerdict:
+    accepted: bool
+    score: float
+    reasons: list = field(default_factory=list)
+    signals: dict = field(default_factory=dict)
+
+    def as_metadata(self) -> dict:
+        return {"accepted": self.accepted, "score": self.score, "reasons": self.reasons, **self.signals}
+
+
+def _placeholder(text: str) -> bool:
+    return text.strip().strip('.!').lower() in PLACEHOLDERS
+
+
+def assess_chunk(content: str, is_table: bool = False) -> QualityVerdict:
+    """
+    Avalia um chunk. Tabelas e textos curtos são isentos dos critérios de idioma/stopwords
+    (células, legendas), mas não dos de proporção de letras e repetição.
+    """
+    body = _TABLE_RULE.sub(' ', _LABELS.sub(' ', content or ''))
+    segments = [s for s in re.split(r'\n\s*\n', body) if s.strip()]
+    if segments and all(_placeholder(s) for s in segments):
+        return QualityVerdict(False, 0.0, ['placeholder'], {"words": 0})
+
+    visible = [c for c in body if not c.isspace()]
+    words = _WORD.findall(body.lower())
+    alpha_ratio = sum(c.isalpha() for c in visible) / len(visible) if visible else 0.0
+    repeated_ratio = sum(len(m.group()) for m in _REPEATED_RUN.finditer(body)) / len(visible) if visible else 0.0
+    language = detect_language(body)
+    stopwords = LANGUAGE_STOPWORDS.get(language) or set().union(*LANGUAGE_STOPWORDS.values())
+    stopword_density = sum(1 for w in words if w in stopwords) / len(words) if words else 0.0
+
+    reasons = []
+    if len(words) < MIN_WORDS:
+        reasons.append('too_short')
+    if alpha_ratio < MIN_ALPHA_RATIO:
+        reasons.append('low_alpha_ratio')
+    if repeated_ratio > MAX_REPEATED_RATIO:
+        reasons.append('repeated_chars')
+    prose = not is_table and len(words) >= LANGUAGE_MIN_WORDS
+    if prose and reasons and not language and stopword_density < MIN_STOPWORD_DENSITY:
+        reasons += ['no_language', 'low_stopword_density']
+
+    # Pontuação contínua (0-1) para ordenar a revisão; a decisão usa os limiares acima
+    score = min(1.0, alpha_ratio / 0.8) * (1.0 - min(1.0, repeated_ratio / MAX_REPEATED_RATIO / 2)) * min(1.0, len(words) / MIN_WORDS)
+    if prose:
+        score *= min(1.0, stopword_density / (MIN_STOPWORD_DENSITY * 3))
+
+    signals = {
+        "words": len(words),
+        "alpha_ratio": round(alpha_ratio, 3),
+        "repeated_ratio": round(repeated_ratio, 3),
+        "language": language,
+        "stopword_density": round(stopword_density, 3),
+    }
+    return QualityVerdict(not reasons, round(score, 3), reasons, signals)
+
+
+def reject_chunk(document, content: str, page_number, metadata: dict, verdict: QualityVerdict):
+    """RejectedChunk (não salvo) com a decisão do portão gravada no metadata."""
+    from core.models import RejectedChunk
+
+    return RejectedChunk(
+        document=document,
+        content=content,
+        page_number=page_number,
+        metadata={**(metadata or {}), "quality": verdict.as_metadata()},
+        quality_score=verdict.score,
+        reasons=verdict.reasons,
+    )
+
+
+def approve_rejected_chunks(rejected) -> int:
+    """
+    Revisão manual: vetoriza os RejectedChunk aprovados, cria os DocumentChunk e remove os
+    rejeitados. Retorna quantos foram aprovados.
+    """
+    from django.db import transaction
+    from core.chunk_metadata import promote_chunk_metadata
+    from core.clients import ollama_client
+    from core.embedding_spaces import active_space, route_vector, save_space_vectors, space_model
+    from core.models import DocumentChunk, LLMCallTrace
+
+    space = active_space()
+    approved = 0
+    for item in rejected.select_related('document'):
+        embedding = ollama_client.embed(
+            space_model(space), item.content,
+            caller=LLMCallTrace.Caller.INGEST_EMBED, organization_id=item.document.organization_id
+        )['embedding']
+        metadata = {**item.metadata, "quality": {**item.metadata.get("quality", {}), "accepted": True, "approved_in_review": True}}
+        with transaction.atomic():
+            chunk = route_vector(promote_chunk_metadata(DocumentChunk(
+                document=item.document, content=item.content, embedding=embedding,
+                page_number=item.page_number, metadata=metadata,
+            ), default_source=item.document.file_name), space)
+            chunk.save()
+            save_space_vectors([chunk], space)
+            item.delete()
+        approved += 1
+    return approved
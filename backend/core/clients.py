@@ -2,10 +2,14 @@
 
 import httpx
 import json
+import numpy as np
 import logging
 import os
+import time
 from typing import Any, Dict
 from django.conf import settings
+from .llm_tracing import record_llm_call
+from .vector_io import parse_embedding_response, parse_embeddings_response
 
 logger = logging.getLogger(__name__)
 
@@ -22,27 +26,104 @@ class OllamaClient:
     def __init__(self):
         self.base_url = settings.OLLAMA_BASE_URL
         self.timeout = httpx.Timeout(1200.0) 
+        # Digests dos modelos instalados (memo por processo, usado como chave do cache de respostas)
+        self._model_digests = {}
 
-    def _make_request(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def _make_request(self, endpoint: str, payload: Dict[str, Any], caller: str = None, organization_id=None, decode=None, timeout: float = None) -> Dict[str, Any]:
+        """
+        :param decode: Decodificador opcional do corpo bruto da resposta (padrão: response.json()).
+        :param timeout: Timeout HTTP desta chamada em segundos (padrão: o do client, 1200s).
+        """
         url = f"{self.base_url}{endpoint}"
+        # Chamadas sem prompt (ex: unload com keep_alive=0) são gestão de VRAM, não inferência
+        traced = bool(payload.get("prompt") or payload.get("input"))
+        started_at = time.perf_counter()
         try:
-            with httpx.Client(timeout=self.timeout) as client:
+            with httpx.Client(timeout=self.timeout if timeout is None else timeout) as client:
                 response = client.post(url, json=payload)
                 response.raise_for_status()
-                return response.json()
+                data = decode(response.content) if decode else response.json()
         except Exception as e:
             logger.error(f"Ollama Error: {e}")
+            if traced:
+                record_llm_call(caller, endpoint, payload.get("model"), started_at, error=e, organization_id=organization_id)
             raise OllamaServiceError(str(e))
 
-    def embed(self, model: str, prompt: str) -> Dict[str, Any]:
-        return self._make_request("/api/embeddings", {"model": model, "prompt": prompt})
+        if traced:
+            record_llm_call(caller, endpoint, payload.get("model"), started_at, response=data, organization_id=organization_id)
+        return data
+
+    def embed(self, model: str, prompt: str, caller: str = None, organization_id=None) -> Dict[str, Any]:
+        """
+        Retorna {"embedding": np.ndarray float32}, decodificado direto do corpo da resposta.
+        :param caller: Tag de rastreio (core.models.LLMCallTrace.Caller) para contabilidade de GPU.
+        :param organization_id: Organização à qual a chamada é atribuída (opcional).
+        """
+        return self._make_request(
+            "/api/embeddings", {"model": model, "prompt": prompt},
+            caller=caller, organization_id=organization_id, decode=parse_embedding_response
+        )
 
-    def generate(self, model: str, prompt: str, is_json: bool = False, options: Dict = None, images: list = None, keep_alive: int = None) -> Dict[str, Any]:
+    def embed_batch(self, model: str, inputs: list[str], caller: str = None, organization_id=None) -> np.ndarray:
+        """
+        Embeddings de vários textos numa única chamada (/api/embed).
+        Retorna matriz np.float32 (len(inputs), dims), na ordem de 'inputs'.
+        """
+        if not inputs:
+            return np.empty((0, 0), dtype=np.float32)
+        response = self._make_request(
+            "/api/embed", {"model": model, "input": list(inputs)},
+            caller=caller, organization_id=organization_id, decode=parse_embeddings_response
+        )
+        return response["embeddings"]
+
+    def get_model_digest(self, model: str) -> str:
+        """
+        Retorna o digest do modelo instalado no Ollama (via /api/tags).
+        Se o modelo for re-baixado (nova versão), o digest muda e o cache de respostas é invalidado.
+        Em caso de falha, usa o próprio nome do modelo como identificador.
+        """
+        if model in self._model_digests:
+            return self._model_digests[model]
+
+        digest = model
+        try:
+            with httpx.Client(timeout=httpx.Timeout(10.0)) as client:
+                response = client.get(f"{self.base_url}/api/tags")
+                response.raise_for_status()
+                for item in response.json().get("models", []):
+                    if model in (item.get("name"), item.get("model")) or item.get("name") == f"{model}:latest":
+                        digest = item.get("digest") or model
+                        break
+        except Exception as e:
+            logger.warning(f"Não foi possível obter o digest do modelo {model}: {e}")
+
+        self._model_digests[model] = digest
+        return digest
+
+    def generate(self, model: str, prompt: str, is_json: bool = False, options: Dict = None, images: list = None, keep_alive: int = None, cache=None, caller: str = None, organization_id=None, timeout: float = None) -> Dict[str, Any]:
         """
         Gera completude de texto ou visão.
         :param images: Lista de strings base64 para modelos de visão (LLaVA).
         :param keep_alive: Tempo em segundos para manter na VRAM (0 = unload imediato).
+        :param cache: Instância opcional de core.llm_cache.LLMResponseCache (opt-in para jobs em lote).
+        :param caller: Tag de rastreio (core.models.LLMCallTrace.Caller) para contabilidade de GPU.
+        :param organization_id: Organização à qual a chamada é atribuída (opcional).
+        :param timeout: Timeout HTTP em segundos (padrão: o do client, 1200s, pensado para visão/lotes).
         """
+        cache_key = None
+        if cache is not None and prompt:
+            from .llm_cache import build_cache_key
+            started_at = time.perf_counter()
+            cache_key = build_cache_key(
+                self.get_model_digest(model), prompt, options,
+                images=images, response_format="json" if is_json else None
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                record_llm_call(caller, "/api/generate", model, started_at, organization_id=organization_id, cache_hit=True)
+                return cached
+
         payload = {
             "model": model, 
             "prompt": prompt, 
@@ -59,7 +140,21 @@ class OllamaClient:
         if keep_alive is not None:
             payload["keep_alive"] = keep_alive # ex: 0 ou "5m"
 
-        return self._make_request("/api/generate", payload)
+        response = self._make_request("/api/generate", payload, caller=caller, organization_id=organization_id, timeout=timeout)
+
+        if cache_key and response.get("done", True) and (not is_json or self._is_valid_json(response)):
+            cache.set(cache_key, model, response)
+
+        return response
+
+    @staticmethod
+    def _is_valid_json(response: Dict[str, Any]) -> bool:
+        # Uma resposta JSON truncada ou malformada não pode ser reaproveitada pelo cache
+        try:
+            json.loads(response.get("response", ""))
+        except (TypeError, ValueError):
+            return False
+        return True
 
 class UnstructuredClient:
     def __init__(self):
@@ -0,0 +1,117 @@
+# backend/core/consent.py em 2026-10-19 23:40
+
+"""
+Consentimento vigente sem varrer o histórico.
+
+O ConsentLog é só de inserção: saber se um usuário concede RESEARCH hoje exigiria achar a
+linha mais recente do par (usuário, tipo). CurrentConsent guarda essa linha materializada,
+atualizada na mesma transação de cada inserção (ConsentLog.save -> record_consents):
+
+    has_consent(user, tipo)              -> bool, uma leitura pela chave única
+    consents_for(user_ids, tipo)         -> {user_id: bool}, uma consulta para a coorte toda
+    users_with_consent(user_ids, tipo)   -> ids dos que concedem (filtro de coorte)
+
+Sem registro no log, o consentimento não foi dado. Inserções que não passam por save()
+(bulk_create, SQL direto) exigem rebuild_current_consent, que reconstrói a tabela a partir do log.
+"""
+
+from django.db import connection, transaction
+
+
+# Só sobrescreve se o log novo vier depois do vigente, na mesma ordem do replay (timestamp, id):
+# transações concorrentes podem commitar fora de ordem e o log mais antigo não pode vencer
+_UPSERT_SQL = """
+    INSERT INTO {table} AS stored (user_id, consent_type, granted, consent_log_id, version, recorded_at)
+    VALUES {values}
+    ON CONFLICT (user_id, consent_type) DO UPDATE
+       SET granted = EXCLUDED.granted, consent_log_id = EXCLUDED.consent_log_id,
+           version = EXCLUDED.version, recorded_at = EXCLUDED.recorded_at
+     WHERE (stored.recorded_at, stored.consent_log_id) < (EXCLUDED.recorded_at, EXCLUDED.consent_log_id)
+"""
+
+
+def record_consents(logs):
+    """Upsert do estado atual a partir de ConsentLogs recém-inseridos (o mais recente de cada par vence)."""
+    from core.models import CurrentConsent
+
+    latest = {}
+    for log in logs:
+        key = (log.user_id, log.consent_type)
+        if key not in latest or (log.timestamp, log.pk) > (latest[key].timestamp, latest[key].pk):
+            latest[key] = log
+    if not latest:
+        return
+    params = []
+    for log in latest.values():
+        params += [log.user_id, log.consent_type, log.granted, log.pk, log.version, log.timestamp]
+    with connection.cursor() as cursor:
+        cursor.execute(_UPSERT_SQL.format(
+            table=CurrentConsent._meta.db_table,
+            values=", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(latest)),
+        ), params)
+
+
+def has_consent(user, consent_type) -> bool:
+    from core.models import CurrentConsent
+
+    user_id = getattr(user, 'pk', user)
+    return CurrentConsent.objects.filter(user_id=user_id, consent_type=consent_type, granted=True).exists()
+
+
+def consents_for(user_ids, consent_type) -> dict:
+    """{user_id: concedido?} para toda a coorte; quem não tem registro aparece como False."""
+    from core.models import CurrentConsent
+
+    user_ids = list(user_ids)
+    granted = set(
+        CurrentConsent.objects.filter(user_id__in=user_ids, consent_type=consent_type, granted=True)
+        .values_list('user_id', flat=True)
+    )
+    return {user_id: user_id in granted for user_id in user_ids}
+
+
+def users_with_consent(user_ids, consent_type) -> set:
+    return {user_id for user_id, granted in consents_for(user_ids, consent_type).items() if granted}
+
+
+# Último ConsentLog de cada (usuário, tipo): o log é a fonte da verdade
+_REPLAY_SQL = """
+    SELECT DISTINCT ON (user_id, consent_type)
+           user_id, consent_type, granted, id AS consent_log_id, version, timestamp AS recorded_at
+    FROM {log}
+    ORDER BY user_id, consent_type, timestamp DESC, id DESC
+"""
+
+
+def rebuild_current_consents() -> int:
+    """
+    Reconstrói CurrentConsent reproduzindo o ConsentLog, numa transação (leitores seguem
+    vendo o estado anterior até o commit). Devolve quantos pares (usuário, tipo) ficaram.
+    """
+    from core.models import ConsentLog, CurrentConsent
+
+    table = CurrentConsent._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Bloqueia inserções no log durante a reconstrução: nenhuma fica de fora do replay
+        cursor.execute(f"LOCK TABLE {ConsentLog._meta.db_table} IN SHARE MODE")
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, consent_type, granted, consent_log_id, version, recorded_at) "
+            + _REPLAY_SQL.format(log=ConsentLog._meta.db_table)
+        )
+        return cursor.rowcount
+
+
+def diverging_consents() -> int:
+    """Pares (usuário, tipo) em que a tabela difere do replay do log (faltando, sobrando ou diferente)."""
+    from core.models import ConsentLog, CurrentConsent
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT count(*) FROM ({_REPLAY_SQL.format(log=ConsentLog._meta.db_table)}) replay
+            FULL OUTER JOIN {CurrentConsent._meta.db_table} stored
+                 ON stored.user_id = replay.user_id AND stored.consent_type = replay.consent_type
+            WHERE stored.consent_log_id IS DISTINCT FROM replay.consent_log_id
+               OR stored.granted IS DISTINCT FROM replay.granted
+        """)
+        return cursor.fetchone()[0]
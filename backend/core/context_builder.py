@@ -0,0 +1,128 @@
+# backend/core/context_builder.py em 2026-10-19 15:50
+
+"""
+Contexto do RAG com orçamento de tokens e compressão por frase.
+
+Em vez de concatenar os chunks inteiros (até 2.000 caracteres cada, mais as descrições de
+visão), as frases dos chunks recuperados são pontuadas contra o embedding da pergunta
+(similaridade de cosseno vetorizada sobre a matriz de embeddings das frases) e as de maior
+valor entram no contexto até o orçamento. No texto final, as frases escolhidas voltam à
+ordem original de cada chunk, sob o cabeçalho de citação da fonte, com '[...]' nos cortes.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+# Aproximação de tokens por caracteres (tokenizers do Llama 3 em PT/EN ficam entre 3.5 e 4.5)
+CHARS_PER_TOKEN = 4
+
+# Frases muito curtas (títulos, números de figura) são coladas na seguinte
+MIN_SENTENCE_CHARS = 40
+
+GAP_MARKER = "[...]"
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?;:])\s+(?=[A-ZÀ-Ú0-9("\[])')
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Frases de um chunk. Quebras de linha também separam (linhas de tabela e marcadores
+    '=== PÁG n ===' viram unidades próprias); fragmentos curtos são unidos ao seguinte.
+    """
+    pieces = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if line:
+            pieces.extend(p.strip() for p in _SENTENCE_BOUNDARY.split(line) if p.strip())
+
+    sentences, carry = [], ""
+    for piece in pieces:
+        carry = f"{carry} {piece}" if carry else piece
+        if len(carry) >= MIN_SENTENCE_CHARS:
+            sentences.append(carry)
+            carry = ""
+    if carry:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {carry}"
+        else:
+            sentences.append(carry)
+    return sentences
+
+
+def score_sentences(query_embedding, sentence_embeddings) -> np.ndarray:
+    """Similaridade de cosseno de cada frase (linhas da matriz) com a pergunta."""
+    matrix = np.asarray(sentence_embeddings, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+    if matrix.size == 0:
+        return np.empty(0, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+    return (matrix @ query) / np.where(norms == 0, 1.0, norms)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    full_tokens: int
+    sentences_used: int
+    sentences_total: int
+
+    @property
+    def reduction(self) -> float:
+        """Fração do contexto original economizada (0.45 = prompt 45% menor)."""
+        return 1 - self.tokens / self.full_tokens if self.full_tokens else 0.0
+
+
+def pack_context(headers: list[str], chunk_sentences: list[list[str]], scores, token_budget: int, separator: str = "\n\n---\n\n") -> PackedContext:
+    """
+    Escolhe frases por pontuação (gulosamente, da maior para a menor) até o orçamento.
+    O cabeçalho de citação de um chunk só é cobrado quando a primeira frase dele entra.
+
+    :param headers: citação de cada chunk ("Fonte 1 (livro.pdf, pág 12):").
+    :param chunk_sentences: frases de cada chunk, na ordem original.
+    :param scores: pontuação de cada frase, achatada na mesma ordem de chunk_sentences.
+    """
+    owners = [(c, s) for c, sentences in enumerate(chunk_sentences) for s in range(len(sentences))]
+    scores = np.asarray(scores, dtype=np.float32)
+    full_tokens = sum(
+        estimate_tokens(header) + estimate_tokens(" ".join(sentences))
+        for header, sentences in zip(headers, chunk_sentences)
+    )
+
+    selected = [set() for _ in chunk_sentences]
+    used = 0
+    for flat_index in np.argsort(-scores, kind='stable'):
+        c, s = owners[flat_index]
+        cost = estimate_tokens(chunk_sentences[c][s]) + (0 if selected[c] else estimate_tokens(headers[c]))
+        if used + cost > token_budget:
+            continue
+        selected[c].add(s)
+        used += cost
+
+    parts = []
+    for c, chosen in enumerate(selected):
+        if not chosen:
+            continue
+        spans, previous = [], None
+        for s in sorted(chosen):
+            if previous is not None and s != previous + 1:
+                spans.append(GAP_MARKER)
+            spans.append(chunk_sentences[c][s])
+            previous = s
+        parts.append(f"{headers[c]}\n{' '.join(spans)}")
+
+    text = separator.join(parts)
+    return PackedContext(
+        text=text,
+        tokens=estimate_tokens(text),
+        full_tokens=full_tokens,
+        sentences_used=sum(len(chosen) for chosen in selected),
+        sentences_total=len(owners),
+    )
@@ -0,0 +1,202 @@
+# backend/core/embedding_spaces.py em 2026-10-19 18:10
+
+"""
+Espaços vetoriais versionados e re-embedding em sombra.
+
+A coluna DocumentChunk.embedding tem dimensão fixa (4096, Llama 3): trocar de modelo
+(ex: Nomic, 768) exigiria reescrever a tabela inteira sob lock e deixaria o RAG sem
+retrieval até o fim. Em vez disso, cada modelo vira um EmbeddingSpace e os vetores dele
+ficam em ChunkEmbedding (um por chunk e espaço). A coluna original é o espaço 'legacy'.
+
+    1. create_embedding_space nomic-v1 --model nomic-embed-text   (detecta a dimensão)
+    2. reembed_chunks nomic-v1 --rate 600                          (em sombra, com limite de vazão)
+    3. reembed_chunks nomic-v1 --check                             (cobertura 100%?)
+    4. RAG_EMBEDDING_SPACE=nomic-v1 + restart                      (cutover)
+
+Todo o caminho de leitura (RAGService, snapshot em memória) e a ingestão usam o espaço
+ativo (active_space): o modelo que embeda a pergunta é sempre o mesmo dos vetores
+consultados. Voltar atrás é só restaurar a configuração anterior (rode reembed_chunks
+legacy antes, para cobrir os chunks ingeridos depois do cutover).
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+
+logger = logging.getLogger(__name__)
+
+LEGACY_SPACE = "legacy"
+
+# nome configurado -> EmbeddingSpace (ou None para o legacy); espaços não mudam depois de criados
+_resolved = {}
+
+
+def resolve_space(name: Optional[str] = None):
+    """EmbeddingSpace pelo nome (padrão: RAG_EMBEDDING_SPACE); None para o espaço 'legacy'."""
+    from core.models import EmbeddingSpace
+
+    name = settings.RAG_EMBEDDING_SPACE if name is None else name
+    if not name or name == LEGACY_SPACE:
+        return None
+    try:
+        return EmbeddingSpace.objects.get(name=name)
+    except EmbeddingSpace.DoesNotExist:
+        raise ImproperlyConfigured(f"Espaço vetorial '{name}' não existe. Crie com create_embedding_space.")
+
+
+def active_space():
+    """Espaço lido pelo RAG e gravado pela ingestão (RAG_EMBEDDING_SPACE), resolvido uma vez por processo."""
+    name = settings.RAG_EMBEDDING_SPACE
+    if name not in _resolved:
+        _resolved[name] = resolve_space(name)
+    return _resolved[name]
+
+
+def space_label(space) -> str:
+    return space.name if space is not None else LEGACY_SPACE
+
+
+def space_model(space) -> str:
+    return space.model if space is not None else settings.OLLAMA_EMBEDDING_MODEL
+
+
+def space_dimensions(space) -> int:
+    from core.models import DocumentChunk
+
+    return space.dimensions if space is not None else DocumentChunk._meta.get_field("embedding").dimensions
+
+
+def with_vectors(queryset, space):
+    """
+    Restringe um queryset de DocumentChunk aos chunks com vetor no espaço e retorna também
+    o caminho do campo do vetor, para CosineDistance/VectorSend:
+
+        queryset, field = with_vectors(DocumentChunk.objects.filter(...), space)
+        queryset.annotate(distance=CosineDistance(field, vector_param(embedding)))
+    """
+    if space is None:
+        return queryset.filter(embedding__isnull=False), "embedding"
+    queryset = queryset.annotate(
+        space_vector=FilteredRelation("space_embeddings", condition=Q(space_embeddings__space=space))
+    ).filter(space_vector__embedding__isnull=False)
+    return queryset, "space_vector__embedding"
+
+
+def route_vector(chunk, space):
+    """
+    Na ingestão, o vetor recém-gerado vem em chunk.embedding. Com um espaço ativo que não
+    seja o legacy, ele sai da coluna e fica pendente para save_space_vectors (após o save do chunk).
+    """
+    if space is not None and chunk.embedding is not None:
+        chunk.pending_space_vector = chunk.embedding
+        chunk.embedding = None
+    return chunk
+
+
+def save_space_vectors(chunks, space) -> int:
+    """Grava os ChunkEmbedding pendentes (route_vector) dos chunks já salvos."""
+    from core.models import ChunkEmbedding
+
+    if space is None:
+        return 0
+    rows = [
+        ChunkEmbedding(chunk=chunk, space=space, embedding=chunk.pending_space_vector)
+        for chunk in chunks if getattr(chunk, "pending_space_vector", None) is not None
+    ]
+    ChunkEmbedding.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+    return len(rows)
+
+
+def chunks_missing_vectors(space):
+    """Chunks canônicos (quase-duplicatas não têm vetor próprio) ainda sem vetor no espaço."""
+    from core.models import DocumentChunk
+
+    queryset = DocumentChunk.objects.filter(duplicate_of__isnull=True)
+    if space is None:
+        return queryset.filter(embedding__isnull=True)
+    return queryset.exclude(space_embeddings__space=space)
+
+
+def coverage(space) -> tuple[int, int]:
+    """(chunks canônicos com vetor no espaço, total de chunks canônicos)."""
+    from core.models import DocumentChunk
+
+    total = DocumentChunk.objects.filter(duplicate_of__isnull=True).count()
+    return total - chunks_missing_vectors(space).count(), total
+
+
+@dataclass
+class ReembedStats:
+    embedded: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def per_minute(self) -> float:
+        return self.embedded / self.elapsed * 60 if self.elapsed else 0.0
+
+
+def reembed_space(space, batch_size: int = None, rate_per_minute: float = None, limit: int = None,
+                  progress: Optional[Callable[[ReembedStats], None]] = None) -> ReembedStats:
+    """
+    Embeda, em lotes, os chunks sem vetor no espaço. Cada lote é uma chamada /api/embed e
+    uma transação curta (sem lock longo na tabela); entre lotes, espera o necessário para
+    não passar de rate_per_minute chunks/min (a GPU continua atendendo o RAG). Incremental:
+    rodar de novo só completa o que falta (chunks ingeridos depois, lotes com erro).
+    """
+    from core.clients import ollama_client
+    from core.models import ChunkEmbedding, DocumentChunk, LLMCallTrace
+
+    batch_size = batch_size or settings.REEMBED_BATCH_SIZE
+    rate_per_minute = settings.REEMBED_RATE_PER_MINUTE if rate_per_minute is None else rate_per_minute
+    model, dims = space_model(space), space_dimensions(space)
+
+    stats = ReembedStats()
+    started = time.monotonic()
+    last_id = None
+    while limit is None or stats.embedded + stats.failed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats.embedded - stats.failed)
+        queryset = chunks_missing_vectors(space).order_by("id")
+        if last_id is not None:
+            queryset = queryset.filter(id__gt=last_id)
+        batch = list(queryset.values_list("id", "content")[:size])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        try:
+            vectors = ollama_client.embed_batch(model, [content for _, content in batch], caller=LLMCallTrace.Caller.REEMBED)
+            if vectors.shape != (len(batch), dims):
+                raise ValueError(f"modelo {model} retornou {vectors.shape}, esperado ({len(batch)}, {dims})")
+        except Exception as e:
+            logger.warning(f"Re-embedding ({space_label(space)}): lote a partir de {batch[0][0]} falhou: {e}")
+            stats.failed += len(batch)
+            continue
+
+        with transaction.atomic():
+            if space is None:
+                for (chunk_id, _), vector in zip(batch, vectors):
+                    DocumentChunk.objects.filter(id=chunk_id).update(embedding=vector)
+            else:
+                ChunkEmbedding.objects.bulk_create(
+                    [ChunkEmbedding(chunk_id=chunk_id, space=space, embedding=vector) for (chunk_id, _), vector in zip(batch, vectors)],
+                    ignore_conflicts=True,
+                )
+        stats.embedded += len(batch)
+        stats.elapsed = time.monotonic() - started
+        if progress:
+            progress(stats)
+
+        if rate_per_minute:
+            ahead = stats.embedded * 60 / rate_per_minute - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    stats.elapsed = time.monotonic() - started
+    return stats
@@ -0,0 +1,367 @@
+# backend/core/envelope.py em 2026-10-19 21:10
+
+"""
+Criptografia em envelope (AES-256-GCM) para PII lida em volume.
+
+O django-crypto-fields guarda na coluna só um hash e busca o segredo na tabela Crypt a cada
+leitura (RSA no EncryptedCharField): uma consulta e uma operação assimétrica por valor.
+Aqui cada tenant (Organization; None = global) tem chaves de dados (DataEncryptionKey) AES-256,
+e a própria chave é guardada cifrada pelas chaves existentes do django-crypto-fields
+(wrapped_key é um EncryptedTextField). Ler um valor custa um AES-GCM em memória; a chave
+do tenant é desembrulhada uma vez por processo.
+
+Formato na coluna: env1$<id da chave>$<base64(nonce 12B + texto cifrado + tag 16B)>
+O id identifica tenant e versão (metadado de rotação); o AAD amarra o valor ao campo
+(ex: "core.UserProfile.cpf"), então um valor copiado para outra coluna não decifra.
+
+Migração online do django-crypto-fields (ver migrate_envelope_encryption):
+    1. O campo vira EnvelopeEncryptedTextField(legacy='rsa'|'aes'): lê os dois formatos,
+       grava só envelope.
+    2. migrate_envelope_encryption re-cifra as linhas antigas em lotes curtos.
+    3. Rotação: --rotate-keys cria nova versão por tenant e re-cifra o que usa a anterior.
+"""
+
+import base64
+import os
+import time
+from dataclasses import dataclass, field as dataclass_field
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import FieldError
+from django.db import IntegrityError, models, transaction
+
+ENVELOPE_PREFIX = "env1$"
+NONCE_BYTES = 12
+TAG_BYTES = 16
+
+# Chaves desembrulhadas (id -> bytes) e chave ativa por tenant (org_id -> (id, expira_em))
+_data_keys = {}
+_active_keys = {}
+
+
+class EnvelopeDecryptionError(Exception):
+    """Valor adulterado, AAD diferente ou chave inexistente."""
+
+
+def clear_key_cache():
+    """Esquece as chaves desembrulhadas e as ativas de cada tenant."""
+    _data_keys.clear()
+    _active_keys.clear()
+
+
+def is_envelope(value) -> bool:
+    return isinstance(value, str) and value.startswith(ENVELOPE_PREFIX)
+
+
+def key_id_of(value: str) -> str | None:
+    return value[len(ENVELOPE_PREFIX):].split("$", 1)[0] if is_envelope(value) else None
+
+
+def _unwrap(data_key) -> bytes:
+    key = base64.b64decode(data_key.wrapped_key)
+    _data_keys[data_key.id.hex] = key
+    return key
+
+
+def data_key(key_id: str) -> bytes:
+    """
+    Chave de dados pelo id gravado no valor (qualquer versão, ativa ou não). Cachear aqui é
+    seguro mesmo dentro de uma transação: só valores gravados com a chave referenciam seu id,
+    e eles somem no mesmo rollback que a desfaria.
+    """
+    from core.models import DataEncryptionKey
+
+    if key_id not in _data_keys:
+        try:
+            _unwrap(DataEncryptionKey.objects.get(pk=key_id))
+        except DataEncryptionKey.DoesNotExist:
+            raise EnvelopeDecryptionError(f"Chave de dados {key_id} não encontrada.")
+    return _data_keys[key_id]
+
+
+def create_data_key(organization_id=None):
+    """
+    Nova versão ativa da chave do tenant; a anterior fica só para leitura. O cache do
+    processo só passa a usá-la depois do commit (ver active_data_key).
+    """
+    from django.utils import timezone
+    from core.models import DataEncryptionKey
+
+    with transaction.atomic():
+        current = (
+            DataEncryptionKey.objects.select_for_update()
+            .filter(organization_id=organization_id).order_by('-version').first()
+        )
+        DataEncryptionKey.objects.filter(organization_id=organization_id, is_active=True).update(
+            is_active=False, retired_at=timezone.now()
+        )
+        created = DataEncryptionKey.objects.create(
+            organization_id=organization_id,
+            version=current.version + 1 if current else 1,
+            wrapped_key=base64.b64encode(os.urandom(32)).decode(),
+        )
+    transaction.on_commit(lambda: _active_keys.pop(organization_id, None))
+    return created
+
+
+def ensure_data_key(organization_id=None):
+    """
+    Cria a primeira versão da chave do tenant, se ainda não houver. Chamada no commit de uma
+    Organization nova (core/signals.py): a chave nasce fora das transações de requisição.
+    """
+    from core.models import DataEncryptionKey
+
+    if DataEncryptionKey.objects.filter(organization_id=organization_id, is_active=True).exists():
+        return
+    try:
+        create_data_key(organization_id)
+    except IntegrityError:
+        pass  # outro processo criou ao mesmo tempo
+
+
+def active_data_key(organization_id=None) -> tuple[str, bytes]:
+    """
+    (id, chave) da versão ativa do tenant. Memoizada por ENVELOPE_ACTIVE_KEY_TTL_SECONDS:
+    após uma rotação, outros processos ainda gravam com a versão anterior até o prazo
+    (o migrate_envelope_encryption seguinte as re-cifra).
+
+    A chave só entra no cache no commit da transação que a leu. Se ela ainda não existe
+    (tenant sem ensure_data_key), é criada na transação corrente: um rollback a desfaz junto
+    com os valores cifrados por ela, e o cache nunca chega a apontar para uma chave fantasma.
+    """
+    from core.models import DataEncryptionKey
+
+    cached = _active_keys.get(organization_id)
+    if cached and cached[1] > time.monotonic():
+        return cached[0], data_key(cached[0])
+
+    key = DataEncryptionKey.objects.filter(organization_id=organization_id, is_active=True).first()
+    if key is None:
+        try:
+            key = create_data_key(organization_id)
+        except IntegrityError:
+            # Outro processo criou a primeira versão ao mesmo tempo
+            key = DataEncryptionKey.objects.get(organization_id=organization_id, is_active=True)
+
+    key_id = key.id.hex
+    key_bytes = _data_keys.get(key_id) or base64.b64decode(key.wrapped_key)
+
+    def remember():
+        _data_keys[key_id] = key_bytes
+        _active_keys[organization_id] = (key_id, time.monotonic() + settings.ENVELOPE_ACTIVE_KEY_TTL_SECONDS)
+
+    transaction.on_commit(remember)
+    return key_id, key_bytes
+
+
+def encrypt(plaintext: str, aad: bytes, organization_id=None) -> str:
+    from Cryptodome.Cipher import AES
+
+    key_id, key = active_data_key(organization_id)
+    nonce = os.urandom(NONCE_BYTES)
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce, mac_len=TAG_BYTES)
+    cipher.update(aad)
+    ciphertext, tag = cipher.encrypt_and_digest(plaintext.encode())
+    return f"{ENVELOPE_PREFIX}{key_id}${base64.b64encode(nonce + ciphertext + tag).decode()}"
+
+
+def decrypt(value: str, aad: bytes) -> str:
+    from Cryptodome.Cipher import AES
+
+    try:
+        key_id, payload = value[len(ENVELOPE_PREFIX):].split("$", 1)
+        raw = base64.b64decode(payload)
+    except ValueError:
+        raise EnvelopeDecryptionError("Valor em envelope mal formado.")
+
+    nonce, ciphertext, tag = raw[:NONCE_BYTES], raw[NONCE_BYTES:-TAG_BYTES], raw[-TAG_BYTES:]
+    cipher = AES.new(data_key(key_id), AES.MODE_GCM, nonce=nonce, mac_len=TAG_BYTES)
+    cipher.update(aad)
+    try:
+        return cipher.decrypt_and_verify(ciphertext, tag).decode()
+    except ValueError:
+        raise EnvelopeDecryptionError(f"Falha na autenticação do valor (chave {key_id}).")
+
+
+class EnvelopeEncryptedTextField(models.TextField):
+    """
+    Texto cifrado com AES-256-GCM pela chave de dados do tenant da linha.
+
+    tenant_field: atributo da instância com o id da Organization (ex: 'primary_organization_id');
+        sem ele, ou em gravações sem instância (update(), bulk_update), usa a chave global.
+    legacy: 'rsa' (EncryptedCharField) ou 'aes' (EncryptedTextField) do django-crypto-fields;
+        valores nesse formato continuam legíveis até o migrate_envelope_encryption.
+
+    Sem busca pelo valor (o nonce é aleatório): use um Blind Index (ex: cpf_index). Só isnull.
+    """
+    description = "Texto cifrado em envelope (AES-256-GCM por tenant)"
+
+    def __init__(self, *args, tenant_field=None, legacy=None, **kwargs):
+        self.tenant_field = tenant_field
+        self.legacy = legacy
+        self._legacy_field = None
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.tenant_field:
+            kwargs['tenant_field'] = self.tenant_field
+        if self.legacy:
+            kwargs['legacy'] = self.legacy
+        return name, path, args, kwargs
+
+    @property
+    def aad(self) -> bytes:
+        return f"{self.model._meta.label}.{self.name}".encode()
+
+    def get_lookup(self, lookup_name):
+        if lookup_name != 'isnull':
+            return None
+        return super().get_lookup(lookup_name)
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if not value or is_envelope(value):
+            return value
+        tenant = getattr(model_instance, self.tenant_field) if self.tenant_field else None
+        # A instância continua com o texto claro; só o valor gravado é cifrado
+        return encrypt(value, self.aad, tenant)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if not value or is_envelope(value):
+            return value
+        return encrypt(value, self.aad)
+
+    def from_db_value(self, value, expression, connection):
+        if not value:
+            return value
+        if is_envelope(value):
+            return decrypt(value, self.aad)
+        return self.legacy_field.from_db_value(value, expression, connection)
+
+    @property
+    def legacy_field(self):
+        if self._legacy_field is None:
+            if self.legacy not in ('rsa', 'aes'):
+                raise FieldError(f"{self.model._meta.label}.{self.name}: valor fora do envelope e sem legacy.")
+            from django_crypto_fields.fields import EncryptedCharField, EncryptedTextField
+
+            self._legacy_field = EncryptedCharField() if self.legacy == 'rsa' else EncryptedTextField()
+        return self._legacy_field
+
+
+# --- Migração online / rotação (migrate_envelope_encryption) ---
+
+def envelope_fields(model) -> list:
+    return [f for f in model._meta.concrete_fields if isinstance(f, EnvelopeEncryptedTextField)]
+
+
+def envelope_models() -> list:
+    from django.apps import apps
+
+    return [model for model in apps.get_models() if envelope_fields(model)]
+
+
+def _stored_values(fields) -> dict:
+    # O valor cru da coluna, sem passar pelo from_db_value (não decifra)
+    from django.db.models import TextField
+    from django.db.models.functions import Cast
+
+    return {f'{f.attname}_stored': Cast(f.attname, output_field=TextField()) for f in fields}
+
+
+def encryption_status(model) -> dict:
+    """{campo: {'legacy': n, 'retired_key': n, 'current': n}} das linhas não vazias."""
+    from django.db.models import Count
+    from django.db.models.functions import Substr
+    from core.models import DataEncryptionKey
+
+    active = {key.hex for key in DataEncryptionKey.objects.filter(is_active=True).values_list('id', flat=True)}
+    status = {}
+    for f in envelope_fields(model):
+        stored = f'{f.attname}_stored'
+        rows = model.objects.annotate(**{stored: _stored_values([f])[stored]}).exclude(**{f'{stored}__isnull': True}).exclude(**{stored: ''})
+        by_key = (
+            rows.filter(**{f'{stored}__startswith': ENVELOPE_PREFIX})
+            .annotate(key_id=Substr(stored, len(ENVELOPE_PREFIX) + 1, 32))
+            .values('key_id').annotate(n=Count('pk')).values_list('key_id', 'n')
+        )
+        counts = {'legacy': rows.exclude(**{f'{stored}__startswith': ENVELOPE_PREFIX}).count(), 'retired_key': 0, 'current': 0}
+        for key_id, n in by_key:
+            counts['current' if key_id in active else 'retired_key'] += n
+        status[f.name] = counts
+    return status
+
+
+@dataclass
+class ReencryptStats:
+    scanned: int = 0
+    reencrypted: dict = dataclass_field(default_factory=dict)  # campo -> valores re-cifrados
+    elapsed: float = 0.0
+
+
+def reencrypt_model(model, batch_size: int = 500,
+                    progress: Optional[Callable[[ReencryptStats], None]] = None) -> ReencryptStats:
+    """
+    Re-cifra com a chave ativa do tenant os valores em formato legado ou com chave aposentada.
+    Lotes por chave primária (keyset); cada lote é uma transação curta com SELECT ... FOR UPDATE,
+    relendo o valor sob lock: uma edição concorrente nunca é sobrescrita por um valor antigo.
+    Idempotente e retomável.
+    """
+    from core.models import DataEncryptionKey
+
+    fields = envelope_fields(model)
+    tenant_attrs = sorted({f.tenant_field for f in fields if f.tenant_field})
+    stored = _stored_values(fields)
+    stats = ReencryptStats(reencrypted={f.name: 0 for f in fields})
+    started = time.monotonic()
+    last_pk = None
+
+    while True:
+        page = model.objects.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        pks = list(page.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        last_pk = pks[-1]
+
+        with transaction.atomic():
+            active = {key.hex for key in DataEncryptionKey.objects.filter(is_active=True).values_list('id', flat=True)}
+            rows = (
+                model.objects.select_for_update().filter(pk__in=pks)
+                .annotate(**stored).values('pk', *tenant_attrs, *stored)
+            )
+            changed = []
+            for row in rows:
+                values, dirty = {}, False
+                for f in fields:
+                    value = row[f'{f.attname}_stored']
+                    if value and (not is_envelope(value) or key_id_of(value) not in active):
+                        tenant = row[f.tenant_field] if f.tenant_field else None
+                        value = encrypt(f.from_db_value(value, None, None), f.aad, tenant)
+                        stats.reencrypted[f.name] += 1
+                        dirty = True
+                    values[f.attname] = value
+                if dirty:
+                    changed.append(model(pk=row['pk'], **values))
+            if changed:
+                # Valores já em envelope passam direto pelo get_prep_value
+                model.objects.bulk_update(changed, [f.attname for f in fields])
+
+        stats.scanned += len(pks)
+        stats.elapsed = time.monotonic() - started
+        if progress:
+            progress(stats)
+
+    return stats
+
+
+def rotate_data_keys() -> list:
+    """Nova versão da chave de cada tenant que já tem uma ativa (re-cifre depois com reencrypt_model)."""
+    from core.models import DataEncryptionKey
+
+    tenants = DataEncryptionKey.objects.filter(is_active=True).values_list('organization_id', flat=True)
+    return [create_data_key(organization_id) for organization_id in list(tenants)]
@@ -0,0 +1,269 @@
+# backend/core/fake_services.py em 2026-10-19 11:00
+
+"""
+Servidores locais que imitam o Ollama e a Unstructured API.
+
+Permitem medir a vazão de ingestão e retrieval sem GPU, sem o container do Unstructured
+e sem rede (ex: em CI). Só usam a stdlib + pypdf (já dependência da ingestão).
+
+- FakeOllamaServer: embeddings determinísticos (semente = hash do modelo + texto), gerações
+  enlatadas e latência configurável.
+- FakeUnstructuredServer: particiona PDFs reais com pypdf em elementos no formato da API.
+
+Uso: `python manage.py run_fake_ai_services` ou a fixture pytest `fake_ai_services` (conftest.py).
+"""
+
+import hashlib
+import io
+import json
+import logging
+import math
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_DIMENSIONS = 4096
+FAKE_MODEL_DIGEST_PREFIX = "sha256:fake"
+
+
+def deterministic_embedding(model: str, text: str, dimensions: int) -> list[float]:
+    """Vetor unitário pseudo-aleatório cuja semente é o hash de (modelo, texto)."""
+    seed = int.from_bytes(hashlib.sha256(f"{model}\x00{text}".encode('utf-8')).digest()[:8], 'big')
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Base com helpers de leitura/escrita. Silencia o log de acesso do http.server."""
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.server.label}: {format % args}")
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _FakeOllamaHandler(_JSONHandler):
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/api/tags':
+            models = sorted(self.server.known_models)
+            return self._send_json({"models": [
+                {"name": m, "model": m, "digest": f"{FAKE_MODEL_DIGEST_PREFIX}-{hashlib.sha256(m.encode()).hexdigest()[:12]}"}
+                for m in models
+            ]})
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        try:
+            payload = json.loads(self._read_body() or b"{}")
+        except json.JSONDecodeError:
+            return self._send_json({"error": "invalid json"}, status=400)
+
+        model = payload.get('model', '')
+        self.server.known_models.add(model)
+
+        if self.path == '/api/embeddings':
+            self._sleep(self.server.embed_latency_ms)
+            return self._send_json({
+                "embedding": deterministic_embedding(model, payload.get('prompt', ''), self.server.dimensions)
+            })
+
+        if self.path == '/api/embed':
+            inputs = payload.get('input', [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._sleep(self.server.embed_latency_ms * max(1, len(inputs)))
+            return self._send_json({
+                "model": model,
+                "embeddings": [deterministic_embedding(model, text, self.server.dimensions) for text in inputs],
+            })
+
+        if self.path == '/api/generate':
+            return self._generate(model, payload)
+
+        self._send_json({"error": "not found"}, status=404)
+
+    def _generate(self, model, payload):
+        prompt = payload.get('prompt', '')
+        if not prompt:
+            # Load/unload de modelo (keep_alive) não gera texto
+            return self._send_json({"model": model, "response": "", "done": True})
+
+        text = self.server.canned_response(prompt, is_json=payload.get('format') == 'json')
+        started = time.perf_counter()
+        self._sleep(self.server.generate_latency_ms)
+        elapsed_ns = int((time.perf_counter() - started) * 1e9)
+
+        self._send_json({
+            "model": model,
+            "response": text,
+            "done": True,
+            "total_duration": elapsed_ns,
+            "load_duration": 0,
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": elapsed_ns // 2,
+            "eval_count": len(text.split()),
+            "eval_duration": elapsed_ns - elapsed_ns // 2,
+        })
+
+    @staticmethod
+    def _sleep(ms):
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+
+class _FakeUnstructuredHandler(_JSONHandler):
+
+    def do_POST(self):
+        content_type = self.headers.get('Content-Type', '')
+        if 'multipart/form-data' not in content_type:
+            return self._send_json({"detail": "multipart/form-data required"}, status=400)
+
+        message = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + self._read_body()
+        )
+
+        file_name, file_bytes, fields = None, None, {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name == 'files':
+                file_name = part.get_filename()
+                file_bytes = part.get_payload(decode=True)
+            else:
+                fields.setdefault(name, []).append(part.get_content().strip())
+
+        if file_bytes is None:
+            return self._send_json({"detail": "files is required"}, status=422)
+
+        try:
+            elements = pdf_to_elements(
+                file_bytes, file_name,
+                include_page_breaks='true' in [v.lower() for v in fields.get('include_page_breaks', [])],
+                languages=fields.get('languages') or ['eng'],
+            )
+        except Exception as e:
+            return self._send_json({"detail": f"Falha ao ler PDF: {e}"}, status=422)
+
+        self._send_json(elements)
+
+
+def pdf_to_elements(file_bytes: bytes, file_name: str, include_page_breaks: bool = False, languages=None) -> list[dict]:
+    """
+    Converte um PDF em elementos no formato da Unstructured API (Title/NarrativeText/PageBreak).
+    Blocos são separados por linhas em branco; linhas curtas sem pontuação final viram 'Title'.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(file_bytes))
+    elements = []
+    for page_index, page in enumerate(reader.pages, start=1):
+        text = page.extract_text() or ""
+        blocks = [b.strip() for b in text.replace('\r', '').split('\n\n')]
+        if len(blocks) == 1:
+            # pypdf costuma devolver a página sem linhas em branco: cai para uma linha por bloco
+            blocks = [b.strip() for b in text.split('\n')]
+
+        for block in filter(None, blocks):
+            is_title = len(block) < 80 and '\n' not in block and not block.endswith(('.', ':', ';', ','))
+            elements.append({
+                "type": "Title" if is_title else "NarrativeText",
+                "element_id": hashlib.sha256(f"{file_name}:{page_index}:{len(elements)}".encode()).hexdigest()[:32],
+                "text": block,
+                "metadata": {"page_number": page_index, "filename": file_name, "languages": list(languages or [])},
+            })
+
+        if include_page_breaks:
+            elements.append({
+                "type": "PageBreak",
+                "element_id": hashlib.sha256(f"{file_name}:{page_index}:break".encode()).hexdigest()[:32],
+                "text": "",
+                "metadata": {"page_number": page_index, "filename": file_name},
+            })
+    return elements
+
+
+class _BackgroundServer:
+    """Sobe um ThreadingHTTPServer numa thread daemon. Porta 0 = porta livre escolhida pelo SO."""
+
+    handler_class = None
+    label = "fake"
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.label = self.label
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        host = self.httpd.server_address[0]
+        return f"http://{host}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=self.label, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeOllamaServer(_BackgroundServer):
+    handler_class = _FakeOllamaHandler
+    label = "fake-ollama"
+
+    def __init__(self, host='127.0.0.1', port=0, dimensions=DEFAULT_EMBEDDING_DIMENSIONS,
+                 embed_latency_ms=0.0, generate_latency_ms=0.0, canned_responses=None):
+        """
+        :param canned_responses: dict {substring_do_prompt: resposta}. A primeira substring
+            encontrada no prompt define a resposta; sem match, usa a resposta padrão.
+        """
+        super().__init__(host, port)
+        self.httpd.dimensions = dimensions
+        self.httpd.embed_latency_ms = embed_latency_ms
+        self.httpd.generate_latency_ms = generate_latency_ms
+        self.httpd.known_models = set()
+        self.httpd.canned_response = self._canned_response
+        self.canned_responses = canned_responses or {}
+
+    def _canned_response(self, prompt: str, is_json: bool) -> str:
+        for needle, answer in self.canned_responses.items():
+            if needle in prompt:
+                return answer if isinstance(answer, str) else json.dumps(answer, ensure_ascii=False)
+        return "{}" if is_json else "Resposta simulada (Fake Ollama)."
+
+
+class FakeUnstructuredServer(_BackgroundServer):
+    handler_class = _FakeUnstructuredHandler
+    label = "fake-unstructured"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/general/v0/general"
@@ -0,0 +1,236 @@
+# backend/core/grants.py em 2026-10-19 22:40
+
+"""
+Avaliação de DataAccessGrant em lote: "o usuário X pode exercer a permissão P sobre o
+recurso Y do dono Z?".
+
+Um grant vale para um usuário (grantee_user) ou para todos os membros de um time
+(grantee_team, via UserProfile.teams), para um recurso específico, para todos os recursos de
+um tipo (só target_content_type) ou para todos os dados do dono (sem alvo). Revogação e
+expiração encerram o acesso. 'full_access' em permissions vale por qualquer permissão.
+
+    - GrantExpansion materializa os grants vigentes com os times já resolvidos: uma linha
+      por (grant, usuário), lida pelo índice (user, owner). Mantida por core/signals.py.
+    - check_many() responde uma página inteira: uma leitura no cache e, para os donos ainda
+      fora dele, uma consulta. As regras de cada (actor, owner) ficam em cache por até
+      GRANT_CACHE_TTL_SECONDS (nunca além da próxima expiração). Criar, editar ou revogar um
+      grant, ou mudar os membros de um time, troca a versão do cache dos usuários afetados.
+    - sweep_expired_grants() (celery-beat) carimba os vencidos em lote: revoked_at recebe o
+      expires_at, o grant sai dos índices parciais e da expansão.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FULL_ACCESS = 'full_access'
+KEY_SCHEMA = "grants:v1"
+
+
+def _cache():
+    return caches[settings.RBAC_CACHE_ALIAS]
+
+
+def _resource_key(resource):
+    """None (todos os dados do dono) ou (content_type_id, pk em texto), como no grant."""
+    if resource is None:
+        return None
+    return ContentType.objects.get_for_model(resource).id, str(resource.pk)
+
+
+# --- Expansão materializada ---
+
+def expand_grants(grants) -> set:
+    """Refaz a expansão dos grants. Devolve os ids dos usuários cujo acesso pode ter mudado."""
+    from core.models import GrantExpansion, UserProfile
+
+    grants = list(grants)
+    existing = GrantExpansion.objects.filter(grant_id__in=[grant.pk for grant in grants])
+    affected = set(existing.values_list('user_id', flat=True))
+    existing.delete()
+
+    open_grants = [grant for grant in grants if grant.is_active()]
+    members = defaultdict(set)
+    team_ids = {grant.grantee_team_id for grant in open_grants if grant.grantee_team_id}
+    if team_ids:
+        memberships = UserProfile.teams.through.objects.filter(team_id__in=team_ids)
+        for team_id, user_id in memberships.values_list('team_id', 'userprofile__user_id'):
+            members[team_id].add(user_id)
+
+    rows = []
+    for grant in open_grants:
+        users = set(members[grant.grantee_team_id]) if grant.grantee_team_id else set()
+        if grant.grantee_user_id:
+            users.add(grant.grantee_user_id)
+        rows.extend(
+            GrantExpansion(
+                grant_id=grant.pk, user_id=user_id, owner_id=grant.owner_id,
+                target_content_type_id=grant.target_content_type_id,
+                target_object_id=grant.target_object_id,
+                permissions=grant.permissions, expires_at=grant.expires_at,
+            )
+            for user_id in users
+        )
+    GrantExpansion.objects.bulk_create(rows, batch_size=1000)
+    return affected | {row.user_id for row in rows}
+
+
+def expand_teams(team_ids) -> set:
+    """Refaz a expansão dos grants vigentes dos times (membros entraram ou saíram)."""
+    from core.models import DataAccessGrant
+
+    return expand_grants(DataAccessGrant.objects.active().filter(grantee_team_id__in=list(team_ids)))
+
+
+def sweep_expired_grants(batch_size: int = 5000, now=None) -> int:
+    """
+    Carimba os grants vencidos e ainda abertos: revoked_at = expires_at (o acesso terminou no
+    vencimento; revogações manuais têm revoked_at diferente do expires_at). Lotes curtos com
+    SKIP LOCKED, lidos pelo índice parcial de vencimento. A expansão desses grants é removida
+    e o cache dos usuários afetados, invalidado. Devolve quantos grants foram carimbados.
+    """
+    from core.models import DataAccessGrant, GrantExpansion
+
+    now = now or timezone.now()
+    swept = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                DataAccessGrant.objects.expired(now).order_by('expires_at')
+                .select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            DataAccessGrant.objects.filter(pk__in=ids).update(revoked_at=F('expires_at'))
+            expansion = GrantExpansion.objects.filter(grant_id__in=ids)
+            invalidate_actors(set(expansion.values_list('user_id', flat=True)))
+            expansion.delete()
+        swept += len(ids)
+        if len(ids) < batch_size:
+            break
+    return swept
+
+
+# --- Cache de checagens ---
+
+def _version_key(actor_id) -> str:
+    return f"{KEY_SCHEMA}:actor:{actor_id}"
+
+
+def _actor_version(cache, actor_id) -> str:
+    version = cache.get(_version_key(actor_id))
+    if version is None:
+        cache.add(_version_key(actor_id), uuid.uuid4().hex, timeout=None)
+        version = cache.get(_version_key(actor_id))
+    return version
+
+
+def invalidate_actors(user_ids):
+    """Nova versão do cache de cada usuário (já e de novo no commit, como em core/rbac.py)."""
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+
+    def invalidate():
+        try:
+            _cache().set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, timeout=None)
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar o cache de grants: {e}")
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def _load_rules(actor_id, owner_ids, now) -> tuple[dict, dict]:
+    """(owner -> regras, owner -> expiração mais próxima) dos grants vigentes, em uma consulta."""
+    from core.models import GrantExpansion
+
+    rules, soonest = defaultdict(list), {}
+    rows = GrantExpansion.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+        user_id=actor_id, owner_id__in=owner_ids,
+    ).values_list('owner_id', 'target_content_type_id', 'target_object_id', 'permissions', 'expires_at')
+    for owner_id, content_type_id, object_id, permissions, expires_at in rows:
+        target = (content_type_id, object_id) if content_type_id else None
+        rules[owner_id].append((target, frozenset(permissions)))
+        if expires_at and (owner_id not in soonest or expires_at < soonest[owner_id]):
+            soonest[owner_id] = expires_at
+    return {owner_id: tuple(rules[owner_id]) for owner_id in owner_ids}, soonest
+
+
+def _rules_for(actor_id, owner_ids) -> dict:
+    now = timezone.now()
+    keys, found, cache = {}, {}, None
+    try:
+        cache = _cache()
+        version = _actor_version(cache, actor_id)
+        keys = {owner_id: f"{KEY_SCHEMA}:{actor_id}:{version}:{owner_id}" for owner_id in owner_ids}
+        found = cache.get_many(list(keys.values()))
+    except Exception as e:
+        logger.warning(f"Cache de grants indisponível, consultando o banco: {e}")
+        cache = None
+
+    rules = {owner_id: found[keys[owner_id]] for owner_id in owner_ids if keys.get(owner_id) in found}
+    missing = owner_ids - rules.keys()
+    if not missing:
+        return rules
+
+    loaded, soonest = _load_rules(actor_id, missing, now)
+    rules.update(loaded)
+    if cache is not None:
+        # Entradas com a mesma validade vão juntas; uma que venceria em menos de 1s não é gravada
+        by_timeout = defaultdict(dict)
+        for owner_id, owner_rules in loaded.items():
+            timeout = settings.GRANT_CACHE_TTL_SECONDS
+            if owner_id in soonest:
+                timeout = min(timeout, int((soonest[owner_id] - now).total_seconds()))
+            if timeout >= 1:
+                by_timeout[timeout][keys[owner_id]] = owner_rules
+        try:
+            for timeout, entries in by_timeout.items():
+                cache.set_many(entries, timeout)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar grants no cache: {e}")
+    return rules
+
+
+def _allows(rules, resource, permission) -> bool:
+    for target, permissions in rules:
+        if permission not in permissions and FULL_ACCESS not in permissions:
+            continue
+        if target is None:
+            return True
+        if resource is not None and target[0] == resource[0] and target[1] in (None, resource[1]):
+            return True
+    return False
+
+
+def check_many(actor, pairs, permission: str = 'read') -> list[bool]:
+    """
+    Uma resposta por (owner, resource) de `pairs`, na mesma ordem. owner é um User ou id;
+    resource é uma instância de modelo ou None (os dados do dono em geral: só grants sem alvo
+    valem). O dono sempre acessa os próprios dados. Pensado para uma chamada por página.
+    """
+    pairs = list(pairs)
+    if actor is None or not actor.is_authenticated:
+        return [False] * len(pairs)
+
+    normalized = [(getattr(owner, 'pk', owner), _resource_key(resource)) for owner, resource in pairs]
+    owner_ids = {owner_id for owner_id, _ in normalized if owner_id != actor.pk}
+    rules = _rules_for(actor.pk, owner_ids) if owner_ids else {}
+    return [
+        owner_id == actor.pk or _allows(rules[owner_id], resource, permission)
+        for owner_id, resource in normalized
+    ]
+
+
+def check(actor, owner, resource=None, permission: str = 'read') -> bool:
+    return check_many(actor, [(owner, resource)], permission)[0]
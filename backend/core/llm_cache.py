@@ -0,0 +1,126 @@
+# backend/core/llm_cache.py em 2026-10-19 09:30
+
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Campos da resposta do Ollama que não fazem sentido persistir.
+# 'context' é o array de tokens da conversa (milhares de inteiros) e não é usado pelos callers.
+VOLATILE_RESPONSE_KEYS = ('context',)
+
+
+def build_cache_key(model_digest: str, prompt: str, options: Dict = None, images: list = None, response_format: str = None) -> str:
+    """
+    Gera a chave determinística (SHA-256) de uma chamada de geração.
+
+    As imagens entram apenas pelo hash (base64 de páginas inteiras seria caro demais para
+    serializar na chave) e as opções são ordenadas para que {"a":1,"b":2} == {"b":2,"a":1}.
+    """
+    images_hash = [hashlib.sha256(img.encode('utf-8')).hexdigest() for img in (images or [])]
+    material = json.dumps(
+        {
+            "model": model_digest,
+            "prompt": prompt,
+            "options": options or {},
+            "format": response_format,
+            "images": images_hash,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Cache persistente (Postgres) de respostas do LLM para jobs em lote de baixa temperatura.
+
+    Uso (opt-in por comando):
+        cache = LLMResponseCache(namespace='audit_anatomy_rag', ttl_hours=72)
+        ollama_client.generate(model, prompt, options={...}, cache=cache)
+
+    - TTL: entradas expiradas são ignoradas e removidas na leitura.
+    - Tamanho: ao ultrapassar LLM_CACHE_MAX_MB, as entradas menos usadas recentemente (LRU) são removidas.
+    """
+
+    # Frequência (em escritas) da verificação de tamanho total. Evita um SUM() por chamada.
+    PRUNE_EVERY = 50
+
+    def __init__(self, namespace: str, ttl_hours: Optional[float] = None, max_mb: Optional[float] = None):
+        self.namespace = namespace
+        self.ttl_hours = ttl_hours if ttl_hours is not None else settings.LLM_CACHE_TTL_HOURS
+        self.max_bytes = int((max_mb if max_mb is not None else settings.LLM_CACHE_MAX_MB) * 1024 * 1024)
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = LLMCacheEntry.objects.filter(key=key).first()
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at and entry.expires_at <= timezone.now():
+            entry.delete()
+            self.misses += 1
+            return None
+
+        LLMCacheEntry.objects.filter(key=key).update(hit_count=F('hit_count') + 1, last_hit_at=timezone.now())
+        self.hits += 1
+        return entry.response
+
+    def set(self, key: str, model: str, response: Dict[str, Any]) -> None:
+        payload = {k: v for k, v in response.items() if k not in VOLATILE_RESPONSE_KEYS}
+        size = len(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+        expires_at = timezone.now() + timedelta(hours=self.ttl_hours) if self.ttl_hours else None
+
+        LLMCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'namespace': self.namespace,
+                'model': model,
+                'response': payload,
+                'size_bytes': size,
+                'expires_at': expires_at,
+                'last_hit_at': timezone.now(),
+            }
+        )
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Remove expirados e aplica o limite de tamanho total (LRU). Retorna quantas entradas saíram."""
+        removed, _ = LLMCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+
+        total = LLMCacheEntry.objects.aggregate(total=Sum('size_bytes'))['total'] or 0
+        if total <= self.max_bytes:
+            return removed
+
+        excess = total - self.max_bytes
+        doomed, freed = [], 0
+        for key, size in LLMCacheEntry.objects.order_by('last_hit_at').values_list('key', 'size_bytes').iterator():
+            if freed >= excess:
+                break
+            doomed.append(key)
+            freed += size
+
+        evicted, _ = LLMCacheEntry.objects.filter(key__in=doomed).delete()
+        logger.info(f"LLM Cache: {evicted} entradas removidas por limite de tamanho ({freed / 1024:.0f} KB).")
+        return removed + evicted
+
+    def stats_line(self) -> str:
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total else 0.0
+        return f"Cache LLM [{self.namespace}]: {self.hits} hits / {self.misses} misses ({ratio:.1f}% hit)"
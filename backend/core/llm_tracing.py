@@ -0,0 +1,177 @@
+# backend/core/llm_tracing.py em 2026-10-19 10:15
+
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Aggregate, Count, F, FloatField, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTraceBuffer:
+    """
+    Buffer em memória dos traces de chamadas ao LLM.
+
+    As chamadas ao Ollama não podem esperar um INSERT por chamada: os registros são
+    acumulados e gravados em lote (bulk_create) por uma thread daemon, a cada
+    LLM_TRACING_FLUSH_SECONDS ou quando o buffer atinge LLM_TRACING_BATCH_SIZE.
+    No encerramento do processo (management commands) o restante é gravado via atexit.
+    """
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._items = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._flush_at_exit = False
+
+    def add(self, trace: Dict[str, Any]) -> None:
+        with self._lock:
+            self._items.append(trace)
+            full = len(self._items) >= self.batch_size
+            if self._worker is None or not self._worker.is_alive():
+                self._start_worker()
+        if full:
+            self._wakeup.set()
+
+    def _start_worker(self):
+        self._worker = threading.Thread(target=self._run, name="llm-trace-flusher", daemon=True)
+        self._worker.start()
+        # A thread é recriada se morrer (ex: fork); o flush de saída é registrado uma vez só
+        if not self._flush_at_exit:
+            atexit.register(self.flush)
+            self._flush_at_exit = True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            # A thread tem conexão própria com o banco: fecha para não segurar conexões ociosas
+            connection.close()
+
+    def flush(self) -> int:
+        with self._lock:
+            items, self._items = self._items, []
+        if not items:
+            return 0
+
+        from .models import LLMCallTrace
+        try:
+            LLMCallTrace.objects.bulk_create([LLMCallTrace(**item) for item in items], batch_size=500)
+        except Exception as e:
+            # Telemetria nunca deve derrubar o fluxo principal
+            logger.warning(f"Falha ao gravar {len(items)} traces de LLM: {e}")
+            return 0
+        return len(items)
+
+
+trace_buffer = LLMTraceBuffer(
+    batch_size=getattr(settings, 'LLM_TRACING_BATCH_SIZE', 200),
+    flush_interval=getattr(settings, 'LLM_TRACING_FLUSH_SECONDS', 5.0),
+)
+
+
+def record_llm_call(
+    caller: Optional[str],
+    endpoint: str,
+    model: str,
+    started_at: float,
+    response: Optional[Dict[str, Any]] = None,
+    error: Optional[Exception] = None,
+    organization_id=None,
+    cache_hit: bool = False,
+) -> None:
+    """
+    Enfileira o trace de uma chamada. 'started_at' é o time.perf_counter() do início da chamada.
+    As métricas de tokens/duração são extraídas da resposta do Ollama quando presentes
+    (o endpoint de embeddings não retorna nenhuma delas).
+    """
+    if not settings.LLM_TRACING_ENABLED:
+        return
+
+    from .models import LLMCallTrace
+
+    if error is not None:
+        outcome = LLMCallTrace.Outcome.ERROR
+    elif cache_hit:
+        outcome = LLMCallTrace.Outcome.CACHE_HIT
+    else:
+        outcome = LLMCallTrace.Outcome.SUCCESS
+
+    data = response if (response and not cache_hit) else {}
+    trace_buffer.add({
+        "caller": caller or LLMCallTrace.Caller.OTHER,
+        "endpoint": endpoint,
+        "model": model or "",
+        "organization_id": organization_id,
+        "outcome": outcome,
+        "error": str(error)[:1000] if error is not None else "",
+        "latency_ms": (time.perf_counter() - started_at) * 1000,
+        "total_duration_ns": data.get("total_duration") or 0,
+        "load_duration_ns": data.get("load_duration") or 0,
+        "prompt_eval_count": data.get("prompt_eval_count") or 0,
+        "prompt_eval_duration_ns": data.get("prompt_eval_duration") or 0,
+        "eval_count": data.get("eval_count") or 0,
+        "eval_duration_ns": data.get("eval_duration") or 0,
+        "created_at": timezone.now(),
+    })
+
+
+class Percentile(Aggregate):
+    """PERCENTILE_CONT do Postgres (ordered-set aggregate), ex: Percentile('latency_ms', 0.95)."""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile: float, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def summarize_llm_usage(hours: int = 24, group_by: str = 'caller') -> list[dict]:
+    """
+    Agrega os traces das últimas 'hours' horas por 'caller' ou 'organization'.
+    Latências (p50/p95) consideram apenas chamadas que foram de fato à GPU (exclui cache hits).
+    """
+    from .models import LLMCallTrace
+
+    group_fields = {
+        'caller': ['caller'],
+        'organization': ['organization_id', 'organization__name'],
+    }[group_by]
+
+    gpu_calls = Q(outcome=LLMCallTrace.Outcome.SUCCESS)
+    rows = (
+        LLMCallTrace.objects
+        .filter(created_at__gte=timezone.now() - timedelta(hours=hours))
+        .values(*group_fields)
+        .annotate(
+            calls=Count('id'),
+            errors=Count('id', filter=Q(outcome=LLMCallTrace.Outcome.ERROR)),
+            cache_hits=Count('id', filter=Q(outcome=LLMCallTrace.Outcome.CACHE_HIT)),
+            p50_latency_ms=Percentile('latency_ms', 0.5, filter=gpu_calls),
+            p95_latency_ms=Percentile('latency_ms', 0.95, filter=gpu_calls),
+            prompt_tokens=Sum('prompt_eval_count'),
+            eval_tokens=Sum('eval_count'),
+            eval_seconds=Sum(F('eval_duration_ns') / 1e9, output_field=FloatField()),
+            load_seconds=Sum(F('load_duration_ns') / 1e9, output_field=FloatField()),
+        )
+        .order_by(*group_fields)
+    )
+
+    results = []
+    for row in rows:
+        eval_seconds = row.pop('eval_seconds') or 0.0
+        row['tokens_per_second'] = round(row['eval_tokens'] / eval_seconds, 2) if eval_seconds else None
+        row['load_seconds'] = round(row['load_seconds'] or 0.0, 3)
+        results.append(row)
+    return results
@@ -0,0 +1,50 @@
+# backend/core/management/commands/backfill_chunk_metadata.py em 2026-10-19 14:00
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.chunk_metadata import PROMOTED_FIELDS, promote_chunk_metadata
+from core.models import DocumentChunk
+
+
+class Command(BaseCommand):
+    help = """
+    Preenche as colunas promovidas do DocumentChunk (is_table, has_vision, source, language,
+    page_start/page_end, ingested_at) a partir do JSON 'metadata' e do conteúdo.
+
+    Por padrão processa apenas chunks ainda não promovidos (ingested_at nulo).
+    Idempotente e em lotes (keyset por id): pode ser interrompido e re-executado.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Chunks por lote. Padrão: 1000.')
+        parser.add_argument('--all', action='store_true', help='Recalcula todos os chunks (ex: após mudar a detecção de idioma).')
+
+    def handle(self, *args, **options):
+        queryset = DocumentChunk.objects.select_related('document').only(
+            'id', 'content', 'metadata', 'page_number', 'document__file_name', 'document__created_at'
+        ).order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(ingested_at__isnull=True)
+
+        total = queryset.count()
+        self.stdout.write(f"Promovendo metadados de {total} chunks...")
+
+        started = time.time()
+        processed, last_id = 0, None
+        while True:
+            page = queryset.filter(id__gt=last_id) if last_id else queryset
+            batch = list(page[:options['batch_size']])
+            if not batch:
+                break
+
+            for chunk in batch:
+                promote_chunk_metadata(chunk, default_source=chunk.document.file_name, ingested_at=chunk.document.created_at)
+            with transaction.atomic():
+                DocumentChunk.objects.bulk_update(batch, PROMOTED_FIELDS)
+
+            processed += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"  {processed}/{total} ({processed / max(time.time() - started, 1e-6):.0f} chunks/s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill concluído: {processed} chunks atualizados."))
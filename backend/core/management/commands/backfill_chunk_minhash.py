@@ -0,0 +1,47 @@
+# backend/core/management/commands/backfill_chunk_minhash.py em 2026-10-19 16:40
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import DocumentChunk
+from core.near_duplicates import band_keys, minhash_signature
+
+
+class Command(BaseCommand):
+    help = """
+    Calcula a assinatura MinHash e as bandas LSH dos chunks ingeridos antes da deduplicação,
+    para que ingestões futuras os reconheçam como canônicos. Não altera vetores nem vincula
+    duplicatas já existentes.
+
+    Processa apenas chunks sem assinatura. Idempotente e em lotes (keyset por id).
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Chunks por lote. Padrão: 1000.')
+
+    def handle(self, *args, **options):
+        queryset = DocumentChunk.objects.filter(minhash__isnull=True).only('id', 'content').order_by('id')
+        total = queryset.count()
+        self.stdout.write(f"Calculando MinHash de {total} chunks...")
+
+        started = time.time()
+        processed, last_id = 0, None
+        while True:
+            page = queryset.filter(id__gt=last_id) if last_id else queryset
+            batch = list(page[:options['batch_size']])
+            if not batch:
+                break
+
+            for chunk in batch:
+                signature = minhash_signature(chunk.content)
+                # Texto sem palavras: assinatura vazia (marca como processado, nunca colide)
+                chunk.minhash = signature.tobytes() if signature is not None else b''
+                chunk.lsh_bands = band_keys(signature) if signature is not None else []
+            with transaction.atomic():
+                DocumentChunk.objects.bulk_update(batch, ['minhash', 'lsh_bands'])
+
+            processed += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"  {processed}/{total} ({processed / max(time.time() - started, 1e-6):.0f} chunks/s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill concluído: {processed} assinaturas calculadas."))
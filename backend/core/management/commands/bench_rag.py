@@ -0,0 +1,136 @@
+# backend/core/management/commands/bench_rag.py em 2026-10-19 11:45
+
+import json
+import math
+import platform
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core.models import Document, DocumentChunk, LLMCallTrace
+from core.services import RAGService
+from core import rag_bench
+
+
+class Command(BaseCommand):
+    help = """
+    Benchmark de Retrieval (RAG) sobre o corpus de DocumentChunk.
+
+    1. Monta um conjunto de consultas (sintético ou amostrado do próprio corpus).
+    2. Calcula o top-k EXATO (scan sequencial) como verdade de referência.
+    3. Mede recall@k, latência p50/p95/p99, CPU Python por consulta, tamanho de índice e pico
+       de memória Python para cada configuração (exact, hnsw, ivfflat, halfvec, reduced, hybrid, memory, mmr).
+       Na config mmr, 'mmr_select_ms' é o custo da reseleção MMR (NumPy) por consulta.
+    4. Mede o custo de CPU do I/O de vetores (listas Python vs NumPy/binário).
+
+    Índices ANN são criados em transações revertidas: nada permanece no banco.
+    A saída JSON é estável para comparação (diff) entre releases.
+
+    SÓ PARA STAGING: o CREATE INDEX (não concorrente) segura um lock SHARE na tabela de chunks
+    durante a construção e a medição de cada config, bloqueando as escritas da ingestão.
+    Não rode contra o banco de produção.
+    """
+
+    CONFIGS = ['exact', 'hnsw', 'ivfflat', 'halfvec', 'reduced', 'hybrid', 'memory', 'mmr']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['synthetic', 'sampled'], default='synthetic',
+                            help='synthetic: vetores do corpus + ruído (sem Ollama). sampled: trechos re-embedados via Ollama. Padrão: synthetic.')
+        parser.add_argument('--queries', type=int, default=100, help='Tamanho do conjunto de consultas. Padrão: 100.')
+        parser.add_argument('--k', type=int, default=5, help='Top-k avaliado (o RAG usa 5). Padrão: 5.')
+        parser.add_argument('--noise', type=float, default=0.05, help='Desvio do ruído gaussiano no modo synthetic. Padrão: 0.05.')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do sorteio de consultas (reprodutibilidade).')
+        parser.add_argument('--configs', type=str, default=','.join(self.CONFIGS),
+                            help=f'Lista separada por vírgula. Disponíveis: {", ".join(self.CONFIGS)}.')
+        parser.add_argument('--ef-search', type=int, default=40, help='hnsw.ef_search para configs HNSW. Padrão: 40.')
+        parser.add_argument('--lists', type=int, help='Listas do IVFFlat. Padrão: linhas/1000 (mín. 1).')
+        parser.add_argument('--probes', type=int, help='ivfflat.probes. Padrão: sqrt(lists).')
+        parser.add_argument('--nprobe', type=int, help='Listas IVF visitadas na config memory. Padrão: RAG_VECTOR_IVF_NPROBE.')
+        parser.add_argument('--reduced-dims', type=int, default=1024, help='Dimensões do prefixo na config reduced. Padrão: 1024.')
+        parser.add_argument('--mmr-lambda', type=float, help='λ da config mmr (1 = só relevância). Padrão: RAG_MMR_LAMBDA.')
+        parser.add_argument('--mmr-candidates', type=int, help='Candidatos reselecionados pela config mmr. Padrão: RAG_MMR_CANDIDATES.')
+        parser.add_argument('--output', type=str, help='Arquivo de saída JSON (padrão: stdout).')
+
+    def handle(self, *args, **options):
+        selected = [c.strip() for c in options['configs'].split(',') if c.strip()]
+        unknown = set(selected) - set(self.CONFIGS)
+        if unknown:
+            raise CommandError(f"Configs desconhecidas: {', '.join(sorted(unknown))}")
+
+        dims = DocumentChunk._meta.get_field('embedding').dimensions
+        corpus_size = DocumentChunk.objects.filter(document__status=Document.DocumentStatus.COMPLETED).count()
+        if corpus_size == 0:
+            raise CommandError("Nenhum DocumentChunk em documentos COMPLETED. Ingerir antes de medir.")
+
+        self.stderr.write(f"Corpus: {corpus_size} chunks ({dims} dims). Montando {options['queries']} consultas ({options['mode']})...")
+        rag = RAGService(caller=LLMCallTrace.Caller.OTHER)
+        queries = rag_bench.build_query_set(
+            options['mode'], options['queries'], noise=options['noise'], seed=options['seed'],
+            embed_fn=rag.get_query_embedding,
+        )
+
+        self.stderr.write("Calculando top-k exato (verdade de referência)...")
+        ground_truth = rag_bench.compute_ground_truth(queries, dims, options['k'])
+
+        results = []
+        for name in selected:
+            config = self._build_config(name, dims, corpus_size, options)
+            self.stderr.write(f"  > {name} {config.params or ''}")
+            results.append(rag_bench.run_config(config, queries, ground_truth))
+
+        self.stderr.write("  > vector_io (CPU de serialização: listas vs NumPy)")
+        vector_io = rag_bench.measure_vector_io()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            row = cursor.fetchone()
+            embedding_bytes = rag_bench.embedding_column_bytes(cursor)
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec='seconds'),
+                "mode": options['mode'],
+                "queries": len(queries),
+                "k": options['k'],
+                "seed": options['seed'],
+                "corpus_chunks": corpus_size,
+                "dimensions": dims,
+                "embedding_column_bytes": embedding_bytes,
+                "pgvector_version": row[0] if row else None,
+                "python": platform.python_version(),
+            },
+            "results": results,
+            "vector_io": vector_io,
+        }
+
+        output = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Relatório salvo em {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _build_config(self, name, dims, corpus_size, options):
+        k = options['k']
+        if name == 'exact':
+            return rag_bench.ExactScan(dims, k)
+        if name == 'hnsw':
+            return rag_bench.HNSWConfig(dims, k, ef_search=options['ef_search'])
+        if name == 'ivfflat':
+            lists = options['lists'] or max(1, corpus_size // 1000)
+            probes = options['probes'] or max(1, int(math.sqrt(lists)))
+            return rag_bench.IVFFlatConfig(dims, k, lists=lists, probes=probes)
+        if name == 'halfvec':
+            return rag_bench.HalfvecConfig(dims, k, ef_search=options['ef_search'])
+        if name == 'reduced':
+            return rag_bench.ReducedDimsConfig(dims, k, reduced_dims=min(options['reduced_dims'], dims), ef_search=options['ef_search'])
+        if name == 'memory':
+            return rag_bench.MemoryIndexConfig(dims, k, nprobe=options['nprobe'])
+        if name == 'mmr':
+            return rag_bench.MMRConfig(
+                dims, k,
+                candidates=options['mmr_candidates'] or settings.RAG_MMR_CANDIDATES,
+                **{'lambda': settings.RAG_MMR_LAMBDA if options['mmr_lambda'] is None else options['mmr_lambda']},
+            )
+        return rag_bench.HybridConfig(dims, k, candidates=50)
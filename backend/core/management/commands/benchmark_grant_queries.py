@@ -0,0 +1,134 @@
+# backend/core/management/commands/benchmark_grant_queries.py em 2026-10-19 23:10
+
+import re
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from core.grants import sweep_expired_grants
+from core.models import ConsentLog, DataAccessGrant, Organization, Team
+
+PARTIAL_INDEXES = ('grant_open_user_owner_idx', 'grant_open_team_owner_idx')
+
+
+class Command(BaseCommand):
+    help = """
+    Benchmark das consultas de grants vigentes (DataAccessGrant.objects.active()) sobre um
+    volume sintético. Tudo roda numa transação desfeita ao final: use um banco de staging
+    (o DROP INDEX da última fase trava a tabela até o fim).
+
+    1. Gera --users usuários e --grants grants por generate_series: 60% vencidos, 10%
+       revogados, 30% vigentes (metade com vencimento futuro); 5% concedidos a um time.
+    2. Mede p50/p95 de "grants vigentes do profissional" e "do time" e o índice escolhido:
+       a) antes da varredura (os vencidos ainda estão nos índices parciais);
+       b) depois de sweep_expired_grants;
+       c) sem os índices parciais (só os índices (owner, grantee_*) originais).
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grants', type=int, default=10_000_000, help='Grants sintéticos. Padrão: 10.000.000.')
+        parser.add_argument('--users', type=int, default=200_000, help='Usuários sintéticos (donos). Padrão: 200.000.')
+        parser.add_argument('--professionals', type=int, default=2_000, help='Dos usuários, quantos recebem grants. Padrão: 2.000.')
+        parser.add_argument('--samples', type=int, default=200, help='Consultas medidas por fase. Padrão: 200.')
+        parser.add_argument('--batch-size', type=int, default=50_000, help='Lote da varredura. Padrão: 50.000.')
+
+    def handle(self, *args, **options):
+        if not 0 < options['professionals'] <= options['users']:
+            raise CommandError('--professionals deve estar entre 1 e --users.')
+
+        with transaction.atomic():
+            team, professionals = self._populate(options)
+
+            self._measure("antes da varredura", team, professionals, options['samples'])
+
+            started = time.perf_counter()
+            swept = sweep_expired_grants(batch_size=options['batch_size'])
+            self.stdout.write(f"Varredura: {swept} grants carimbados em {time.perf_counter() - started:.1f}s")
+            self._analyze()
+            self._measure("depois da varredura", team, professionals, options['samples'])
+
+            with connection.cursor() as cursor:
+                for name in PARTIAL_INDEXES:
+                    cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+            self._analyze()
+            self._measure("sem índices parciais", team, professionals, options['samples'])
+
+            transaction.set_rollback(True)
+
+    def _populate(self, options):
+        table = DataAccessGrant._meta.db_table
+        users_table = User._meta.db_table
+        team = Team.objects.create(organization=Organization.objects.create(name="Benchmark de Grants"), name="Benchmark")
+
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {users_table}
+                    (password, is_superuser, username, first_name, last_name, email, is_staff, is_active, date_joined)
+                SELECT '!', false, 'bench_grant_' || g, '', '', '', false, true, now()
+                FROM generate_series(1, %s) g
+            """, [options['users']])
+            cursor.execute(f"""
+                CREATE TEMP TABLE bench_users ON COMMIT DROP AS
+                SELECT row_number() OVER (ORDER BY id) AS n, id FROM {users_table}
+                WHERE username LIKE 'bench\\_grant\\_%'
+            """)
+            cursor.execute("CREATE UNIQUE INDEX ON bench_users (n)")
+            consent = ConsentLog.objects.create(
+                user_id=self._first_user(cursor), consent_type=ConsentLog.ConsentType.DATA_SHARING,
+                granted=True, version="benchmark",
+            )
+            cursor.execute(f"""
+                INSERT INTO {table}
+                    (id, owner_id, grantor_id, grantee_user_id, grantee_team_id, target_content_type_id,
+                     target_object_id, permissions, consent_log_id, created_at, expires_at, revoked_at)
+                SELECT gen_random_uuid(), o.id, o.id,
+                       CASE WHEN g %% 20 = 0 THEN NULL ELSE p.id END,
+                       CASE WHEN g %% 20 = 0 THEN %s::uuid END,
+                       NULL, NULL, '["read"]'::jsonb, %s::uuid, now(),
+                       CASE WHEN g %% 10 < 6 THEN now() - (g %% 720) * interval '1 hour'
+                            WHEN g %% 10 >= 8 THEN now() + (g %% 720) * interval '1 hour' END,
+                       CASE WHEN g %% 10 = 6 THEN now() - interval '1 day' END
+                FROM generate_series(1, %s) g
+                JOIN bench_users o ON o.n = 1 + (g * 7919::bigint) %% %s
+                JOIN bench_users p ON p.n = 1 + (g * 31::bigint) %% %s
+            """, [str(team.pk), str(consent.pk), options['grants'], options['users'], options['professionals']])
+            cursor.execute("SELECT id FROM bench_users WHERE n <= %s", [options['professionals']])
+            professionals = [row[0] for row in cursor.fetchall()]
+        self._analyze()
+        self.stdout.write(f"{options['grants']} grants gerados em {time.perf_counter() - started:.1f}s")
+        return team, professionals
+
+    def _first_user(self, cursor):
+        cursor.execute("SELECT id FROM bench_users WHERE n = 1")
+        return cursor.fetchone()[0]
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {DataAccessGrant._meta.db_table}")
+
+    def _measure(self, phase, team, professionals, samples):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{phase}"))
+        step = max(1, len(professionals) // samples)
+        queries = {
+            'profissional': [
+                DataAccessGrant.objects.active().filter(grantee_user_id=user_id).values_list('owner_id', flat=True)
+                for user_id in professionals[::step][:samples]
+            ],
+            'time': [DataAccessGrant.objects.active().filter(grantee_team=team).values_list('owner_id', flat=True)] * min(samples, 20),
+        }
+        for label, querysets in queries.items():
+            timings, rows = [], 0
+            for queryset in querysets:
+                started = time.perf_counter()
+                rows = len(list(queryset.all()))
+                timings.append((time.perf_counter() - started) * 1000)
+            plan = querysets[0].explain()
+            index = re.search(r'(?:Index|Bitmap Index) (?:Only )?Scan (?:Backward )?(?:using|on) (\w+)', plan)
+            timings.sort()
+            self.stdout.write(
+                f"  {label:<13} p50={statistics.median(timings):.2f}ms "
+                f"p95={timings[min(len(timings) - 1, int(len(timings) * 0.95))]:.2f}ms "
+                f"({rows} linhas na última; plano: {index.group(1) if index else 'Seq Scan'})"
+            )
@@ -0,0 +1,54 @@
+# backend/core/management/commands/benchmark_pii_encryption.py em 2026-10-19 21:10
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core import envelope
+
+
+class Command(BaseCommand):
+    help = """
+    Vazão (valores/s) de cifrar e decifrar PII: django-crypto-fields (RSA do EncryptedCharField,
+    AES do EncryptedTextField) contra o envelope AES-GCM (core/envelope.py).
+
+    Roda numa transação desfeita ao final (nada fica na tabela Crypt nem em DataEncryptionKey).
+    O decifrar do django-crypto-fields encontra o segredo no cache do Django (gravado ao cifrar):
+    é o melhor caso dele, sem a consulta à tabela Crypt.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--values', type=int, default=1000, help='Valores distintos por esquema. Padrão: 1000.')
+
+    def handle(self, *args, **options):
+        from django_crypto_fields.fields import EncryptedCharField, EncryptedTextField
+
+        values = [f"Paciente {i:06d} de Oliveira Santos" for i in range(options['values'])]
+        aad = b"benchmark"
+        rsa_field, aes_field = EncryptedCharField(), EncryptedTextField()
+        schemes = [
+            ("django-crypto-fields RSA", rsa_field.get_prep_value, lambda v: rsa_field.from_db_value(v)),
+            ("django-crypto-fields AES", aes_field.get_prep_value, lambda v: aes_field.from_db_value(v)),
+            ("envelope AES-GCM", lambda v: envelope.encrypt(v, aad), lambda v: envelope.decrypt(v, aad)),
+        ]
+
+        results = []
+        with transaction.atomic():
+            envelope.active_data_key()  # criação/desembrulho da chave fora da medição
+            for label, encrypt, decrypt in schemes:
+                started = time.perf_counter()
+                stored = [encrypt(value) for value in values]
+                encrypt_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                decrypted = [decrypt(value) for value in stored]
+                decrypt_seconds = time.perf_counter() - started
+
+                assert decrypted == values, f"{label}: ida e volta não confere"
+                results.append((label, len(values) / encrypt_seconds, len(values) / decrypt_seconds))
+            transaction.set_rollback(True)
+        envelope.clear_key_cache()
+
+        baseline = results[0][2]
+        self.stdout.write(f"{'Esquema':<28}{'cifrar/s':>12}{'decifrar/s':>14}{'decifrar x RSA':>16}")
+        for label, encrypt_rate, decrypt_rate in results:
+            self.stdout.write(f"{label:<28}{encrypt_rate:>12.0f}{decrypt_rate:>14.0f}{decrypt_rate / baseline:>15.1f}x")
@@ -0,0 +1,65 @@
+# backend/core/management/commands/build_vector_snapshot.py em 2026-10-19 12:30
+
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Document, DocumentChunk
+from core.embedding_spaces import LEGACY_SPACE
+from core.vector_store import InMemoryVectorIndex, build_snapshot_from_db, snapshot_root
+from core import rag_bench
+
+
+class Command(BaseCommand):
+    help = """
+    Gera o snapshot float16 (mmap) usado pelo backend de retrieval em memória (RAG_RETRIEVAL_BACKEND=memory).
+
+    O snapshot também é reconstruído automaticamente (Celery) quando um Document fica COMPLETED.
+    Com --verify N, compara o top-k do snapshot com o top-k exato do pgvector para N chunks sorteados.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ivf-lists', type=int, help='Listas do IVF (0 = scan completo). Padrão: RAG_VECTOR_IVF_LISTS.')
+        parser.add_argument('--nprobe', type=int, help='Listas visitadas por consulta na verificação. Padrão: RAG_VECTOR_IVF_NPROBE.')
+        parser.add_argument('--verify', type=int, default=0, help='Nº de consultas para comparar com o pgvector (0 = não verifica).')
+        parser.add_argument('--k', type=int, default=5, help='Top-k usado na verificação. Padrão: 5.')
+        parser.add_argument('--space', type=str, default=None, help="Espaço vetorial (ex: gerar o do espaço em sombra antes do cutover). Padrão: RAG_EMBEDDING_SPACE.")
+
+    def handle(self, *args, **options):
+        if not DocumentChunk.objects.filter(document__status=Document.DocumentStatus.COMPLETED).exists():
+            raise CommandError("Nenhum DocumentChunk em documentos COMPLETED. Ingerir antes de gerar o snapshot.")
+
+        self.stdout.write("Exportando embeddings para o snapshot float16...")
+        meta = build_snapshot_from_db(ivf_lists=options['ivf_lists'], space_name=options['space'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {meta['version']}: {meta['rows']} linhas x {meta['dimensions']} dims, "
+            f"IVF={meta['ivf_lists']} listas, {meta['build_seconds']}s (espaço {meta['embedding_space']})."
+        ))
+
+        if options['verify'] and meta['embedding_space'] != LEGACY_SPACE:
+            self.stdout.write(self.style.WARNING("--verify compara com a coluna legacy do pgvector; ignorado para outros espaços."))
+        elif options['verify']:
+            self._verify(options['verify'], options['k'], options['nprobe'], meta['dimensions'], snapshot_root(meta['embedding_space']))
+
+    def _verify(self, size, k, nprobe, dims, root):
+        """
+        Recall@k e latência do snapshot recém-gerado (em root, o diretório do espaço de --space,
+        não o do espaço ativo) contra o scan exato do pgvector (consultas sintéticas).
+        """
+        queries = rag_bench.build_query_set('synthetic', size)
+        ground_truth = rag_bench.compute_ground_truth(queries, dims, k)
+
+        index = InMemoryVectorIndex(root=root, reload_interval=0)
+        recalls, latencies = [], []
+        for query in queries:
+            started = time.perf_counter()
+            hits = index.search(query.embedding, k, nprobe=nprobe)
+            latencies.append((time.perf_counter() - started) * 1000)
+            recalls.append(rag_bench.recall_at_k([chunk_id for chunk_id, _ in hits], ground_truth[query.source_chunk_id]))
+
+        recall = statistics.fmean(recalls)
+        latency = rag_bench.latency_summary(latencies)
+        style = self.style.SUCCESS if recall >= 0.95 else self.style.WARNING
+        self.stdout.write(style(
+            f"Verificação ({len(queries)} consultas): recall@{k}={recall:.4f} vs pgvector exato, "
+            f"latência p50={latency['p50']}ms p95={latency['p95']}ms."
+        ))
@@ -0,0 +1,33 @@
+# backend/core/management/commands/create_embedding_space.py em 2026-10-19 18:10
+
+from django.core.management.base import BaseCommand, CommandError
+from core.clients import ollama_client
+from core.embedding_spaces import LEGACY_SPACE
+from core.models import EmbeddingSpace, LLMCallTrace
+
+
+class Command(BaseCommand):
+    help = """
+    Cria um espaço vetorial (core.embedding_spaces) para um novo modelo de embedding.
+    A dimensão é detectada embedando um texto de teste no Ollama.
+
+    Depois: reembed_chunks <nome> para preenchê-lo em sombra e RAG_EMBEDDING_SPACE=<nome> para o cutover.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', type=str, help="Nome do espaço (slug). Ex: nomic-v1.")
+        parser.add_argument('--model', type=str, required=True, help='Modelo de embedding no Ollama. Ex: nomic-embed-text.')
+
+    def handle(self, *args, **options):
+        name, model = options['name'], options['model']
+        if name == LEGACY_SPACE:
+            raise CommandError(f"'{LEGACY_SPACE}' é reservado para a coluna DocumentChunk.embedding.")
+        if EmbeddingSpace.objects.filter(name=name).exists():
+            raise CommandError(f"Espaço '{name}' já existe.")
+
+        probe = ollama_client.embed(model, "Fêmur: osso da coxa.", caller=LLMCallTrace.Caller.REEMBED)['embedding']
+        if len(probe) == 0:
+            raise CommandError(f"O modelo '{model}' não retornou embedding. Está instalado no Ollama?")
+
+        space = EmbeddingSpace.objects.create(name=name, model=model, dimensions=len(probe))
+        self.stdout.write(self.style.SUCCESS(f"Espaço criado: {space}. Próximo passo: reembed_chunks {name}"))
@@ -1,5 +1,6 @@
 # backend/core/management/commands/ingest_knowledge_book.py em 2025-12-14 11:48
 
+import argparse
 import os
 import hashlib
 import json
@@ -12,8 +13,12 @@ from datetime import datetime, timedelta, timezone
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from core.models import Organization, Document, DocumentChunk
+from core.models import Organization, Document, DocumentChunk, RejectedChunk, LLMCallTrace
 from core.clients import ollama_client
+from core.chunk_metadata import promote_chunk_metadata
+from core.chunk_quality import assess_chunk, reject_chunk
+from core.embedding_spaces import active_space, route_vector, save_space_vectors, space_model
+from core.near_duplicates import NearDuplicateDetector, dedup_ratio, release_canonicals
 
 # Dependências Críticas
 try:
@@ -78,6 +83,18 @@ class Command(BaseCommand):
             default=300, 
             help='Sobreposição entre chunks para manter contexto entre quebras. Padrão: 300 caracteres.'
         )
+        parser.add_argument(
+            '--dedup',
+            action=argparse.BooleanOptionalAction,
+            default=None,
+            help='Detecta quase-duplicatas (MinHash/LSH) do corpus e do próprio livro; elas apontam para o chunk canônico e não são embedadas. Padrão: INGEST_DEDUP_ENABLED.'
+        )
+        parser.add_argument(
+            '--quality-gate',
+            action=argparse.BooleanOptionalAction,
+            default=None,
+            help='Reprova chunks de baixa qualidade (OCR ruim, restos de layout, descrições vazias) antes da vetorização; vão para RejectedChunk para revisão. Padrão: INGEST_QUALITY_GATE_ENABLED.'
+        )
         parser.add_argument(
             '--fix-hyphens',
             action='store_true',
@@ -162,6 +179,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.gmt = options['gmt']
         self.log_handle = None
+        self.organization_id = None
         
         if options['log_file']:
             self.log_handle = open(options['log_file'], 'a', encoding='utf-8')
@@ -207,6 +225,10 @@ class Command(BaseCommand):
             self.log("Nenhum elemento extraído. Abortando.", 'ERROR')
             return
 
+        # Atribuição das chamadas ao LLM (rastreio de GPU por organização)
+        self.organization_id = doc.organization_id if doc else None
+        self.document = doc
+
         # 4. FASE 2: Enriquecimento (Visão)
         # Se --text-only ou --skip-vision estiverem ativos, pula esta fase
         if not (options['skip_vision'] or options['text_only']):
@@ -308,7 +330,9 @@ class Command(BaseCommand):
                     model=model_name,
                     prompt=prompt,
                     images=[base64_img],
-                    options={"temperature": 0.1}
+                    options={"temperature": 0.1},
+                    caller=LLMCallTrace.Caller.INGEST_VISION,
+                    organization_id=self.organization_id
                 )
                 
                 # FILTRO 2: Sanitização de caracteres de controle
@@ -432,9 +456,57 @@ class Command(BaseCommand):
                 "ingestion_date": datetime.now().isoformat()
             }
             final_chunks.append({"content": content, "page": current_page_num, "metadata": meta})
+
+        quality_gate = options['quality_gate'] if options['quality_gate'] is not None else settings.INGEST_QUALITY_GATE_ENABLED
+        self.rejected_chunks = []
+        if quality_gate:
+            final_chunks = self._apply_quality_gate(final_chunks)
+
+        dedup = options['dedup'] if options['dedup'] is not None else settings.INGEST_DEDUP_ENABLED
+        if dedup:
+            self._mark_near_duplicates(final_chunks)
             
         return final_chunks
 
+    def _apply_quality_gate(self, chunks):
+        """
+        Avalia cada chunk (só CPU) e grava a decisão em metadata['quality']. Os reprovados
+        saem da lista e ficam em self.rejected_chunks (persistidos como RejectedChunk).
+        """
+        accepted = []
+        reasons = {}
+        for chunk in chunks:
+            verdict = assess_chunk(chunk['content'], is_table=chunk['metadata']['is_table'])
+            if verdict.accepted:
+                chunk['metadata']['quality'] = verdict.as_metadata()
+                accepted.append(chunk)
+            else:
+                self.rejected_chunks.append((chunk, verdict))
+                for reason in verdict.reasons:
+                    reasons[reason] = reasons.get(reason, 0) + 1
+
+        if self.rejected_chunks:
+            summary = ", ".join(f"{reason}={count}" for reason, count in sorted(reasons.items()))
+            self.log(f"Portão de qualidade: {len(self.rejected_chunks)}/{len(chunks)} chunks reprovados ({summary}).", 'TABLE')
+        return accepted
+
+    def _mark_near_duplicates(self, chunks):
+        """
+        Assinatura MinHash de cada chunk e vínculo das quase-duplicatas com o canônico
+        (do corpus ou anterior neste livro). Duplicatas não passam pela vetorização.
+        """
+        decisions = NearDuplicateDetector(exclude_document=getattr(self, 'document', None)).detect([c['content'] for c in chunks])
+        for chunk, decision in zip(chunks, decisions):
+            chunk['dedup'] = decision
+
+        from_corpus = sum(1 for d in decisions if d.duplicate_of_id is not None)
+        from_book = sum(1 for d in decisions if d.duplicate_of_index is not None)
+        self.log(
+            f"Quase-duplicatas: {from_corpus + from_book}/{len(chunks)} ({dedup_ratio(decisions):.1%}) "
+            f"— {from_corpus} de outros documentos, {from_book} do próprio livro.",
+            'TABLE'
+        )
+
     def _fix_hyphenation(self, text):
         """
         Corrige hifenização fantasma causada por justificação de texto em PDFs.
@@ -451,6 +523,14 @@ class Command(BaseCommand):
             for i, c in enumerate(chunks):
                 self.log_handle.write(f"\n--- Chunk {i+1} (Pág {c['page']}) ---\n")
                 self.log_handle.write(f"Flags: {c['metadata']}\n")
+                if c.get('dedup') is not None and c['dedup'].is_duplicate:
+                    self.log_handle.write(f"Quase-duplicata (Jaccard ~{c['dedup'].similarity:.2f}): não seria embedado.\n")
+                self.log_handle.write(f"Conteúdo:\n{c['content']}\n")
+                self.log_handle.write("-" * 40 + "\n")
+
+            for c, verdict in self.rejected_chunks:
+                self.log_handle.write(f"\n--- Reprovado (Pág {c['page']}, score {verdict.score}) ---\n")
+                self.log_handle.write(f"Motivos: {', '.join(verdict.reasons)} | Sinais: {verdict.signals}\n")
                 self.log_handle.write(f"Conteúdo:\n{c['content']}\n")
                 self.log_handle.write("-" * 40 + "\n")
         
@@ -461,20 +541,47 @@ class Command(BaseCommand):
         total = len(chunks)
         start_time = time.time()
         
+        release_canonicals(doc)
         doc.chunks.all().delete()
+        doc.rejected_chunks.all().delete()
+        RejectedChunk.objects.bulk_create([
+            reject_chunk(doc, c['content'], c['page'], c['metadata'], verdict)
+            for c, verdict in self.rejected_chunks
+        ])
         
+        space = active_space()
         db_objs = []
+        # índice em 'chunks' -> id do chunk canônico criado (alvo das duplicatas do próprio livro)
+        canonical_ids = {}
+        skipped_duplicates = 0
         for i, item in enumerate(chunks):
             try:
-                emb = ollama_client.embed(settings.OLLAMA_EMBEDDING_MODEL, item['content'])
+                decision = item.get('dedup')
+                canonical_id = None
+                if decision is not None and decision.is_duplicate:
+                    canonical_id = decision.duplicate_of_id or canonical_ids.get(decision.duplicate_of_index)
+
+                embedding = None
+                if canonical_id is None:
+                    embedding = ollama_client.embed(
+                        space_model(space), item['content'],
+                        caller=LLMCallTrace.Caller.INGEST_EMBED, organization_id=doc.organization_id
+                    )['embedding']
+                else:
+                    skipped_duplicates += 1
                 
-                db_objs.append(DocumentChunk(
+                chunk = promote_chunk_metadata(DocumentChunk(
                     document=doc,
                     content=item['content'],
-                    embedding=emb['embedding'],
+                    embedding=embedding,
                     page_number=item['page'],
                     metadata=item['metadata']
-                ))
+                ), default_source=doc.file_name)
+                if decision is not None:
+                    decision.apply(chunk, canonical_id)
+                if canonical_id is None:
+                    canonical_ids[i] = chunk.id
+                db_objs.append(route_vector(chunk, space))
                 
                 self._print_progress(i + 1, total, start_time, label="Vetorização")
                 
@@ -486,16 +593,19 @@ class Command(BaseCommand):
                 self.log(f"Erro vetorizando chunk {i}: {e}", 'ERROR')
 
         print("") 
+        if skipped_duplicates:
+            self.log(f"Embeddings evitados por deduplicação: {skipped_duplicates}/{total}.", 'SUCCESS')
         
         if db_objs:
             batch_size = 500
             for i in range(0, len(db_objs), batch_size):
                 DocumentChunk.objects.bulk_create(db_objs[i:i+batch_size])
+                save_space_vectors(db_objs[i:i+batch_size], space)
             
             doc.status = Document.DocumentStatus.COMPLETED
             doc.save()
             self.log("Ingestão e Vetorização finalizadas.", 'SUCCESS')
-            self._unload_model(settings.OLLAMA_EMBEDDING_MODEL)
+            self._unload_model(space_model(space))
         else:
             doc.status = Document.DocumentStatus.FAILED
             doc.save()
@@ -529,7 +639,9 @@ class Command(BaseCommand):
                 model=model, 
                 prompt=prompt, 
                 images=[image_b64], 
-                options={"temperature": 0.1}
+                options={"temperature": 0.1},
+                caller=LLMCallTrace.Caller.INGEST_VISION,
+                organization_id=self.organization_id
             )
             return resp.get('response', '').strip()
         except Exception as e:
@@ -1,13 +1,18 @@
 # backend/core/management/commands/ingest_manual.py em 2025-12-14 11:48
 
+import argparse
 import os
 import hashlib
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from core.models import Organization, Document, DocumentChunk, UserProfile
+from core.models import Organization, Document, DocumentChunk, RejectedChunk, UserProfile, LLMCallTrace
 from core.clients import unstructured_client, ollama_client
+from core.chunk_metadata import promote_chunk_metadata
+from core.chunk_quality import assess_chunk, reject_chunk
+from core.embedding_spaces import active_space, route_vector, save_space_vectors, space_model
+from core.near_duplicates import release_canonicals
 
 User = get_user_model()
 
@@ -16,9 +21,16 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('filename', type=str, help='Nome do arquivo dentro de backend/docs_to_ingest/')
+        parser.add_argument(
+            '--quality-gate',
+            action=argparse.BooleanOptionalAction,
+            default=None,
+            help='Reprova chunks de baixa qualidade antes da vetorização (vão para RejectedChunk). Padrão: INGEST_QUALITY_GATE_ENABLED.'
+        )
 
     def handle(self, *args, **options):
         filename = options['filename']
+        quality_gate = options['quality_gate'] if options['quality_gate'] is not None else settings.INGEST_QUALITY_GATE_ENABLED
         file_path = os.path.join(settings.BASE_DIR, 'docs_to_ingest', filename)
 
         if not os.path.exists(file_path):
@@ -86,30 +98,44 @@ class Command(BaseCommand):
             doc.save()
 
             # Limpa chunks antigos se for reprocessamento
+            release_canonicals(doc)
             doc.chunks.all().delete()
+            doc.rejected_chunks.all().delete()
 
+            space = active_space()
             chunks_to_create = []
+            rejected = []
             
             for i, chunk in enumerate(chunks_data):
                 content = chunk.get("text", "").strip()
                 if not content or len(content) < 10: # Ignora ruído muito curto
                     continue
 
+                if quality_gate:
+                    verdict = assess_chunk(content, is_table=chunk.get("type") == "Table")
+                    if not verdict.accepted:
+                        rejected.append(reject_chunk(doc, content, chunk.get("metadata", {}).get("page_number"), chunk.get("metadata", {}), verdict))
+                        continue
+                    chunk["metadata"] = {**chunk.get("metadata", {}), "quality": verdict.as_metadata()}
+
                 # Gera o vetor
                 embedding_response = ollama_client.embed(
-                    settings.OLLAMA_EMBEDDING_MODEL, 
-                    content
+                    space_model(space),
+                    content,
+                    caller=LLMCallTrace.Caller.INGEST_EMBED,
+                    organization_id=org.id
                 )
                 
-                chunks_to_create.append(
+                chunks_to_create.append(route_vector(promote_chunk_metadata(
                     DocumentChunk(
                         document=doc,
                         content=content,
                         embedding=embedding_response["embedding"],
                         page_number=chunk.get("metadata", {}).get("page_number"),
                         metadata=chunk.get("metadata", {})
-                    )
-                )
+                    ),
+                    default_source=doc.file_name
+                ), space))
                 
                 if i % 10 == 0:
                     self.stdout.write(f"  > Processados {i}/{len(chunks_data)}...")
@@ -117,11 +143,13 @@ class Command(BaseCommand):
             # 6. Salvar no Banco
             self.stdout.write('Salvando no Banco de Dados...')
             DocumentChunk.objects.bulk_create(chunks_to_create)
+            save_space_vectors(chunks_to_create, space)
+            RejectedChunk.objects.bulk_create(rejected)
 
             doc.status = Document.DocumentStatus.COMPLETED
             doc.save()
 
-            self.stdout.write(self.style.SUCCESS(f'SUCESSO! Documento ingerido. {len(chunks_to_create)} vetores criados.'))
+            self.stdout.write(self.style.SUCCESS(f'SUCESSO! Documento ingerido. {len(chunks_to_create)} vetores criados, {len(rejected)} chunks reprovados no portão de qualidade.'))
 
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Erro fatal na ingestão: {e}'))
@@ -0,0 +1,73 @@
+# backend/core/management/commands/migrate_envelope_encryption.py em 2026-10-19 21:10
+
+import time
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.envelope import encryption_status, envelope_models, reencrypt_model, rotate_data_keys
+
+
+class Command(BaseCommand):
+    help = """
+    Migração online para a criptografia em envelope (ver core/envelope.py).
+
+    Re-cifra com a chave de dados ativa do tenant os valores ainda no formato do
+    django-crypto-fields ou com chave aposentada, em lotes curtos com lock só das linhas
+    do lote (a aplicação segue lendo e gravando). Idempotente e retomável.
+
+    --rotate-keys cria uma nova versão da chave de cada tenant antes de re-cifrar.
+    --check só conta os valores pendentes e falha se houver algum.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', help='Ex: core.UserProfile (repetível). Padrão: todos com campos em envelope.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Linhas por transação. Padrão: 500.')
+        parser.add_argument('--rotate-keys', action='store_true', help='Nova versão da chave de cada tenant antes de re-cifrar.')
+        parser.add_argument('--check', action='store_true', help='Só informa quantos valores faltam migrar.')
+
+    def handle(self, *args, **options):
+        models = envelope_models()
+        if options['model']:
+            try:
+                models = [apps.get_model(label) for label in options['model']]
+            except LookupError as e:
+                raise CommandError(str(e))
+            if invalid := [m._meta.label for m in models if m not in envelope_models()]:
+                raise CommandError(f"Sem campos em envelope: {', '.join(invalid)}")
+
+        if options['check']:
+            return self._check(models)
+
+        if options['rotate_keys']:
+            keys = rotate_data_keys()
+            self.stdout.write(f"{len(keys)} chaves rotacionadas: {', '.join(str(key) for key in keys) or '-'}")
+            self.stdout.write(self.style.WARNING(
+                f"Outros processos adotam a nova versão em até {settings.ENVELOPE_ACTIVE_KEY_TTL_SECONDS}s: "
+                "rode de novo depois desse prazo para re-cifrar o que eles gravarem até lá."
+            ))
+
+        for model in models:
+            label = model._meta.label
+            last_report = [0.0]
+
+            def progress(stats):
+                if time.monotonic() - last_report[0] >= 5:
+                    last_report[0] = time.monotonic()
+                    self.stdout.write(f"  > {label}: {stats.scanned} linhas, {sum(stats.reencrypted.values())} valores re-cifrados")
+
+            stats = reencrypt_model(model, batch_size=options['batch_size'], progress=progress)
+            detail = ", ".join(f"{name}: {n}" for name, n in stats.reencrypted.items())
+            self.stdout.write(self.style.SUCCESS(f"{label}: {stats.scanned} linhas em {stats.elapsed:.1f}s ({detail})."))
+
+    def _check(self, models):
+        pending = 0
+        for model in models:
+            for name, counts in encryption_status(model).items():
+                pending += counts['legacy'] + counts['retired_key']
+                self.stdout.write(
+                    f"{model._meta.label}.{name}: {counts['current']} em envelope com chave ativa, "
+                    f"{counts['retired_key']} com chave aposentada, {counts['legacy']} no formato legado"
+                )
+        if pending:
+            raise CommandError(f"{pending} valores pendentes. Rode migrate_envelope_encryption.")
+        self.stdout.write(self.style.SUCCESS("Todos os valores estão em envelope com a chave ativa."))
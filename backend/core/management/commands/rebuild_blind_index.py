@@ -0,0 +1,50 @@
+# backend/core/management/commands/rebuild_blind_index.py em 2026-10-19 19:40
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.blind_index import DEFAULT_BATCH_SIZE, rebuild_blind_indexes
+
+
+class Command(BaseCommand):
+    help = """
+    Recalcula os Blind Indexes de todos os perfis (nome: search_tokens e search_prefix_tokens;
+    cpf_index e phone_index) com a configuração atual: BLIND_INDEX_KEY, STOPWORDS/normalize_text,
+    normalização de CPF/telefone e limites de prefixo.
+
+    Leitura em streaming (cursor do servidor), decifragem/tokenização em pool de processos e
+    gravação em bulk_update só dos perfis alterados (ver core/blind_index.py). Idempotente.
+
+    Rotação da chave: rode com BLIND_INDEX_PREVIOUS_KEY=<antiga> ainda configurada (a busca
+    aceita as duas chaves durante o rebuild) e esvazie-a depois.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help=f'Perfis por lote (leitura, worker e UPDATE). Padrão: {DEFAULT_BATCH_SIZE}.')
+        parser.add_argument('--workers', type=int, default=None, help='Processos de decifragem/tokenização (1 = sem pool). Padrão: núcleos da CPU.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser positivo.')
+
+        if settings.BLIND_INDEX_PREVIOUS_KEY:
+            self.stdout.write("Janela de rotação ativa: a busca aceita a chave atual e BLIND_INDEX_PREVIOUS_KEY.")
+        if not settings.BLIND_PREFIX_INDEX_ENABLED:
+            self.stdout.write("BLIND_PREFIX_INDEX_ENABLED=False: prefixos gravados serão removidos.")
+
+        last_report = [0.0]
+
+        def progress(stats):
+            if time.monotonic() - last_report[0] >= 5:
+                last_report[0] = time.monotonic()
+                self.stdout.write(f"  > {stats.scanned} perfis lidos, {stats.updated} atualizados ({stats.per_second:.0f}/s)")
+
+        stats = rebuild_blind_indexes(batch_size=options['batch_size'], workers=options['workers'], progress=progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats.scanned} perfis lidos, {stats.updated} atualizados em {stats.elapsed:.1f}s ({stats.per_second:.0f}/s)."
+        ))
+        if stats.skipped:
+            self.stdout.write(f"{stats.skipped} perfis editados durante a reconstrução mantiveram os tokens gravados pelo save().")
+        if settings.BLIND_INDEX_PREVIOUS_KEY:
+            self.stdout.write("Todos os tokens usam a chave atual: esvazie BLIND_INDEX_PREVIOUS_KEY e reinicie.")
@@ -0,0 +1,31 @@
+# backend/core/management/commands/rebuild_current_consent.py em 2026-10-19 23:40
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.consent import diverging_consents, rebuild_current_consents
+
+
+class Command(BaseCommand):
+    help = """
+    Reconstrói o consentimento vigente (CurrentConsent) reproduzindo o ConsentLog: o registro
+    mais recente de cada (usuário, tipo). Uma transação; inserções no log esperam o fim.
+
+    Necessário uma vez para o histórico anterior à tabela, ou depois de inserções no log que
+    não passaram por ConsentLog.save() (bulk_create, SQL direto).
+    --check só compara a tabela com o log e falha se divergirem.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Só conta os pares divergentes do log.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            diverging = diverging_consents()
+            if diverging:
+                raise CommandError(f"{diverging} pares (usuário, tipo) divergem do ConsentLog. Rode rebuild_current_consent.")
+            self.stdout.write(self.style.SUCCESS("CurrentConsent confere com o ConsentLog."))
+            return
+
+        started = time.monotonic()
+        pairs = rebuild_current_consents()
+        self.stdout.write(self.style.SUCCESS(f"{pairs} pares (usuário, tipo) reconstruídos em {time.monotonic() - started:.1f}s."))
@@ -0,0 +1,46 @@
+# backend/core/management/commands/rebuild_grant_expansion.py em 2026-10-19 22:40
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.grants import expand_grants, invalidate_actors
+from core.models import DataAccessGrant
+
+
+class Command(BaseCommand):
+    help = """
+    Reconstrói a expansão materializada dos DataAccessGrants (GrantExpansion, ver core/grants.py):
+    uma linha por (grant não revogado, usuário beneficiado), com os times já resolvidos.
+
+    Necessário uma vez para os grants anteriores à tabela, ou depois de alterações feitas sem
+    passar pelos sinais (update() em massa, SQL direto). Lotes em transações curtas; idempotente.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Grants por transação. Padrão: 500.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size deve ser positivo.')
+
+        started = time.monotonic()
+        scanned, affected, last_pk = 0, set(), None
+        while True:
+            batch = DataAccessGrant.objects.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                users = expand_grants(batch)
+                invalidate_actors(users)
+            affected |= users
+            scanned += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{scanned} grants expandidos em {time.monotonic() - started:.1f}s "
+            f"({len(affected)} usuários com acesso recalculado)."
+        ))
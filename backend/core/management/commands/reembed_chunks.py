@@ -0,0 +1,54 @@
+# backend/core/management/commands/reembed_chunks.py em 2026-10-19 18:10
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.embedding_spaces import coverage, reembed_space, resolve_space, space_label, space_model
+
+
+class Command(BaseCommand):
+    help = """
+    Re-embedding em sombra: gera os vetores de um espaço (core.embedding_spaces) para os
+    chunks que ainda não os têm, em lotes e com vazão limitada, sem tocar no espaço ativo.
+
+    Incremental e retomável: rodar de novo só completa o que falta. Use 'legacy' para
+    repreencher a coluna DocumentChunk.embedding (ex: antes de desfazer um cutover).
+    Com --check, só informa a cobertura e falha se estiver incompleta (pré-condição do cutover).
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('space', type=str, help="Nome do espaço (ou 'legacy').")
+        parser.add_argument('--batch-size', type=int, default=None, help='Textos por chamada /api/embed. Padrão: REEMBED_BATCH_SIZE.')
+        parser.add_argument('--rate', type=float, default=None, help='Máximo de chunks por minuto (0 = sem limite). Padrão: REEMBED_RATE_PER_MINUTE.')
+        parser.add_argument('--limit', type=int, default=None, help='Processa no máximo N chunks nesta execução.')
+        parser.add_argument('--check', action='store_true', help='Só verifica a cobertura do espaço.')
+
+    def handle(self, *args, **options):
+        space = resolve_space(options['space'])
+        label = space_label(space)
+        covered, total = coverage(space)
+        self.stdout.write(f"Espaço {label} ({space_model(space)}): {covered}/{total} chunks com vetor.")
+
+        if options['check']:
+            if covered < total:
+                raise CommandError(f"Cobertura incompleta: faltam {total - covered} chunks. Rode reembed_chunks {label}.")
+            self.stdout.write(self.style.SUCCESS(f"Cobertura completa. Cutover: RAG_EMBEDDING_SPACE={'' if space is None else label}"))
+            return
+
+        missing = total - covered if options['limit'] is None else min(options['limit'], total - covered)
+        last_report = [0.0]
+
+        def progress(stats):
+            if time.monotonic() - last_report[0] >= 5:
+                last_report[0] = time.monotonic()
+                self.stdout.write(f"  > {stats.embedded}/{missing} vetores ({stats.per_minute:.0f}/min, {stats.failed} com erro)")
+
+        stats = reembed_space(
+            space, batch_size=options['batch_size'], rate_per_minute=options['rate'],
+            limit=options['limit'], progress=progress,
+        )
+        covered, total = coverage(space)
+        style = self.style.SUCCESS if not stats.failed else self.style.WARNING
+        self.stdout.write(style(
+            f"{stats.embedded} vetores gerados ({stats.failed} com erro) em {stats.elapsed:.0f}s "
+            f"({stats.per_minute:.0f}/min). Cobertura: {covered}/{total}."
+        ))
@@ -0,0 +1,57 @@
+# backend/core/management/commands/run_fake_ai_services.py em 2026-10-19 11:00
+
+import json
+import time
+from django.core.management.base import BaseCommand
+from core.fake_services import FakeOllamaServer, FakeUnstructuredServer, DEFAULT_EMBEDDING_DIMENSIONS
+
+
+class Command(BaseCommand):
+    help = """
+    Sobe servidores locais que imitam o Ollama e a Unstructured API (sem GPU e sem rede).
+    Use para medir vazão de ingestão/RAG em condições de CI:
+
+        python manage.py run_fake_ai_services --ollama-port 11435 --unstructured-port 8003
+        OLLAMA_BASE_URL=http://127.0.0.1:11435 \\
+        UNSTRUCTURED_API_URL=http://127.0.0.1:8003/general/v0/general \\
+        python manage.py ingest_knowledge_book livro.pdf --skip-vision
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1')
+        parser.add_argument('--ollama-port', type=int, default=11435, help='Porta do Fake Ollama. Padrão: 11435.')
+        parser.add_argument('--unstructured-port', type=int, default=8003, help='Porta do Fake Unstructured. Padrão: 8003.')
+        parser.add_argument('--dimensions', type=int, default=DEFAULT_EMBEDDING_DIMENSIONS, help='Dimensão dos embeddings. Padrão: 4096 (DocumentChunk.embedding).')
+        parser.add_argument('--embed-latency-ms', type=float, default=0.0, help='Latência simulada por texto embedado.')
+        parser.add_argument('--generate-latency-ms', type=float, default=0.0, help='Latência simulada por geração.')
+        parser.add_argument('--canned', type=str, help='Arquivo JSON {"trecho do prompt": resposta} para gerações enlatadas.')
+
+    def handle(self, *args, **options):
+        canned = {}
+        if options['canned']:
+            with open(options['canned'], encoding='utf-8') as f:
+                canned = json.load(f)
+
+        ollama = FakeOllamaServer(
+            host=options['host'],
+            port=options['ollama_port'],
+            dimensions=options['dimensions'],
+            embed_latency_ms=options['embed_latency_ms'],
+            generate_latency_ms=options['generate_latency_ms'],
+            canned_responses=canned,
+        ).start()
+        unstructured = FakeUnstructuredServer(host=options['host'], port=options['unstructured_port']).start()
+
+        self.stdout.write(self.style.SUCCESS(f"Fake Ollama:       OLLAMA_BASE_URL={ollama.base_url}"))
+        self.stdout.write(self.style.SUCCESS(f"Fake Unstructured: UNSTRUCTURED_API_URL={unstructured.api_url}"))
+        self.stdout.write(self.style.WARNING("Ctrl+C para encerrar."))
+
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ollama.stop()
+            unstructured.stop()
+            self.stdout.write("Servidores encerrados.")
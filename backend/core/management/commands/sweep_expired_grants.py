@@ -0,0 +1,54 @@
+# backend/core/management/commands/sweep_expired_grants.py em 2026-10-19 23:10
+
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.grants import sweep_expired_grants
+
+PERIODIC_TASK_NAME = "Varredura de grants vencidos"
+
+
+class Command(BaseCommand):
+    help = """
+    Carimba os DataAccessGrants vencidos (revoked_at = expires_at) em lotes, removendo-os dos
+    índices parciais de grants abertos e da expansão materializada (ver core/grants.py).
+
+    Agendamento (django-celery-beat): --schedule "*/15 * * * *" cria/atualiza a tarefa periódica.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Grants por transação. Padrão: 5000.')
+        parser.add_argument('--schedule', type=str, metavar='CRON', help='Agenda no celery-beat (ex: "*/15 * * * *") e sai.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser positivo.')
+        if options['schedule']:
+            return self._schedule(options['schedule'], options['batch_size'])
+
+        swept = sweep_expired_grants(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{swept} grants vencidos carimbados."))
+
+    def _schedule(self, cron, batch_size):
+        from django_celery_beat.models import CrontabSchedule, PeriodicTask
+
+        fields = cron.split()
+        if len(fields) != 5:
+            raise CommandError('Cron inválido: use 5 campos, ex: "*/15 * * * *".')
+        minute, hour, day_of_month, month_of_year, day_of_week = fields
+        schedule, _ = CrontabSchedule.objects.get_or_create(
+            minute=minute, hour=hour, day_of_month=day_of_month, month_of_year=month_of_year,
+            day_of_week=day_of_week, timezone=settings.CELERY_TIMEZONE,
+        )
+        task, created = PeriodicTask.objects.update_or_create(
+            name=PERIODIC_TASK_NAME,
+            defaults={
+                'task': 'core.tasks.sweep_expired_grants',
+                'crontab': schedule,
+                'kwargs': json.dumps({'batch_size': batch_size}),
+                'queue': 'default',
+                'enabled': True,
+            },
+        )
+        action = "criada" if created else "atualizada"
+        self.stdout.write(self.style.SUCCESS(f"Tarefa periódica '{task.name}' {action}: {cron} ({settings.CELERY_TIMEZONE})."))
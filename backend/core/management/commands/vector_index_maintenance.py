@@ -0,0 +1,106 @@
+# backend/core/management/commands/vector_index_maintenance.py em 2026-10-19 18:50
+
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.vector_maintenance import run_maintenance
+
+PERIODIC_TASK_NAME = "Manutenção dos índices vetoriais"
+
+
+class Command(BaseCommand):
+    help = """
+    Saúde dos índices ANN (HNSW/IVFFlat) das tabelas de chunks (ver core/vector_maintenance.py).
+
+    1. Tamanho dos índices, tuplas vivas/mortas e bloat das tabelas (pgstattuple, se instalado).
+    2. Recall@k por amostragem contra a busca exata.
+    3. REINDEX CONCURRENTLY dos índices com recall abaixo de --rebuild-below.
+    4. Sintonia de hnsw.ef_search / ivfflat.probes para o recall alvo (--apply grava no banco).
+
+    Agendamento (django-celery-beat): --schedule "0 4 * * 0" cria/atualiza a tarefa periódica.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=5, help='Top-k avaliado (o RAG usa 5). Padrão: 5.')
+        parser.add_argument('--samples', type=int, default=None, help='Consultas amostradas por índice. Padrão: VECTOR_INDEX_SAMPLE_QUERIES.')
+        parser.add_argument('--target-recall', type=float, default=None, help='Recall alvo da sintonia. Padrão: VECTOR_INDEX_TARGET_RECALL.')
+        parser.add_argument('--rebuild-below', type=float, default=None, help='Recall que dispara o REINDEX. Padrão: VECTOR_INDEX_REBUILD_BELOW.')
+        parser.add_argument('--report-only', action='store_true', help='Só mede: não reconstrói nem sintoniza.')
+        parser.add_argument('--no-rebuild', action='store_true', help='Não reconstrói índices degradados.')
+        parser.add_argument('--apply', action='store_true', help='Grava a ef_search/probes sintonizada com ALTER DATABASE (novas conexões).')
+        parser.add_argument('--output', type=str, help='Grava o relatório completo em JSON.')
+        parser.add_argument('--schedule', type=str, metavar='CRON', help='Agenda no celery-beat (ex: "0 4 * * 0") com --apply e rebuild, e sai.')
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            return self._schedule(options['schedule'])
+
+        report = run_maintenance(
+            k=options['k'],
+            samples=options['samples'],
+            target_recall=options['target_recall'],
+            rebuild_below=options['rebuild_below'],
+            rebuild=not (options['report_only'] or options['no_rebuild']),
+            tune=not options['report_only'],
+            apply=options['apply'],
+            log=self.stdout.write,
+        )
+        self._print_report(report, options['k'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+            self.stdout.write(f"Relatório gravado em {options['output']}")
+
+    def _print_report(self, report, k):
+        self.stdout.write(self.style.MIGRATE_HEADING("\nTabelas"))
+        for table in report['tables']:
+            bloat = f", bloat {table['bloat_ratio']:.1%}" if table['bloat_ratio'] is not None else ""
+            self.stdout.write(
+                f"  {table['table']}: {table['total_bytes'] / 1024 ** 2:.1f} MB, {table['live_tuples']} vivas, "
+                f"{table['dead_tuples']} mortas ({table['dead_ratio']:.1%}){bloat}, último vacuum: {table['last_vacuum'] or '-'}"
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nÍndices ANN"))
+        if not report['indexes']:
+            self.stdout.write("  Nenhum índice HNSW/IVFFlat nas tabelas de chunks.")
+        for index in report['indexes']:
+            recall = index['recall_after_rebuild'] or index['recall_before']
+            line = f"  {index['name']} ({index['method']}, {index['size_bytes'] / 1024 ** 2:.1f} MB)"
+            if recall:
+                line += f": recall@{k}={recall['recall']:.4f}, p95={recall['latency_ms'].get('p95')}ms"
+            if index['rebuilt']:
+                line += f" [reconstruído em {index['rebuild_seconds']}s]"
+            if index['tuned']:
+                line += f" -> sintonizado {index['tuned']['setting']} (recall {index['tuned']['recall']:.4f})"
+            self.stdout.write(line)
+            for warning in index['warnings']:
+                self.stdout.write(self.style.WARNING(f"    ! {warning}"))
+
+        for guc, setting in report['settings'].items():
+            status = "aplicado" if setting['applied'] else "recomendado (use --apply)"
+            self.stdout.write(self.style.SUCCESS(f"\n{guc} = {setting['value']} ({status})"))
+
+    def _schedule(self, cron):
+        from django_celery_beat.models import CrontabSchedule, PeriodicTask
+
+        fields = cron.split()
+        if len(fields) != 5:
+            raise CommandError('Cron inválido: use 5 campos, ex: "0 4 * * 0".')
+        minute, hour, day_of_month, month_of_year, day_of_week = fields
+        schedule, _ = CrontabSchedule.objects.get_or_create(
+            minute=minute, hour=hour, day_of_month=day_of_month, month_of_year=month_of_year,
+            day_of_week=day_of_week, timezone=settings.CELERY_TIMEZONE,
+        )
+        task, created = PeriodicTask.objects.update_or_create(
+            name=PERIODIC_TASK_NAME,
+            defaults={
+                'task': 'core.tasks.maintain_vector_indexes',
+                'crontab': schedule,
+                'kwargs': json.dumps({'rebuild': True, 'tune': True, 'apply': True}),
+                'queue': 'heavy_ingestion',
+                'enabled': True,
+            },
+        )
+        action = "criada" if created else "atualizada"
+        self.stdout.write(self.style.SUCCESS(f"Tarefa periódica '{task.name}' {action}: {cron} ({settings.CELERY_TIMEZONE})."))
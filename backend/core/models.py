@@ -1,7 +1,8 @@
 # backend/core/models.py em 2025-12-14 11:48
 
 import uuid
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -9,13 +10,14 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.indexes import GinIndex
-from pgvector.django import VectorField
+from .envelope import EnvelopeEncryptedTextField
+from .vector_io import NumpyVectorField
 
 # Importa os campos de criptografia
-from django_crypto_fields.fields import EncryptedCharField, EncryptedTextField
+from django_crypto_fields.fields import EncryptedTextField
 
 # Importa o utilitário de Blind Indexing
-from .utils import generate_search_tokens
+from .utils import profile_blind_indexes
 
 # --- 1. RBAC Dinâmico e Organização (B2B) ---
 
@@ -99,6 +101,35 @@ class Team(models.Model):
 
 # --- 2. Identidade e Perfis (Unificado) ---
 
+class DataEncryptionKey(models.Model):
+    """
+    Chave de dados AES-256 de um tenant (criptografia em envelope, ver core.envelope).
+    A chave em si é guardada cifrada pelas chaves do django-crypto-fields; versões antigas
+    ficam inativas, só para ler valores ainda não re-cifrados.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        Organization, on_delete=models.PROTECT, null=True, blank=True, related_name='data_keys',
+        help_text=_("Tenant da chave (nulo = chave global).")
+    )
+    version = models.PositiveIntegerField()
+    wrapped_key = EncryptedTextField()
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    retired_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'version'], name='data_key_org_version_uniq', nulls_distinct=False),
+            models.UniqueConstraint(
+                fields=['organization'], condition=models.Q(is_active=True),
+                name='data_key_one_active_per_org', nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self): return f"{self.organization or 'global'} v{self.version}"
+
+
 class UserProfile(models.Model):
     """
     Perfil base estendendo o User do Django.
@@ -106,9 +137,10 @@ class UserProfile(models.Model):
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     
-    # Dados Pessoais Sensíveis (PII) - Criptografados
-    # EncryptedTextField usado para evitar limite de tamanho RSA em nomes longos
-    full_name = EncryptedTextField(null=True, blank=True)
+    # Dados Pessoais Sensíveis (PII) - Criptografados em envelope (AES-GCM com a chave do tenant).
+    # legacy: valores ainda no formato do django-crypto-fields continuam legíveis até o
+    # migrate_envelope_encryption re-cifrá-los
+    full_name = EnvelopeEncryptedTextField(null=True, blank=True, tenant_field='primary_organization_id', legacy='aes')
     
     # Blind Indexing: Tokens de busca (Hashes) para permitir buscar por nome sem descriptografar
     search_tokens = ArrayField(
@@ -117,10 +149,22 @@ class UserProfile(models.Model):
         default=list,
         help_text=_("Hashes das partes do nome para busca segura (Blind Index).")
     )
+    # Typeahead: hashes dos prefixos das partes do nome (opt-in, BLIND_PREFIX_INDEX_ENABLED)
+    search_prefix_tokens = ArrayField(
+        models.CharField(max_length=32),
+        blank=True,
+        default=list,
+        help_text=_("Hashes dos prefixos do nome para busca incremental (Blind Index de prefixos).")
+    )
     
-    # Estes são pequenos o suficiente para manter CharField (limite ~214 chars no RSA)
-    phone_number = EncryptedCharField(max_length=20, null=True, blank=True)
-    cpf = EncryptedCharField(max_length=14, null=True, blank=True, unique=True)
+    # Unicidade do CPF fica no cpf_index (o envelope não é determinístico)
+    phone_number = EnvelopeEncryptedTextField(null=True, blank=True, tenant_field='primary_organization_id', legacy='rsa')
+    cpf = EnvelopeEncryptedTextField(null=True, blank=True, tenant_field='primary_organization_id', legacy='rsa')
+
+    # Blind Index de CPF e telefone: HMAC dos dígitos normalizados (busca exata por índice B-tree).
+    # Nulo quando o valor não é um CPF/telefone válido. Telefone não é único (familiares compartilham)
+    cpf_index = models.CharField(max_length=32, null=True, blank=True, unique=True, editable=False)
+    phone_index = models.CharField(max_length=32, null=True, blank=True, db_index=True, editable=False)
     
     # Contexto Organizacional
     primary_organization = models.ForeignKey(
@@ -147,26 +191,23 @@ class UserProfile(models.Model):
         Intercepta o salvamento para atualizar os tokens de busca
         sempre que o nome mudar.
         """
-        if self.full_name:
-            # Gera os tokens a partir do texto plano antes dele ser criptografado pelo field
-            # Nota: O django-crypto-fields criptografa no get_prep_value, então aqui 
-            # self.full_name ainda é legível se foi setado recentemente.
-            # Se for update sem mudar o nome, pode ser necessário lógica extra,
-            # mas para MVP isso cobre criação e edição explícita.
-            try:
-                self.search_tokens = generate_search_tokens(self.full_name)
-            except Exception:
-                # Fallback se full_name já estiver criptografado ou inválido
-                pass
-        else:
-            self.search_tokens = []
-            
+        # Gera os tokens a partir do texto plano antes dele ser criptografado pelo field
+        # Nota: O django-crypto-fields criptografa no get_prep_value e decifra ao carregar,
+        # então aqui self.full_name é sempre legível. Um erro na geração sobe: engolir a
+        # exceção deixaria tokens do nome anterior (busca errada em silêncio).
+        self.refresh_blind_indexes()
         super().save(*args, **kwargs)
 
+    def refresh_blind_indexes(self):
+        """Recalcula os Blind Indexes (nome, CPF, telefone) com a chave atual (ver rebuild_blind_index para o lote)."""
+        for field, value in profile_blind_indexes(self.full_name, self.cpf, self.phone_number).items():
+            setattr(self, field, value)
+
     class Meta:
         indexes = [
             # Índice GIN para busca ultra-rápida no Array de tokens
             GinIndex(fields=['search_tokens'], name='user_name_blind_idx'),
+            GinIndex(fields=['search_prefix_tokens'], name='user_name_prefix_blind_idx'),
         ]
 
     def __str__(self):
@@ -252,11 +293,69 @@ class ConsentLog(models.Model):
     version = models.CharField(max_length=50, help_text="Versão do documento aceito.")
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        """
+        Só inserções contam (o log é imutável): cada uma atualiza o CurrentConsent do
+        (usuário, tipo) na mesma transação.
+        """
+        from .consent import record_consents
+
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            record_consents([self])
+
     def __str__(self):
         status = "CONCEDIDO" if self.granted else "REVOGADO"
         return f"{self.user.username} - {self.consent_type} - {status}"
 
 
+class CurrentConsent(models.Model):
+    """
+    Estado atual do consentimento por (usuário, tipo): o ConsentLog mais recente de cada par,
+    materializado. Mantido na mesma transação de cada inserção no log (ConsentLog.save) e
+    reconstruído a partir do log por rebuild_current_consent. Consultas em core/consent.py.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='current_consents')
+    consent_type = models.CharField(max_length=20, choices=ConsentLog.ConsentType.choices)
+    granted = models.BooleanField()
+    consent_log = models.ForeignKey(ConsentLog, on_delete=models.CASCADE, related_name='+')
+    version = models.CharField(max_length=50)
+    recorded_at = models.DateTimeField(help_text="timestamp do ConsentLog vigente.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'consent_type'], name='current_consent_uniq'),
+        ]
+        indexes = [
+            # Coortes: "quem concedeu RESEARCH" sem passar pelos que negaram
+            models.Index(
+                fields=['consent_type', 'user'], name='current_consent_granted_idx',
+                condition=models.Q(granted=True),
+            ),
+        ]
+
+    def __str__(self):
+        status = "CONCEDIDO" if self.granted else "REVOGADO"
+        return f"{self.user_id} - {self.consent_type} - {status} (v{self.version})"
+
+
+class DataAccessGrantQuerySet(models.QuerySet):
+    """A regra de DataAccessGrant.is_active() em SQL, atendida pelos índices parciais do modelo."""
+
+    def active(self, at=None):
+        at = at or timezone.now()
+        return self.filter(revoked_at__isnull=True).filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=at)
+        )
+
+    def expired(self, at=None):
+        """Vencidos e ainda não carimbados pela varredura (core.grants.sweep_expired_grants)."""
+        return self.filter(revoked_at__isnull=True, expires_at__lte=at or timezone.now())
+
+
 class DataAccessGrant(models.Model):
     """
     O Coração do Data Vault.
@@ -283,25 +382,82 @@ class DataAccessGrant(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True, help_text="Acesso temporário (opcional).")
-    revoked_at = models.DateTimeField(null=True, blank=True)
+    revoked_at = models.DateTimeField(null=True, blank=True, help_text="Revogação, ou o vencimento carimbado pela varredura de expirados.")
+
+    objects = DataAccessGrantQuerySet.as_manager()
 
     class Meta:
         indexes = [
             models.Index(fields=['owner', 'grantee_user']),
             models.Index(fields=['owner', 'grantee_team']),
+            # Só grants não revogados: a varredura carimba os vencidos (revoked_at = expires_at)
+            # e eles saem destes índices, que ficam do tamanho do que está em vigor
+            models.Index(
+                fields=['grantee_user', 'owner'], name='grant_open_user_owner_idx',
+                condition=models.Q(revoked_at__isnull=True, grantee_user__isnull=False),
+            ),
+            models.Index(
+                fields=['grantee_team', 'owner'], name='grant_open_team_owner_idx',
+                condition=models.Q(revoked_at__isnull=True, grantee_team__isnull=False),
+            ),
+            # Próximos a vencer, para a varredura
+            models.Index(
+                fields=['expires_at'], name='grant_open_expiry_idx',
+                condition=models.Q(revoked_at__isnull=True, expires_at__isnull=False),
+            ),
         ]
 
     def is_active(self):
+        # Mesma regra de DataAccessGrant.objects.active(), para uma instância já carregada
         now = timezone.now()
         not_revoked = self.revoked_at is None
         not_expired = self.expires_at is None or self.expires_at > now
         return not_revoked and not_expired
 
+    def clean(self):
+        from .consent import has_consent
+
+        if self.owner_id and not has_consent(self.owner_id, ConsentLog.ConsentType.DATA_SHARING):
+            raise ValidationError(_("O dono dos dados não tem consentimento de compartilhamento vigente."))
+
+    def revoke(self):
+        """Revoga o acesso. Via save(): o sinal remove a expansão e invalida o cache de checagens."""
+        self.revoked_at = timezone.now()
+        self.save(update_fields=['revoked_at'])
+
     def __str__(self):
         target = self.target_object or "TODOS"
         return f"Grant: {self.owner} -> {self.grantee_user or self.grantee_team} em {target}"
 
 
+class GrantExpansion(models.Model):
+    """
+    Expansão materializada dos DataAccessGrants vigentes: uma linha por (grant, usuário
+    beneficiado), com os membros do time já resolvidos e os dados do grant copiados. A checagem
+    "X pode acessar o recurso Y de Z" vira uma leitura no índice (user, owner), sem JOIN com
+    times nem com o grant. Mantida por core/signals.py; reconstruída por rebuild_grant_expansion.
+    """
+    id = models.BigAutoField(primary_key=True)
+    grant = models.ForeignKey(DataAccessGrant, on_delete=models.CASCADE, related_name='expansion')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, related_name='+')
+    target_object_id = models.CharField(max_length=255, null=True)
+    permissions = models.JSONField(default=list)
+    expires_at = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['grant', 'user'], name='grant_expansion_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'owner'], name='grant_expansion_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> dados de {self.owner_id} (grant {self.grant_id})"
+
+
 class AuditLog(models.Model):
     """
     Log de Auditoria de Segurança e Compliance.
@@ -367,10 +523,155 @@ class DocumentChunk(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="chunks")
     content = models.TextField()
-    # Vetor de 4096 dimensões (padrão Llama 3) ou 768 (Nomic). Ajuste se mudar o modelo.
-    # O Llama 3 padrão via Ollama costuma ser 4096.
-    embedding = VectorField(dimensions=4096) 
+    # Espaço vetorial 'legacy': 4096 dimensões (Llama 3 via Ollama, OLLAMA_EMBEDDING_MODEL).
+    # Outros modelos (ex: Nomic, 768) ficam em ChunkEmbedding, por EmbeddingSpace (ver core.embedding_spaces).
+    # Lido/gravado como np.float32 (ver core.vector_io)
+    # Nulo nas quase-duplicatas (duplicate_of preenchido): não são embedadas nem indexadas
+    embedding = NumpyVectorField(dimensions=4096, null=True, blank=True)
+    page_number = models.PositiveIntegerField(null=True, blank=True)
+    metadata = models.JSONField(default=dict)
+
+    # Atributos promovidos do 'metadata' para colunas indexadas (filtros do RAG aplicados
+    # na própria consulta vetorial). Preenchidos por promote_chunk_metadata (core.chunk_metadata).
+    is_table = models.BooleanField(default=False)
+    has_vision = models.BooleanField(default=False)
+    source = models.CharField(max_length=255, blank=True, default="")
+    language = models.CharField(max_length=8, blank=True, default="")
+    page_start = models.PositiveIntegerField(null=True, blank=True)
+    page_end = models.PositiveIntegerField(null=True, blank=True)
+    ingested_at = models.DateTimeField(null=True, blank=True)
+
+    # Deduplicação na ingestão (core.near_duplicates): assinatura MinHash (uint32[128]),
+    # chaves das bandas LSH (consulta de candidatos via GIN) e o chunk canônico, se quase-duplicata
+    minhash = models.BinaryField(null=True, blank=True, editable=False)
+    lsh_bands = ArrayField(models.BigIntegerField(), default=list, blank=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.SET_NULL, related_name='near_duplicates'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['document', 'page_start', 'page_end'], name='chunk_doc_page_span_idx'),
+            models.Index(fields=['source'], name='chunk_source_idx'),
+            models.Index(fields=['language'], name='chunk_language_idx'),
+            models.Index(fields=['ingested_at'], name='chunk_ingested_at_idx'),
+            # Parciais: tabelas e descrições de visão são minoria do corpus
+            models.Index(fields=['document'], condition=models.Q(is_table=True), name='chunk_tables_idx'),
+            models.Index(fields=['document'], condition=models.Q(has_vision=True), name='chunk_vision_idx'),
+            GinIndex(fields=['lsh_bands'], name='chunk_lsh_bands_idx'),
+        ]
+
+    def __str__(self): return f"Chunk de {self.document.file_name}"
+
+class EmbeddingSpace(models.Model):
+    """
+    Espaço vetorial versionado: um modelo de embedding e sua dimensão. Os vetores dos chunks
+    nesse espaço ficam em ChunkEmbedding; o espaço lido pelo RAG é o de RAG_EMBEDDING_SPACE
+    (vazio = coluna DocumentChunk.embedding, o espaço 'legacy'). Ver core.embedding_spaces.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.SlugField(max_length=64, unique=True)
+    model = models.CharField(max_length=128)
+    dimensions = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self): return f"{self.name} ({self.model}, {self.dimensions} dims)"
+
+class ChunkEmbedding(models.Model):
+    """Vetor de um DocumentChunk num EmbeddingSpace (re-embedding em sombra, sem reescrever DocumentChunk)."""
+    chunk = models.ForeignKey(DocumentChunk, on_delete=models.CASCADE, related_name="space_embeddings")
+    space = models.ForeignKey(EmbeddingSpace, on_delete=models.CASCADE, related_name="embeddings")
+    # Sem dimensão fixa na coluna: cada espaço tem a sua (validada ao gravar)
+    embedding = NumpyVectorField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['space', 'chunk'], name='chunk_embedding_space_uniq'),
+        ]
+
+    def __str__(self): return f"Vetor {self.space.name} de {self.chunk_id}"
+
+class RejectedChunk(models.Model):
+    """
+    Chunk reprovado no portão de qualidade da ingestão (core.chunk_quality): OCR ruim,
+    restos de layout, descrições de visão vazias. Não é embedado; fica aqui para revisão
+    (o admin permite aprovar, o que vetoriza e cria o DocumentChunk).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="rejected_chunks")
+    content = models.TextField()
     page_number = models.PositiveIntegerField(null=True, blank=True)
     metadata = models.JSONField(default=dict)
+    quality_score = models.FloatField(default=0.0, db_index=True)
+    reasons = ArrayField(models.CharField(max_length=32), default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self): return f"Chunk rejeitado de {self.document.file_name} ({', '.join(self.reasons)})"
+
+
+class LLMCacheEntry(models.Model):
+    """
+    Cache endereçado por conteúdo das respostas do Ollama (ver core.llm_cache).
+    A chave é o SHA-256 de (digest do modelo, prompt, opções, formato, hash das imagens),
+    então qualquer mudança upstream (modelo re-baixado, prompt alterado) gera uma chave nova.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    namespace = models.CharField(max_length=100, db_index=True, help_text=_("Comando/serviço que gerou a entrada (ex: 'audit_anatomy_rag')."))
+    model = models.CharField(max_length=255)
+    response = models.JSONField(default=dict)
+    size_bytes = models.PositiveIntegerField(default=0)
+    hit_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self): return f"LLM Cache [{self.namespace}] {self.key[:12]}"
+
+
+class LLMCallTrace(models.Model):
+    """
+    Registro de cada chamada generate/embed feita ao Ollama (ver core.llm_tracing).
+    Durações do Ollama vêm em nanossegundos; 'latency_ms' é o tempo de parede medido no cliente.
+    """
+    class Caller(models.TextChoices):
+        RAG = 'RAG', _('RAG (Perguntas)')
+        MAESTRO = 'MAESTRO', _('Maestro (Planos)')
+        RECIPE = 'RECIPE', _('Análise de Receitas')
+        INGEST_VISION = 'INGEST_VISION', _('Ingestão: Visão')
+        INGEST_EMBED = 'INGEST_EMBED', _('Ingestão: Embeddings')
+        REEMBED = 'REEMBED', _('Re-embedding (espaço vetorial)')
+        ENRICHMENT = 'ENRICHMENT', _('Enriquecimento/Auditoria')
+        OTHER = 'OTHER', _('Outros')
+
+    class Outcome(models.TextChoices):
+        SUCCESS = 'SUCCESS', _('Sucesso')
+        ERROR = 'ERROR', _('Erro')
+        CACHE_HIT = 'CACHE_HIT', _('Cache (sem GPU)')
+
+    id = models.BigAutoField(primary_key=True)
+    caller = models.CharField(max_length=20, choices=Caller.choices, default=Caller.OTHER)
+    endpoint = models.CharField(max_length=50)
+    model = models.CharField(max_length=255)
+    organization = models.ForeignKey(Organization, on_delete=models.SET_NULL, null=True, blank=True, related_name='llm_calls')
+    outcome = models.CharField(max_length=20, choices=Outcome.choices, default=Outcome.SUCCESS)
+    error = models.TextField(blank=True)
+
+    latency_ms = models.FloatField(default=0.0)
+    total_duration_ns = models.BigIntegerField(default=0)
+    load_duration_ns = models.BigIntegerField(default=0)
+    prompt_eval_count = models.PositiveIntegerField(default=0)
+    prompt_eval_duration_ns = models.BigIntegerField(default=0)
+    eval_count = models.PositiveIntegerField(default=0)
+    eval_duration_ns = models.BigIntegerField(default=0)
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['caller', 'created_at']),
+            models.Index(fields=['organization', 'created_at']),
+        ]
 
-    def __str__(self): return f"Chunk de {self.document.file_name}"
\ No newline at end of file
+    def __str__(self): return f"{self.caller} {self.model} {self.latency_ms:.0f}ms ({self.outcome})"
@@ -0,0 +1,229 @@
+# backend/core/near_duplicates.py em 2026-10-19 16:40
+
+"""
+Detecção de chunks quase duplicados na ingestão (MinHash + LSH).
+
+Edições e reimpressões dos mesmos atlas geram muitos chunks quase idênticos (os shingles
+são de palavras: traduções não são detectadas). Cada chunk recebe
+uma assinatura MinHash (NUM_PERM mínimos de shingles de 5 palavras) e as chaves LSH das
+bandas da assinatura, gravadas em DocumentChunk.lsh_bands (GIN). Um chunk novo cujas bandas
+colidem com um chunk canônico (do corpus ou anterior no mesmo documento), e cuja similaridade
+de Jaccard estimada passa do limiar, não é embedado: aponta para o canônico (duplicate_of) e
+fica sem vetor, fora dos índices de retrieval. Filtros de busca (ChunkFilter.retrieval_q) casam
+o canônico quando a duplicata os satisfaz: "só este livro" continua achando a 2ª edição inteira.
+
+Com BANDS=16 x 8 linhas, pares com Jaccard >= 0.85 colidem em alguma banda com ~99.9% de
+chance; abaixo de ~0.5 quase nunca viram candidatos.
+"""
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+
+# Permutações fixas (a*x + b mod p): a assinatura precisa ser estável entre execuções,
+# pois é persistida e comparada com chunks de ingestões anteriores
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_PERMUTATIONS = np.random.RandomState(1).randint(1, int(_MERSENNE_PRIME), size=(2, NUM_PERM), dtype=np.uint64)
+
+# Marcadores de página e numeração mudam entre edições sem mudar o conteúdo
+_PAGE_MARKER = re.compile(r'=== PÁG \d+ ===|### TABELA PÁG \d+')
+_WORD = re.compile(r'[^\W\d_]+', re.UNICODE)
+
+# Chunks por consulta de candidatos ao banco (cada um contribui BANDS chaves)
+LOOKUP_BATCH = 200
+
+
+def shingles(text: str) -> set[str]:
+    words = _WORD.findall(_PAGE_MARKER.sub(' ', text or '').lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """Assinatura MinHash (uint32[NUM_PERM]); None para texto sem palavras."""
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=4).digest(), 'little') for g in grams),
+        dtype=np.uint64, count=len(grams),
+    )
+    a, b = _PERMUTATIONS
+    permuted = ((hashes[:, None] * a + b) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> list[int]:
+    """Uma chave int64 por banda (o índice da banda entra no hash: bandas diferentes não colidem)."""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(bytes([band]) + rows.tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def estimated_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.mean(first == second))
+
+
+def signature_from_bytes(data) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype=np.uint32)
+
+
+@dataclass
+class DedupDecision:
+    signature: Optional[np.ndarray]
+    bands: list
+    # Canônico já persistido (UUID) ou chunk anterior do mesmo lote (índice)
+    duplicate_of_id: Optional[object] = None
+    duplicate_of_index: Optional[int] = None
+    similarity: Optional[float] = None
+
+    @property
+    def is_duplicate(self) -> bool:
+        return self.duplicate_of_id is not None or self.duplicate_of_index is not None
+
+    @property
+    def minhash_bytes(self) -> Optional[bytes]:
+        return self.signature.tobytes() if self.signature is not None else None
+
+    def apply(self, chunk, canonical_id=None):
+        """
+        Grava a assinatura/bandas no DocumentChunk (não salva) e, se for duplicata, o vínculo
+        com o canônico (canonical_id resolve duplicate_of_index para o id já atribuído).
+        """
+        chunk.minhash = self.minhash_bytes
+        chunk.lsh_bands = self.bands
+        canonical_id = canonical_id or self.duplicate_of_id
+        if canonical_id is not None:
+            chunk.duplicate_of_id = canonical_id
+            chunk.embedding = None
+            chunk.metadata = {**(chunk.metadata or {}), "near_duplicate_of": str(canonical_id), "dedup_similarity": round(self.similarity, 3)}
+        return chunk
+
+
+class NearDuplicateDetector:
+    """
+    Decide, para uma sequência de textos de um documento, quais são quase duplicatas de
+    chunks canônicos já no corpus ou de textos anteriores da mesma sequência.
+
+        decisions = NearDuplicateDetector(exclude_document=doc).detect(texts)
+    """
+
+    def __init__(self, threshold: float = None, exclude_document=None):
+        self.threshold = settings.INGEST_DEDUP_THRESHOLD if threshold is None else threshold
+        self.exclude_document = exclude_document
+
+    def detect(self, texts: list[str]) -> list[DedupDecision]:
+        decisions = []
+        for text in texts:
+            signature = minhash_signature(text)
+            decisions.append(DedupDecision(signature, band_keys(signature) if signature is not None else []))
+
+        corpus = self._corpus_candidates([d.bands for d in decisions if d.bands])
+        local = {}  # chave de banda -> índices de canônicos anteriores deste lote
+
+        for index, decision in enumerate(decisions):
+            if decision.signature is None:
+                continue
+
+            best_similarity, best = 0.0, None
+            for key in decision.bands:
+                for chunk_id, signature in corpus.get(key, ()):
+                    similarity = estimated_jaccard(decision.signature, signature)
+                    if similarity > best_similarity:
+                        best_similarity, best = similarity, ('id', chunk_id)
+                for previous in local.get(key, ()):
+                    similarity = estimated_jaccard(decision.signature, decisions[previous].signature)
+                    if similarity > best_similarity:
+                        best_similarity, best = similarity, ('index', previous)
+
+            if best is not None and best_similarity >= self.threshold:
+                decision.similarity = best_similarity
+                if best[0] == 'id':
+                    decision.duplicate_of_id = best[1]
+                else:
+                    decision.duplicate_of_index = best[1]
+            else:
+                for key in decision.bands:
+                    local.setdefault(key, []).append(index)
+        return decisions
+
+    def _corpus_candidates(self, band_lists: list[list[int]]) -> dict:
+        """Chunks canônicos do corpus que colidem em alguma banda: {chave: [(id, assinatura)]}."""
+        from core.models import DocumentChunk
+
+        candidates = {}
+        for start in range(0, len(band_lists), LOOKUP_BATCH):
+            keys = sorted({key for bands in band_lists[start:start + LOOKUP_BATCH] for key in bands})
+            queryset = DocumentChunk.objects.filter(
+                lsh_bands__overlap=keys, duplicate_of__isnull=True,
+            )
+            if self.exclude_document is not None:
+                queryset = queryset.exclude(document=self.exclude_document)
+
+            wanted = set(keys)
+            for chunk_id, minhash, bands in queryset.values_list('id', 'minhash', 'lsh_bands'):
+                if minhash is None:
+                    continue
+                entry = (chunk_id, signature_from_bytes(minhash))
+                for key in wanted.intersection(bands):
+                    candidates.setdefault(key, []).append(entry)
+        return candidates
+
+
+def dedup_ratio(decisions: list[DedupDecision]) -> float:
+    return sum(d.is_duplicate for d in decisions) / len(decisions) if decisions else 0.0
+
+
+def release_canonicals(document) -> int:
+    """
+    Antes de apagar os chunks de um documento (reingestão), promove a canônico a primeira
+    quase-duplicata de cada chunk dele em outros documentos: ela herda o vetor e as demais
+    passam a apontar para ela. Sem isso, as duplicatas ficariam sem vetor e sem canônico.
+    Retorna quantos chunks foram promovidos.
+    """
+    from core.models import ChunkEmbedding, DocumentChunk
+
+    promoted = 0
+    with transaction.atomic():
+        duplicates = (
+            DocumentChunk.objects
+            .filter(duplicate_of__document=document)
+            .exclude(document=document)
+            .order_by('duplicate_of_id', 'ingested_at', 'id')
+            .values_list('id', 'duplicate_of_id')
+        )
+        groups = {}
+        for chunk_id, canonical_id in duplicates:
+            groups.setdefault(canonical_id, []).append(chunk_id)
+
+        for canonical_id, chunk_ids in groups.items():
+            heir, others = chunk_ids[0], chunk_ids[1:]
+            embedding = DocumentChunk.objects.filter(id=canonical_id).values_list('embedding', flat=True).first()
+            DocumentChunk.objects.filter(id=heir).update(embedding=embedding, duplicate_of=None)
+            # Vetores dos outros espaços (core.embedding_spaces) também passam para o herdeiro
+            ChunkEmbedding.objects.filter(chunk_id=canonical_id).update(chunk_id=heir)
+            if others:
+                DocumentChunk.objects.filter(id__in=others).update(duplicate_of=heir)
+            promoted += 1
+
+    if promoted:
+        logger.info(f"Dedup: {promoted} quase-duplicatas promovidas a canônicas antes de reprocessar {document.id}.")
+    return promoted
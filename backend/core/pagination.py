@@ -0,0 +1,16 @@
+# backend/core/pagination.py em 2026-10-19 19:20
+
+from rest_framework.pagination import CursorPagination
+
+
+class PatientCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) da lista de pacientes: cada página é um
+    'WHERE id < cursor ORDER BY id DESC LIMIT n', com custo constante em qualquer
+    profundidade (OFFSET relê todas as linhas anteriores). A chave é o id (único e
+    imutável), então inserções entre páginas não duplicam nem pulam pacientes.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
@@ -0,0 +1,181 @@
+# backend/core/pii.py em 2026-10-19 20:30
+
+"""
+Decifragem de PII em lote, memoizada só durante a requisição.
+
+O django-crypto-fields decifra cada campo criptografado no carregamento da linha: uma lista
+que mostra nomes (feed, planos, receitas, admin) paga uma decifragem por linha, mesmo quando
+o mesmo usuário aparece várias vezes. Aqui o caminho é outro:
+
+    1. A view/serializer junta os ids dos usuários que a resposta vai exibir.
+    2. profile_names() lê os full_name ainda cifrados (Cast para texto) em uma consulta só.
+    3. Cada texto cifrado distinto é decifrado uma vez; o resultado fica no DecryptionCache
+       da requisição (PIIDecryptionMiddleware), que é limpo ao fim dela.
+
+Custo proporcional ao número de usuários distintos, não ao de linhas. Fora de uma requisição
+(tasks, comandos) não há memo entre chamadas: cada profile_names() ainda deduplica o lote.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable
+
+from django.db.models.manager import BaseManager
+from rest_framework import serializers
+
+_request_cache: ContextVar = ContextVar('pii_decryption_cache', default=None)
+
+
+def decrypt_value(field, ciphertext):
+    """Decifra um valor lido cru do banco pelo próprio campo criptografado (mesmo caminho do ORM)."""
+    return field.from_db_value(ciphertext, None, None) if ciphertext else None
+
+
+class DecryptionCache:
+    """
+    Memo (campo, texto cifrado) -> texto claro, e (chave, id) -> nome, de uma requisição.
+    Nunca é persistido nem compartilhado entre requisições.
+    """
+
+    def __init__(self):
+        self._plain = {}
+        self._names = {}
+        self.decrypted = 0
+
+    def decrypt_many(self, field, ciphertexts: Iterable) -> dict:
+        """Decifra cada texto cifrado distinto ainda não visto; retorna {cifrado: claro}."""
+        label = field.model._meta.label, field.name
+        wanted = {value for value in ciphertexts if value}
+        for ciphertext in wanted:
+            if (label, ciphertext) not in self._plain:
+                self._plain[label, ciphertext] = decrypt_value(field, ciphertext)
+                self.decrypted += 1
+        return {ciphertext: self._plain[label, ciphertext] for ciphertext in wanted}
+
+    def clear(self):
+        """
+        Descarta os valores decifrados. Strings Python são imutáveis (não dá para zerar a
+        memória): removemos todas as referências para que o coletor as libere com o cache.
+        """
+        self._plain.clear()
+        self._names.clear()
+
+
+def current_cache() -> DecryptionCache:
+    """O cache da requisição em curso; fora de uma, um cache descartável."""
+    return _request_cache.get() or DecryptionCache()
+
+
+@contextmanager
+def decryption_scope():
+    """Escopo de memoização (uma requisição, uma task); limpa o cache ao sair."""
+    cache = DecryptionCache()
+    token = _request_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _request_cache.reset(token)
+        cache.clear()
+
+
+class PIIDecryptionMiddleware:
+    """Abre um decryption_scope por requisição (ver settings.MIDDLEWARE)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with decryption_scope():
+            return self.get_response(request)
+
+
+def profile_names(ids: Iterable, key: str = 'user_id') -> dict:
+    """
+    {id: full_name} dos UserProfile com `key` (user_id ou pk) em ids, em uma consulta
+    (só para os ids ainda não memoizados) e uma decifragem por nome cifrado distinto.
+    Ids sem perfil mapeiam para None.
+    """
+    from django.db.models import TextField
+    from django.db.models.functions import Cast
+    from core.models import UserProfile
+
+    cache = current_cache()
+    ids = {value for value in ids if value is not None}
+    missing = [value for value in ids if (key, value) not in cache._names]
+
+    if missing:
+        rows = list(
+            UserProfile.objects.filter(**{f'{key}__in': missing})
+            .annotate(full_name_cipher=Cast('full_name', output_field=TextField()))
+            .values_list(key, 'full_name_cipher')
+        )
+        plain = cache.decrypt_many(UserProfile._meta.get_field('full_name'), (cipher for _, cipher in rows))
+        found = {value: plain.get(cipher) for value, cipher in rows}
+        for value in missing:
+            cache._names[key, value] = found.get(value)
+
+    return {value: cache._names[key, value] for value in ids}
+
+
+class ProfileNameField(serializers.ReadOnlyField):
+    """
+    Nome (full_name) do perfil cujo id está em `source`, via profile_names(): use com
+    BatchDecryptListSerializer para decifrar a página inteira de uma vez.
+
+    Ex: participant_name = ProfileNameField(source='participant_id')
+        name = ProfileNameField(source='profile_id', key='pk')
+    """
+
+    def __init__(self, key='user_id', **kwargs):
+        self.key = key
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return profile_names([value], key=self.key).get(value)
+
+
+def _collect_name_ids(serializer, instance, wanted):
+    for field in serializer.fields.values():
+        if isinstance(field, ProfileNameField):
+            wanted.setdefault(field.key, set()).add(field.get_attribute(instance))
+        elif isinstance(field, serializers.Serializer):
+            nested = field.get_attribute(instance)
+            if nested is not None:
+                _collect_name_ids(field, nested, wanted)
+
+
+class BatchDecryptListSerializer(serializers.ListSerializer):
+    """
+    Antes de serializar a lista, junta os ids de todos os ProfileNameField (inclusive em
+    serializers aninhados) e decifra os nomes em lote; as linhas leem do memo.
+    Ex: class Meta: list_serializer_class = BatchDecryptListSerializer
+    """
+
+    def to_representation(self, data):
+        if _request_cache.get() is None:
+            # Fora de uma requisição (ex: shell, task): o memo vale para esta lista
+            with decryption_scope():
+                return self.to_representation(data)
+
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        wanted = {}
+        for item in items:
+            _collect_name_ids(self.child, item, wanted)
+        for key, ids in wanted.items():
+            profile_names(ids, key=key)
+        return super().to_representation(items)
+
+
+class BatchDecryptAdminMixin:
+    """
+    ModelAdmin: decifra em lote os nomes dos usuários (FKs em decrypted_user_fields) da
+    página do changelist; os métodos de list_display usam profile_names() e acertam o memo.
+    """
+    decrypted_user_fields = ()
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        profile_names(
+            getattr(obj, field) for obj in changelist.result_list for field in self.decrypted_user_fields
+        )
+        return changelist
@@ -0,0 +1,241 @@
+# backend/core/pipeline.py em 2026-10-19 15:10
+
+"""
+Execução em pipeline para comandos em lote que alternam GPU (Ollama) e banco.
+
+Cada item passa por estágios (ex: expansão de termos no LLM -> retrieval -> análise no
+LLM) executados por threads, com até N itens em andamento ao mesmo tempo: enquanto um item
+está na geração, outro está no retrieval. A escrita (sink) roda na thread do chamador e
+SEMPRE na ordem de entrada, de modo que o log e o banco ficam iguais aos da execução serial.
+
+    runner = PipelineRunner([('termos', expand), ('busca', retrieve), ('análise', analyze)], concurrency=4)
+    runner.run(bones, sink=write)
+
+- Um estágio que retorna None descarta o item (o sink recebe result.skipped_at).
+- Uma exceção num estágio não derruba o lote: o sink recebe result.error.
+- concurrency=1 executa tudo na thread atual, sem filas (comportamento serial de antes).
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_DONE = object()
+
+# Intervalo de checagem do sinal de parada nas esperas bloqueantes
+_POLL_SECONDS = 0.2
+
+
+@dataclass
+class PipelineResult:
+    seq: int
+    item: Any
+    value: Any = None
+    error: Optional[BaseException] = None
+    failed_at: Optional[str] = None
+    skipped_at: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.skipped_at is None
+
+
+@dataclass
+class PipelineStats:
+    written: int = 0
+    skipped: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    # Tempo somado (s) gasto em cada estágio; comparado a 'elapsed' mostra a sobreposição
+    stage_seconds: dict = field(default_factory=dict)
+
+    def summary_line(self) -> str:
+        stages = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in self.stage_seconds.items())
+        return (
+            f"Pipeline: {self.written} ok, {self.skipped} pulados, {self.failed} com erro "
+            f"em {self.elapsed:.1f}s (tempo por estágio: {stages})"
+        )
+
+
+class PipelineRunner:
+    def __init__(self, stages: list[tuple[str, Callable]], concurrency: int = 1):
+        if not stages:
+            raise ValueError("PipelineRunner precisa de ao menos um estágio.")
+        self.stages = stages
+        self.concurrency = max(1, int(concurrency or 1))
+        self.stats = PipelineStats(stage_seconds={name: 0.0 for name, _ in stages})
+        self._stats_lock = threading.Lock()
+        # seq -> item ainda não entregue ao sink (para o ponto de retomada)
+        self._pending = {}
+
+    @property
+    def resume_point(self):
+        """Primeiro item (na ordem de entrada) ainda não escrito; None se o lote terminou."""
+        return self._pending[min(self._pending)] if self._pending else None
+
+    def run(self, items: Iterable, sink: Callable[[PipelineResult], None]) -> PipelineStats:
+        started = time.perf_counter()
+        try:
+            if self.concurrency == 1:
+                self._run_serial(items, sink)
+            else:
+                self._run_threaded(items, sink)
+        finally:
+            self.stats.elapsed = time.perf_counter() - started
+        return self.stats
+
+    def _process(self, result: PipelineResult, stage_index: int) -> PipelineResult:
+        name, func = self.stages[stage_index]
+        started = time.perf_counter()
+        try:
+            value = func(result.value)
+        except Exception as e:
+            result.error, result.failed_at = e, name
+            logger.debug(f"Pipeline: item {result.seq} falhou em '{name}': {e}")
+        else:
+            if value is None:
+                result.skipped_at = name
+            result.value = value
+        finally:
+            with self._stats_lock:
+                self.stats.stage_seconds[name] += time.perf_counter() - started
+        return result
+
+    def _deliver(self, result: PipelineResult, sink):
+        sink(result)
+        self._pending.pop(result.seq, None)
+        if result.error is not None:
+            self.stats.failed += 1
+        elif result.skipped_at is not None:
+            self.stats.skipped += 1
+        else:
+            self.stats.written += 1
+
+    def _run_serial(self, items, sink):
+        for seq, item in enumerate(items):
+            self._pending[seq] = item
+            result = PipelineResult(seq=seq, item=item, value=item)
+            for stage_index in range(len(self.stages)):
+                result = self._process(result, stage_index)
+                if not result.ok:
+                    break
+            self._deliver(result, sink)
+
+    def _run_threaded(self, items, sink):
+        n = self.concurrency
+        inboxes = [queue.Queue(maxsize=n) for _ in self.stages]
+        outbox = queue.Queue()
+        # Limita os itens em andamento (filas + buffer de reordenação) a N
+        in_flight = threading.BoundedSemaphore(n)
+        stop = threading.Event()
+        finished_workers = [0] * len(self.stages)
+        finished_lock = threading.Lock()
+
+        def put(target, value):
+            while not stop.is_set():
+                try:
+                    target.put(value, timeout=_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feeder():
+            try:
+                for seq, item in enumerate(items):
+                    while not in_flight.acquire(timeout=_POLL_SECONDS):
+                        if stop.is_set():
+                            return
+                    self._pending[seq] = item
+                    if not put(inboxes[0], PipelineResult(seq=seq, item=item, value=item)):
+                        return
+            except Exception as e:
+                outbox.put(e)
+            finally:
+                for _ in range(n):
+                    put(inboxes[0], _STOP)
+                connections.close_all()
+
+        def worker(stage_index):
+            inbox = inboxes[stage_index]
+            is_last = stage_index == len(self.stages) - 1
+            try:
+                while True:
+                    result = inbox.get()
+                    if result is _STOP:
+                        break
+                    if result.ok:
+                        result = self._process(result, stage_index)
+                    # Itens descartados/com erro atravessam os estágios seguintes sem processamento
+                    if is_last or not result.ok:
+                        outbox.put(result)
+                    elif not put(inboxes[stage_index + 1], result):
+                        break
+            finally:
+                # Cada thread tem sua própria conexão com o banco
+                connections.close_all()
+                with finished_lock:
+                    finished_workers[stage_index] += 1
+                    last_one = finished_workers[stage_index] == n
+                if last_one:
+                    if is_last:
+                        outbox.put(_DONE)
+                    else:
+                        for _ in range(n):
+                            put(inboxes[stage_index + 1], _STOP)
+
+        threads = [threading.Thread(target=feeder, name="pipeline-feeder", daemon=True)]
+        for stage_index, (name, _) in enumerate(self.stages):
+            threads += [
+                threading.Thread(target=worker, args=(stage_index,), name=f"pipeline-{name}-{i}", daemon=True)
+                for i in range(n)
+            ]
+        for thread in threads:
+            thread.start()
+
+        # Buffer de reordenação: o sink recebe os itens estritamente na ordem de entrada
+        buffered, next_seq = {}, 0
+        try:
+            while True:
+                message = outbox.get()
+                if message is _DONE:
+                    break
+                if isinstance(message, Exception):
+                    raise message
+                buffered[message.seq] = message
+                while next_seq in buffered:
+                    self._deliver(buffered.pop(next_seq), sink)
+                    in_flight.release()
+                    next_seq += 1
+        finally:
+            stop.set()
+
+
+def add_pipeline_arguments(parser):
+    """Argumentos comuns dos comandos em pipeline (--concurrency, --resume-from)."""
+    parser.add_argument('--concurrency', type=int, default=None, help='Itens em andamento ao mesmo tempo (1 = serial). Padrão: AUDIT_PIPELINE_CONCURRENCY.')
+    parser.add_argument('--resume-from', type=str, default=None, help="Retoma a partir deste nome (ordem alfabética, inclusive). Ex: --resume-from 'Fêmur'.")
+
+
+def run_in_command(command, runner: PipelineRunner, items: Iterable, sink: Callable[[PipelineResult], None]) -> PipelineStats:
+    """
+    Executa o pipeline dentro de um BaseCommand: imprime o resumo ao final e, se a execução
+    for interrompida (Ctrl+C ou erro no sink), o --resume-from para continuar de onde parou.
+    """
+    try:
+        stats = runner.run(items, sink)
+    except BaseException:
+        item = runner.resume_point
+        if item is not None:
+            command.stdout.write(command.style.WARNING(f"\nInterrompido. Para continuar: --resume-from '{getattr(item, 'name', item)}'"))
+        raise
+    command.stdout.write(stats.summary_line())
+    return stats
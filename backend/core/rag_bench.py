@@ -0,0 +1,473 @@
+# backend/core/rag_bench.py em 2026-10-19 11:45
+
+"""
+Infraestrutura do benchmark de retrieval (comando `bench_rag`).
+
+Cada configuração de retrieval (scan exato, HNSW, IVFFlat, halfvec, dimensões reduzidas,
+híbrido, snapshot em memória, MMR) é uma subclasse de RetrievalConfig. Índices ANN são criados DENTRO de uma transação
+que sofre rollback ao final da medição: o banco nunca fica com índices do bench. O CREATE INDEX
+não é CONCURRENTLY e segura um lock SHARE na tabela de chunks durante a construção e a medição,
+bloqueando as escritas da ingestão: rode só em staging (ou numa cópia do banco).
+
+Atenção: o pgvector só indexa `vector` até 2.000 dimensões e `halfvec` até 4.000.
+Com o embedding atual de 4.096 dimensões (Llama 3), HNSW/IVFFlat e halfvec no vetor inteiro
+são reportados como 'skipped'; a única alternativa indexável é reduced (prefixo do vetor).
+"""
+
+import json
+import logging
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Optional
+
+import numpy as np
+from django.db import connection, transaction
+
+from .models import Document, DocumentChunk
+from .vector_io import decode_vector_binary, format_vector, parse_embedding_response
+
+logger = logging.getLogger(__name__)
+
+PGVECTOR_MAX_INDEX_DIMS = {'vector': 2000, 'halfvec': 4000}
+
+
+def latency_summary(samples_ms: list[float]) -> dict:
+    if not samples_ms:
+        return {}
+    ordered = sorted(samples_ms)
+
+    def pct(q):
+        # Percentil por interpolação linear (mesma definição do PERCENTILE_CONT do Postgres)
+        pos = (len(ordered) - 1) * q
+        low, high = int(pos), min(int(pos) + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(pct(0.50), 3),
+        "p95": round(pct(0.95), 3),
+        "p99": round(pct(0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def recall_at_k(found_ids: list, truth_ids: list) -> float:
+    if not truth_ids:
+        return 1.0
+    return len(set(found_ids) & set(truth_ids)) / len(truth_ids)
+
+
+class BenchQuery:
+    """Uma consulta do benchmark: vetor (obrigatório) e texto (apenas no modo 'sampled')."""
+
+    def __init__(self, embedding, text: Optional[str] = None, source_chunk_id=None):
+        self.embedding = embedding
+        self.text = text
+        self.source_chunk_id = source_chunk_id
+        self.literal = format_vector(embedding)
+
+
+def build_query_set(mode: str, size: int, noise: float = 0.05, seed: int = 42, embed_fn=None) -> list[BenchQuery]:
+    """
+    - synthetic: embeddings de chunks sorteados + ruído gaussiano (não chama o Ollama).
+    - sampled: o início do conteúdo de chunks sorteados é re-embedado como pergunta (usa embed_fn).
+    """
+    rng = random.Random(seed)
+    ids = list(
+        DocumentChunk.objects
+        .filter(document__status=Document.DocumentStatus.COMPLETED, embedding__isnull=False)
+        .values_list('id', flat=True)
+    )
+    if not ids:
+        return []
+    sample_ids = rng.sample(ids, min(size, len(ids)))
+
+    queries = []
+    for chunk in DocumentChunk.objects.filter(id__in=sample_ids).only('id', 'content', 'embedding'):
+        if mode == 'sampled':
+            text = ' '.join(chunk.content.split()[:40])
+            queries.append(BenchQuery(embed_fn(text), text=text, source_chunk_id=chunk.id))
+        else:
+            vec = [float(v) + rng.gauss(0.0, noise) for v in chunk.embedding]
+            queries.append(BenchQuery(vec, source_chunk_id=chunk.id))
+    return queries
+
+
+class RetrievalConfig:
+    """
+    Uma estratégia de retrieval medida pelo benchmark.
+    Subclasses definem o DDL do índice (opcional), os SET LOCAL e a consulta top-k.
+    """
+    name = "base"
+    requires_text = False
+
+    def __init__(self, dims: int, k: int, **params):
+        self.dims = dims
+        self.k = k
+        self.params = params
+
+    @property
+    def chunk_table(self):
+        return DocumentChunk._meta.db_table
+
+    @property
+    def document_table(self):
+        return Document._meta.db_table
+
+    def skip_reason(self) -> Optional[str]:
+        return None
+
+    def index_ddl(self) -> Optional[str]:
+        return None
+
+    def session_settings(self) -> list[str]:
+        # Força o uso do índice ANN (sem isso o planner pode cair num seq scan em bases pequenas)
+        return ["SET LOCAL enable_seqscan = off"]
+
+    def order_expression(self) -> tuple[str, str]:
+        """(expressão da coluna, expressão do parâmetro) para ORDER BY col <=> param."""
+        return "c.embedding", "%s::vector"
+
+    def search(self, cursor, query: BenchQuery) -> list:
+        column, param = self.order_expression()
+        cursor.execute(
+            f"""
+            SELECT c.id FROM {self.chunk_table} c
+            JOIN {self.document_table} d ON d.id = c.document_id
+            WHERE d.status = %s
+            ORDER BY {column} <=> {param}
+            LIMIT %s
+            """,
+            [Document.DocumentStatus.COMPLETED, query.literal, self.k],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def describe(self) -> dict:
+        return {"config": self.name, "params": self.params}
+
+    def extra_metrics(self) -> dict:
+        """Métricas específicas da config, coletadas durante as consultas (ex: custo do MMR)."""
+        return {}
+
+
+class ExactScan(RetrievalConfig):
+    name = "exact"
+
+    def session_settings(self):
+        return ["SET LOCAL enable_indexscan = off", "SET LOCAL enable_bitmapscan = off"]
+
+
+class HNSWConfig(RetrievalConfig):
+    name = "hnsw"
+
+    def skip_reason(self):
+        if self.dims > PGVECTOR_MAX_INDEX_DIMS['vector']:
+            return f"pgvector não indexa vector com {self.dims} dims (máx {PGVECTOR_MAX_INDEX_DIMS['vector']})."
+        return None
+
+    def index_ddl(self):
+        m = self.params.get('m', 16)
+        ef_construction = self.params.get('ef_construction', 64)
+        return (
+            f"CREATE INDEX bench_hnsw_idx ON {self.chunk_table} "
+            f"USING hnsw (embedding vector_cosine_ops) WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+        )
+
+    def session_settings(self):
+        return super().session_settings() + [f"SET LOCAL hnsw.ef_search = {int(self.params.get('ef_search', 40))}"]
+
+
+class IVFFlatConfig(HNSWConfig):
+    name = "ivfflat"
+
+    def index_ddl(self):
+        return (
+            f"CREATE INDEX bench_ivfflat_idx ON {self.chunk_table} "
+            f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {int(self.params['lists'])})"
+        )
+
+    def session_settings(self):
+        return RetrievalConfig.session_settings(self) + [f"SET LOCAL ivfflat.probes = {int(self.params['probes'])}"]
+
+
+class HalfvecConfig(RetrievalConfig):
+    """HNSW sobre o embedding convertido para float16 (metade do tamanho do índice)."""
+    name = "halfvec"
+
+    def skip_reason(self):
+        if self.dims > PGVECTOR_MAX_INDEX_DIMS['halfvec']:
+            return f"pgvector não indexa halfvec com {self.dims} dims (máx {PGVECTOR_MAX_INDEX_DIMS['halfvec']})."
+        return None
+
+    def index_ddl(self):
+        return (
+            f"CREATE INDEX bench_halfvec_idx ON {self.chunk_table} "
+            f"USING hnsw ((embedding::halfvec({self.dims})) halfvec_cosine_ops)"
+        )
+
+    def session_settings(self):
+        return super().session_settings() + [f"SET LOCAL hnsw.ef_search = {int(self.params.get('ef_search', 40))}"]
+
+    def order_expression(self):
+        return f"c.embedding::halfvec({self.dims})", f"%s::vector::halfvec({self.dims})"
+
+
+class ReducedDimsConfig(RetrievalConfig):
+    """HNSW sobre o prefixo do embedding (subvector). Mede o custo de recall de truncar dimensões."""
+    name = "reduced"
+
+    def skip_reason(self):
+        r = int(self.params['reduced_dims'])
+        if r > PGVECTOR_MAX_INDEX_DIMS['vector']:
+            return f"pgvector não indexa vector com {r} dims (máx {PGVECTOR_MAX_INDEX_DIMS['vector']})."
+        return None
+
+    def index_ddl(self):
+        r = int(self.params['reduced_dims'])
+        return (
+            f"CREATE INDEX bench_reduced_idx ON {self.chunk_table} "
+            f"USING hnsw ((subvector(embedding, 1, {r})::vector({r})) vector_cosine_ops)"
+        )
+
+    def session_settings(self):
+        return super().session_settings() + [f"SET LOCAL hnsw.ef_search = {int(self.params.get('ef_search', 40))}"]
+
+    def order_expression(self):
+        r = int(self.params['reduced_dims'])
+        return f"subvector(c.embedding, 1, {r})::vector({r})", f"subvector(%s::vector, 1, {r})::vector({r})"
+
+
+class HybridConfig(RetrievalConfig):
+    """
+    Vetorial (scan exato) + full-text do Postgres, fundidos por Reciprocal Rank Fusion.
+    Só faz sentido com consultas textuais (modo 'sampled').
+    """
+    name = "hybrid"
+    requires_text = True
+    RRF_K = 60
+
+    def session_settings(self):
+        return []
+
+    def search(self, cursor, query: BenchQuery) -> list:
+        pool = int(self.params.get('candidates', 50))
+        vector_ids = ExactScan(self.dims, pool).search(cursor, query)
+        cursor.execute(
+            f"""
+            SELECT c.id FROM {self.chunk_table} c
+            JOIN {self.document_table} d ON d.id = c.document_id
+            WHERE d.status = %s AND to_tsvector('simple', c.content) @@ plainto_tsquery('simple', %s)
+            ORDER BY ts_rank_cd(to_tsvector('simple', c.content), plainto_tsquery('simple', %s)) DESC
+            LIMIT %s
+            """,
+            [Document.DocumentStatus.COMPLETED, query.text, query.text, pool],
+        )
+        text_ids = [row[0] for row in cursor.fetchall()]
+
+        from .services import reciprocal_rank_fusion
+        fused = reciprocal_rank_fusion([vector_ids, text_ids], k=self.RRF_K)
+        return [chunk_id for chunk_id, _ in fused[:self.k]]
+
+
+class MMRConfig(RetrievalConfig):
+    """
+    Scan exato de 'candidates' vizinhos (com os vetores em binário) + reseleção MMR com 'lambda'.
+    O recall contra o top-k exato cai por construção (troca duplicatas por diversidade); o que
+    interessa aqui é o custo: 'mmr_select_ms' isola a etapa NumPy do tempo total da consulta.
+    """
+    name = "mmr"
+
+    def __init__(self, dims: int, k: int, **params):
+        super().__init__(dims, k, **params)
+        self.select_ms = []
+
+    def session_settings(self):
+        return []
+
+    def search(self, cursor, query: BenchQuery) -> list:
+        from .services import maximal_marginal_relevance
+
+        cursor.execute(
+            f"""
+            SELECT c.id, vector_send(c.embedding) FROM {self.chunk_table} c
+            JOIN {self.document_table} d ON d.id = c.document_id
+            WHERE d.status = %s AND c.embedding IS NOT NULL
+            ORDER BY c.embedding <=> %s::vector
+            LIMIT %s
+            """,
+            [Document.DocumentStatus.COMPLETED, query.literal, int(self.params.get('candidates', 50))],
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return []
+
+        started = time.perf_counter()
+        vectors = np.vstack([decode_vector_binary(row[1]) for row in rows])
+        chosen = maximal_marginal_relevance(query.embedding, vectors, self.k, float(self.params.get('lambda', 0.7)))
+        self.select_ms.append((time.perf_counter() - started) * 1000)
+        return [rows[i][0] for i in chosen]
+
+    def extra_metrics(self):
+        return {"mmr_select_ms": latency_summary(self.select_ms)} if self.select_ms else {}
+
+
+class MemoryIndexConfig(RetrievalConfig):
+    """
+    Backend de retrieval em memória (snapshot float16 mmap, core.vector_store), fora do Postgres.
+    Usa o snapshot publicado (gere com `build_vector_snapshot`); 'nprobe' só vale com IVF.
+    """
+    name = "memory"
+
+    def __init__(self, dims: int, k: int, **params):
+        super().__init__(dims, k, **params)
+        from .vector_store import InMemoryVectorIndex, read_snapshot_meta
+        self.meta = read_snapshot_meta()
+        self.index = InMemoryVectorIndex(reload_interval=3600)
+
+    def skip_reason(self):
+        if self.meta is None:
+            return "nenhum snapshot vetorial publicado (rode build_vector_snapshot)."
+        return None
+
+    def session_settings(self):
+        return []
+
+    def search(self, cursor, query: BenchQuery) -> list:
+        return [chunk_id for chunk_id, _ in self.index.search(query.embedding, self.k, nprobe=self.params.get('nprobe'))]
+
+    def describe(self):
+        result = super().describe()
+        if self.meta:
+            result["snapshot"] = {key: self.meta.get(key) for key in ("version", "rows", "ivf_lists")}
+        return result
+
+
+def index_size_bytes(cursor, index_name: str) -> int:
+    cursor.execute("SELECT pg_relation_size(%s::regclass)", [index_name])
+    return cursor.fetchone()[0]
+
+
+def embedding_column_bytes(cursor) -> int:
+    cursor.execute(f"SELECT COALESCE(SUM(pg_column_size(embedding)), 0) FROM {DocumentChunk._meta.db_table}")
+    return int(cursor.fetchone()[0])
+
+
+def run_config(config: RetrievalConfig, queries: list[BenchQuery], ground_truth: dict, warmup: int = 3) -> dict:
+    """
+    Mede uma configuração. Tudo roda numa transação revertida ao final
+    (índices temporários e SET LOCAL não sobrevivem ao benchmark).
+    """
+    result = config.describe()
+
+    reason = config.skip_reason()
+    if reason is None and config.requires_text and not all(q.text for q in queries):
+        reason = "requer consultas textuais (use --mode sampled)."
+    if reason:
+        result["skipped"] = reason
+        return result
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            ddl = config.index_ddl()
+            if ddl:
+                started = time.perf_counter()
+                cursor.execute(ddl)
+                result["build_seconds"] = round(time.perf_counter() - started, 3)
+                index_name = ddl.split()[2]
+                result["index_bytes"] = index_size_bytes(cursor, index_name)
+            else:
+                result["index_bytes"] = 0
+
+            for statement in config.session_settings():
+                cursor.execute(statement)
+
+            for query in queries[:warmup]:
+                config.search(cursor, query)
+
+            latencies, recalls = [], []
+            tracemalloc.start()
+            cpu_started = time.process_time()
+            for query in queries:
+                started = time.perf_counter()
+                found = config.search(cursor, query)
+                latencies.append((time.perf_counter() - started) * 1000)
+                recalls.append(recall_at_k(found, ground_truth[query.source_chunk_id]))
+            cpu_seconds = time.process_time() - cpu_started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        transaction.set_rollback(True)
+
+    result["recall_at_k"] = round(statistics.fmean(recalls), 4) if recalls else None
+    result["latency_ms"] = latency_summary(latencies)
+    result["python_peak_bytes"] = peak
+    # CPU do processo Python (serialização do vetor, parse do resultado); não inclui o Postgres
+    result["python_cpu_ms_per_query"] = round(cpu_seconds * 1000 / len(queries), 3) if queries else None
+    result.update(config.extra_metrics())
+    return result
+
+
+def compute_ground_truth(queries: list[BenchQuery], dims: int, k: int) -> dict:
+    """Top-k exato (scan sequencial) de cada consulta, indexado pelo chunk de origem."""
+    exact = ExactScan(dims, k)
+    truth = {}
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for statement in exact.session_settings():
+                cursor.execute(statement)
+            for query in queries:
+                truth[query.source_chunk_id] = exact.search(cursor, query)
+        transaction.set_rollback(True)
+    return truth
+
+
+def _cpu_us_per_item(fn, items, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.process_time()
+        for item in items:
+            fn(item)
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1e6 / max(len(items), 1), 1)
+
+
+def measure_vector_io(sample_size: int = 50, seed: int = 42) -> dict:
+    """
+    CPU por vetor (µs) dos caminhos de I/O de embeddings: listas Python (legado, pgvector padrão)
+    vs NumPy (core.vector_io). Usa embeddings reais do corpus.
+    """
+    from pgvector import Vector
+
+    ids = list(DocumentChunk.objects.filter(embedding__isnull=False).values_list('id', flat=True)[:sample_size * 10])
+    if not ids:
+        return {}
+    ids = random.Random(seed).sample(ids, min(sample_size, len(ids)))
+    table = DocumentChunk._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT embedding::text, vector_send(embedding) FROM {table} WHERE id = ANY(%s::uuid[])", [[str(i) for i in ids]])
+        rows = cursor.fetchall()
+    texts = [row[0] for row in rows]
+    binaries = [bytes(row[1]) for row in rows]
+    arrays = [decode_vector_binary(b) for b in binaries]
+    lists = [a.tolist() for a in arrays]
+    ollama_bodies = [json.dumps({"embedding": values}).encode() for values in lists]
+
+    return {
+        "vectors": len(rows),
+        "ollama_decode_us": {
+            "list": _cpu_us_per_item(lambda body: json.loads(body)["embedding"], ollama_bodies),
+            "numpy": _cpu_us_per_item(parse_embedding_response, ollama_bodies),
+        },
+        "param_encode_us": {
+            "list": _cpu_us_per_item(Vector._to_db, lists),
+            "numpy": _cpu_us_per_item(format_vector, arrays),
+        },
+        "row_decode_us": {
+            "text": _cpu_us_per_item(Vector._from_db, texts),
+            "binary": _cpu_us_per_item(decode_vector_binary, binaries),
+        },
+    }
@@ -0,0 +1,174 @@
+# backend/core/rbac.py em 2026-10-19 22:05
+
+"""
+Permissões efetivas de cada usuário compiladas em conjuntos imutáveis.
+
+Papéis (UserProfile.roles) e permissões (Role.permissions) viram um PermissionSet com os
+nomes dos papéis e os slugs das permissões, calculado em uma consulta e guardado em duas
+camadas:
+
+    1. Memo local do processo, válido por RBAC_LOCAL_TTL_SECONDS.
+    2. Cache compartilhado (alias RBAC_CACHE_ALIAS, Redis), com chave versionada
+       'rbac:v1:<geração>:<user_id>'.
+
+Invalidação (core/signals.py, m2m_changed):
+    - papéis de um perfil mudaram -> apaga a chave daquele usuário;
+    - permissões de um papel (ou o próprio papel/permissão) mudaram -> incrementa a geração:
+      todas as chaves antigas deixam de ser lidas e expiram sozinhas.
+
+No processo que fez a alteração o efeito é imediato; nos demais, em até RBAC_LOCAL_TTL_SECONDS.
+Uma falha do Redis não nega nem concede nada: a checagem cai para o banco.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.permissions import BasePermission
+
+logger = logging.getLogger(__name__)
+
+KEY_SCHEMA = "rbac:v1"
+GENERATION_KEY = f"{KEY_SCHEMA}:generation"
+
+# user_id -> (PermissionSet, expira_em monotonic)
+_local: dict = {}
+
+
+@dataclass(frozen=True)
+class PermissionSet:
+    roles: frozenset = frozenset()
+    permissions: frozenset = frozenset()
+
+    def has_perm(self, slug: str) -> bool:
+        return slug in self.permissions
+
+    def has_perms(self, slugs) -> bool:
+        return self.permissions.issuperset(slugs)
+
+    def has_role(self, *names: str) -> bool:
+        return not self.roles.isdisjoint(names)
+
+
+EMPTY = PermissionSet()
+
+
+def _cache():
+    return caches[settings.RBAC_CACHE_ALIAS]
+
+
+def _generation() -> int:
+    cache = _cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Base no relógio: uma geração recriada (Redis limpo/evicção) não reencontra chaves antigas
+        cache.add(GENERATION_KEY, int(time.time()), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _key(generation: int, user_id) -> str:
+    return f"{KEY_SCHEMA}:{generation}:{user_id}"
+
+
+def compile_permissions(user_id) -> PermissionSet:
+    """Papéis e permissões do usuário direto do banco (uma consulta; papéis sem permissão inclusos)."""
+    from core.models import Role
+
+    rows = Role.objects.filter(users__user_id=user_id).values_list('name', 'permissions__slug')
+    return PermissionSet(
+        roles=frozenset(name for name, _ in rows),
+        permissions=frozenset(slug for _, slug in rows if slug),
+    )
+
+
+def permissions_for(user) -> PermissionSet:
+    """PermissionSet do usuário, sem consulta ao banco quando já compilado."""
+    if user is None or not user.is_authenticated:
+        return EMPTY
+
+    cached = _local.get(user.pk)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    try:
+        generation = _generation()
+        perms = _cache().get(_key(generation, user.pk))
+    except Exception as e:
+        logger.warning(f"Cache de RBAC indisponível, compilando do banco: {e}")
+        return compile_permissions(user.pk)
+
+    if perms is None:
+        perms = compile_permissions(user.pk)
+        try:
+            _cache().set(_key(generation, user.pk), perms, settings.RBAC_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar permissões compiladas no cache: {e}")
+
+    if settings.RBAC_LOCAL_TTL_SECONDS > 0:
+        _local[user.pk] = (perms, time.monotonic() + settings.RBAC_LOCAL_TTL_SECONDS)
+    return perms
+
+
+def _after_change(invalidate):
+    """Invalida já (a própria transação enxerga a mudança) e de novo no commit: descarta o que
+    outro processo tenha compilado entre os dois momentos com os dados ainda antigos."""
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def invalidate_users(user_ids):
+    user_ids = list(user_ids)
+
+    def invalidate():
+        for user_id in user_ids:
+            _local.pop(user_id, None)
+        try:
+            generation = _generation()
+            _cache().delete_many([_key(generation, user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar permissões compiladas: {e}")
+
+    _after_change(invalidate)
+
+
+def invalidate_all():
+    def invalidate():
+        _local.clear()
+        try:
+            cache = _cache()
+            try:
+                cache.incr(GENERATION_KEY)
+            except ValueError:  # geração ainda não existe: a próxima leitura cria uma nova
+                pass
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar permissões compiladas: {e}")
+
+    _after_change(invalidate)
+
+
+def clear_local_cache():
+    _local.clear()
+
+
+class RBACPermission(BasePermission):
+    """
+    Exige todos os slugs de required_permissions. Só consulta o PermissionSet compilado:
+    cada slug é um teste de pertinência em frozenset, sem ir ao banco.
+    Use require_permission('approve_wellness_plan') em permission_classes.
+    """
+    required_permissions: frozenset = frozenset()
+    message = "Você não tem permissão para esta ação."
+
+    def has_permission(self, request, view):
+        return permissions_for(request.user).has_perms(self.required_permissions)
+
+
+def require_permission(*slugs: str) -> type:
+    return type(
+        f"Require_{'_'.join(slugs)}",
+        (RBACPermission,),
+        {'required_permissions': frozenset(slugs)},
+    )
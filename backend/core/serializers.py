@@ -3,6 +3,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import UserProfile, Role, Organization, ProfessionalProfile, ParticipantProfile
+from .pii import BatchDecryptListSerializer, ProfileNameField
 
 class UserSimpleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -29,6 +30,21 @@ class ParticipantProfileSerializer(serializers.ModelSerializer):
         model = ParticipantProfile
         fields = ['id', 'autonomy_level', 'personality_type', 'gamification_wallet_balance', 'current_streak_days']
 
+class PatientListSerializer(serializers.ModelSerializer):
+    """
+    Linha da lista de pacientes: só colunas do próprio perfil + User (um JOIN, sem roles
+    nem perfis de participante/profissional). O detalhe completo é o UserProfileSerializer.
+    O 'user' aninhado tem o mesmo formato do detalhe (o frontend lê patient.user.username).
+    O full_name não vem na consulta da lista: é decifrado em lote para a página inteira.
+    """
+    user = UserSimpleSerializer(read_only=True)
+    full_name = ProfileNameField(source='pk', key='pk')
+
+    class Meta:
+        model = UserProfile
+        fields = ['id', 'user', 'full_name', 'avatar_url', 'primary_organization', 'created_at']
+        list_serializer_class = BatchDecryptListSerializer
+
 class UserProfileSerializer(serializers.ModelSerializer):
     user = UserSimpleSerializer(read_only=True)
     roles = RoleSerializer(many=True, read_only=True)
@@ -1,67 +1,221 @@
 # backend/core/services.py em 2025-12-14 11:48
 
 import logging
+import numpy as np
 from django.conf import settings
-from django.db.models import F
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
 from pgvector.django import CosineDistance
 from core.models import DocumentChunk, Document
 from core.clients import ollama_client
-from .models import DocumentChunk, AuditLog
+from core.vector_io import VectorSend, decode_vector_binary, format_vector, vector_param
+from core.chunk_metadata import ChunkFilter
+from core.context_builder import estimate_tokens, pack_context, score_sentences, split_sentences
+from core.embedding_spaces import active_space, space_model, with_vectors
+from .models import DocumentChunk, AuditLog, LLMCallTrace
 from pgvector.django import CosineDistance
 
 logger = logging.getLogger(__name__)
 
+# Constante padrão do Reciprocal Rank Fusion (Cormack et al.): amortece o peso do 1º lugar
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: list[list], k: int = RRF_K) -> list[tuple]:
+    """
+    Funde rankings (listas de ids em ordem de relevância) somando 1/(k + posição).
+    Itens repetidos entre rankings são deduplicados e acumulam pontuação.
+    Retorna [(id, score)] em ordem decrescente de score.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def maximal_marginal_relevance(query_embedding, candidate_embeddings, k: int, lambda_mult: float = 0.7) -> list[int]:
+    """
+    Seleção MMR (Carbonell & Goldstein): a cada passo escolhe o candidato que maximiza
+    λ·sim(consulta, c) - (1-λ)·max sim(c, já escolhidos). λ=1 é o ranking puro por relevância;
+    valores menores penalizam chunks quase idênticos (overlap da ingestão, edições repetidas).
+    Vetorizado: uma matriz de similaridade n×n e k atualizações de um vetor de máximos.
+    Retorna os índices escolhidos (posições em candidate_embeddings), em ordem de seleção.
+    """
+    matrix = np.asarray(candidate_embeddings, dtype=np.float32)
+    n = len(matrix)
+    if n == 0 or k <= 0:
+        return []
+
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = matrix @ query
+    similarity = matrix @ matrix.T
+    redundancy = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+
+    selected = []
+    for _ in range(min(k, n)):
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[:, best], out=redundancy)
+    return selected
+
+
 class RAGService:
-    def __init__(self):
-        self.embedding_model = settings.OLLAMA_EMBEDDING_MODEL
+    def __init__(self, caller: str = LLMCallTrace.Caller.RAG, organization_id=None):
+        # Espaço vetorial ativo (RAG_EMBEDDING_SPACE): a pergunta é embedada pelo mesmo modelo dos chunks
+        self.space = active_space()
+        self.embedding_model = space_model(self.space)
         self.generation_model = settings.OLLAMA_GENERATION_MODEL
+        # Atribuição das chamadas ao LLM (rastreio de tokens/latência)
+        self.caller = caller
+        self.organization_id = organization_id
 
-    def get_query_embedding(self, text: str) -> list[float]:
-        """Gera o embedding para a pergunta do usuário."""
-        response = ollama_client.embed(self.embedding_model, text)
-        return response.get("embedding", [])
+    def get_query_embedding(self, text: str) -> np.ndarray:
+        """Gera o embedding (np.float32) para a pergunta do usuário."""
+        response = ollama_client.embed(self.embedding_model, text, caller=self.caller, organization_id=self.organization_id)
+        return response.get("embedding", np.empty(0, dtype=np.float32))
 
-    def search_relevant_chunks(self, query_text: str, limit: int = 5, similarity_threshold: float = 0.3) -> list[DocumentChunk]:
+    def search_relevant_chunks(self, query_text: str, limit: int = 5, similarity_threshold: float = 0.3, filters: ChunkFilter = None, query_embedding=None, diversify: bool = None, mmr_lambda: float = None) -> list[DocumentChunk]:
         """
         Busca semântica no banco de dados.
         Retorna os chunks mais próximos da pergunta.
+        :param filters: ChunkFilter opcional (ex: só tabelas, só um livro, só 'pt'), aplicado
+            como pré-filtro na própria consulta vetorial (o top-k já sai filtrado).
+        :param query_embedding: embedding já calculado da pergunta (evita uma 2ª chamada ao Ollama).
+        :param diversify: aplica MMR sobre RAG_MMR_CANDIDATES candidatos (padrão: RAG_MMR_ENABLED),
+            trocando chunks quase duplicados por outros relevantes. mmr_lambda padrão: RAG_MMR_LAMBDA.
         """
         if not query_text:
             return []
 
-        embedding = self.get_query_embedding(query_text)
-        
-        # Busca vetorial usando Cosine Distance (menor distância = maior similaridade)
-        # Filtra apenas documentos processados (COMPLETED)
-        chunks = DocumentChunk.objects.filter(
-            document__status=Document.DocumentStatus.COMPLETED
-        ).annotate(
-            distance=CosineDistance('embedding', embedding)
-        ).order_by('distance')[:limit]
+        embedding = query_embedding if query_embedding is not None else self.get_query_embedding(query_text)
+        diversify = settings.RAG_MMR_ENABLED if diversify is None else diversify
+        fetch_limit = max(settings.RAG_MMR_CANDIDATES, limit) if diversify else limit
+
+        chunks = None
+        if settings.RAG_RETRIEVAL_BACKEND == 'memory':
+            chunks = self._search_in_memory(embedding, fetch_limit, filters)
+
+        if chunks is None:
+            # Busca vetorial usando Cosine Distance (menor distância = maior similaridade)
+            # Filtra apenas documentos processados (COMPLETED). O vetor de cada chunk não é
+            # carregado (parse de 4096 floats em texto); com MMR vem no formato binário.
+            queryset, vector_field = with_vectors(DocumentChunk.objects.filter(
+                document__status=Document.DocumentStatus.COMPLETED
+            ).filter(
+                filters.retrieval_q() if filters else Q()
+            ).defer('embedding'), self.space)
+            queryset = queryset.annotate(distance=CosineDistance(vector_field, vector_param(embedding)))
+            if diversify:
+                queryset = queryset.annotate(embedding_binary=VectorSend(vector_field))
+            chunks = list(queryset.order_by('distance')[:fetch_limit])
 
         # Opcional: Filtrar por threshold de qualidade se necessário
         # return [c for c in chunks if c.distance < similarity_threshold]
-        
-        return list(chunks)
 
-    def build_context(self, chunks: list[DocumentChunk]) -> str:
-        """Monta o texto de contexto para o prompt."""
+        if diversify and len(chunks) > limit:
+            chunks = self._diversify(embedding, chunks, limit, settings.RAG_MMR_LAMBDA if mmr_lambda is None else mmr_lambda)
+        return chunks
+
+    def _diversify(self, embedding, chunks: list[DocumentChunk], limit: int, mmr_lambda: float) -> list[DocumentChunk]:
+        """Reseleciona `limit` chunks diversos entre os candidatos (MMR sobre os vetores float32)."""
+        missing = [c.id for c in chunks if getattr(c, 'embedding_binary', None) is None]
+        if missing:
+            queryset, vector_field = with_vectors(DocumentChunk.objects.filter(id__in=missing), self.space)
+            binaries = dict(queryset.values_list('id', VectorSend(vector_field)))
+            for chunk in chunks:
+                if chunk.id in binaries:
+                    chunk.embedding_binary = binaries[chunk.id]
+
+        vectors = np.vstack([decode_vector_binary(c.embedding_binary) for c in chunks])
+        return [chunks[i] for i in maximal_marginal_relevance(embedding, vectors, limit, mmr_lambda)]
+
+    def _search_in_memory(self, embedding, limit: int, filters: ChunkFilter = None):
+        """
+        Top-k no snapshot float16 em memória (core.vector_store). Retorna None se não houver
+        snapshot, para o chamador cair no pgvector. Busca o dobro de candidatos porque o
+        snapshot pode conter chunks de documentos que deixaram de estar COMPLETED.
+        """
+        from core.vector_store import vector_index
+
+        hits = vector_index.search(embedding, limit * 2, filters=filters, include_ids=filters.canonical_ids() if filters else None)
+        if hits is None:
+            return None
+
+        chunks_by_id = DocumentChunk.objects.select_related('document').defer('embedding').filter(
+            id__in=[chunk_id for chunk_id, _ in hits],
+            document__status=Document.DocumentStatus.COMPLETED,
+        ).in_bulk()
+
+        chunks = []
+        for chunk_id, distance in hits:
+            chunk = chunks_by_id.get(chunk_id)
+            if chunk is not None:
+                chunk.distance = distance
+                chunks.append(chunk)
+        return chunks[:limit]
+
+    def build_context(self, chunks: list[DocumentChunk], query_embedding=None, token_budget: int = None) -> str:
+        """
+        Monta o texto de contexto para o prompt.
+        Com query_embedding e orçamento (token_budget ou RAG_CONTEXT_TOKEN_BUDGET > 0), entram só
+        as frases mais relevantes para a pergunta, com a citação da fonte (ver core/context_builder.py).
+        Se os chunks inteiros já cabem no orçamento, as frases nem são embedadas.
+        """
         if not chunks:
             return ""
-            
-        context_parts = []
-        for i, chunk in enumerate(chunks):
-            source = f"Fonte {i+1} ({chunk.document.file_name}, pág {chunk.page_number or '?'}):"
-            context_parts.append(f"{source}\n{chunk.content}")
-            
-        return "\n\n---\n\n".join(context_parts)
-
-    def query_with_rag(self, user_question: str) -> dict:
+
+        headers = [
+            f"Fonte {i+1} ({chunk.document.file_name}, pág {chunk.page_number or '?'}):"
+            for i, chunk in enumerate(chunks)
+        ]
+        token_budget = settings.RAG_CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+        context = "\n\n---\n\n".join(f"{header}\n{chunk.content}" for header, chunk in zip(headers, chunks))
+
+        # O /api/embed das frases custa quase o prefill que a compressão economizaria: só vale acima do orçamento
+        if query_embedding is not None and 0 < token_budget < estimate_tokens(context):
+            packed = self._pack_sentences(chunks, headers, query_embedding, token_budget)
+            if packed is not None:
+                return packed.text
+        return context
+
+    def _pack_sentences(self, chunks, headers, query_embedding, token_budget):
+        """Pontua as frases dos chunks contra a pergunta (um único /api/embed em lote) e empacota no orçamento."""
+        chunk_sentences = [split_sentences(chunk.content) for chunk in chunks]
+        sentences = [sentence for group in chunk_sentences for sentence in group]
+        if not sentences:
+            return None
+        try:
+            sentence_embeddings = ollama_client.embed_batch(
+                self.embedding_model, sentences, caller=self.caller, organization_id=self.organization_id
+            )
+        except Exception as e:
+            logger.warning(f"RAG: falha ao embedar frases do contexto, usando chunks inteiros: {e}")
+            return None
+
+        packed = pack_context(headers, chunk_sentences, score_sentences(query_embedding, sentence_embeddings), token_budget)
+        if not packed.text:
+            return None
+        logger.debug(
+            f"RAG: contexto {packed.full_tokens} -> {packed.tokens} tokens estimados "
+            f"({packed.reduction:.0%} menor, {packed.sentences_used}/{packed.sentences_total} frases)."
+        )
+        return packed
+
+    def query_with_rag(self, user_question: str, filters: ChunkFilter = None) -> dict:
         """
         Fluxo completo: Pergunta -> Busca -> Prompt -> Resposta.
         """
-        # 1. Recuperação
-        chunks = self.search_relevant_chunks(user_question)
+        # 1. Recuperação (o embedding da pergunta também pontua as frases do contexto)
+        query_embedding = self.get_query_embedding(user_question) if user_question else None
+        chunks = self.search_relevant_chunks(user_question, filters=filters, query_embedding=query_embedding)
         
         if not chunks:
             return {
@@ -70,7 +224,7 @@ class RAGService:
             }
 
         # 2. Construção do Prompt
-        context_str = self.build_context(chunks)
+        context_str = self.build_context(chunks, query_embedding=query_embedding)
         system_prompt = (
             "Você é a IA da Vitalia, uma plataforma de saúde. "
             "Responda à pergunta do usuário baseando-se ESTRITAMENTE no contexto fornecido abaixo. "
@@ -81,7 +235,10 @@ class RAGService:
         full_prompt = f"{system_prompt}\n\nCONTEXTO:\n{context_str}\n\nPERGUNTA:\n{user_question}"
 
         # 3. Geração
-        response = ollama_client.generate(self.generation_model, full_prompt)
+        response = ollama_client.generate(
+            self.generation_model, full_prompt,
+            caller=self.caller, organization_id=self.organization_id
+        )
         
         return {
             "answer": response.get("response", ""),
@@ -95,7 +252,7 @@ class RAGService:
             ]
         }
 
-    def search_for_audit(self, query_text: str, limit: int = 5) -> list[dict]:
+    def search_for_audit(self, query_text: str, limit: int = 5, filters: ChunkFilter = None) -> list[dict]:
         """
         Busca chunks relevantes para auditoria técnica.
         Retorna o conteúdo + metadados da fonte (Livro/Página).
@@ -103,21 +260,97 @@ class RAGService:
         embedding = self.get_query_embedding(query_text)
         
         # Busca sem filtros de permissão (o Auditor tem acesso total ao Knowledge Base)
+        queryset, vector_field = with_vectors(DocumentChunk.objects.filter(filters.retrieval_q() if filters else Q()), self.space)
         chunks = (
-            DocumentChunk.objects
-            .annotate(distance=CosineDistance("embedding", embedding))
+            queryset
+            .annotate(distance=CosineDistance(vector_field, vector_param(embedding)))
             .select_related('document')
             .order_by("distance")[:limit]
         )
 
+        return [self._audit_evidence(c, c.distance) for c in chunks]
+
+    def _audit_evidence(self, chunk: DocumentChunk, distance: float) -> dict:
+        # Formata a fonte para evidência
+        source_info = f"{chunk.document.file_name} (Pág. {chunk.page_number or '?'})"
+        return {
+            "content": chunk.content,
+            "source": source_info,
+            "distance": distance
+        }
+
+    def search_multi_query(self, queries: list[str], limit: int = 5, per_query_limit: int = None, filters: ChunkFilter = None) -> list[dict]:
+        """
+        Busca com expansão de consulta (ex: nome PT + Latim + Inglês + sinônimos).
+        Em vez de embedar "A OR B OR C" como um único texto (vetor 'borrado'):
+        1. Embeda todos os termos numa única chamada em lote ao Ollama.
+        2. Roda o top-k de cada termo numa única consulta SQL (LATERAL JOIN).
+        3. Funde os rankings com RRF, deduplicando chunks encontrados por mais de um termo.
+        Retorna no formato do search_for_audit + 'matched_terms' e 'rrf_score'.
+        """
+        terms = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+        if not terms:
+            return []
+        per_query_limit = per_query_limit or limit * 2
+
+        embeddings = ollama_client.embed_batch(
+            self.embedding_model, terms, caller=self.caller, organization_id=self.organization_id
+        )
+        rankings = self._rank_per_term(embeddings, per_query_limit, filters)
+
+        best_distance, matched_terms = {}, {}
+        for term, ranking in zip(terms, rankings):
+            for chunk_id, distance in ranking:
+                best_distance[chunk_id] = min(distance, best_distance.get(chunk_id, distance))
+                matched_terms.setdefault(chunk_id, []).append(term)
+
+        fused = reciprocal_rank_fusion([[chunk_id for chunk_id, _ in ranking] for ranking in rankings])[:limit]
+        chunks = DocumentChunk.objects.select_related('document').in_bulk([chunk_id for chunk_id, _ in fused])
+
         results = []
-        for c in chunks:
-            # Formata a fonte para evidência
-            source_info = f"{c.document.file_name} (Pág. {c.page_number or '?'})"
-            results.append({
-                "content": c.content,
-                "source": source_info,
-                "distance": c.distance
-            })
-        
+        for chunk_id, score in fused:
+            if chunk_id not in chunks:
+                continue
+            evidence = self._audit_evidence(chunks[chunk_id], best_distance[chunk_id])
+            evidence["matched_terms"] = matched_terms[chunk_id]
+            evidence["rrf_score"] = round(score, 5)
+            results.append(evidence)
         return results
+
+    def _rank_per_term(self, embeddings, per_query_limit: int, filters: ChunkFilter = None) -> list[list[tuple]]:
+        """Top-k [(chunk_id, distância)] de cada vetor de consulta, na ordem dos vetores."""
+        if settings.RAG_RETRIEVAL_BACKEND == 'memory':
+            from core.vector_store import vector_index
+            include_ids = filters.canonical_ids() if filters else None
+            rankings = [vector_index.search(vector, per_query_limit, filters=filters, include_ids=include_ids) for vector in embeddings]
+            if all(r is not None for r in rankings):
+                return rankings
+
+        # Consulta interna do ORM (com os filtros) referenciando o vetor do termo via LATERAL
+        queryset, vector_field = with_vectors(DocumentChunk.objects.filter(filters.retrieval_q() if filters else Q()), self.space)
+        inner = (
+            queryset
+            .annotate(distance=CosineDistance(vector_field, RawSQL('q.vec', ())))
+            .order_by('distance')
+            .values_list('id', 'distance')[:per_query_limit]
+        )
+        inner_sql, inner_params = inner.query.sql_with_params()
+        values_sql = ", ".join(["(%s, %s::vector)"] * len(embeddings))
+        params = [p for term_index, vector in enumerate(embeddings) for p in (term_index, format_vector(vector))]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT q.term, r.id, r.distance
+                FROM (VALUES {values_sql}) AS q(term, vec)
+                CROSS JOIN LATERAL ({inner_sql}) AS r
+                ORDER BY q.term, r.distance
+                """,
+                params + list(inner_params),
+            )
+            rows = cursor.fetchall()
+
+        rankings = [[] for _ in range(len(embeddings))]
+        for term_index, chunk_id, distance in rows:
+            rankings[term_index].append((chunk_id, distance))
+        return rankings
@@ -0,0 +1,112 @@
+# backend/core/signals.py em 2026-10-19 12:30
+
+import time
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from . import envelope, grants, rbac
+from .models import DataAccessGrant, Document, GrantExpansion, Organization, Permission, Role, UserProfile
+from .near_duplicates import release_canonicals
+from .tasks import rebuild_vector_snapshot
+
+
+def _schedule_vector_snapshot_rebuild():
+    requested_at = time.time()
+    transaction.on_commit(lambda: rebuild_vector_snapshot.apply_async(
+        kwargs={'requested_at': requested_at},
+        countdown=settings.RAG_VECTOR_REBUILD_DELAY_SECONDS,
+    ))
+
+
+@receiver(post_save, sender=Document)
+def refresh_vector_snapshot_on_completion(sender, instance, update_fields=None, **kwargs):
+    """Com o backend 'memory', um documento COMPLETED agenda a reconstrução do snapshot vetorial."""
+    if settings.RAG_RETRIEVAL_BACKEND != 'memory':
+        return
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    if instance.status == Document.DocumentStatus.COMPLETED:
+        _schedule_vector_snapshot_rebuild()
+
+
+@receiver(pre_delete, sender=Document)
+def release_canonicals_on_delete(sender, instance, **kwargs):
+    """
+    Apagar um documento leva seus chunks; as quase-duplicatas em outros documentos não têm
+    vetor e cairiam para duplicate_of=NULL (fora da busca). Promove uma delas antes.
+    """
+    release_canonicals(instance)
+
+
+@receiver(post_delete, sender=Document)
+def refresh_vector_snapshot_on_delete(sender, instance, **kwargs):
+    if settings.RAG_RETRIEVAL_BACKEND == 'memory' and instance.status == Document.DocumentStatus.COMPLETED:
+        _schedule_vector_snapshot_rebuild()
+
+
+# --- RBAC: invalidação das permissões compiladas (ver core/rbac.py) ---
+
+@receiver(m2m_changed, sender=UserProfile.roles.through)
+def invalidate_profile_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # role.users.add/remove/clear: vários perfis (pk_set é None no clear) -> tudo
+        rbac.invalidate_all()
+    else:
+        rbac.invalidate_users([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def invalidate_role_permissions(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        rbac.invalidate_all()
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_rbac_catalog(sender, created=False, **kwargs):
+    # Renomear/remover um papel ou permissão não dispara m2m_changed (o CASCADE apaga as
+    # linhas da tabela de junção direto). Um papel recém-criado ainda não tem usuários; já o
+    # slug é a PK da Permission: renomeá-lo grava uma linha nova (created) e repassa os vínculos.
+    if not created or sender is Permission:
+        rbac.invalidate_all()
+
+
+# --- Data Vault: expansão materializada dos grants (ver core/grants.py) ---
+
+@receiver(post_save, sender=DataAccessGrant)
+def expand_saved_grant(sender, instance, **kwargs):
+    grants.invalidate_actors(grants.expand_grants([instance]))
+
+
+@receiver(pre_delete, sender=DataAccessGrant)
+def invalidate_deleted_grant(sender, instance, **kwargs):
+    # A expansão sai pelo CASCADE; antes disso, quem tinha acesso por este grant
+    grants.invalidate_actors(GrantExpansion.objects.filter(grant=instance).values_list('user_id', flat=True))
+
+
+@receiver(m2m_changed, sender=UserProfile.teams.through)
+def expand_team_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # team.members.add/remove/clear
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            grants.invalidate_actors(grants.expand_teams([instance.pk]))
+    elif action == 'pre_clear':
+        # No post_clear o pk_set vem vazio: guarda os times que o perfil deixa
+        instance._cleared_team_ids = list(instance.teams.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        grants.invalidate_actors(grants.expand_teams(pk_set))
+    elif action == 'post_clear':
+        grants.invalidate_actors(grants.expand_teams(getattr(instance, '_cleared_team_ids', [])))
+
+
+# --- PII: chave de dados do envelope criada no commit da Organization (ver core/envelope.py) ---
+
+@receiver(post_save, sender=Organization)
+def create_organization_data_key(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: envelope.ensure_data_key(instance.pk))
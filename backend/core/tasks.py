@@ -4,21 +4,29 @@ import os
 from celery import shared_task
 from django.conf import settings
 from django.db import transaction
-from core.models import Document, DocumentChunk
+from core.models import Document, DocumentChunk, RejectedChunk, LLMCallTrace
 from core.clients import unstructured_client, ollama_client, UnstructuredServiceError
+from core.chunk_metadata import promote_chunk_metadata
+from core.chunk_quality import assess_chunk, reject_chunk
+from core.embedding_spaces import active_space, route_vector, save_space_vectors, space_model
+from core.near_duplicates import NearDuplicateDetector, dedup_ratio, release_canonicals
 
 import logging
 logger = logging.getLogger(__name__)
 
 @shared_task(queue='heavy_ingestion')
-def process_document_ingestion(document_id: str):
+def process_document_ingestion(document_id: str, dedup: bool = None, quality_gate: bool = None):
     """
     Task Celery para processar um documento:
     1. Envia para Unstructured (OCR/Parse)
     2. Recebe chunks de texto
-    3. Envia para Ollama (Embedding)
-    4. Salva no banco
+    3. Portão de qualidade: chunks reprovados vão para RejectedChunk, sem embedding (quality_gate; padrão: INGEST_QUALITY_GATE_ENABLED)
+    4. Detecta quase-duplicatas (MinHash/LSH), que não são embedadas (dedup; padrão: INGEST_DEDUP_ENABLED)
+    5. Envia para Ollama (Embedding)
+    6. Salva no banco
     """
+    dedup = settings.INGEST_DEDUP_ENABLED if dedup is None else dedup
+    quality_gate = settings.INGEST_QUALITY_GATE_ENABLED if quality_gate is None else quality_gate
     try:
         doc = Document.objects.get(id=document_id)
     except Document.DoesNotExist:
@@ -54,36 +62,138 @@ def process_document_ingestion(document_id: str):
         doc.status = Document.DocumentStatus.EMBEDDING
         doc.save(update_fields=['status'])
 
-        # 2. Vetorização
+        # 2. Portão de qualidade + Deduplicação + Vetorização
+        items = [(item, item.get('text', '').strip()) for item in chunks_data]
+        items = [(item, text) for item, text in items if len(text) >= 10]
+
+        rejected = []
+        if quality_gate:
+            accepted = []
+            for item, text in items:
+                metadata = item.get('metadata', {})
+                verdict = assess_chunk(text, is_table=item.get('type') == 'Table')
+                if verdict.accepted:
+                    item['metadata'] = {**metadata, "quality": verdict.as_metadata()}
+                    accepted.append((item, text))
+                else:
+                    rejected.append(reject_chunk(doc, text, metadata.get('page_number'), metadata, verdict))
+            items = accepted
+        decisions = NearDuplicateDetector(exclude_document=doc).detect([text for _, text in items]) if dedup else [None] * len(items)
+
+        space = active_space()
         chunks_to_create = []
-        for item in chunks_data:
-            text = item.get('text', '').strip()
-            if len(text) < 10: continue
+        canonical_ids = {}
+        for index, ((item, text), decision) in enumerate(zip(items, decisions)):
+            canonical_id = None
+            if decision is not None and decision.is_duplicate:
+                canonical_id = decision.duplicate_of_id or canonical_ids.get(decision.duplicate_of_index)
 
-            embedding_resp = ollama_client.embed(settings.OLLAMA_EMBEDDING_MODEL, text)
+            embedding = None
+            if canonical_id is None:
+                embedding = ollama_client.embed(
+                    space_model(space), text,
+                    caller=LLMCallTrace.Caller.INGEST_EMBED, organization_id=doc.organization_id
+                )['embedding']
             
-            chunks_to_create.append(
+            chunk = promote_chunk_metadata(
                 DocumentChunk(
                     document=doc,
                     content=text,
-                    embedding=embedding_resp['embedding'],
+                    embedding=embedding,
                     page_number=item.get('metadata', {}).get('page_number'),
                     metadata=item.get('metadata', {})
-                )
+                ),
+                default_source=doc.file_name
             )
+            if decision is not None:
+                decision.apply(chunk, canonical_id)
+            if canonical_id is None:
+                canonical_ids[index] = chunk.id
+            chunks_to_create.append(route_vector(chunk, space))
 
         # 3. Persistência
         with transaction.atomic():
             # Limpa anteriores se houver (reprocessamento)
+            release_canonicals(doc)
             doc.chunks.all().delete()
+            doc.rejected_chunks.all().delete()
             DocumentChunk.objects.bulk_create(chunks_to_create)
+            save_space_vectors(chunks_to_create, space)
+            RejectedChunk.objects.bulk_create(rejected)
             
             doc.status = Document.DocumentStatus.COMPLETED
             doc.save(update_fields=['status'])
             
-        logger.info(f"Documento {doc.id} processado com sucesso. {len(chunks_to_create)} chunks.")
+        logger.info(
+            f"Documento {doc.id} processado com sucesso. {len(chunks_to_create)} chunks, "
+            f"{len(rejected)} reprovados no portão de qualidade "
+            f"(quase-duplicatas: {dedup_ratio(decisions) if dedup else 0:.1%})."
+        )
 
     except Exception as e:
         logger.error(f"Erro processando documento {doc.id}: {e}", exc_info=True)
         doc.status = Document.DocumentStatus.FAILED
-        doc.save(update_fields=['status'])
\ No newline at end of file
+        doc.save(update_fields=['status'])
+
+@shared_task(queue='heavy_ingestion')
+def reembed_embedding_space(space_name: str, batch_size: int = None, rate_per_minute: float = None, limit: int = None):
+    """
+    Re-embedding em sombra (core.embedding_spaces): completa os vetores do espaço com vazão
+    limitada. Incremental, pode ser agendada (celery-beat) até o cutover.
+    """
+    from core.embedding_spaces import coverage, reembed_space, resolve_space
+
+    space = resolve_space(space_name)
+    stats = reembed_space(space, batch_size=batch_size, rate_per_minute=rate_per_minute, limit=limit)
+    covered, total = coverage(space)
+    logger.info(
+        f"Re-embedding {space_name}: {stats.embedded} vetores ({stats.failed} com erro) em {stats.elapsed:.0f}s. "
+        f"Cobertura: {covered}/{total}."
+    )
+    return {"embedded": stats.embedded, "failed": stats.failed, "covered": covered, "total": total}
+
+@shared_task(queue='heavy_ingestion')
+def maintain_vector_indexes(rebuild: bool = True, tune: bool = True, apply: bool = False):
+    """
+    Saúde dos índices ANN (core.vector_maintenance): recall por amostragem, REINDEX CONCURRENTLY
+    se degradado e sintonia de ef_search/probes. Agendada via django-celery-beat
+    (vector_index_maintenance --schedule). Só grava ef_search/probes no banco (ALTER DATABASE)
+    com apply=True explícito, como nos kwargs da tarefa agendada.
+    """
+    from core.vector_maintenance import run_maintenance
+
+    report = run_maintenance(rebuild=rebuild, tune=tune, apply=apply)
+    for index in report["indexes"]:
+        for warning in index["warnings"]:
+            logger.warning(f"Índice vetorial {index['name']}: {warning}")
+    return report
+
+@shared_task(queue='heavy_ingestion')
+def rebuild_vector_snapshot(requested_at: float = None):
+    """
+    Reconstrói o snapshot float16 do backend de retrieval em memória (core.vector_store).
+    Disparada (com atraso) quando um Document fica COMPLETED. Se um snapshot mais novo
+    que o pedido já foi publicado (ingestões em sequência), não faz nada.
+    """
+    from core.vector_store import build_snapshot_from_db, read_snapshot_meta
+
+    current = read_snapshot_meta()
+    if requested_at and current and current.get('created_at', 0) >= requested_at:
+        logger.info(f"Snapshot vetorial {current['version']} já cobre o pedido. Ignorando rebuild.")
+        return current['version']
+
+    meta = build_snapshot_from_db()
+    return meta['version']
+
+@shared_task(queue='default')
+def sweep_expired_grants(batch_size: int = 5000):
+    """
+    Carimba em lote os DataAccessGrants vencidos (core.grants.sweep_expired_grants).
+    Agendada via django-celery-beat (sweep_expired_grants --schedule).
+    """
+    from core.grants import sweep_expired_grants as sweep
+
+    swept = sweep(batch_size=batch_size)
+    if swept:
+        logger.info(f"Varredura de grants: {swept} vencidos carimbados.")
+    return swept
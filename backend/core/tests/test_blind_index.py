@@ -0,0 +1,183 @@
+# backend/core/tests/test_blind_index.py
+
+from unittest.mock import patch
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core import blind_index
+from core.blind_index import rebuild_blind_indexes
+from core.models import UserProfile
+from core.tests.factories import RoleFactory, UserFactory, UserProfileFactory
+from core.utils import (
+    generate_prefix_query_tokens, generate_prefix_tokens, generate_search_tokens, normalize_cpf, normalize_phone,
+)
+
+
+@pytest.fixture
+def prefix_index(settings):
+    settings.BLIND_PREFIX_INDEX_ENABLED = True
+    settings.BLIND_PREFIX_MIN_CHARS = 3
+    settings.BLIND_PREFIX_MAX_CHARS = 8
+    settings.BLIND_PREFIX_MAX_PARTS = 4
+    return settings
+
+
+class TestPrefixTokens:
+    def test_prefixes_are_bounded(self, prefix_index):
+        # ANDRE: AND..ANDRE (3); SILVA: SIL..SILVA (3); "da" é stopword
+        assert len(generate_prefix_tokens("André da Silva")) == 6
+        # Acima do teto só o prefixo de 8 letras é indexado
+        assert len(generate_prefix_tokens("Maximiliano")) == 6
+
+    def test_query_matches_indexed_prefixes(self, prefix_index):
+        stored = set(generate_prefix_tokens("André da Silva"))
+
+        assert set(generate_prefix_query_tokens("and")) <= stored
+        assert set(generate_prefix_query_tokens("ANDRE sil")) <= stored
+        assert not set(generate_prefix_query_tokens("andreia")) <= stored
+
+    def test_long_query_is_truncated_to_the_cap(self, prefix_index):
+        assert generate_prefix_query_tokens("Maximiliano")[0] in generate_prefix_tokens("Maximiliano")
+
+    def test_short_term_has_no_tokens(self, prefix_index):
+        assert generate_prefix_query_tokens("an") == []
+
+    def test_prefix_tokens_are_domain_separated(self, prefix_index):
+        assert not set(generate_prefix_tokens("Silva")) & set(generate_search_tokens("Sil Silva"))
+
+    def test_max_parts_limits_indexed_parts(self, prefix_index):
+        prefix_index.BLIND_PREFIX_MAX_PARTS = 1
+
+        assert generate_prefix_query_tokens("Silva")[0] not in generate_prefix_tokens("André Silva")
+
+
+class TestIdentifierNormalization:
+    @pytest.mark.parametrize("value,expected", [
+        ("529.982.247-25", "52998224725"),
+        ("52998224725", "52998224725"),
+        ("529.982.247-24", None),  # dígito verificador errado
+        ("111.111.111-11", None),
+        ("5299822472", None),
+    ])
+    def test_cpf(self, value, expected):
+        assert normalize_cpf(value) == expected
+
+    @pytest.mark.parametrize("value,expected", [
+        ("+55 (11) 98765-4321", "11987654321"),
+        ("(11) 3456-7890", "1134567890"),
+        ("011 3456-7890", "1134567890"),
+        ("(11) 8765-43210", None),  # celular sem o 9
+        ("3456-7890", None),  # sem DDD
+    ])
+    def test_phone(self, value, expected):
+        assert normalize_phone(value) == expected
+
+
+@pytest.fixture
+def api_client():
+    client = APIClient()
+    client.force_authenticate(UserFactory())
+    return client
+
+
+@pytest.mark.django_db
+class TestPatientTypeahead:
+    def test_profile_save_fills_prefix_tokens_only_when_enabled(self, settings):
+        settings.BLIND_PREFIX_INDEX_ENABLED = False
+        assert UserProfileFactory(full_name="André Silva").search_prefix_tokens == []
+
+        settings.BLIND_PREFIX_INDEX_ENABLED = True
+        assert UserProfileFactory(full_name="André Silva").search_prefix_tokens
+
+    def test_typeahead_returns_open_columns_only(self, api_client, prefix_index, django_assert_num_queries):
+        participant = RoleFactory(name="Participante")
+        andre = UserProfileFactory(full_name="André Silva", roles=[participant])
+        UserProfileFactory(full_name="Bruna Souza", roles=[participant])
+        UserProfileFactory(full_name="Andreia Lima", roles=[RoleFactory(name="Médico")])
+
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse('patient-typeahead'), {'q': 'and sil'})
+
+        assert response.status_code == 200
+        assert response.data == [{'id': andre.id, 'avatar_url': andre.avatar_url, 'username': andre.user.username}]
+
+    def test_typeahead_is_opt_in(self, api_client, settings):
+        settings.BLIND_PREFIX_INDEX_ENABLED = False
+
+        assert api_client.get(reverse('patient-typeahead'), {'q': 'and'}).status_code == 404
+
+
+@pytest.mark.django_db
+class TestIdentifierSearch:
+    @pytest.fixture
+    def patient(self):
+        return UserProfileFactory(
+            cpf="529.982.247-25", phone_number="(11) 98765-4321", roles=[RoleFactory(name="Participante")]
+        )
+
+    def search(self, api_client, term):
+        response = api_client.get(reverse('patient-list'), {'search': term})
+        return [row['id'] for row in response.data['results']]
+
+    @pytest.mark.parametrize("term", ["529.982.247-25", "52998224725", "+55 11 98765-4321", "11987654321"])
+    def test_cpf_and_phone_in_any_format(self, api_client, patient, term):
+        UserProfileFactory(roles=[RoleFactory(name="Participante")])
+
+        assert self.search(api_client, term) == [patient.id]
+
+    def test_invalid_identifier_matches_nothing(self, api_client, patient):
+        assert self.search(api_client, "529.982.247-24") == []
+
+    def test_identifier_index_is_saved(self, patient):
+        assert patient.cpf_index and patient.phone_index
+        assert UserProfile.objects.get(cpf_index=patient.cpf_index) == patient
+
+
+@pytest.mark.django_db
+class TestRebuildBlindIndex:
+    def test_rebuild_restores_stale_tokens(self, settings):
+        settings.BLIND_PREFIX_INDEX_ENABLED = True
+        profile = UserProfileFactory(full_name="André Silva")
+        expected = (profile.search_tokens, profile.search_prefix_tokens)
+        UserProfile.objects.filter(pk=profile.pk).update(search_tokens=[], search_prefix_tokens=[])
+
+        stats = rebuild_blind_indexes(batch_size=2, workers=1)
+
+        profile.refresh_from_db()
+        assert (profile.search_tokens, profile.search_prefix_tokens) == expected
+        assert (stats.scanned, stats.updated) == (1, 1)
+        assert rebuild_blind_indexes(workers=1).updated == 0
+
+    def test_profile_saved_during_rebuild_keeps_fresh_tokens(self):
+        profile = UserProfileFactory(full_name="André Silva")
+        UserProfile.objects.filter(pk=profile.pk).update(search_tokens=[])
+        tokenize = blind_index.tokenize_rows
+
+        def tokenize_then_edit(rows):
+            changed = tokenize(rows)
+            profile.full_name = "Bruna Souza"  # edição entre a leitura do lote e a escrita
+            profile.save()
+            return changed
+
+        with patch.object(blind_index, 'tokenize_rows', tokenize_then_edit):
+            stats = rebuild_blind_indexes(workers=1)
+
+        profile.refresh_from_db()
+        assert profile.search_tokens == generate_search_tokens("Bruna Souza")
+        assert (stats.updated, stats.skipped) == (0, 1)
+
+    def test_key_rotation_keeps_search_working(self, api_client, settings):
+        settings.BLIND_INDEX_KEY = "old-key"
+        andre = UserProfileFactory(full_name="André Silva", roles=[RoleFactory(name="Participante")])
+
+        settings.BLIND_INDEX_KEY, settings.BLIND_INDEX_PREVIOUS_KEY = "new-key", "old-key"
+        search = lambda: [row['id'] for row in api_client.get(reverse('patient-list'), {'search': 'andre'}).data['results']]
+        assert search() == [andre.id]
+
+        rebuild_blind_indexes(workers=1)
+        andre.refresh_from_db()
+        assert andre.search_tokens == generate_search_tokens("André Silva", key="new-key")
+
+        settings.BLIND_INDEX_PREVIOUS_KEY = ""
+        assert search() == [andre.id]
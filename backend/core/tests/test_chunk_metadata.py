@@ -0,0 +1,33 @@
+# backend/core/tests/test_chunk_metadata.py
+
+from core.chunk_metadata import ChunkFilter, detect_language, promote_chunk_metadata
+from core.models import DocumentChunk
+
+
+class TestChunkMetadataPromotion:
+    def test_ingest_metadata_is_promoted_to_columns(self):
+        """Os flags gravados pelo ingest_knowledge_book viram colunas; o span vem dos marcadores de página."""
+        chunk = DocumentChunk(
+            content="=== PÁG 12 ===\n### TABELA PÁG 12\n| Músculo | Origem |\n=== PÁG 13 ===\nO músculo é inervado pelo nervo...",
+            page_number=12,
+            metadata={"source": "gray.pdf", "is_table": True, "has_vision": False, "ingestion_date": "2026-10-01T10:00:00"},
+        )
+
+        promote_chunk_metadata(chunk)
+
+        assert chunk.is_table is True
+        assert chunk.has_vision is False
+        assert chunk.source == "gray.pdf"
+        assert (chunk.page_start, chunk.page_end) == (12, 13)
+        assert chunk.ingested_at.year == 2026
+
+    def test_language_detection(self):
+        assert detect_language("O fêmur é o osso mais longo do corpo humano e se articula com a tíbia.") == "pt"
+        assert detect_language("The femur is the longest bone of the human body and it articulates with the tibia.") == "en"
+        assert detect_language("Fêmur") == ""
+
+    def test_filter_builds_page_overlap_condition(self):
+        assert not ChunkFilter()
+        q = ChunkFilter(tables_only=True, pages=(10, 20)).to_q()
+        assert ('is_table', True) in q.children
+        assert ('page_start__lte', 20) in q.children and ('page_end__gte', 10) in q.children
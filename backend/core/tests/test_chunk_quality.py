@@ -0,0 +1,106 @@
+# backend/core/tests/test_chunk_quality.py
+
+import pytest
+from core.chunk_quality import assess_chunk, reject_chunk
+from core.models import Document, RejectedChunk
+from core.tests.factories import OrganizationFactory
+
+PROSE_PT = (
+    "O fêmur é o osso mais longo do corpo humano. Sua extremidade proximal se articula com o "
+    "acetábulo do quadril e a distal com a tíbia e a patela, formando a articulação do joelho. "
+    "O colo do fêmur é uma região frequente de fraturas em idosos com osteoporose."
+)
+PROSE_EN = (
+    "The femur is the longest bone in the human body. Its proximal end articulates with the "
+    "acetabulum of the hip and the distal end with the tibia and the patella at the knee joint, "
+    "and the neck of the femur is a common site of fractures in the elderly."
+)
+STRUCTURE_LIST = (
+    "Músculos: bíceps braquial, tríceps braquial, deltoide, peitoral maior, peitoral menor, "
+    "coracobraquial, braquial, braquiorradial, supinador, pronador redondo, pronador quadrado, "
+    "flexor radial do carpo, flexor ulnar do carpo, palmar longo, extensor ulnar do carpo."
+)
+LATIN = (
+    "Musculus biceps brachii originem habet caput longum a tuberculo supraglenoidali scapulae et "
+    "caput breve a processu coracoideo. Insertio fit in tuberositate radii et per aponeurosim "
+    "musculi bicipitis brachii in fascia antebrachii. Nervus musculocutaneus musculum innervat."
+)
+TABLE = (
+    "### TABELA PÁG 12\n| Músculo | Origem | Inserção |\n|---|---|---|\n"
+    "| Bíceps braquial | Tubérculo supraglenoidal | Tuberosidade do rádio |\n"
+    "| Tríceps braquial | Tubérculo infraglenoidal | Olécrano |"
+)
+
+
+class TestAssessChunk:
+    @pytest.mark.parametrize("text", [PROSE_PT, PROSE_EN])
+    def test_accepts_prose(self, text):
+        verdict = assess_chunk(text)
+
+        assert verdict.accepted, verdict.reasons
+        assert verdict.score > 0.8
+        assert verdict.signals["language"] in {"pt", "en"}
+
+    def test_accepts_markdown_table(self):
+        assert assess_chunk(TABLE, is_table=True).accepted
+
+    def test_rejects_empty_vision_description(self):
+        verdict = assess_chunk("[DESCRIÇÃO VISUAL IA]: Não encontrado.")
+
+        assert not verdict.accepted
+        assert verdict.reasons == ["placeholder"]
+        assert verdict.score == 0.0
+
+    def test_rejects_table_of_contents_residue(self):
+        verdict = assess_chunk("Capítulo 3 ........................ 42\nCapítulo 4 ........................ 57")
+
+        assert not verdict.accepted
+        assert "repeated_chars" in verdict.reasons
+
+    def test_rejects_ocr_garbage(self):
+        verdict = assess_chunk("|||| ~~ 1l1 0O0 @#% ;;: 8B8 1l1 |||| --- 0O0 @#% ;;: 8B8 " * 4)
+
+        assert not verdict.accepted
+        assert "low_alpha_ratio" in verdict.reasons
+
+    def test_language_signals_back_up_ocr_signals(self):
+        text = " ".join(["q7z1 9v3r 4k8p 2m6w 8q1t 2z5x 6c9#"] * 6)
+
+        verdict = assess_chunk(text)
+
+        assert not verdict.accepted
+        assert {"low_alpha_ratio", "no_language", "low_stopword_density"} <= set(verdict.reasons)
+
+    @pytest.mark.parametrize("text", [STRUCTURE_LIST, LATIN])
+    def test_accepts_structure_lists_and_latin_nomenclature(self, text):
+        verdict = assess_chunk(text)
+
+        assert verdict.accepted, verdict.reasons
+
+    def test_short_caption_is_not_judged_by_language(self):
+        verdict = assess_chunk("Figura 3.2 Vista anterior do fêmur direito")
+
+        assert verdict.accepted
+        assert "no_language" not in verdict.reasons
+
+    def test_metadata_carries_decision_and_signals(self):
+        metadata = assess_chunk(PROSE_PT).as_metadata()
+
+        assert metadata["accepted"] is True
+        assert {"score", "reasons", "words", "alpha_ratio", "repeated_ratio", "stopword_density"} <= metadata.keys()
+
+
+@pytest.mark.django_db
+class TestRejectChunk:
+    def test_builds_rejected_chunk_for_review(self):
+        doc = Document.objects.create(organization=OrganizationFactory(), file_name="atlas.pdf")
+        verdict = assess_chunk("Não encontrado.")
+
+        rejected = reject_chunk(doc, "Não encontrado.", 7, {"source": "atlas.pdf"}, verdict)
+        rejected.save()
+
+        stored = RejectedChunk.objects.get(document=doc)
+        assert stored.reasons == ["placeholder"]
+        assert stored.page_number == 7
+        assert stored.metadata["source"] == "atlas.pdf"
+        assert stored.metadata["quality"]["accepted"] is False
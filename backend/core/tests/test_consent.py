@@ -0,0 +1,73 @@
+# backend/core/tests/test_consent.py
+
+import pytest
+from django.core.exceptions import ValidationError
+from core.consent import (
+    consents_for, diverging_consents, has_consent, rebuild_current_consents, record_consents, users_with_consent,
+)
+from core.models import ConsentLog, CurrentConsent
+from core.tests.factories import ConsentLogFactory, DataAccessGrantFactory, UserFactory
+
+RESEARCH = ConsentLog.ConsentType.RESEARCH
+
+
+@pytest.mark.django_db
+class TestCurrentConsent:
+    def test_latest_log_wins(self):
+        user = UserFactory()
+        ConsentLogFactory(user=user, consent_type=RESEARCH, granted=True)
+        assert has_consent(user, RESEARCH)
+
+        ConsentLogFactory(user=user, consent_type=RESEARCH, granted=False, version="2.0")
+
+        current = CurrentConsent.objects.get(user=user, consent_type=RESEARCH)
+        assert (current.granted, current.version) == (False, "2.0")
+        assert not has_consent(user, RESEARCH)
+
+    def test_older_log_committed_later_does_not_win(self):
+        """Duas transações concorrentes: a do log mais antigo faz o upsert depois da do mais novo."""
+        user = UserFactory()
+        older = ConsentLogFactory(user=user, consent_type=RESEARCH, granted=True, version="1.0")
+        newer = ConsentLogFactory(user=user, consent_type=RESEARCH, granted=False, version="2.0")
+
+        record_consents([older])
+
+        current = CurrentConsent.objects.get(user=user, consent_type=RESEARCH)
+        assert current.consent_log_id == newer.pk
+        assert not has_consent(user, RESEARCH)
+        assert diverging_consents() == 0
+
+    def test_cohort_check_in_one_query(self, django_assert_num_queries):
+        granted, revoked, silent = UserFactory.create_batch(3)
+        ConsentLogFactory(user=granted, consent_type=RESEARCH, granted=True)
+        ConsentLogFactory(user=revoked, consent_type=RESEARCH, granted=False)
+        ConsentLogFactory(user=silent, granted=True)  # outro tipo
+
+        with django_assert_num_queries(1):
+            cohort = consents_for([granted.pk, revoked.pk, silent.pk], RESEARCH)
+
+        assert cohort == {granted.pk: True, revoked.pk: False, silent.pk: False}
+        assert users_with_consent([granted.pk, revoked.pk], RESEARCH) == {granted.pk}
+
+    def test_rebuild_replays_log(self):
+        user = UserFactory()
+        ConsentLogFactory(user=user, consent_type=RESEARCH, granted=True)
+        ConsentLogFactory(user=user, consent_type=RESEARCH, granted=False)
+        CurrentConsent.objects.all().delete()
+        assert diverging_consents() == 1
+
+        assert rebuild_current_consents() == 1
+
+        assert not has_consent(user, RESEARCH)
+        assert diverging_consents() == 0
+
+
+@pytest.mark.django_db
+def test_grant_requires_current_sharing_consent():
+    owner = UserFactory()
+    grant = DataAccessGrantFactory(owner=owner, grantee_user=UserFactory(), consent_log=ConsentLogFactory(user=owner))
+    grant.clean()
+
+    ConsentLogFactory(user=grant.owner, granted=False)
+    with pytest.raises(ValidationError):
+        grant.clean()
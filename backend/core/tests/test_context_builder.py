@@ -0,0 +1,47 @@
+# backend/core/tests/test_context_builder.py
+
+import numpy as np
+from core.context_builder import GAP_MARKER, estimate_tokens, pack_context, score_sentences, split_sentences
+
+
+class TestSentenceSplitting:
+    def test_splits_sentences_and_lines(self):
+        text = (
+            "O fêmur é o osso mais longo do corpo humano. Ele se articula com o acetábulo do quadril.\n"
+            "=== PÁG 12 ===\n"
+            "A diáfise é cilíndrica e levemente curvada para frente."
+        )
+        sentences = split_sentences(text)
+
+        assert sentences[0] == "O fêmur é o osso mais longo do corpo humano."
+        assert any("PÁG 12" in s for s in sentences)
+        assert sentences[-1].endswith("curvada para frente.")
+
+    def test_short_fragments_are_merged(self):
+        """Títulos curtos não viram frases isoladas (seriam embedados sem conteúdo)."""
+        sentences = split_sentences("Figura 3.\nVista anterior do fêmur direito mostrando a cabeça e o colo.")
+        assert len(sentences) == 1
+
+
+class TestContextPacking:
+    def test_scores_are_cosine_similarities(self):
+        scores = score_sentences([1.0, 0.0], [[2.0, 0.0], [0.0, 3.0], [1.0, 1.0]])
+        assert np.allclose(scores, [1.0, 0.0, np.sqrt(0.5)])
+
+    def test_keeps_best_sentences_within_budget(self):
+        """As frases mais relevantes entram com a citação, na ordem original, com '[...]' nos cortes."""
+        headers = ["Fonte 1 (atlas.pdf, pág 12):", "Fonte 2 (netter.pdf, pág 3):"]
+        chunk_sentences = [
+            ["A" * 80 + " relevante.", "B" * 80 + " irrelevante.", "C" * 80 + " relevante também."],
+            ["D" * 80 + " irrelevante."],
+        ]
+        scores = [0.9, 0.1, 0.8, 0.05]
+        budget = estimate_tokens(headers[0]) + estimate_tokens(chunk_sentences[0][0]) + estimate_tokens(chunk_sentences[0][2])
+
+        packed = pack_context(headers, chunk_sentences, scores, budget)
+
+        assert packed.text.startswith(headers[0])
+        assert "relevante também" in packed.text and GAP_MARKER in packed.text
+        assert "irrelevante" not in packed.text and headers[1] not in packed.text
+        assert packed.tokens <= budget + 2
+        assert packed.sentences_used == 2 and 0.4 < packed.reduction < 0.6
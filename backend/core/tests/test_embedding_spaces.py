@@ -0,0 +1,82 @@
+# backend/core/tests/test_embedding_spaces.py
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from core import embedding_spaces
+from core.embedding_spaces import coverage, reembed_space, resolve_space, route_vector, save_space_vectors
+from core.fake_services import deterministic_embedding
+from core.models import ChunkEmbedding, Document, DocumentChunk, EmbeddingSpace
+from core.services import RAGService
+from core.tests.factories import OrganizationFactory
+
+TEXTS = [
+    "O fêmur se articula com o acetábulo do quadril.",
+    "A tíbia sustenta o peso do corpo na perna.",
+    "O úmero se articula com a escápula no ombro.",
+]
+
+
+@pytest.fixture
+def corpus(db):
+    document = Document.objects.create(organization=OrganizationFactory(), file_name="atlas.pdf", status=Document.DocumentStatus.COMPLETED)
+    return [
+        DocumentChunk.objects.create(document=document, content=text, embedding=deterministic_embedding("llama3", text, 4096))
+        for text in TEXTS
+    ]
+
+
+@pytest.fixture
+def shadow_space(db):
+    embedding_spaces._resolved.clear()
+    yield EmbeddingSpace.objects.create(name="shadow", model="shadow-embed", dimensions=4096)
+    embedding_spaces._resolved.clear()
+
+
+@pytest.mark.django_db
+class TestShadowReembedding:
+    def test_reembed_fills_only_missing_vectors(self, fake_ai_services, corpus, shadow_space):
+        assert coverage(shadow_space) == (0, 3)
+
+        first = reembed_space(shadow_space, batch_size=2, rate_per_minute=0, limit=2)
+        assert first.embedded == 2
+        assert coverage(shadow_space) == (2, 3)
+
+        second = reembed_space(shadow_space, batch_size=2, rate_per_minute=0)
+        assert second.embedded == 1
+        assert coverage(shadow_space) == (3, 3)
+        # A coluna legacy não é tocada
+        assert DocumentChunk.objects.filter(embedding__isnull=True).count() == 0
+
+    def test_duplicates_are_not_reembedded(self, fake_ai_services, corpus, shadow_space):
+        DocumentChunk.objects.filter(id=corpus[2].id).update(duplicate_of=corpus[0], embedding=None)
+
+        reembed_space(shadow_space, rate_per_minute=0)
+
+        assert coverage(shadow_space) == (2, 2)
+        assert not ChunkEmbedding.objects.filter(chunk=corpus[2]).exists()
+
+    def test_cutover_reads_from_active_space(self, fake_ai_services, corpus, shadow_space, settings):
+        reembed_space(shadow_space, rate_per_minute=0)
+        settings.RAG_EMBEDDING_SPACE = "shadow"
+
+        rag = RAGService()
+        chunks = rag.search_relevant_chunks(TEXTS[1], limit=1)
+
+        assert rag.embedding_model == "shadow-embed"
+        assert chunks[0].id == corpus[1].id
+        assert chunks[0].distance == pytest.approx(0.0, abs=1e-5)
+
+    def test_ingestion_writes_active_space(self, corpus, shadow_space):
+        vector = deterministic_embedding("shadow-embed", "Chunk novo.", 4096)
+        chunk = route_vector(DocumentChunk(document=corpus[0].document, content="Chunk novo.", embedding=vector), shadow_space)
+        chunk.save()
+        save_space_vectors([chunk], shadow_space)
+
+        assert DocumentChunk.objects.get(id=chunk.id).embedding is None
+        assert ChunkEmbedding.objects.filter(chunk=chunk, space=shadow_space).exists()
+
+    def test_unknown_space_is_a_configuration_error(self, db):
+        assert resolve_space("") is None
+        assert resolve_space("legacy") is None
+        with pytest.raises(ImproperlyConfigured):
+            resolve_space("does-not-exist")
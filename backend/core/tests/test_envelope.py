@@ -0,0 +1,97 @@
+# backend/core/tests/test_envelope.py
+
+import pytest
+from django.db import connection, transaction
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django_crypto_fields.fields import EncryptedTextField
+from core import envelope
+from core.models import DataEncryptionKey, UserProfile
+from core.tests.factories import OrganizationFactory, UserProfileFactory
+
+
+def stored(profile, field):
+    return UserProfile.objects.annotate(raw=Cast(field, output_field=TextField())).values_list('raw', flat=True).get(pk=profile.pk)
+
+
+@pytest.mark.django_db
+class TestEnvelopeField:
+    def test_round_trip_with_tenant_key(self):
+        organization = OrganizationFactory()
+        profile = UserProfileFactory(full_name="André Silva", primary_organization=organization)
+
+        raw = stored(profile, 'full_name')
+        key = DataEncryptionKey.objects.get(organization=organization, is_active=True)
+        assert envelope.key_id_of(raw) == key.id.hex
+        assert "André" not in raw
+        assert UserProfile.objects.get(pk=profile.pk).full_name == "André Silva"
+
+    def test_value_is_bound_to_its_column(self):
+        profile = UserProfileFactory(cpf="529.982.247-25")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {UserProfile._meta.db_table} SET phone_number = cpf WHERE id = %s", [profile.pk]
+            )
+
+        with pytest.raises(envelope.EnvelopeDecryptionError):
+            UserProfile.objects.get(pk=profile.pk)
+
+    def test_legacy_values_stay_readable_until_migrated(self):
+        profile = UserProfileFactory(full_name="André Silva")
+        legacy = EncryptedTextField().get_prep_value("André Legado")
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {UserProfile._meta.db_table} SET full_name = %s WHERE id = %s", [legacy, profile.pk])
+
+        assert UserProfile.objects.get(pk=profile.pk).full_name == "André Legado"
+        assert envelope.encryption_status(UserProfile)['full_name']['legacy'] == 1
+
+        stats = envelope.reencrypt_model(UserProfile, batch_size=1)
+
+        assert stats.reencrypted['full_name'] == 1
+        assert envelope.is_envelope(stored(profile, 'full_name'))
+        assert UserProfile.objects.get(pk=profile.pk).full_name == "André Legado"
+
+
+@pytest.mark.django_db
+class TestKeyRotation:
+    def test_rotation_reencrypts_with_new_version(self):
+        profile = UserProfileFactory(full_name="André Silva", cpf="529.982.247-25")
+        old_key = envelope.key_id_of(stored(profile, 'cpf'))
+
+        [new_key] = envelope.rotate_data_keys()
+        assert envelope.encryption_status(UserProfile)['cpf']['retired_key'] == 1
+
+        envelope.reencrypt_model(UserProfile)
+
+        assert envelope.key_id_of(stored(profile, 'cpf')) == new_key.id.hex != old_key
+        assert envelope.encryption_status(UserProfile)['cpf'] == {'legacy': 0, 'retired_key': 0, 'current': 1}
+        profile = UserProfile.objects.get(pk=profile.pk)
+        assert (profile.full_name, profile.cpf) == ("André Silva", "529.982.247-25")
+
+
+@pytest.fixture
+def forget_keys():
+    # Com transaction=True as chaves entram no cache no commit e o banco é esvaziado ao fim
+    yield
+    envelope.clear_key_cache()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestKeyCreationRollback:
+    def test_rolled_back_key_is_never_reused(self, forget_keys):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                UserProfileFactory(full_name="André Silva")
+                raise RuntimeError("erro depois do primeiro perfil do tenant")
+        assert not DataEncryptionKey.objects.exists()
+
+        profile = UserProfileFactory(full_name="Bruna Souza")
+
+        assert DataEncryptionKey.objects.filter(pk=envelope.key_id_of(stored(profile, 'full_name'))).exists()
+        envelope.clear_key_cache()  # outro processo, sem nada em memória
+        assert UserProfile.objects.get(pk=profile.pk).full_name == "Bruna Souza"
+
+    def test_organization_key_is_created_on_commit(self, forget_keys):
+        organization = OrganizationFactory()
+
+        assert DataEncryptionKey.objects.filter(organization=organization, is_active=True).count() == 1
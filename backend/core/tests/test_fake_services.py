@@ -0,0 +1,72 @@
+# backend/core/tests/test_fake_services.py
+
+import numpy as np
+from core.clients import ollama_client, unstructured_client
+from core.fake_services import pdf_to_elements
+
+
+def _pdf(pages: list[list[str]]) -> bytes:
+    """PDF mínimo (Helvetica, uma linha de texto por entrada) sem depender de gerador externo."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 12 Tf 72 720 Td " + " 0 -20 Td ".join(f"({line}) Tj" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode('latin-1')
+    xref = f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    trailer = f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{len(body)}\n%%EOF\n"
+    return body + (xref + trailer).encode('latin-1')
+
+
+class TestFakeOllama:
+    def test_embeddings_are_deterministic_and_sized(self, fake_ai_services):
+        """Mesmo texto -> mesmo vetor; dimensão igual à do DocumentChunk.embedding."""
+        first = ollama_client.embed("llama3", "fêmur")["embedding"]
+        second = ollama_client.embed("llama3", "fêmur")["embedding"]
+        other = ollama_client.embed("llama3", "tíbia")["embedding"]
+
+        assert first.dtype == np.float32
+        assert np.array_equal(first, second)
+        assert not np.array_equal(first, other)
+        assert len(first) == 4096
+
+    def test_generate_returns_canned_json(self, fake_ai_services):
+        ollama, _ = fake_ai_services
+        ollama.canned_responses = {"Anatomista": {"confidence": "HIGH"}}
+
+        response = ollama_client.generate("llama3", "Aja como um Anatomista Sênior.", is_json=True)
+
+        assert response["response"] == '{"confidence": "HIGH"}'
+        assert response["eval_count"] > 0
+
+
+class TestFakeUnstructured:
+    def test_pdf_is_partitioned_into_elements(self, fake_ai_services, tmp_path):
+        """O PDF enviado pelo UnstructuredClient volta como elementos com página e nome do arquivo."""
+        path = tmp_path / "femur.pdf"
+        path.write_bytes(_pdf([["Femur", "O femur e o osso mais longo do corpo."], ["Tibia"]]))
+
+        elements = unstructured_client.partition_file("doc-1", str(path), "femur.pdf", path.stat().st_size)
+
+        assert [(e["type"], e["text"], e["metadata"]["page_number"]) for e in elements] == [
+            ("Title", "Femur", 1),
+            ("NarrativeText", "O femur e o osso mais longo do corpo.", 1),
+            ("Title", "Tibia", 2),
+        ]
+        assert {e["metadata"]["filename"] for e in elements} == {"femur.pdf"}
+        assert len({e["element_id"] for e in elements}) == 3
+
+    def test_page_breaks_are_optional(self):
+        elements = pdf_to_elements(_pdf([["Femur"], ["Tibia"]]), "ossos.pdf", include_page_breaks=True)
+
+        assert [e["type"] for e in elements] == ["Title", "PageBreak", "Title", "PageBreak"]
@@ -0,0 +1,107 @@
+# backend/core/tests/test_grants.py
+
+from datetime import timedelta
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from core.grants import check, check_many, sweep_expired_grants
+from core.models import ConsentLog, DataAccessGrant, GrantExpansion, Team
+from core.tests.factories import DataAccessGrantFactory, OrganizationFactory, UserFactory, UserProfileFactory
+
+
+@pytest.fixture
+def team():
+    return Team.objects.create(organization=OrganizationFactory(), name="Cardiologia")
+
+
+@pytest.mark.django_db
+class TestCheckMany:
+    def test_user_team_and_target_grants(self, team):
+        doctor = UserProfileFactory().user
+        doctor.profile.teams.add(team)
+        owners = UserFactory.create_batch(4)
+        DataAccessGrantFactory(owner=owners[0], grantee_user=doctor, permissions=['read'])
+        DataAccessGrantFactory(owner=owners[1], grantee_team=team, permissions=['full_access'])
+        DataAccessGrantFactory(
+            owner=owners[2], grantee_user=doctor, permissions=['read'],
+            target_content_type=ContentType.objects.get_for_model(ConsentLog), target_object_id=None,
+        )
+
+        pairs = [(owner, None) for owner in owners] + [(doctor, None)]
+        assert check_many(doctor, pairs) == [True, True, False, False, True]
+        assert check_many(doctor, pairs, permission='approve') == [False, True, False, False, True]
+        # Grant por tipo vale para qualquer recurso desse tipo do dono
+        consent_log = ConsentLog.objects.create(user=owners[2], consent_type='SHARING', granted=True, version='1')
+        assert check(doctor, owners[2], consent_log)
+
+    def test_one_query_per_page_then_cached(self, django_assert_num_queries):
+        doctor = UserFactory()
+        owners = UserFactory.create_batch(20)
+        for owner in owners[::2]:
+            DataAccessGrantFactory(owner=owner, grantee_user=doctor, permissions=['read'])
+
+        with django_assert_num_queries(1):
+            first = check_many(doctor, [(owner, None) for owner in owners])
+        with django_assert_num_queries(0):
+            assert check_many(doctor, [(owner, None) for owner in owners]) == first == [True, False] * 10
+
+    def test_revoke_and_expiry_end_access(self):
+        doctor, owner = UserFactory(), UserFactory()
+        grant = DataAccessGrantFactory(owner=owner, grantee_user=doctor, permissions=['read'])
+        assert check(doctor, owner)
+
+        grant.revoke()
+        assert not check(doctor, owner)
+        assert not GrantExpansion.objects.filter(grant=grant).exists()
+
+        DataAccessGrantFactory(owner=owner, grantee_user=doctor, permissions=['read'],
+                               expires_at=timezone.now() - timedelta(minutes=1))
+        assert not check(doctor, owner)
+
+
+@pytest.mark.django_db
+class TestTeamExpansion:
+    def test_membership_changes_follow_team_grants(self, team):
+        owner = UserFactory()
+        DataAccessGrantFactory(owner=owner, grantee_team=team, permissions=['read'])
+        nurse = UserProfileFactory()
+        assert not check(nurse.user, owner)
+
+        nurse.teams.add(team)
+        assert check(nurse.user, owner)
+
+        nurse.teams.clear()
+        assert not check(nurse.user, owner)
+
+        team.members.add(nurse)
+        assert check(nurse.user, owner)
+        assert GrantExpansion.objects.filter(user=nurse.user, owner=owner).count() == 1
+
+
+@pytest.mark.django_db
+class TestExpiry:
+    def test_active_matches_is_active(self):
+        now = timezone.now()
+        grants = [
+            DataAccessGrantFactory(),
+            DataAccessGrantFactory(expires_at=now + timedelta(days=1)),
+            DataAccessGrantFactory(expires_at=now - timedelta(days=1)),
+            DataAccessGrantFactory(revoked_at=now),
+        ]
+
+        assert set(DataAccessGrant.objects.active()) == {grant for grant in grants if grant.is_active()}
+        assert list(DataAccessGrant.objects.expired()) == [grants[2]]
+
+    def test_sweep_stamps_expired_and_drops_expansion(self):
+        doctor, owner = UserFactory(), UserFactory()
+        expires_at = timezone.now() + timedelta(hours=1)
+        expiring = DataAccessGrantFactory(owner=owner, grantee_user=doctor, expires_at=expires_at, permissions=['read'])
+        lasting = DataAccessGrantFactory(owner=owner, grantee_user=doctor, permissions=['read'])
+
+        assert sweep_expired_grants(batch_size=1, now=expires_at + timedelta(seconds=1)) == 1
+
+        expiring.refresh_from_db()
+        assert expiring.revoked_at == expires_at
+        assert list(GrantExpansion.objects.values_list('grant_id', flat=True)) == [lasting.pk]
+        assert sweep_expired_grants(now=expires_at + timedelta(seconds=1)) == 0
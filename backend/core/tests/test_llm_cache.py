@@ -0,0 +1,60 @@
+# backend/core/tests/test_llm_cache.py
+
+import pytest
+from unittest.mock import patch
+from core.clients import ollama_client
+from core.llm_cache import LLMResponseCache, build_cache_key
+from core.models import LLMCacheEntry
+
+
+class TestBuildCacheKey:
+    def test_key_is_deterministic_and_order_independent(self):
+        """A ordem das opções não pode alterar a chave (dicts equivalentes)."""
+        k1 = build_cache_key("sha256:abc", "prompt", {"temperature": 0.1, "seed": 42})
+        k2 = build_cache_key("sha256:abc", "prompt", {"seed": 42, "temperature": 0.1})
+        assert k1 == k2
+
+    def test_key_changes_with_upstream_inputs(self):
+        """Digest do modelo, imagens e formato participam da chave."""
+        base = build_cache_key("sha256:abc", "prompt", {"temperature": 0.1})
+        assert base != build_cache_key("sha256:def", "prompt", {"temperature": 0.1})
+        assert base != build_cache_key("sha256:abc", "prompt", {"temperature": 0.1}, images=["aGVsbG8="])
+        assert base != build_cache_key("sha256:abc", "prompt", {"temperature": 0.1}, response_format="json")
+
+
+@pytest.mark.django_db
+class TestLLMResponseCache:
+    def test_generate_replays_from_cache(self):
+        """A segunda chamada idêntica não deve ir ao Ollama."""
+        cache = LLMResponseCache('test', ttl_hours=1)
+
+        with patch.object(ollama_client, 'get_model_digest', return_value="sha256:abc"), \
+             patch.object(ollama_client, '_make_request', return_value={"response": "{}", "done": True, "context": [1, 2, 3]}) as mock_req:
+            first = ollama_client.generate("llama3", "Qual o osso?", is_json=True, cache=cache)
+            second = ollama_client.generate("llama3", "Qual o osso?", is_json=True, cache=cache)
+
+        assert mock_req.call_count == 1
+        assert first["response"] == second["response"]
+        assert "context" not in second
+        assert cache.hits == 1 and cache.misses == 1
+
+    def test_invalid_json_response_is_not_cached(self):
+        """Com is_json, uma resposta que não é JSON válido vai ao Ollama de novo na próxima chamada."""
+        cache = LLMResponseCache('test', ttl_hours=1)
+
+        with patch.object(ollama_client, 'get_model_digest', return_value="sha256:abc"), \
+             patch.object(ollama_client, '_make_request', return_value={"response": '{"osso": "fêm', "done": True}) as mock_req:
+            ollama_client.generate("llama3", "Qual o osso?", is_json=True, cache=cache)
+            ollama_client.generate("llama3", "Qual o osso?", is_json=True, cache=cache)
+
+        assert mock_req.call_count == 2
+        assert LLMCacheEntry.objects.count() == 0
+
+    def test_prune_evicts_least_recently_used(self):
+        cache = LLMResponseCache('test', ttl_hours=1, max_mb=0)
+        cache.set("a" * 64, "llama3", {"response": "x" * 100})
+
+        removed = cache.prune()
+
+        assert removed == 1
+        assert LLMCacheEntry.objects.count() == 0
@@ -0,0 +1,40 @@
+# backend/core/tests/test_llm_tracing.py
+
+import time
+import pytest
+from unittest.mock import patch
+from core.llm_tracing import LLMTraceBuffer, record_llm_call, trace_buffer
+from core.models import LLMCallTrace
+
+
+@pytest.mark.django_db
+class TestLLMTracing:
+    @patch.object(LLMTraceBuffer, '_start_worker')
+    def test_generate_metrics_are_buffered_and_flushed(self, _mock_worker, settings):
+        """As métricas do Ollama devem ser persistidas só no flush (escrita em lote)."""
+        settings.LLM_TRACING_ENABLED = True
+        ollama_response = {
+            "response": "ok", "total_duration": 2_000_000_000, "load_duration": 500_000_000,
+            "prompt_eval_count": 120, "eval_count": 40, "eval_duration": 1_000_000_000,
+        }
+
+        record_llm_call(LLMCallTrace.Caller.RAG, "/api/generate", "llama3", time.perf_counter(), response=ollama_response)
+        assert LLMCallTrace.objects.count() == 0
+
+        assert trace_buffer.flush() == 1
+        trace = LLMCallTrace.objects.get()
+        assert trace.caller == LLMCallTrace.Caller.RAG
+        assert trace.outcome == LLMCallTrace.Outcome.SUCCESS
+        assert trace.prompt_eval_count == 120
+        assert trace.eval_count == 40
+
+    @patch.object(LLMTraceBuffer, '_start_worker')
+    def test_errors_are_recorded(self, _mock_worker, settings):
+        settings.LLM_TRACING_ENABLED = True
+
+        record_llm_call(LLMCallTrace.Caller.MAESTRO, "/api/generate", "llama3", time.perf_counter(), error=Exception("timeout"))
+        trace_buffer.flush()
+
+        trace = LLMCallTrace.objects.get()
+        assert trace.outcome == LLMCallTrace.Outcome.ERROR
+        assert "timeout" in trace.error
@@ -0,0 +1,120 @@
+# backend/core/tests/test_near_duplicates.py
+
+import random
+
+import numpy as np
+import pytest
+from core.chunk_metadata import ChunkFilter
+from core.models import Document, DocumentChunk
+from core.services import RAGService
+from core.near_duplicates import (
+    NearDuplicateDetector, band_keys, dedup_ratio, estimated_jaccard, minhash_signature, release_canonicals,
+)
+from core.tests.factories import OrganizationFactory
+
+VOCABULARY = (
+    "o fêmur é o osso mais longo do corpo humano e se articula com o acetábulo do quadril "
+    "e com a tíbia no joelho sua diáfise é cilíndrica e o colo pode fraturar em idosos"
+).split()
+
+
+def _text(seed: int, words: int = 300) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def _edited(text: str, every: int = 60) -> str:
+    """Mesma passagem com pequenas diferenças (outra edição do livro)."""
+    words = text.split()
+    for i in range(0, len(words), every):
+        words[i] = "revisado"
+    return " ".join(words)
+
+
+class TestMinHash:
+    def test_signature_is_stable_and_ignores_page_markers(self):
+        text = _text(1)
+        first = minhash_signature(f"=== PÁG 12 ===\n{text}")
+        second = minhash_signature(f"=== PÁG 340 ===\n{text}")
+
+        assert first.dtype == np.uint32 and first.shape == (128,)
+        assert np.array_equal(first, second)
+        assert band_keys(first) == band_keys(second)
+
+    def test_jaccard_estimate_separates_editions_from_other_text(self):
+        text = _text(1)
+        assert estimated_jaccard(minhash_signature(text), minhash_signature(_edited(text))) > 0.8
+        assert estimated_jaccard(minhash_signature(text), minhash_signature(_text(2))) < 0.2
+        assert minhash_signature("1234 --- 5678") is None
+
+
+@pytest.mark.django_db
+class TestNearDuplicateDetector:
+    def _canonical_chunk(self, text):
+        document = Document.objects.create(organization=OrganizationFactory(), file_name="gray_40ed.pdf", status=Document.DocumentStatus.COMPLETED)
+        signature = minhash_signature(text)
+        return DocumentChunk.objects.create(
+            document=document, content=text, embedding=np.ones(4096, dtype=np.float32),
+            minhash=signature.tobytes(), lsh_bands=band_keys(signature),
+        )
+
+    def test_links_to_corpus_and_to_earlier_chunk_of_same_document(self):
+        """Edição nova: um chunk repete o corpus, outro repete um chunk anterior do próprio livro."""
+        canonical = self._canonical_chunk(_text(1))
+        fresh = _text(3)
+
+        decisions = NearDuplicateDetector(threshold=0.8).detect([_edited(_text(1)), fresh, _edited(fresh), _text(4)])
+
+        assert decisions[0].duplicate_of_id == canonical.id
+        assert not decisions[1].is_duplicate
+        assert decisions[2].duplicate_of_index == 1
+        assert not decisions[3].is_duplicate
+        assert dedup_ratio(decisions) == 0.5
+
+    def test_reingesting_canonical_promotes_its_duplicate(self):
+        """Apagar o canônico não pode deixar a duplicata sem vetor."""
+        canonical = self._canonical_chunk(_text(1))
+        other = Document.objects.create(organization=canonical.document.organization, file_name="gray_41ed.pdf")
+        duplicate = NearDuplicateDetector(threshold=0.8).detect([_edited(_text(1))])[0].apply(
+            DocumentChunk(document=other, content=_edited(_text(1)))
+        )
+        duplicate.save()
+
+        assert release_canonicals(canonical.document) == 1
+        duplicate.refresh_from_db()
+        assert duplicate.duplicate_of_id is None
+        assert np.array_equal(duplicate.embedding, canonical.embedding)
+
+    def test_deleting_canonical_document_keeps_duplicate_searchable(self):
+        canonical = self._canonical_chunk(_text(1))
+        other = Document.objects.create(
+            organization=canonical.document.organization, file_name="gray_41ed.pdf", status=Document.DocumentStatus.COMPLETED,
+        )
+        duplicate = NearDuplicateDetector(threshold=0.8).detect([_edited(_text(1))])[0].apply(
+            DocumentChunk(document=other, content=_edited(_text(1)))
+        )
+        duplicate.save()
+
+        canonical.document.delete()
+
+        hits = RAGService().search_relevant_chunks("fêmur", query_embedding=np.ones(4096, dtype=np.float32), diversify=False)
+        assert [chunk.id for chunk in hits] == [duplicate.id]
+
+    def test_document_filter_reaches_canonical_of_its_duplicates(self):
+        """Busca "só a 2ª edição": o trecho repetido da 1ª edição continua elegível."""
+        canonical = self._canonical_chunk(_text(1))
+        second = Document.objects.create(
+            organization=canonical.document.organization, file_name="gray_41ed.pdf", status=Document.DocumentStatus.COMPLETED,
+        )
+        NearDuplicateDetector(threshold=0.8).detect([_edited(_text(1))])[0].apply(
+            DocumentChunk(document=second, content=_edited(_text(1)))
+        ).save()
+
+        scoped = ChunkFilter(document_ids=[second.id])
+        hits = RAGService().search_relevant_chunks(
+            "fêmur", query_embedding=np.ones(4096, dtype=np.float32), diversify=False, filters=scoped,
+        )
+
+        assert [chunk.id for chunk in hits] == [canonical.id]
+        assert scoped.canonical_ids() == [canonical.id]
+        assert not DocumentChunk.objects.filter(ChunkFilter(document_ids=[second.id]).to_q(), embedding__isnull=False).exists()
@@ -0,0 +1,58 @@
+# backend/core/tests/test_patient_api.py
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.tests.factories import RoleFactory, UserFactory, UserProfileFactory
+
+
+@pytest.fixture
+def api_client():
+    client = APIClient()
+    client.force_authenticate(UserFactory())
+    return client
+
+
+@pytest.fixture
+def participants(db):
+    participant = RoleFactory(name="Participante")
+    other = RoleFactory(name="Voluntário")
+    # Perfis com mais de um papel: o JOIN em roles os duplicaria na lista
+    return [UserProfileFactory(roles=[participant, other]) for _ in range(5)]
+
+
+@pytest.mark.django_db
+class TestPatientList:
+    def test_cursor_pages_cover_each_patient_once(self, api_client, participants):
+        UserProfileFactory(roles=[RoleFactory(name="Médico")])
+
+        seen, url = [], reverse('patient-list') + '?page_size=2'
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == 200
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+
+        assert sorted(seen, reverse=True) == seen
+        assert sorted(seen) == sorted(p.id for p in participants)
+
+    def test_list_rows_are_lean(self, api_client, participants):
+        row = api_client.get(reverse('patient-list')).data['results'][0]
+
+        assert set(row) == {'id', 'user', 'full_name', 'avatar_url', 'primary_organization', 'created_at'}
+        assert set(row['user']) == {'id', 'username', 'email'}
+
+    def test_list_names_are_batch_decrypted(self, api_client, participants):
+        rows = api_client.get(reverse('patient-list')).data['results']
+
+        assert {row['full_name'] for row in rows} == {p.full_name for p in participants}
+
+    def test_list_query_count_does_not_grow_with_page(self, api_client, participants, django_assert_max_num_queries):
+        with django_assert_max_num_queries(3):
+            api_client.get(reverse('patient-list') + '?page_size=5')
+
+    def test_detail_keeps_nested_profile(self, api_client, participants):
+        response = api_client.get(reverse('patient-detail', args=[participants[0].id]))
+
+        assert response.status_code == 200
+        assert {role['name'] for role in response.data['roles']} == {"Participante", "Voluntário"}
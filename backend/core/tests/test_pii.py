@@ -0,0 +1,63 @@
+# backend/core/tests/test_pii.py
+
+import pytest
+from core.pii import DecryptionCache, decryption_scope, profile_names
+from core.tests.factories import UserProfileFactory
+from medical.models import WellnessPlan
+from medical.serializers import WellnessPlanListSerializer
+
+
+class CountingField:
+    """Campo criptografado falso: 'decifra' invertendo o texto e conta as chamadas."""
+    name = "full_name"
+
+    class model:
+        class _meta:
+            label = "core.UserProfile"
+
+    def __init__(self):
+        self.calls = 0
+
+    def from_db_value(self, value, expression, connection):
+        self.calls += 1
+        return value[::-1]
+
+
+class TestDecryptionCache:
+    def test_each_distinct_ciphertext_is_decrypted_once(self):
+        cache, field = DecryptionCache(), CountingField()
+
+        assert cache.decrypt_many(field, ["ana", "ana", "bia", None]) == {"ana": "ana"[::-1], "bia": "aib"}
+        cache.decrypt_many(field, ["bia", "ana"])
+
+        assert field.calls == cache.decrypted == 2
+
+    def test_scope_clears_cache_on_exit(self):
+        with decryption_scope() as cache:
+            cache.decrypt_many(CountingField(), ["ana"])
+
+        assert cache._plain == {}
+
+
+@pytest.mark.django_db
+class TestProfileNames:
+    def test_list_decrypts_each_participant_once(self, django_assert_num_queries):
+        profiles = [UserProfileFactory(full_name=name) for name in ("André Silva", "Bruna Souza")]
+        for i in range(6):
+            WellnessPlan.objects.create(participant=profiles[i % 2].user, title=f"Plano {i}", goals="-")
+        plans = list(WellnessPlan.objects.order_by('title'))
+
+        with decryption_scope() as cache:
+            with django_assert_num_queries(1):
+                data = WellnessPlanListSerializer(plans, many=True).data
+
+        assert [row['participant_name'] for row in data] == ["André Silva", "Bruna Souza"] * 3
+        assert cache.decrypted == 2
+
+    def test_names_are_memoized_within_scope(self, django_assert_num_queries):
+        profile = UserProfileFactory(full_name="André Silva")
+
+        with decryption_scope():
+            profile_names([profile.user_id])
+            with django_assert_num_queries(0):
+                assert profile_names([profile.user_id, None]) == {profile.user_id: "André Silva"}
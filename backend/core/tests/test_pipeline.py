@@ -0,0 +1,68 @@
+# backend/core/tests/test_pipeline.py
+
+import random
+import threading
+import time
+
+import pytest
+from core.pipeline import PipelineRunner
+
+
+def _slow(func):
+    def wrapper(value):
+        time.sleep(random.random() * 0.01)
+        return func(value)
+    return wrapper
+
+
+def _failing_on_seven(value):
+    if value == 7:
+        raise RuntimeError("falha simulada")
+    return value
+
+
+class TestPipelineRunner:
+    @pytest.mark.parametrize("concurrency", [1, 4])
+    def test_sink_receives_items_in_input_order(self, concurrency):
+        """Mesmo com estágios de duração aleatória, a escrita segue a ordem de entrada."""
+        written = []
+        runner = PipelineRunner([
+            ('a', _slow(_failing_on_seven)),
+            ('b', _slow(lambda v: None if v % 5 == 0 else v * 10)),
+        ], concurrency=concurrency)
+        stats = runner.run(range(30), written.append)
+
+        assert [r.seq for r in written] == list(range(30))
+        assert [r.value for r in written if r.ok] == [v * 10 for v in range(30) if v % 5 and v != 7]
+        assert [(r.item, r.failed_at) for r in written if r.error] == [(7, 'a')]
+        assert (stats.written, stats.skipped, stats.failed) == (23, 6, 1)
+        assert runner.resume_point is None
+
+    def test_in_flight_items_are_bounded(self):
+        """Nunca há mais que N itens entre a entrada e o sink."""
+        lock, active, peak = threading.Lock(), [0], [0]
+
+        def enter(value):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.005)
+            return value
+
+        def leave(result):
+            with lock:
+                active[0] -= 1
+
+        PipelineRunner([('a', enter), ('b', _slow(lambda v: v))], concurrency=3).run(range(40), leave)
+        assert peak[0] <= 3
+
+    def test_resume_point_after_sink_failure(self):
+        """Se a escrita falha, o ponto de retomada é o primeiro item não escrito."""
+        def sink(result):
+            if result.item == 'c':
+                raise KeyboardInterrupt
+
+        runner = PipelineRunner([('a', _slow(lambda v: v))], concurrency=2)
+        with pytest.raises(KeyboardInterrupt):
+            runner.run(['a', 'b', 'c', 'd', 'e'], sink)
+        assert runner.resume_point == 'c'
@@ -0,0 +1,24 @@
+# backend/core/tests/test_rag_bench.py
+
+from core.rag_bench import HNSWConfig, HalfvecConfig, ReducedDimsConfig, latency_summary, recall_at_k
+
+
+class TestRagBenchMetrics:
+    def test_recall_at_k(self):
+        assert recall_at_k(['a', 'b', 'c'], ['a', 'b', 'd']) == 2 / 3
+        assert recall_at_k([], []) == 1.0
+
+    def test_latency_percentiles_interpolate(self):
+        """Mesma definição do PERCENTILE_CONT: interpolação linear entre vizinhos."""
+        summary = latency_summary([float(v) for v in range(1, 101)])
+        assert summary["p50"] == 50.5
+        assert summary["p99"] == 99.01
+        assert summary["max"] == 100.0
+
+    def test_pgvector_dimension_limits_are_reported(self):
+        """Com 4096 dims o HNSW em vector/halfvec não é suportado e deve ser pulado, não falhar."""
+        assert HNSWConfig(4096, 5).skip_reason() is not None
+        assert HalfvecConfig(4096, 5).skip_reason() is not None
+        assert HNSWConfig(768, 5).skip_reason() is None
+        assert ReducedDimsConfig(4096, 5, reduced_dims=3072).skip_reason() is not None
+        assert ReducedDimsConfig(4096, 5, reduced_dims=1024).skip_reason() is None
@@ -0,0 +1,68 @@
+# backend/core/tests/test_rag_service.py
+
+from unittest.mock import patch
+
+import numpy as np
+from core.clients import ollama_client
+from core.models import Document, DocumentChunk
+from core.services import RAGService, maximal_marginal_relevance, reciprocal_rank_fusion
+
+
+class TestMultiQueryRetrieval:
+    def test_rrf_dedupes_and_rewards_agreement(self):
+        """Um chunk encontrado por vários termos sobe no ranking e aparece uma única vez."""
+        fused = reciprocal_rank_fusion([
+            ["femur-a", "femur-b", "tibia"],
+            ["femur-b", "femur-c"],
+            ["femur-b", "femur-a"],
+        ])
+        ids = [chunk_id for chunk_id, _ in fused]
+
+        assert ids[0] == "femur-b"
+        assert ids[1] == "femur-a"
+        assert len(ids) == len(set(ids)) == 4
+
+    def test_batched_embedding_matches_single_calls(self, fake_ai_services):
+        """O /api/embed em lote devolve uma matriz float32 na ordem dos termos."""
+        terms = ["fêmur", "femur", "os femoris"]
+        matrix = ollama_client.embed_batch("llama3", terms)
+
+        assert matrix.shape == (3, 4096)
+        assert matrix.dtype == np.float32
+        for row, term in zip(matrix, terms):
+            assert np.allclose(row, ollama_client.embed("llama3", term)["embedding"])
+
+
+class TestMaximalMarginalRelevance:
+    def setup_method(self):
+        self.query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+        # Dois quase-duplicados muito relevantes e um terceiro relevante mas diferente
+        self.candidates = np.array([
+            [0.95, 0.31, 0.0],
+            [0.94, 0.34, 0.0],
+            [0.80, 0.0, 0.60],
+        ], dtype=np.float32)
+
+    def test_lambda_one_is_pure_relevance(self):
+        assert maximal_marginal_relevance(self.query, self.candidates, k=2, lambda_mult=1.0) == [0, 1]
+
+    def test_penalizes_near_duplicates(self):
+        """Com λ<1 o segundo escolhido é o chunk diferente, não a duplicata."""
+        assert maximal_marginal_relevance(self.query, self.candidates, k=2, lambda_mult=0.5) == [0, 2]
+
+    def test_k_larger_than_candidates(self):
+        assert sorted(maximal_marginal_relevance(self.query, self.candidates, k=10)) == [0, 1, 2]
+        assert maximal_marginal_relevance(self.query, np.empty((0, 3)), k=5) == []
+
+
+class TestContextBudget:
+    def test_context_within_budget_skips_sentence_embedding(self):
+        """Se os chunks inteiros cabem no orçamento, não há /api/embed extra das frases."""
+        document = Document(file_name="gray.pdf")
+        chunks = [DocumentChunk(document=document, content="O fêmur é o osso mais longo do corpo.", page_number=12)]
+
+        with patch.object(ollama_client, 'embed_batch') as embed_batch:
+            context = RAGService().build_context(chunks, query_embedding=np.ones(4, dtype=np.float32), token_budget=1200)
+
+        embed_batch.assert_not_called()
+        assert context == "Fonte 1 (gray.pdf, pág 12):\nO fêmur é o osso mais longo do corpo."
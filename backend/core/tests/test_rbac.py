@@ -0,0 +1,78 @@
+# backend/core/tests/test_rbac.py
+
+from types import SimpleNamespace
+
+import pytest
+from core.models import Permission, Role
+from core.rbac import permissions_for, require_permission
+from core.tests.factories import RoleFactory, UserProfileFactory
+
+
+@pytest.fixture
+def approve():
+    return Permission.objects.create(slug='approve_wellness_plan', name='Aprovar Plano')
+
+
+@pytest.mark.django_db
+class TestPermissionsFor:
+    def test_compiles_roles_and_slugs_once(self, approve, django_assert_num_queries):
+        role = RoleFactory(name="Profissional de Saúde")
+        role.permissions.add(approve)
+        profile = UserProfileFactory(roles=[role, RoleFactory(name="Sem Permissões")])
+
+        perms = permissions_for(profile.user)
+
+        assert perms.roles == {"Profissional de Saúde", "Sem Permissões"}
+        assert perms.permissions == {'approve_wellness_plan'}
+        with django_assert_num_queries(0):
+            assert permissions_for(profile.user).has_role("Gestor de Clínica", "Profissional de Saúde")
+
+    def test_profile_roles_change_invalidates_user(self, approve):
+        role = RoleFactory(name="Profissional de Saúde")
+        role.permissions.add(approve)
+        profile = UserProfileFactory()
+        assert not permissions_for(profile.user).has_perm('approve_wellness_plan')
+
+        profile.roles.add(role)
+        assert permissions_for(profile.user).has_perm('approve_wellness_plan')
+
+        profile.roles.clear()
+        assert permissions_for(profile.user).roles == frozenset()
+
+    def test_role_permissions_change_invalidates_all_members(self, approve):
+        role = RoleFactory(name="Profissional de Saúde")
+        profiles = [UserProfileFactory(roles=[role]) for _ in range(2)]
+        assert not any(permissions_for(p.user).has_perm('approve_wellness_plan') for p in profiles)
+
+        role.permissions.add(approve)
+        assert all(permissions_for(p.user).has_perm('approve_wellness_plan') for p in profiles)
+
+        approve.delete()
+        assert not any(permissions_for(p.user).permissions for p in profiles)
+
+    def test_renamed_permission_slug_invalidates_all(self, approve):
+        role = RoleFactory(name="Profissional de Saúde")
+        role.permissions.add(approve)
+        profile = UserProfileFactory(roles=[role])
+        assert permissions_for(profile.user).permissions == {'approve_wellness_plan'}
+
+        # O slug é a PK: renomear grava a permissão nova e repassa os vínculos (migração de dados)
+        renamed = Permission.objects.create(slug='approve_plan', name=approve.name)
+        Role.permissions.through.objects.filter(permission=approve).update(permission=renamed)
+
+        assert permissions_for(profile.user).permissions == {'approve_plan'}
+
+
+@pytest.mark.django_db
+class TestRequirePermission:
+    def test_checks_compiled_slugs(self, approve, django_assert_num_queries):
+        role = RoleFactory(name="Profissional de Saúde")
+        role.permissions.add(approve)
+        allowed, denied = UserProfileFactory(roles=[role]).user, UserProfileFactory().user
+        permission = require_permission('approve_wellness_plan')()
+        for user in (allowed, denied):
+            permissions_for(user)
+
+        with django_assert_num_queries(0):
+            assert permission.has_permission(SimpleNamespace(user=allowed), None)
+            assert not permission.has_permission(SimpleNamespace(user=denied), None)
@@ -0,0 +1,56 @@
+# backend/core/tests/test_vector_io.py
+
+import json
+import numpy as np
+import pytest
+from pgvector import Vector
+from psycopg2 import ProgrammingError
+from psycopg2.extensions import adapt
+from core.vector_io import (
+    NumpyVectorField, as_vector_param, decode_vector_binary, format_vector, parse_embedding_response,
+    parse_vector_text,
+)
+
+
+@pytest.fixture
+def embedding():
+    return np.random.default_rng(3).normal(size=4096).astype(np.float32)
+
+
+class TestVectorIO:
+    def test_text_literal_roundtrips_float32_exactly(self, embedding):
+        """'%.9g' é suficiente para ida e volta exata de float32 (o pgvector armazena float32)."""
+        literal = format_vector(embedding)
+        assert np.array_equal(parse_vector_text(literal), embedding)
+        assert np.array_equal(Vector.from_text(literal).to_numpy(), embedding)
+
+    def test_binary_decode_matches_pgvector_wire_format(self, embedding):
+        decoded = decode_vector_binary(Vector(embedding).to_binary())
+        assert decoded.dtype == np.float32
+        assert np.array_equal(decoded, embedding)
+
+    def test_ollama_response_decoded_without_json_lists(self, embedding):
+        body = json.dumps({"embedding": embedding.tolist()}).encode()
+        parsed = parse_embedding_response(body)["embedding"]
+        assert parsed.dtype == np.float32
+        assert np.array_equal(parsed, embedding)
+
+    def test_unexpected_ollama_payload_falls_back_to_json(self):
+        assert parse_embedding_response(b'{"error": "model not found"}') == {"error": "model not found"}
+
+    def test_partially_parsed_array_falls_back_to_json(self):
+        """O parse rápido não pode devolver um vetor truncado (NumPy 1.x não levanta erro)."""
+        parsed = parse_embedding_response(b'{"embedding": [0.5, "0.25", 1]}')["embedding"]
+        assert np.array_equal(parsed, np.array([0.5, 0.25, 1.0], dtype=np.float32))
+
+    def test_field_validates_dimensions(self, embedding):
+        field = NumpyVectorField(dimensions=4096)
+        assert field.get_prep_value(embedding.tolist()) == format_vector(embedding)
+        with pytest.raises(ValueError):
+            field.get_prep_value(embedding[:10])
+
+    def test_only_vector_params_are_adapted(self, embedding):
+        """O adapter vale para VectorParam; ndarrays comuns não viram literal vector."""
+        assert adapt(as_vector_param(embedding)).getquoted() == adapt(format_vector(embedding)).getquoted()
+        with pytest.raises(ProgrammingError):
+            adapt(embedding)
@@ -0,0 +1,70 @@
+# backend/core/tests/test_vector_maintenance.py
+
+import numpy as np
+import pytest
+from django.db import connection
+from core.models import ChunkEmbedding, Document, DocumentChunk, EmbeddingSpace
+from core.tests.factories import OrganizationFactory
+from core.vector_maintenance import AnnIndex, find_ann_indexes, run_maintenance
+
+DIMS = 8
+
+
+class TestAnnIndexQuery:
+    def test_query_applies_index_expression_to_parameter(self):
+        index = AnnIndex(
+            name="idx", table="core_chunkembedding", method="hnsw",
+            expression="(embedding::halfvec(8))", opclass="halfvec_cosine_ops",
+            predicate="(space_id = 'abc'::uuid)", size_bytes=0,
+        )
+
+        sql = index.query_sql()
+
+        assert "WHERE (space_id = 'abc'::uuid)" in sql
+        assert "ORDER BY (embedding::halfvec(8)) <=> ((%s::vector)::halfvec(8))" in sql
+        assert index.guc == "hnsw.ef_search"
+
+    def test_operator_follows_opclass(self):
+        index = AnnIndex("idx", "t", "ivfflat", "embedding", "vector_l2_ops", None, 0)
+
+        assert index.operator == "<->"
+        assert index.guc == "ivfflat.probes"
+
+
+@pytest.mark.django_db
+class TestRunMaintenance:
+    @pytest.fixture
+    def space_index(self):
+        space = EmbeddingSpace.objects.create(name="mini", model="mini-embed", dimensions=DIMS)
+        document = Document.objects.create(organization=OrganizationFactory(), file_name="atlas.pdf")
+        rng = np.random.default_rng(0)
+        chunks = DocumentChunk.objects.bulk_create([DocumentChunk(document=document, content=f"chunk {i}") for i in range(200)])
+        ChunkEmbedding.objects.bulk_create([
+            ChunkEmbedding(chunk=chunk, space=space, embedding=rng.normal(size=DIMS).astype(np.float32)) for chunk in chunks
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX test_mini_hnsw ON {ChunkEmbedding._meta.db_table} "
+                f"USING hnsw ((embedding::vector({DIMS})) vector_cosine_ops) WHERE space_id = %s",
+                [str(space.id)],
+            )
+        return space
+
+    def test_finds_partial_expression_index(self, space_index):
+        with connection.cursor() as cursor:
+            indexes = find_ann_indexes(cursor)
+
+        index = next(i for i in indexes if i.name == "test_mini_hnsw")
+        assert index.method == "hnsw"
+        assert str(space_index.id) in index.predicate
+        assert index.size_bytes > 0
+
+    def test_reports_recall_and_tunes_ef_search(self, space_index):
+        report = run_maintenance(k=5, samples=20, target_recall=0.9, rebuild=False, tune=True, apply=False, log=lambda _: None)
+
+        index = next(i for i in report["indexes"] if i["name"] == "test_mini_hnsw")
+        assert index["uses_index"]
+        assert 0.0 <= index["recall_before"]["recall"] <= 1.0
+        assert index["tuned"]["recall"] >= 0.9
+        assert report["settings"]["hnsw.ef_search"] == {"value": index["tuned"]["setting"], "applied": False}
+        assert {t["table"] for t in report["tables"]} == {DocumentChunk._meta.db_table, ChunkEmbedding._meta.db_table}
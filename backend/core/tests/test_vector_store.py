@@ -0,0 +1,80 @@
+# backend/core/tests/test_vector_store.py
+
+import uuid
+import numpy as np
+from core.vector_store import InMemoryVectorIndex, normalize_rows, read_current_version, write_snapshot
+
+
+def _corpus(n=2000, dims=64, seed=7):
+    rng = np.random.default_rng(seed)
+    return [uuid.uuid4() for _ in range(n)], rng.normal(size=(n, dims)).astype(np.float32)
+
+
+def _exact_top_k(matrix, query, k):
+    return np.argsort(-(normalize_rows(matrix) @ normalize_rows(query)))[:k]
+
+
+class TestInMemoryVectorIndex:
+    def test_full_scan_matches_exact_cosine(self, tmp_path):
+        """Sem IVF, o top-k do snapshot float16 deve coincidir com o cosseno exato em float32."""
+        ids, matrix = _corpus()
+        write_snapshot(zip(ids, matrix), len(ids), matrix.shape[1], root=tmp_path)
+        index = InMemoryVectorIndex(root=tmp_path, reload_interval=0)
+
+        query = matrix[10] + 0.01
+        hits = index.search(query, 5)
+
+        assert [chunk_id for chunk_id, _ in hits] == [ids[i] for i in _exact_top_k(matrix, query, 5)]
+        assert hits[0][1] < 0.01  # distância de cosseno, mesma escala do CosineDistance
+
+    def test_uuid_with_trailing_zero_bytes_roundtrips(self, tmp_path):
+        ids, matrix = _corpus(n=10)
+        ids[0] = uuid.UUID(bytes=b"\x01" * 14 + b"\x00\x00")
+        write_snapshot(zip(ids, matrix), len(ids), matrix.shape[1], root=tmp_path)
+
+        hits = InMemoryVectorIndex(root=tmp_path, reload_interval=0).search(matrix[0], 1)
+        assert hits[0][0] == ids[0]
+
+    def test_reload_picks_up_new_version(self, tmp_path):
+        """Um novo snapshot publicado via CURRENT é visto pelo leitor sem reiniciar o processo."""
+        ids, matrix = _corpus(n=50)
+        write_snapshot(zip(ids[:25], matrix[:25]), 25, matrix.shape[1], root=tmp_path)
+        index = InMemoryVectorIndex(root=tmp_path, reload_interval=0)
+        first_version = index.version
+
+        write_snapshot(zip(ids, matrix), 50, matrix.shape[1], root=tmp_path)
+
+        assert index.version == read_current_version(tmp_path) != first_version
+        assert index.search(matrix[40], 1)[0][0] == ids[40]
+
+    def test_ivf_with_all_lists_probed_is_exact(self, tmp_path):
+        ids, matrix = _corpus()
+        meta = write_snapshot(zip(ids, matrix), len(ids), matrix.shape[1], root=tmp_path, ivf_lists=8)
+        index = InMemoryVectorIndex(root=tmp_path, reload_interval=0)
+
+        query = matrix[3]
+        hits = index.search(query, 5, nprobe=meta["ivf_lists"])
+        assert [chunk_id for chunk_id, _ in hits] == [ids[i] for i in _exact_top_k(matrix, query, 5)]
+
+    def test_missing_snapshot_returns_none(self, tmp_path):
+        assert InMemoryVectorIndex(root=tmp_path, reload_interval=0).search([1.0, 0.0], 5) is None
+
+    def test_filters_are_applied_before_ranking(self, tmp_path):
+        """Com filtro, o top-k sai só das linhas elegíveis, mesmo que não estejam no top-k global."""
+        from core.chunk_metadata import ChunkFilter
+
+        ids, matrix = _corpus(n=200)
+        document_id = uuid.uuid4()
+        rows = [
+            (chunk_id, vector, {"document_id": document_id, "is_table": i % 10 == 0, "language": "pt" if i % 2 else "en"})
+            for i, (chunk_id, vector) in enumerate(zip(ids, matrix))
+        ]
+        write_snapshot(rows, len(rows), matrix.shape[1], root=tmp_path, ivf_lists=4)
+        index = InMemoryVectorIndex(root=tmp_path, reload_interval=0)
+
+        hits = index.search(matrix[5], 5, filters=ChunkFilter(tables_only=True))
+        table_ids = {ids[i] for i in range(0, 200, 10)}
+        assert len(hits) == 5
+        assert {chunk_id for chunk_id, _ in hits} <= table_ids
+
+        assert index.search(matrix[5], 3, filters=ChunkFilter(document_ids=[uuid.uuid4()])) == []
@@ -2,12 +2,13 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CurrentUserView, PatientViewSet
+from .views import CurrentUserView, PatientViewSet, LLMUsageStatsView
 
 router = DefaultRouter()
 router.register(r'patients', PatientViewSet, basename='patient')
 
 urlpatterns = [
     path('users/me/', CurrentUserView.as_view(), name='current-user'),
+    path('llm-usage/', LLMUsageStatsView.as_view(), name='llm-usage'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -4,9 +4,11 @@
 import hashlib
 import hmac
 import os
+import re
 import uuid
 import unicodedata
 from django.conf import settings
+from django.db.models import Q
 from django.utils.encoding import force_bytes
 
 # Lista básica de stopwords para nomes em PT-BR (Preposições e Artigos)
@@ -34,7 +36,7 @@ def normalize_text(text: str) -> str:
     # 2. Uppercase e 3. Remoção de espaços extras
     return " ".join(text_ascii.upper().split())
 
-def generate_search_tokens(text: str) -> list[str]:
+def generate_search_tokens(text: str, key: str | None = None) -> list[str]:
     """
     Gera tokens determinísticos (HMAC) para permitir busca exata 
     em campos criptografados (Blind Indexing) com normalização robusta.
@@ -44,6 +46,8 @@ def generate_search_tokens(text: str) -> list[str]:
     2. Split -> ["ANDRE", "DA", "SILVA"]
     3. Filter Stopwords -> ["ANDRE", "SILVA"]
     4. Hash -> [HMAC("ANDRE"), HMAC("SILVA")]
+
+    key: chave do HMAC (padrão: BLIND_INDEX_KEY; ver blind_index_keys).
     """
     if not text:
         return []
@@ -54,25 +58,178 @@ def generate_search_tokens(text: str) -> list[str]:
     
     tokens = []
     
-    # Usa a SECRET_KEY do Django como chave do HMAC para segurança
-    # Isso impede que alguém com acesso apenas ao DB tente gerar Rainbow Tables
-    key = force_bytes(settings.SECRET_KEY)
-
     for part in parts:
         # Filtra stopwords (ex: "DA", "DE") e partes muito curtas
         if part in STOPWORDS or len(part) < 2:
             continue
             
-        # Gera o HMAC-SHA256 da parte do nome
-        msg = force_bytes(part)
-        token = hmac.new(key, msg, hashlib.sha256).hexdigest()
-        
-        # Trunca para 32 chars para economizar índice e armazenamento
-        # (SHA256 hex tem 64 chars, 32 já garante colisão quase nula para este fim)
-        tokens.append(token[:32])
+        tokens.append(_blind_token(part, key=key))
         
     return tokens
 
+# Separação de domínio: o token do prefixo "SIL" não pode coincidir com o da palavra
+# inteira "SIL" em search_tokens (cruzar as duas colunas revelaria quais nomes são prefixos)
+PREFIX_TOKEN_SCOPE = b"prefix:"
+
+def blind_index_keys() -> list[str]:
+    """
+    Chaves aceitas na leitura do Blind Index: a atual e, durante uma rotação,
+    BLIND_INDEX_PREVIOUS_KEY (perfis ainda não reprocessados pelo rebuild_blind_index).
+    A escrita usa sempre a primeira.
+    """
+    keys = [settings.BLIND_INDEX_KEY]
+    if settings.BLIND_INDEX_PREVIOUS_KEY and settings.BLIND_INDEX_PREVIOUS_KEY != settings.BLIND_INDEX_KEY:
+        keys.append(settings.BLIND_INDEX_PREVIOUS_KEY)
+    return keys
+
+def blind_index_lookup(field: str, generate, term: str):
+    """
+    Filtro `<field>__contains` com os tokens do termo em cada chave de blind_index_keys()
+    (OR entre as chaves: o GIN atende cada ramo). None se o termo não gera tokens.
+
+    Ex: blind_index_lookup('search_tokens', generate_search_tokens, "João")
+    """
+    lookup = Q()
+    for key in blind_index_keys():
+        tokens = generate(term, key=key)
+        if not tokens:
+            return None
+        lookup |= Q(**{f'{field}__contains': tokens})
+    return lookup
+
+def _blind_token(value: str, scope: bytes = b"", key: str | None = None) -> str:
+    """
+    HMAC-SHA256 de um valor já normalizado.
+
+    A chave (BLIND_INDEX_KEY, por padrão a SECRET_KEY do Django) impede que alguém
+    com acesso apenas ao DB tente gerar Rainbow Tables.
+    """
+    key = force_bytes(key or settings.BLIND_INDEX_KEY)
+    token = hmac.new(key, scope + force_bytes(value), hashlib.sha256).hexdigest()
+
+    # Trunca para 32 chars para economizar índice e armazenamento
+    # (SHA256 hex tem 64 chars, 32 já garante colisão quase nula para este fim)
+    return token[:32]
+
+def _name_parts(text: str) -> list[str]:
+    return [part for part in normalize_text(text).split() if part not in STOPWORDS]
+
+def generate_prefix_tokens(text: str, key: str | None = None) -> list[str]:
+    """
+    Tokens HMAC dos prefixos de cada parte do nome, para o typeahead (Blind Index de prefixos).
+
+    Limites de vazamento (settings): só prefixos de BLIND_PREFIX_MIN_CHARS a BLIND_PREFIX_MAX_CHARS
+    caracteres, das primeiras BLIND_PREFIX_MAX_PARTS partes. Quanto mais curto o prefixo, mais
+    perfis compartilham o token (menos revela); o teto impede que o índice equivalha ao nome inteiro.
+
+    Ex (3-8): "André da Silva" -> [HMAC("AND"), HMAC("ANDR"), HMAC("ANDRE"), HMAC("SIL"), ...]
+    """
+    min_chars, max_chars = settings.BLIND_PREFIX_MIN_CHARS, settings.BLIND_PREFIX_MAX_CHARS
+
+    tokens = []
+    for part in _name_parts(text)[:settings.BLIND_PREFIX_MAX_PARTS]:
+        for size in range(min_chars, min(len(part), max_chars) + 1):
+            token = _blind_token(part[:size], scope=PREFIX_TOKEN_SCOPE, key=key)
+            if token not in tokens:
+                tokens.append(token)
+    return tokens
+
+def generate_prefix_query_tokens(term: str, key: str | None = None) -> list[str]:
+    """
+    Tokens de busca do typeahead: um por parte digitada, truncada em BLIND_PREFIX_MAX_CHARS.
+    Partes abaixo de BLIND_PREFIX_MIN_CHARS não têm token (lista vazia = termo curto demais).
+
+    Ex: "andre sil" -> [HMAC("ANDRE"), HMAC("SIL")]; o perfil precisa conter todos (busca AND).
+    """
+    tokens = []
+    for part in _name_parts(term):
+        if len(part) < settings.BLIND_PREFIX_MIN_CHARS:
+            continue
+        token = _blind_token(part[:settings.BLIND_PREFIX_MAX_CHARS], scope=PREFIX_TOKEN_SCOPE, key=key)
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+CPF_TOKEN_SCOPE = b"cpf:"
+PHONE_TOKEN_SCOPE = b"phone:"
+
+# Termo de busca com cara de documento/telefone: só dígitos e pontuação ("123.456.789-09", "(11) 98765-4321")
+IDENTIFIER_SHAPE = re.compile(r'^[\d\s().+\-/]+$')
+
+def only_digits(value: str | None) -> str:
+    return re.sub(r'\D', '', value or '')
+
+def normalize_cpf(value: str | None) -> str | None:
+    """
+    CPF só com dígitos, se os dígitos verificadores conferirem; senão None.
+    Ex: "529.982.247-25" -> "52998224725"
+    """
+    digits = only_digits(value)
+    if len(digits) != 11 or len(set(digits)) == 1:
+        return None
+    for size in (9, 10):
+        total = sum(int(digit) * weight for digit, weight in zip(digits, range(size + 1, 1, -1)))
+        if (total * 10) % 11 % 10 != int(digits[size]):
+            return None
+    return digits
+
+def normalize_phone(value: str | None) -> str | None:
+    """
+    Telefone brasileiro como DDD + número (10 dígitos fixo, 11 celular), sem DDI (+55)
+    nem zero de tronco; None se não tiver esse formato.
+    Ex: "+55 (11) 98765-4321" -> "11987654321"
+    """
+    digits = only_digits(value)
+    if len(digits) in (12, 13) and digits.startswith('55'):
+        digits = digits[2:]
+    elif len(digits) in (11, 12) and digits.startswith('0'):
+        digits = digits[1:]
+    if len(digits) not in (10, 11) or '0' in digits[:2]:
+        return None
+    if len(digits) == 11 and digits[2] != '9':
+        return None
+    return digits
+
+def cpf_blind_token(value: str | None, key: str | None = None) -> str | None:
+    cpf = normalize_cpf(value)
+    return _blind_token(cpf, scope=CPF_TOKEN_SCOPE, key=key) if cpf else None
+
+def phone_blind_token(value: str | None, key: str | None = None) -> str | None:
+    phone = normalize_phone(value)
+    return _blind_token(phone, scope=PHONE_TOKEN_SCOPE, key=key) if phone else None
+
+def identifier_lookup(term: str):
+    """
+    Busca exata por CPF ou telefone via Blind Index (cpf_index / phone_index, índices B-tree),
+    em cada chave de blind_index_keys(). Um termo de 11 dígitos pode ser CPF e celular: os
+    dois são consultados. None se o termo não tem cara de identificador; Q que não casa nada
+    (pk__in=[]) se tem, mas não é CPF nem telefone válido.
+    """
+    if not IDENTIFIER_SHAPE.match(term) or not only_digits(term):
+        return None
+
+    lookup = Q()
+    for key in blind_index_keys():
+        cpf_token, phone_token = cpf_blind_token(term, key=key), phone_blind_token(term, key=key)
+        if cpf_token:
+            lookup |= Q(cpf_index=cpf_token)
+        if phone_token:
+            lookup |= Q(phone_index=phone_token)
+    return lookup or Q(pk__in=[])
+
+def profile_blind_indexes(full_name: str | None, cpf: str | None, phone_number: str | None) -> dict:
+    """
+    Colunas de Blind Index de um UserProfile a partir dos valores em claro.
+    Os prefixos do nome só são gerados com BLIND_PREFIX_INDEX_ENABLED.
+    """
+    prefix_tokens = generate_prefix_tokens(full_name) if full_name and settings.BLIND_PREFIX_INDEX_ENABLED else []
+    return {
+        'search_tokens': generate_search_tokens(full_name),
+        'search_prefix_tokens': prefix_tokens,
+        'cpf_index': cpf_blind_token(cpf),
+        'phone_index': phone_blind_token(phone_number),
+    }
+
 def secure_file_upload_path(instance, filename):
     """
     Gera um caminho de arquivo anonimizado.
@@ -0,0 +1,352 @@
+# backend/core/vector_maintenance.py em 2026-10-19 18:50
+
+"""
+Saúde e manutenção dos índices ANN (HNSW/IVFFlat do pgvector) das tabelas de chunks.
+
+Índices aproximados degradam sem aviso: o grafo HNSW acumula nós de linhas apagadas
+(reingestões, deduplicação) e as listas do IVFFlat ficam desbalanceadas conforme o corpus
+cresce depois do build. A manutenção (comando `vector_index_maintenance`, task
+`maintain_vector_indexes`) faz, para cada índice ANN encontrado no catálogo:
+
+1. Tamanho do índice; linhas vivas/mortas e bloat da tabela (pgstattuple, se instalado).
+2. Recall@k por amostragem: vetores do próprio corpus (+ ruído) como consultas, comparando
+   o top-k pelo índice com o top-k exato (mesma expressão, com index scan desligado).
+3. REINDEX CONCURRENTLY se o recall ficar abaixo de VECTOR_INDEX_REBUILD_BELOW.
+4. Menor hnsw.ef_search / ivfflat.probes que atinge VECTOR_INDEX_TARGET_RECALL, aplicado
+   (opcionalmente) com ALTER DATABASE ... SET, valendo para as novas conexões.
+
+Nada aqui depende de qual expressão foi indexada (vetor inteiro, halfvec, subvector, índice
+parcial por espaço vetorial): a consulta é montada a partir da definição do próprio índice.
+"""
+
+import logging
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from .rag_bench import latency_summary, recall_at_k
+from .vector_io import decode_vector_binary, format_vector
+
+logger = logging.getLogger(__name__)
+
+ANN_METHODS = ("hnsw", "ivfflat")
+# GUC de busca de cada método e os valores testados na sintonia (hnsw.ef_search vai até 1000)
+SEARCH_GUCS = {"hnsw": "hnsw.ef_search", "ivfflat": "ivfflat.probes"}
+SEARCH_LADDERS = {
+    "hnsw": (40, 64, 100, 160, 250, 400, 640, 1000),
+    "ivfflat": (1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+}
+DISTANCE_OPERATORS = {"cosine": "<=>", "l2": "<->", "ip": "<#>", "l1": "<+>"}
+# Coluna vetorial das tabelas de chunks (DocumentChunk.embedding, ChunkEmbedding.embedding)
+VECTOR_COLUMN = "embedding"
+
+
+def chunk_tables() -> list[str]:
+    from .models import ChunkEmbedding, DocumentChunk
+
+    return [DocumentChunk._meta.db_table, ChunkEmbedding._meta.db_table]
+
+
+@dataclass
+class TableHealth:
+    table: str
+    total_bytes: int
+    live_tuples: int
+    dead_tuples: int
+    last_vacuum: Optional[str]
+    # Fração do heap desperdiçada (tuplas mortas + espaço livre); None sem pgstattuple
+    bloat_ratio: Optional[float] = None
+
+    @property
+    def dead_ratio(self) -> float:
+        total = self.live_tuples + self.dead_tuples
+        return self.dead_tuples / total if total else 0.0
+
+
+@dataclass
+class AnnIndex:
+    name: str
+    table: str
+    method: str
+    expression: str
+    opclass: str
+    predicate: Optional[str]
+    size_bytes: int
+    options: dict = field(default_factory=dict)
+
+    @property
+    def guc(self) -> str:
+        return SEARCH_GUCS[self.method]
+
+    @property
+    def operator(self) -> str:
+        for metric, operator in DISTANCE_OPERATORS.items():
+            if self.opclass.endswith(f"_{metric}_ops"):
+                return operator
+        raise ValueError(f"Operator class sem operador conhecido: {self.opclass}")
+
+    def query_sql(self) -> str:
+        """Top-k pela mesma expressão do índice (o vetor da consulta passa pela mesma conversão)."""
+        # '%' literal na definição do índice não pode ser confundido com placeholder
+        expression = self.expression.replace("%", "%%")
+        param = re.sub(rf'\b{VECTOR_COLUMN}\b', "(%s::vector)", expression)
+        where = f"WHERE {self.predicate.replace('%', '%%')}" if self.predicate else ""
+        return f"SELECT id FROM {self.table} {where} ORDER BY {expression} {self.operator} {param} LIMIT %s"
+
+
+@dataclass
+class RecallCheck:
+    setting: Optional[int]
+    recall: float
+    latency_ms: dict
+
+
+@dataclass
+class IndexReport:
+    index: AnnIndex
+    uses_index: bool = True
+    before: Optional[RecallCheck] = None
+    rebuilt: bool = False
+    rebuild_seconds: Optional[float] = None
+    after: Optional[RecallCheck] = None
+    tuned: Optional[RecallCheck] = None
+    warnings: list = field(default_factory=list)
+
+
+def table_health(cursor, table: str) -> TableHealth:
+    cursor.execute(
+        """
+        SELECT pg_total_relation_size(relid), n_live_tup, n_dead_tup,
+               GREATEST(last_vacuum, last_autovacuum)::text
+        FROM pg_stat_user_tables WHERE relname = %s
+        """,
+        [table],
+    )
+    row = cursor.fetchone() or (0, 0, 0, None)
+    health = TableHealth(table, int(row[0] or 0), int(row[1] or 0), int(row[2] or 0), row[3])
+
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pgstattuple'")
+    if cursor.fetchone():
+        # Versão aproximada: lê só as páginas sem visibility map 'all-visible'
+        cursor.execute("SELECT dead_tuple_percent + approx_free_percent FROM pgstattuple_approx(%s::regclass)", [table])
+        health.bloat_ratio = round(float(cursor.fetchone()[0]) / 100, 4)
+    return health
+
+
+def find_ann_indexes(cursor, tables: list[str] = None) -> list[AnnIndex]:
+    """Índices HNSW/IVFFlat das tabelas (padrão: chunk_tables), lidos do catálogo."""
+    cursor.execute(
+        """
+        SELECT ic.relname, t.relname, am.amname,
+               pg_get_indexdef(i.indexrelid, 1, true), opc.opcname,
+               pg_get_expr(i.indpred, i.indrelid), pg_relation_size(i.indexrelid), ic.reloptions
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_am am ON am.oid = ic.relam
+        JOIN pg_opclass opc ON opc.oid = i.indclass[0]
+        WHERE t.relname = ANY(%s) AND am.amname = ANY(%s) AND i.indisvalid
+        ORDER BY t.relname, ic.relname
+        """,
+        [tables or chunk_tables(), list(ANN_METHODS)],
+    )
+    return [
+        AnnIndex(
+            name=name, table=table, method=method, expression=expression, opclass=opclass,
+            predicate=predicate, size_bytes=int(size),
+            options=dict(option.split("=", 1) for option in (reloptions or [])),
+        )
+        for name, table, method, expression, opclass, predicate, size, reloptions in cursor.fetchall()
+    ]
+
+
+def sample_queries(cursor, index: AnnIndex, size: int, noise: float = 0.1, seed: int = 42) -> list[np.ndarray]:
+    """
+    Vetores sorteados do conjunto indexado, com ruído gaussiano relativo à norma (uma
+    consulta idêntica a uma linha sempre a encontraria, inflando o recall).
+    """
+    where = f"AND {index.predicate.replace('%', '%%')}" if index.predicate else ""
+    cursor.execute(
+        f"SELECT vector_send({VECTOR_COLUMN}) FROM {index.table} "
+        f"WHERE {VECTOR_COLUMN} IS NOT NULL {where} ORDER BY random() LIMIT %s",
+        [size],
+    )
+    rng = np.random.default_rng(seed)
+    queries = []
+    for (binary,) in cursor.fetchall():
+        vector = decode_vector_binary(binary)
+        scale = noise * (np.linalg.norm(vector) / np.sqrt(len(vector)) or 1.0)
+        queries.append((vector + rng.normal(0.0, scale, len(vector))).astype(np.float32))
+    return queries
+
+
+def _top_k(cursor, index: AnnIndex, queries, k: int, statements: list[str]) -> tuple[list[list], list[float]]:
+    results, latencies = [], []
+    with transaction.atomic():
+        for statement in statements:
+            cursor.execute(statement)
+        sql = index.query_sql()
+        for query in queries:
+            started = time.perf_counter()
+            cursor.execute(sql, [format_vector(query), k])
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append([row[0] for row in cursor.fetchall()])
+        transaction.set_rollback(True)
+    return results, latencies
+
+
+def exact_neighbors(cursor, index: AnnIndex, queries, k: int) -> list[list]:
+    return _top_k(cursor, index, queries, k, ["SET LOCAL enable_indexscan = off", "SET LOCAL enable_bitmapscan = off"])[0]
+
+
+def planner_uses_index(cursor, index: AnnIndex, query, k: int) -> bool:
+    with transaction.atomic():
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN {index.query_sql()}", [format_vector(query), k])
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+        transaction.set_rollback(True)
+    return index.name in plan
+
+
+def measure_recall(cursor, index: AnnIndex, queries, truth: list[list], k: int, setting: int = None) -> RecallCheck:
+    """Recall@k médio do índice contra o top-k exato, com a GUC de busca em 'setting' (None = atual)."""
+    statements = ["SET LOCAL enable_seqscan = off"]
+    if setting is not None:
+        statements.append(f"SET LOCAL {index.guc} = {int(setting)}")
+    found, latencies = _top_k(cursor, index, queries, k, statements)
+    recall = statistics.fmean(recall_at_k(f, t) for f, t in zip(found, truth)) if queries else 1.0
+    return RecallCheck(setting, round(recall, 4), latency_summary(latencies))
+
+
+def tune_search_setting(cursor, index: AnnIndex, queries, truth: list[list], k: int, target: float) -> RecallCheck:
+    """Menor valor da escada do método que atinge o recall alvo (ou o melhor medido)."""
+    ladder = [v for v in SEARCH_LADDERS[index.method] if index.method != "hnsw" or v >= k]
+    if index.method == "ivfflat" and "lists" in index.options:
+        ladder = [v for v in ladder if v < int(index.options["lists"])] + [int(index.options["lists"])]
+
+    best = None
+    for value in ladder:
+        check = measure_recall(cursor, index, queries, truth, k, setting=value)
+        if best is None or check.recall > best.recall:
+            best = check
+        if check.recall >= target:
+            return check
+    return best
+
+
+def rebuild_index(cursor, index: AnnIndex) -> float:
+    """REINDEX CONCURRENTLY (sem bloquear escrita/leitura; não pode rodar dentro de transação)."""
+    if not connection.get_autocommit():
+        raise RuntimeError("REINDEX CONCURRENTLY precisa de autocommit (não chame dentro de transaction.atomic).")
+    started = time.perf_counter()
+    cursor.execute(f"REINDEX INDEX CONCURRENTLY {connection.ops.quote_name(index.name)}")
+    return time.perf_counter() - started
+
+
+def apply_search_setting(cursor, guc: str, value: int):
+    """Persiste a GUC no banco (novas conexões) e na sessão atual."""
+    database = connection.ops.quote_name(connection.settings_dict["NAME"])
+    cursor.execute(f"ALTER DATABASE {database} SET {guc} = {int(value)}")
+    cursor.execute(f"SET {guc} = {int(value)}")
+
+
+def run_maintenance(k: int = 5, samples: int = None, target_recall: float = None, rebuild_below: float = None,
+                    rebuild: bool = True, tune: bool = True, apply: bool = False,
+                    log: Callable[[str], None] = logger.info) -> dict:
+    """
+    Executa o ciclo completo e retorna o relatório (JSON-serializável). Com apply=True, a maior
+    GUC sintonizada de cada método (hnsw/ivfflat) é gravada com ALTER DATABASE.
+    """
+    samples = samples or settings.VECTOR_INDEX_SAMPLE_QUERIES
+    target_recall = settings.VECTOR_INDEX_TARGET_RECALL if target_recall is None else target_recall
+    rebuild_below = settings.VECTOR_INDEX_REBUILD_BELOW if rebuild_below is None else rebuild_below
+
+    report = {"tables": [], "indexes": [], "settings": {}}
+    with connection.cursor() as cursor:
+        for table in chunk_tables():
+            health = table_health(cursor, table)
+            report["tables"].append({**health.__dict__, "dead_ratio": round(health.dead_ratio, 4)})
+            if health.dead_ratio > 0.2:
+                log(f"{table}: {health.dead_ratio:.0%} de tuplas mortas; considere VACUUM (ANALYZE).")
+
+        tuned_by_guc = {}
+        for index in find_ann_indexes(cursor):
+            result = IndexReport(index)
+            queries = sample_queries(cursor, index, samples)
+            if not queries:
+                result.warnings.append("índice sem linhas para amostrar")
+                report["indexes"].append(_index_dict(result))
+                continue
+
+            result.uses_index = planner_uses_index(cursor, index, queries[0], k)
+            if not result.uses_index:
+                result.warnings.append("o planner não usa o índice para a consulta top-k; recall não medido")
+                report["indexes"].append(_index_dict(result))
+                continue
+
+            if index.method == "ivfflat" and "lists" in index.options:
+                rows = _indexed_rows(cursor, index)
+                ideal = max(1, rows // 1000)
+                if not ideal / 4 <= int(index.options["lists"]) <= ideal * 4:
+                    result.warnings.append(f"lists={index.options['lists']} para {rows} linhas (recomendado ~{ideal}); recrie o índice")
+
+            truth = exact_neighbors(cursor, index, queries, k)
+            result.before = measure_recall(cursor, index, queries, truth, k)
+            log(f"{index.name} ({index.method}): recall@{k}={result.before.recall:.4f}")
+
+            if rebuild and result.before.recall < rebuild_below:
+                log(f"{index.name}: recall abaixo de {rebuild_below}; REINDEX CONCURRENTLY...")
+                result.rebuild_seconds = round(rebuild_index(cursor, index), 2)
+                result.rebuilt = True
+                result.after = measure_recall(cursor, index, queries, truth, k)
+                log(f"{index.name}: recall@{k}={result.after.recall:.4f} após rebuild ({result.rebuild_seconds}s)")
+
+            if tune:
+                result.tuned = tune_search_setting(cursor, index, queries, truth, k, target_recall)
+                log(f"{index.name}: {index.guc}={result.tuned.setting} -> recall@{k}={result.tuned.recall:.4f}")
+                if result.tuned.recall < target_recall:
+                    result.warnings.append(f"recall alvo {target_recall} não atingido nem com {index.guc}={result.tuned.setting}")
+                tuned_by_guc[index.guc] = max(tuned_by_guc.get(index.guc, 0), result.tuned.setting)
+            report["indexes"].append(_index_dict(result))
+
+        for guc, value in tuned_by_guc.items():
+            report["settings"][guc] = {"value": value, "applied": apply}
+            if apply:
+                apply_search_setting(cursor, guc, value)
+                log(f"ALTER DATABASE ... SET {guc} = {value}")
+    return report
+
+
+def _indexed_rows(cursor, index: AnnIndex) -> int:
+    where = f"WHERE {index.predicate}" if index.predicate else ""
+    cursor.execute(f"SELECT count(*) FROM {index.table} {where}")
+    return int(cursor.fetchone()[0])
+
+
+def _check_dict(check: Optional[RecallCheck]) -> Optional[dict]:
+    return check.__dict__ if check else None
+
+
+def _index_dict(result: IndexReport) -> dict:
+    return {
+        "name": result.index.name,
+        "table": result.index.table,
+        "method": result.index.method,
+        "expression": result.index.expression,
+        "predicate": result.index.predicate,
+        "size_bytes": result.index.size_bytes,
+        "options": result.index.options,
+        "uses_index": result.uses_index,
+        "recall_before": _check_dict(result.before),
+        "rebuilt": result.rebuilt,
+        "rebuild_seconds": result.rebuild_seconds,
+        "recall_after_rebuild": _check_dict(result.after),
+        "tuned": _check_dict(result.tuned),
+        "warnings": result.warnings,
+    }
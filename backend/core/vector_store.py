@@ -0,0 +1,448 @@
+# backend/core/vector_store.py em 2026-10-19 12:30
+
+"""
+Backend de retrieval em memória para o Knowledge Hub (RAG_RETRIEVAL_BACKEND=memory).
+
+A base de conhecimento só muda quando alguém roda a ingestão, então os embeddings dos
+DocumentChunk COMPLETED são exportados para um snapshot em disco:
+
+    <RAG_VECTOR_SNAPSHOT_DIR>/
+        CURRENT                 -> nome da versão ativa (trocado atomicamente via os.replace)
+        v20261019T123000123456/
+            embeddings.f16.npy  -> matriz (n, dims) float16, linhas normalizadas (L2)
+            ids.npy             -> UUIDs dos chunks (n, 16) uint8, alinhados às linhas
+            attributes.npz      -> colunas promovidas do chunk (pré-filtro do ChunkFilter)
+            centroids.f16.npy   -> (opcional) centróides do IVF
+            list_offsets.npy    -> (opcional) início/fim de cada lista IVF na matriz
+            meta.json
+
+Os arquivos são abertos com np.load(mmap_mode='r'): os processos Daphne/Celery
+compartilham as mesmas páginas do page cache do SO em vez de cada um ter sua cópia.
+O top-k é um produto matriz-vetor em blocos + argpartition (sem loop Python por linha).
+Com IVF, as linhas são ordenadas por lista e só as 'nprobe' listas mais próximas são lidas.
+
+Com RAG_EMBEDDING_SPACE definido (core.embedding_spaces), o snapshot fica num subdiretório
+com o nome do espaço: o de um espaço em sombra pode ser gerado antes do cutover
+(build_vector_snapshot --space) e nunca é confundido com o do espaço anterior.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CURRENT_POINTER = "CURRENT"
+KEPT_VERSIONS = 2
+# Colunas promovidas do DocumentChunk copiadas para o snapshot (pré-filtro do ChunkFilter)
+ATTRIBUTE_FIELDS = ("is_table", "has_vision", "source", "language", "page_start", "page_end")
+# Bloco da busca: ~32 MB de float32 temporário por bloco, independente das dimensões
+BLOCK_BYTES = 32 * 1024 * 1024
+_VERSION_NAME = re.compile(r"^v\d{8}T\d{15}$")
+
+
+def snapshot_root(space_name: Optional[str] = None) -> Path:
+    """Diretório dos snapshots do espaço (padrão: o ativo); o 'legacy' usa a raiz."""
+    from .embedding_spaces import LEGACY_SPACE
+
+    root = Path(settings.RAG_VECTOR_SNAPSHOT_DIR)
+    space_name = settings.RAG_EMBEDDING_SPACE if space_name is None else space_name
+    return root / space_name if space_name and space_name != LEGACY_SPACE else root
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza (L2) cada linha em float32. Linhas nulas ficam nulas (similaridade 0)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def spherical_kmeans(sample: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """K-means por similaridade de cosseno (centróides normalizados) sobre uma amostra normalizada."""
+    rng = np.random.default_rng(seed)
+    n_lists = min(n_lists, len(sample))
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for j in range(n_lists):
+            members = sample[assign == j]
+            if len(members):
+                centroids[j] = members.sum(axis=0)
+            else:
+                # Lista vazia: re-semeia com um ponto aleatório
+                centroids[j] = sample[rng.integers(len(sample))]
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+def _block_rows(dims: int) -> int:
+    return max(256, BLOCK_BYTES // (4 * max(dims, 1)))
+
+
+@contextmanager
+def _build_lock(root: Path):
+    """Serializa builds concorrentes (vários workers Celery) no mesmo diretório."""
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".build.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_current_version(root: Optional[Path] = None) -> Optional[str]:
+    try:
+        return (Path(root or snapshot_root()) / CURRENT_POINTER).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_snapshot_meta(root: Optional[Path] = None) -> Optional[dict]:
+    root = Path(root or snapshot_root())
+    version = read_current_version(root)
+    if not version:
+        return None
+    try:
+        return json.loads((root / version / "meta.json").read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_snapshot(
+    rows: Iterable[tuple],
+    count: int,
+    dims: int,
+    root: Optional[Path] = None,
+    ivf_lists: int = 0,
+    extra_meta: Optional[dict] = None,
+) -> dict:
+    """
+    Grava um snapshot a partir de 'rows' ((uuid, embedding[, atributos]), no máximo 'count'
+    itens) e o publica como versão atual. 'atributos' é um dict com as colunas promovidas
+    do chunk (ver ATTRIBUTE_FIELDS), usadas para pré-filtrar a busca. Os embeddings são escritos em lotes direto no memmap:
+    a matriz completa nunca precisa caber na RAM do processo que faz o build.
+    """
+    root = Path(root or snapshot_root())
+    started = time.perf_counter()
+
+    with _build_lock(root):
+        version = time.strftime("v%Y%m%dT%H%M%S") + f"{time.time_ns() % 1_000_000_000:09d}"
+        work_dir = root / f".{version}.tmp"
+        work_dir.mkdir(parents=True)
+        try:
+            matrix = np.lib.format.open_memmap(work_dir / "embeddings.f16.npy", mode="w+", dtype=np.float16, shape=(count, dims))
+            # uint8 (n, 16) e não 'S16': o NumPy descarta bytes nulos finais de strings fixas
+            ids = np.zeros((count, 16), dtype=np.uint8)
+
+            written = 0
+            batch_ids, batch_vectors = [], []
+            attribute_rows = []
+            block = _block_rows(dims)
+
+            def flush_batch():
+                nonlocal written
+                if not batch_vectors:
+                    return
+                end = written + len(batch_vectors)
+                matrix[written:end] = normalize_rows(np.vstack(batch_vectors)).astype(np.float16)
+                ids[written:end] = np.frombuffer(b"".join(batch_ids), dtype=np.uint8).reshape(-1, 16)
+                written = end
+                batch_ids.clear()
+                batch_vectors.clear()
+
+            for row in rows:
+                if written + len(batch_vectors) >= count:
+                    break
+                chunk_id, embedding = row[0], row[1]
+                attribute_rows.append(row[2] if len(row) > 2 else {})
+                batch_ids.append(uuid.UUID(str(chunk_id)).bytes)
+                batch_vectors.append(np.asarray(embedding, dtype=np.float32))
+                if len(batch_vectors) >= block:
+                    flush_batch()
+            flush_batch()
+            matrix.flush()
+
+            if written < count:
+                # Menos linhas do que o previsto (chunks removidos durante o build)
+                del matrix
+                trimmed = np.load(work_dir / "embeddings.f16.npy", mmap_mode="r")[:written]
+                np.save(work_dir / "embeddings.trim.npy", trimmed)
+                del trimmed
+                os.replace(work_dir / "embeddings.trim.npy", work_dir / "embeddings.f16.npy")
+                ids = ids[:written]
+
+            attributes = _attribute_columns(attribute_rows)
+
+            lists = 0
+            if ivf_lists and written >= ivf_lists * 4:
+                lists, order = _write_ivf(work_dir, ivf_lists, dims)
+                ids = ids[order]
+                attributes = {key: (col if key == 'sources' else col[order]) for key, col in attributes.items()}
+            np.save(work_dir / "ids.npy", ids)
+            np.savez(work_dir / "attributes.npz", **attributes)
+
+            meta = {
+                "version": version,
+                "rows": written,
+                "dimensions": dims,
+                "ivf_lists": lists,
+                "created_at": time.time(),
+                "build_seconds": round(time.perf_counter() - started, 3),
+                **(extra_meta or {}),
+            }
+            (work_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+            os.rename(work_dir, root / version)
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+        pointer_tmp = root / f".{CURRENT_POINTER}.{os.getpid()}"
+        pointer_tmp.write_text(version)
+        os.replace(pointer_tmp, root / CURRENT_POINTER)
+        _prune_old_versions(root, keep=version)
+
+    logger.info(f"Snapshot vetorial {version} publicado: {written} linhas, IVF={lists}, {meta['build_seconds']}s.")
+    return meta
+
+
+def _attribute_columns(attribute_rows: list[dict]) -> dict:
+    """Colunas NumPy dos atributos promovidos. Páginas nulas = -1; 'source' vira código + dicionário."""
+    sources = sorted({a.get('source') or "" for a in attribute_rows})
+    source_codes = {source: code for code, source in enumerate(sources)}
+    documents = [uuid.UUID(str(a['document_id'])).bytes if a.get('document_id') else bytes(16) for a in attribute_rows]
+    return {
+        'document': np.frombuffer(b"".join(documents), dtype=np.uint8).reshape(-1, 16),
+        'is_table': np.array([bool(a.get('is_table')) for a in attribute_rows], dtype=bool),
+        'has_vision': np.array([bool(a.get('has_vision')) for a in attribute_rows], dtype=bool),
+        'language': np.array([(a.get('language') or "").encode() for a in attribute_rows], dtype='S8'),
+        'page_start': np.array([a.get('page_start') if a.get('page_start') is not None else -1 for a in attribute_rows], dtype=np.int32),
+        'page_end': np.array([a.get('page_end') if a.get('page_end') is not None else -1 for a in attribute_rows], dtype=np.int32),
+        'source_code': np.array([source_codes[a.get('source') or ""] for a in attribute_rows], dtype=np.int32),
+        'sources': np.array(sources, dtype=str),
+    }
+
+
+def _write_ivf(work_dir: Path, ivf_lists: int, dims: int) -> tuple[int, np.ndarray]:
+    """
+    Treina o IVF numa amostra, reordena as linhas da matriz por lista e grava centróides/offsets.
+    Retorna (nº de listas, permutação aplicada) para o chamador reordenar ids/atributos.
+    """
+    matrix = np.load(work_dir / "embeddings.f16.npy", mmap_mode="r")
+    n = len(matrix)
+    rng = np.random.default_rng(0)
+    sample_size = min(n, ivf_lists * 256)
+    sample = np.asarray(matrix[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+    centroids = spherical_kmeans(sample, ivf_lists)
+
+    block = _block_rows(dims)
+    assign = np.empty(n, dtype=np.int32)
+    for start in range(0, n, block):
+        assign[start:start + block] = np.argmax(np.asarray(matrix[start:start + block], dtype=np.float32) @ centroids.T, axis=1)
+
+    order = np.argsort(assign, kind="stable")
+    sorted_matrix = np.lib.format.open_memmap(work_dir / "embeddings.ivf.npy", mode="w+", dtype=np.float16, shape=(n, dims))
+    for start in range(0, n, block):
+        sorted_matrix[start:start + block] = matrix[order[start:start + block]]
+    sorted_matrix.flush()
+    del sorted_matrix, matrix
+    os.replace(work_dir / "embeddings.ivf.npy", work_dir / "embeddings.f16.npy")
+
+    np.save(work_dir / "centroids.f16.npy", centroids.astype(np.float16))
+    np.save(work_dir / "list_offsets.npy", np.searchsorted(assign[order], np.arange(len(centroids) + 1)).astype(np.int64))
+    return len(centroids), order
+
+
+def _prune_old_versions(root: Path, keep: str):
+    """
+    Mantém as KEPT_VERSIONS versões mais recentes. Processos que ainda mapeiam uma versão
+    removida continuam lendo normalmente (o inode só é liberado quando o mmap é fechado).
+    """
+    # Só diretórios de versão: os subdiretórios dos espaços vetoriais também ficam na raiz
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and _VERSION_NAME.match(p.name))
+    for old in versions[:-KEPT_VERSIONS]:
+        if old.name != keep:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def build_snapshot_from_db(root: Optional[Path] = None, ivf_lists: Optional[int] = None, batch_size: int = 1000, space_name: Optional[str] = None) -> dict:
+    """
+    Exporta os embeddings dos chunks COMPLETED no espaço vetorial (padrão: o ativo). A leitura
+    roda em REPEATABLE READ: contagem e varredura enxergam o mesmo estado do banco, mesmo com
+    ingestões em paralelo.
+    """
+    from django.db import connection, transaction
+    from .embedding_spaces import resolve_space, space_dimensions, space_label, space_model, with_vectors
+    from .models import Document, DocumentChunk
+    from .vector_io import VectorSend, decode_vector_binary
+
+    space = resolve_space(space_name)
+    dims = space_dimensions(space)
+    root = root or snapshot_root(space_label(space))
+    if ivf_lists is None:
+        ivf_lists = settings.RAG_VECTOR_IVF_LISTS
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        # Quase-duplicatas (core.near_duplicates) não têm vetor
+        queryset, vector_field = with_vectors(
+            DocumentChunk.objects.filter(document__status=Document.DocumentStatus.COMPLETED), space
+        )
+        count = queryset.count()
+        # Formato binário do pgvector: evita o parse texto de 4096 floats por linha
+        columns = queryset.order_by("id").values_list(
+            "id", VectorSend(vector_field), "document_id", *ATTRIBUTE_FIELDS
+        ).iterator(chunk_size=batch_size)
+        rows = (
+            (row[0], decode_vector_binary(row[1]), dict(zip(("document_id", *ATTRIBUTE_FIELDS), row[2:])))
+            for row in columns
+        )
+        return write_snapshot(
+            rows, count, dims, root=root, ivf_lists=ivf_lists,
+            extra_meta={"embedding_model": space_model(space), "embedding_space": space_label(space)},
+        )
+
+
+class InMemoryVectorIndex:
+    """
+    Leitor do snapshot atual. Verifica o ponteiro CURRENT no máximo a cada 'reload_interval'
+    segundos e troca de versão sem lock na leitura (a troca é uma atribuição de tupla).
+    """
+
+    def __init__(self, root: Optional[Path] = None, reload_interval: Optional[float] = None):
+        self._root = Path(root) if root else None
+        self.reload_interval = settings.RAG_VECTOR_RELOAD_SECONDS if reload_interval is None else reload_interval
+        self._state = None  # (version, matrix, ids, centroids, offsets, attributes)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> Path:
+        return self._root or snapshot_root()
+
+    @property
+    def version(self) -> Optional[str]:
+        state = self._ensure_loaded()
+        return state[0] if state else None
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        if self._state is not None and now - self._checked_at < self.reload_interval:
+            return self._state
+
+        with self._lock:
+            if self._state is not None and now - self._checked_at < self.reload_interval:
+                return self._state
+            self._checked_at = now
+            version = read_current_version(self.root)
+            if version and (self._state is None or self._state[0] != version):
+                try:
+                    self._state = self._load(version)
+                    logger.info(f"Índice vetorial em memória carregado: versão {version} ({len(self._state[2])} linhas).")
+                except (FileNotFoundError, ValueError) as e:
+                    logger.warning(f"Falha ao carregar snapshot vetorial {version}: {e}")
+            return self._state
+
+    def _load(self, version: str):
+        directory = self.root / version
+        matrix = np.load(directory / "embeddings.f16.npy", mmap_mode="r")
+        ids = np.load(directory / "ids.npy")
+        centroids = offsets = None
+        if (directory / "centroids.f16.npy").exists():
+            centroids = np.load(directory / "centroids.f16.npy").astype(np.float32)
+            offsets = np.load(directory / "list_offsets.npy")
+        attributes = None
+        if (directory / "attributes.npz").exists():
+            with np.load(directory / "attributes.npz") as data:
+                attributes = {key: data[key] for key in data.files}
+        return version, matrix, ids, centroids, offsets, attributes
+
+    def search(self, query_vector, k: int, nprobe: Optional[int] = None, filters=None, include_ids=None) -> Optional[list[tuple[uuid.UUID, float]]]:
+        """
+        Top-k por distância de cosseno (1 - similaridade, mesma escala do CosineDistance do pgvector).
+        'filters' (core.chunk_metadata.ChunkFilter) restringe as linhas ANTES do ranking; com filtro
+        a busca é exata sobre as linhas elegíveis (o IVF poderia devolver menos de k resultados).
+        'include_ids' são chunks elegíveis mesmo fora do filtro (canônicos de quase-duplicatas
+        que o satisfazem, ver ChunkFilter.canonical_ids).
+        Retorna None quando não há snapshot (o chamador deve cair para o pgvector).
+        """
+        state = self._ensure_loaded()
+        if state is None:
+            return None
+        _, matrix, ids, centroids, offsets, attributes = state
+        if filters and attributes is None:
+            return None
+        if len(ids) == 0 or k <= 0:
+            return []
+
+        query = normalize_rows(np.asarray(query_vector, dtype=np.float32))
+        if filters:
+            mask = filters.mask(attributes)
+            if include_ids:
+                wanted = np.array([uuid.UUID(str(i)).bytes for i in include_ids], dtype='V16')
+                mask |= np.isin(ids.view('V16').ravel(), wanted)
+            return self._search_rows(matrix, ids, np.flatnonzero(mask), query, k)
+        if centroids is not None:
+            nprobe = nprobe or settings.RAG_VECTOR_IVF_NPROBE
+            probe = np.argsort(-(centroids @ query))[:nprobe]
+            ranges = [(int(offsets[j]), int(offsets[j + 1])) for j in sorted(probe)]
+        else:
+            ranges = [(0, len(ids))]
+
+        block = _block_rows(matrix.shape[1])
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start, end in ranges:
+            for block_start in range(start, end, block):
+                block_end = min(block_start + block, end)
+                scores = np.asarray(matrix[block_start:block_end], dtype=np.float32) @ query
+                if len(scores) > k:
+                    top = np.argpartition(-scores, k - 1)[:k]
+                else:
+                    top = np.arange(len(scores))
+                best_rows = np.concatenate([best_rows, top + block_start])
+                best_scores = np.concatenate([best_scores, scores[top]])
+                if len(best_scores) > 4 * k:
+                    keep = np.argpartition(-best_scores, k - 1)[:k]
+                    best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        return self._ranked(ids, best_rows, best_scores, k)
+
+    def _search_rows(self, matrix, ids, rows: np.ndarray, query: np.ndarray, k: int):
+        """Scan exato restrito a um subconjunto de linhas (leitura por fancy indexing no mmap)."""
+        block = _block_rows(matrix.shape[1])
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(rows), block):
+            subset = rows[start:start + block]
+            scores = np.asarray(matrix[subset], dtype=np.float32) @ query
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            best_rows = np.concatenate([best_rows, subset[top]])
+            best_scores = np.concatenate([best_scores, scores[top]])
+        return self._ranked(ids, best_rows, best_scores, k)
+
+    @staticmethod
+    def _ranked(ids, rows: np.ndarray, scores: np.ndarray, k: int):
+        order = np.argsort(-scores)[:k]
+        return [
+            (uuid.UUID(bytes=ids[row].tobytes()), float(1.0 - score))
+            for row, score in zip(rows[order], scores[order])
+        ]
+
+
+vector_index = InMemoryVectorIndex()
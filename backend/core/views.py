@@ -1,15 +1,20 @@
 # backend/core/views.py em 2025-12-14 11:48
 
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q
 
 from .models import UserProfile, Role
-from .serializers import UserProfileSerializer
-from .utils import generate_search_tokens
+from .pagination import PatientCursorPagination
+from .serializers import PatientListSerializer, UserProfileSerializer
+from .utils import blind_index_lookup, generate_prefix_query_tokens, generate_search_tokens, identifier_lookup
+from .llm_tracing import summarize_llm_usage
 
 class CurrentUserView(APIView):
     """
@@ -30,42 +35,142 @@ class PatientViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Endpoint para listar pacientes.
     Implementa busca segura via Blind Indexing no campo criptografado 'full_name'.
+
+    A lista é paginada por cursor (PatientCursorPagination) e usa o PatientListSerializer:
+    só as colunas da linha são carregadas (cada campo criptografado lido é decifrado, então
+    CPF, telefone e full_name ficam de fora; o nome é decifrado em lote pelo serializer).
+    O detalhe (retrieve) traz o perfil completo.
+
+    O typeahead (/patients/typeahead/?q=) consulta só o Blind Index de prefixos e não lê
+    nenhuma coluna criptografada.
     """
     serializer_class = UserProfileSerializer
+    pagination_class = PatientCursorPagination
     permission_classes = [IsAuthenticated] # No futuro: IsProfessional
+    participant_role = "Participante"
+    typeahead_limit = 10
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return PatientListSerializer
+        return UserProfileSerializer
 
     @extend_schema(
         parameters=[
-            OpenApiParameter(name='search', description='Nome, CPF ou Email', required=False, type=str),
+            OpenApiParameter(name='search', description='Nome, CPF, telefone ou Email', required=False, type=str),
         ],
         summary="Listar Pacientes",
         tags=["Core"]
     )
     def get_queryset(self):
-        # Filtra apenas perfis que são Participantes
-        queryset = UserProfile.objects.filter(
-            roles__name="Participante"
-        ).select_related('user', 'participant_data', 'primary_organization')
+        queryset = self._participants()
+
+        if self.action == 'list':
+            queryset = queryset.select_related('user').only(
+                'id', 'avatar_url', 'primary_organization_id', 'created_at',
+                'user__id', 'user__username', 'user__email',
+            )
+        else:
+            queryset = queryset.select_related(
+                'user', 'participant_data', 'professional_data', 'primary_organization'
+            ).prefetch_related('roles')
 
         # Filtro de Busca (Blind Indexing Implementation)
         search_term = self.request.query_params.get('search', '').strip()
         
         if search_term:
+            identifier = identifier_lookup(search_term)
+
             # 1. Busca por Username ou Email (Campos abertos no User)
             # Otimização: Se contiver '@', prioriza email
             if '@' in search_term:
                 queryset = queryset.filter(user__email__icontains=search_term)
+            elif identifier is not None:
+                # CPF ou telefone (só dígitos e pontuação): igualdade no Blind Index,
+                # uma busca no índice B-tree de cpf_index/phone_index
+                queryset = queryset.filter(identifier)
             else:
                 # 2. Busca por Nome (Criptografado) usando Search Tokens
-                # Gera os tokens do termo digitado (ex: "João" -> hash_joao)
-                tokens = generate_search_tokens(search_term)
+                # Gera os tokens do termo digitado (ex: "João" -> hash_joao), um conjunto
+                # por chave aceita (janela de rotação da BLIND_INDEX_KEY)
+                lookup = blind_index_lookup('search_tokens', generate_search_tokens, search_term)
                 
-                if tokens:
+                if lookup:
                     # A query verifica se o array search_tokens do banco contém 
                     # TODOS os tokens gerados da busca (busca AND)
-                    queryset = queryset.filter(search_tokens__contains=tokens)
+                    queryset = queryset.filter(lookup)
                 else:
                     # Fallback para busca textual em campos não criptografados se não gerou tokens
                     queryset = queryset.filter(user__username__icontains=search_term)
 
-        return queryset
\ No newline at end of file
+        return queryset
+
+    def _participants(self):
+        # Filtra apenas perfis que são Participantes. EXISTS em vez de JOIN em roles:
+        # um perfil com vários papéis não aparece duplicado
+        is_participant = UserProfile.roles.through.objects.filter(
+            userprofile_id=OuterRef('pk'), role__name=self.participant_role
+        )
+        return UserProfile.objects.filter(Exists(is_participant))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='q', description=f'Início do nome (mín. {settings.BLIND_PREFIX_MIN_CHARS} letras por parte)', required=True, type=str),
+        ],
+        summary="Typeahead de Pacientes",
+        tags=["Core"]
+    )
+    @action(detail=False, methods=['get'])
+    def typeahead(self, request):
+        """
+        Sugestões enquanto o nome é digitado ("And" -> Andre, Andrea...), em uma única consulta
+        ao índice GIN de search_prefix_tokens. Só colunas abertas voltam (id, username, avatar):
+        nenhum full_name é decifrado; o nome completo vem do detalhe do paciente escolhido.
+        """
+        if not settings.BLIND_PREFIX_INDEX_ENABLED:
+            raise NotFound("Typeahead desabilitado (BLIND_PREFIX_INDEX_ENABLED).")
+
+        lookup = blind_index_lookup(
+            'search_prefix_tokens', generate_prefix_query_tokens, request.query_params.get('q', '')
+        )
+        if not lookup:
+            return Response([])
+
+        rows = (
+            self._participants()
+            .filter(lookup)
+            .order_by('-id')
+            .values('id', 'avatar_url', username=F('user__username'))[:self.typeahead_limit]
+        )
+        return Response(list(rows))
+
+class LLMUsageStatsView(APIView):
+    """
+    Contabilidade de GPU: latência (p50/p95), tokens e tokens/s das chamadas ao LLM,
+    agregadas por caller (RAG, Maestro, Receitas, Ingestão...) ou por organização.
+    """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='hours', description='Janela em horas (padrão: 24)', required=False, type=int),
+            OpenApiParameter(name='group_by', description="'caller' ou 'organization'", required=False, type=str),
+        ],
+        summary="Estatísticas de Uso do LLM",
+        tags=["Core"]
+    )
+    def get(self, request):
+        group_by = request.query_params.get('group_by', 'caller')
+        if group_by not in ('caller', 'organization'):
+            return Response({"error": "group_by deve ser 'caller' ou 'organization'."}, status=400)
+
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            return Response({"error": "hours deve ser um inteiro."}, status=400)
+
+        return Response({
+            "hours": hours,
+            "group_by": group_by,
+            "results": summarize_llm_usage(hours=hours, group_by=group_by),
+        })
@@ -21,6 +21,7 @@ from .models import (
     # Data Vault
     MedicalExam, PhysicalEvaluation
 )
+from core.pii import BatchDecryptAdminMixin, profile_names
 
 # =========================================================
 # UTILS & MIXINS
@@ -298,12 +299,13 @@ class DailyScheduleInline(admin.TabularInline):
     activities_summary_html.short_description = "Resumo Visual"
 
 @admin.register(WellnessPlan)
-class WellnessPlanAdmin(BaseAdmin):
+class WellnessPlanAdmin(BatchDecryptAdminMixin, BaseAdmin):
     list_display = ('title', 'participant_link', 'status_badge', 'professional_link', 'duration_display')
     list_filter = ('status', 'created_at')
-    search_fields = ('title', 'participant__username', 'participant__profile__full_name')
+    search_fields = ('title', 'participant__username')
     autocomplete_fields = ['participant', 'responsible_professional', 'resistance_routine']
     inlines = [DailyScheduleInline]
+    decrypted_user_fields = ('participant_id', 'responsible_professional_id')
     
     fieldsets = (
         ('Cabeçalho do Plano', {
@@ -331,12 +333,12 @@ class WellnessPlanAdmin(BaseAdmin):
     status_badge.short_description = "Status Atual"
 
     def participant_link(self, obj):
-        return obj.participant.profile.full_name if hasattr(obj.participant, 'profile') else obj.participant.username
+        return profile_names([obj.participant_id])[obj.participant_id] or obj.participant.username
     participant_link.short_description = "Participante"
 
     def professional_link(self, obj):
-        if not obj.responsible_professional: return "-"
-        return obj.responsible_professional.profile.full_name
+        if not obj.responsible_professional_id: return "-"
+        return profile_names([obj.responsible_professional_id])[obj.responsible_professional_id]
     professional_link.short_description = "Profissional Resp."
 
     def duration_display(self, obj):
@@ -387,7 +389,7 @@ class MedicalExamAdmin(BaseAdmin):
 class PhysicalEvaluationAdmin(BaseAdmin):
     list_display = ('patient_link', 'evaluator_link', 'evaluation_type', 'date', 'finalized_bool')
     list_filter = ('evaluation_type', 'is_finalized', 'date')
-    search_fields = ('patient__username', 'patient__profile__full_name')
+    search_fields = ('patient__username',)
     readonly_fields = ('date',)
     
     fieldsets = (
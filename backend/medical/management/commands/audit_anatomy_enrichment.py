@@ -4,43 +4,63 @@ import json
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from medical.models import Bone
-from core.models import AuditLog
+from core.models import AuditLog, LLMCallTrace
 from core.services import RAGService
 from core.clients import ollama_client
+from core.llm_cache import LLMResponseCache
+from core.pipeline import PipelineRunner, add_pipeline_arguments, run_in_command
 
 class Command(BaseCommand):
     help = 'Enriquece Descrições e Notas Clínicas dos Ossos usando RAG (Blindado para PT-BR).'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--llm-cache', action='store_true', help='Reaproveita respostas idênticas do LLM de execuções anteriores (replay rápido).')
+        parser.add_argument('--llm-cache-ttl', type=float, default=None, help='Validade do cache em horas. Padrão: LLM_CACHE_TTL_HOURS.')
+        add_pipeline_arguments(parser)
+
     def handle(self, *args, **kwargs):
-        self.rag = RAGService()
+        self.rag = RAGService(caller=LLMCallTrace.Caller.ENRICHMENT)
+        self.llm_cache = LLMResponseCache('audit_anatomy_enrichment', ttl_hours=kwargs['llm_cache_ttl']) if kwargs['llm_cache'] else None
+        concurrency = kwargs['concurrency'] or settings.AUDIT_PIPELINE_CONCURRENCY
         
         # Pega todos os ossos ordenados
         bones = Bone.objects.all().order_by('name')
-        total = bones.count()
+        if kwargs['resume_from']:
+            bones = bones.filter(name__gte=kwargs['resume_from'])
+        self.total = bones.count()
+        self.position = 0
         
-        self.stdout.write(self.style.WARNING(f'Iniciando Enriquecimento Textual para {total} ossos...'))
-
-        for i, bone in enumerate(bones):
-            # Se já tem notas clínicas detalhadas, podemos pular
-            if len(bone.clinical_notes) > 50: 
-                continue
-
-            self.stdout.write(f"[{i+1}/{total}] Enriquecendo: {bone.name} ({bone.scientific_name})...")
-            
-            # 1. Recuperação (Retrieval) - Busca híbrida (PT/EN/Latim)
-            query = f"{bone.name} {bone.scientific_name or ''} anatomy clinical relevance fractures landmarks function"
-            
-            # Busca no Knowledge Base
-            evidence_list = self.rag.search_for_audit(query, limit=4)
-            
-            if not evidence_list:
-                self.stdout.write(self.style.ERROR("  > Sem evidência nos livros. Pulando."))
-                continue
+        self.stdout.write(self.style.WARNING(f'Iniciando Enriquecimento Textual para {self.total} ossos (concorrência: {concurrency})...'))
+
+        # Recuperação e geração de ossos diferentes se sobrepõem; a escrita segue a ordem alfabética
+        runner = PipelineRunner([
+            ('busca', self._retrieve),
+            ('geração', self._generate),
+        ], concurrency=concurrency)
+        run_in_command(self, runner, bones, self._write_result)
+
+        if self.llm_cache:
+            self.stdout.write(self.llm_cache.stats_line())
+        self.stdout.write(self.style.SUCCESS('Enriquecimento PT-BR Concluído!'))
+
+    def _retrieve(self, bone):
+        # Se já tem notas clínicas detalhadas, podemos pular
+        if len(bone.clinical_notes) > 50:
+            return None
+
+        # 1. Recuperação (Retrieval) - Busca híbrida (PT/EN/Latim)
+        query = f"{bone.name} {bone.scientific_name or ''} anatomy clinical relevance fractures landmarks function"
+        
+        # Busca no Knowledge Base
+        evidence_list = self.rag.search_for_audit(query, limit=4)
+        return {'bone': bone, 'evidence': evidence_list} if evidence_list else None
 
-            context_text = "\n".join([f"- {e['content']}" for e in evidence_list])
+    def _generate(self, work):
+        bone = work['bone']
+        context_text = "\n".join([f"- {e['content']}" for e in work['evidence']])
 
-            # 2. Geração (Prompt Blindado para PT-BR)
-            prompt = f"""
+        # 2. Geração (Prompt Blindado para PT-BR)
+        prompt = f"""
             Você é um Professor de Anatomia e Ortopedia Brasileiro.
             Sua tarefa é ler o contexto (que pode estar em Inglês) e gerar conteúdo técnico estritamente em PORTUGUÊS DO BRASIL.
 
@@ -65,53 +85,71 @@ class Command(BaseCommand):
             }}
             """
 
-            try:
-                # Chamada ao LLM
-                response = ollama_client.generate(
-                    settings.OLLAMA_GENERATION_MODEL, 
-                    prompt, 
-                    is_json=True,
-                    options={"temperature": 0.1} # Baixa criatividade para garantir adesão à instrução
-                )
-                
-                # Tratamento robusto do retorno
-                raw_json = response.get('response', '{}')
-                ai_data = json.loads(raw_json)
+        # Chamada ao LLM
+        response = ollama_client.generate(
+            settings.OLLAMA_GENERATION_MODEL, 
+            prompt, 
+            is_json=True,
+            options={"temperature": 0.1}, # Baixa criatividade para garantir adesão à instrução
+            cache=self.llm_cache,
+            caller=LLMCallTrace.Caller.ENRICHMENT
+        )
+        
+        # Tratamento robusto do retorno
+        raw_json = response.get('response', '{}')
+        work['ai_data'] = json.loads(raw_json)
+        return work
+
+    def _write_result(self, result):
+        """Sink do pipeline (thread principal, ordem alfabética): log + persistência."""
+        self.position += 1
+        bone = result.item
+        if result.skipped_at == 'busca' and len(bone.clinical_notes) > 50:
+            return
+
+        self.stdout.write(f"[{self.position}/{self.total}] Enriquecendo: {bone.name} ({bone.scientific_name})...")
+        if result.error is not None:
+            self.stdout.write(self.style.ERROR(f"  > Erro ao processar: {result.error}"))
+            return
+        if result.skipped_at:
+            self.stdout.write(self.style.ERROR("  > Sem evidência nos livros. Pulando."))
+            return
+
+        evidence_list, ai_data = result.value['evidence'], result.value['ai_data']
+
+        try:
+            # 3. Persistência
+            new_desc = ai_data.get('description')
+            new_notes = ai_data.get('clinical_notes')
+            
+            updated = False
+            
+            # Só salva se tiver conteúdo relevante e estiver em Português (heurística simples)
+            if new_desc and len(new_desc) > len(bone.description or ""):
+                bone.description = new_desc
+                updated = True
+            
+            if new_notes and len(new_notes) > 10:
+                bone.clinical_notes = new_notes
+                updated = True
 
-                # 3. Persistência
-                new_desc = ai_data.get('description')
-                new_notes = ai_data.get('clinical_notes')
+            if updated:
+                bone.save()
+                self.stdout.write(self.style.SUCCESS("  > Atualizado com sucesso."))
                 
-                updated = False
-                
-                # Só salva se tiver conteúdo relevante e estiver em Português (heurística simples)
-                if new_desc and len(new_desc) > len(bone.description or ""):
-                    bone.description = new_desc
-                    updated = True
-                
-                if new_notes and len(new_notes) > 10:
-                    bone.clinical_notes = new_notes
-                    updated = True
-
-                if updated:
-                    bone.save()
-                    self.stdout.write(self.style.SUCCESS("  > Atualizado com sucesso."))
-                    
-                    # Log de Auditoria (Evidência)
-                    AuditLog.objects.create(
-                        action='AI_DECISION',
-                        target_object_id=str(bone.id),
-                        # target_content_type será preenchido se necessário, ou usamos GenericFK
-                        details={
-                            "field": "enrichment_pt_br",
-                            "source_evidence": [e['source'] for e in evidence_list[:2]]
-                        },
-                        ai_reasoning_snapshot=ai_data
-                    )
-                else:
-                    self.stdout.write("  > Nenhuma informação nova relevante gerada.")
-
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"  > Erro ao processar: {e}"))
-
-        self.stdout.write(self.style.SUCCESS('Enriquecimento PT-BR Concluído!'))
\ No newline at end of file
+                # Log de Auditoria (Evidência)
+                AuditLog.objects.create(
+                    action='AI_DECISION',
+                    target_object_id=str(bone.id),
+                    # target_content_type será preenchido se necessário, ou usamos GenericFK
+                    details={
+                        "field": "enrichment_pt_br",
+                        "source_evidence": [e['source'] for e in evidence_list[:2]]
+                    },
+                    ai_reasoning_snapshot=ai_data
+                )
+            else:
+                self.stdout.write("  > Nenhuma informação nova relevante gerada.")
+
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"  > Erro ao processar: {e}"))
@@ -2,13 +2,19 @@
 
 import json
 import time
+from functools import partial
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.db import transaction
 from medical.models import Bone, BoneType, Muscle
-from core.models import AuditLog
+from core.models import AuditLog, LLMCallTrace
 from core.services import RAGService
 from core.clients import ollama_client
+from core.llm_cache import LLMResponseCache
+from core.pipeline import PipelineRunner, add_pipeline_arguments, run_in_command
+
+# Termos sugeridos pelo LLM além do nome original (cada um custa uma busca vetorial)
+MAX_SEARCH_TERMS = 4
 
 class Command(BaseCommand):
     help = 'Audita e corrige dados de Anatomia (Ossos/Músculos) usando RAG e Literatura Ingerida.'
@@ -16,42 +22,57 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--target', type=str, choices=['bones', 'muscles'], default='bones', help='O que auditar?')
         parser.add_argument('--dry-run', action='store_true', help='Apenas simula e mostra o que mudaria.')
-        parser.add_argument('--limit', type=int, default=10, help='Quantos itens auditar por vez (para teste).')
+        parser.add_argument('--limit', type=int, default=10, help='Quantos itens auditar por vez (0 = todos).')
+        parser.add_argument('--llm-cache', action='store_true', help='Reaproveita respostas idênticas do LLM de execuções anteriores (replay rápido).')
+        parser.add_argument('--llm-cache-ttl', type=float, default=None, help='Validade do cache em horas. Padrão: LLM_CACHE_TTL_HOURS.')
+        add_pipeline_arguments(parser)
 
     def handle(self, *args, **options):
-        self.rag = RAGService()
+        self.rag = RAGService(caller=LLMCallTrace.Caller.ENRICHMENT)
         self.dry_run = options['dry_run']
+        self.llm_cache = LLMResponseCache('audit_anatomy_rag', ttl_hours=options['llm_cache_ttl']) if options['llm_cache'] else None
+        self.concurrency = options['concurrency'] or settings.AUDIT_PIPELINE_CONCURRENCY
         target = options['target']
         limit = options['limit']
+        resume_from = options['resume_from']
 
-        self.stdout.write(self.style.WARNING(f"Iniciando Auditoria ({target.upper()})... Modo Dry-Run: {self.dry_run}"))
+        self.stdout.write(self.style.WARNING(
+            f"Iniciando Auditoria ({target.upper()})... Modo Dry-Run: {self.dry_run} | Concorrência: {self.concurrency}"
+        ))
 
         if target == 'bones':
-            self.audit_bones(limit)
+            self.audit_bones(limit, resume_from)
         elif target == 'muscles':
-            self.audit_muscles(limit)
+            self.audit_muscles(limit, resume_from)
 
-    def audit_bones(self, limit):
-        bones = Bone.objects.all().order_by('name')[:limit]
-        
-        for bone in bones:
-            self.stdout.write(f"\n🔍 Auditando Osso: {bone.name}...")
-            
-            # 1. Expansão de Consulta (A Ponte do Latim)
-            # Perguntamos ao LLM os termos de busca antes de ir ao vetor
-            search_terms = self._get_search_terms(bone.name, "bone")
-            query = f"{bone.name} OR {search_terms}"
-            
-            # 2. Recuperação (Retrieval)
-            evidence_list = self.rag.search_for_audit(query, limit=3)
-            if not evidence_list:
-                self.stdout.write(self.style.ERROR("  > Nenhuma evidência encontrada nos livros."))
-                continue
+        if self.llm_cache:
+            self.stdout.write(self.llm_cache.stats_line())
+
+    def _select(self, model, limit, resume_from):
+        items = model.objects.all().order_by('name')
+        if resume_from:
+            items = items.filter(name__gte=resume_from)
+        return items[:limit] if limit else items
 
-            context_text = "\n".join([f"[{e['source']}]: {e['content']}" for e in evidence_list])
+    def audit_bones(self, limit, resume_from=None):
+        bones = self._select(Bone, limit, resume_from)
 
+        runner = PipelineRunner([
+            # 1. Expansão de Consulta (A Ponte do Latim): termos de busca antes de ir ao vetor
+            ('termos', lambda bone: {'obj': bone, 'queries': [bone.name, *self._get_search_terms(bone.name, "bone")]}),
+            # 2. Recuperação (Retrieval): um vetor por termo, fundidos por RRF
+            ('busca', partial(self._retrieve, limit=3)),
             # 3. Análise (Generation)
-            prompt = f"""
+            ('análise', partial(self._analyze, build_prompt=self._bone_prompt)),
+        ], concurrency=self.concurrency)
+
+        run_in_command(self, runner, bones, partial(
+            self._write_result, label="🔍 Auditando Osso", no_evidence="Nenhuma evidência encontrada nos livros.",
+            apply=self._apply_bone_changes,
+        ))
+
+    def _bone_prompt(self, bone, context_text):
+        return f"""
             Aja como um Anatomista Sênior. Use o CONTEXTO abaixo (que pode estar em Inglês) para corrigir os dados do banco (em Português).
 
             DADOS ATUAIS NO BANCO:
@@ -79,29 +100,31 @@ class Command(BaseCommand):
                 "confidence": "HIGH/LOW"
             }}
             """
-            
-            ai_result = self._call_llm(prompt)
-            if ai_result:
-                self._apply_bone_changes(bone, ai_result, evidence_list)
 
-    def audit_muscles(self, limit):
+    def audit_muscles(self, limit, resume_from=None):
         # Foca nos que não têm descrição ou têm dados suspeitos
-        muscles = Muscle.objects.all().order_by('name')[:limit]
+        muscles = self._select(Muscle, limit, resume_from)
 
-        for muscle in muscles:
-            self.stdout.write(f"\n💪 Auditando Músculo: {muscle.name}...")
-            
+        def expand(muscle):
             search_terms = self._get_search_terms(muscle.name, "muscle")
-            query = f"{muscle.name} anatomy origin insertion action {search_terms}"
-            
-            evidence_list = self.rag.search_for_audit(query, limit=4)
-            if not evidence_list:
-                self.stdout.write(self.style.ERROR("  > Sem evidência."))
-                continue
+            return {'obj': muscle, 'queries': [muscle.name, f"{muscle.name} anatomy origin insertion action", *search_terms]}
+
+        def apply(muscle, ai_result, evidence_list):
+            if ai_result.get('found_in_text'):
+                self._apply_muscle_changes(muscle, ai_result, evidence_list)
 
-            context_text = "\n".join([f"[{e['source']}]: {e['content']}" for e in evidence_list])
+        runner = PipelineRunner([
+            ('termos', expand),
+            ('busca', partial(self._retrieve, limit=4)),
+            ('análise', partial(self._analyze, build_prompt=self._muscle_prompt)),
+        ], concurrency=self.concurrency)
 
-            prompt = f"""
+        run_in_command(self, runner, muscles, partial(
+            self._write_result, label="💪 Auditando Músculo", no_evidence="Sem evidência.", apply=apply,
+        ))
+
+    def _muscle_prompt(self, muscle, context_text):
+        return f"""
             Aja como um Cinesiologista. Use o CONTEXTO (Inglês/Português) para corrigir os dados do músculo (Português).
 
             MÚSCULO: {muscle.name}
@@ -122,32 +145,72 @@ class Command(BaseCommand):
                 "found_in_text": true
             }}
             """
-            
-            ai_result = self._call_llm(prompt)
-            if ai_result and ai_result.get('found_in_text'):
-                self._apply_muscle_changes(muscle, ai_result, evidence_list)
 
-    def _get_search_terms(self, name, type_obj):
-        """Usa o LLM (Zero-Shot) para descobrir o nome em Latim/Inglês para melhorar a busca."""
-        prompt = f"Retorne apenas o nome em Latim e em Inglês para o {type_obj} '{name}'. Formato: 'LatinName OR EnglishName'."
-        try:
-            resp = ollama_client.generate(settings.OLLAMA_GENERATION_MODEL, prompt)
-            return resp.get('response', '').strip().replace('"', '')
-        except:
-            return ""
+    # --- Estágios do pipeline (rodam em threads: nada de stdout nem escrita no banco aqui) ---
 
-    def _call_llm(self, prompt):
+    def _retrieve(self, work, limit):
+        work['evidence'] = self.rag.search_multi_query(work['queries'], limit=limit)
+        return work if work['evidence'] else None
+
+    def _analyze(self, work, build_prompt):
+        context_text = "\n".join([f"[{e['source']}]: {e['content']}" for e in work['evidence']])
+        work['ai_result'] = self._call_llm(build_prompt(work['obj'], context_text))
+        return work
+
+    def _write_result(self, result, label, no_evidence, apply):
+        """Sink do pipeline: log e escrita no banco, na thread principal e na ordem alfabética."""
+        self.stdout.write(f"\n{label}: {result.item.name}...")
+        if result.error is not None:
+            self.stdout.write(self.style.ERROR(f"  > Erro ({result.failed_at}): {result.error}"))
+            return
+        if result.skipped_at:
+            self.stdout.write(self.style.ERROR(f"  > {no_evidence}"))
+            return
+
+        work = result.value
+        self._log_evidence(work['evidence'])
+        if work['ai_result']:
+            apply(work['obj'], work['ai_result'], work['evidence'])
+
+    def _get_search_terms(self, name, type_obj) -> list[str]:
+        """
+        Usa o LLM (Zero-Shot) para descobrir o nome em Latim/Inglês e sinônimos para melhorar a busca.
+        Cada termo vira uma consulta vetorial separada (ver RAGService.search_multi_query).
+        """
+        prompt = (
+            f"Retorne o nome em Latim, o nome em Inglês e até 2 sinônimos anatômicos para o {type_obj} '{name}'. "
+            f'SAÍDA JSON: {{"terms": ["LatinName", "EnglishName", "..."]}}'
+        )
         try:
             resp = ollama_client.generate(
-                settings.OLLAMA_GENERATION_MODEL, 
-                prompt, 
-                is_json=True,
-                options={"temperature": 0.1}
+                settings.OLLAMA_GENERATION_MODEL, prompt, is_json=True,
+                cache=self.llm_cache, caller=LLMCallTrace.Caller.ENRICHMENT
             )
-            return json.loads(resp.get('response', '{}'))
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"  > Erro LLM: {e}"))
-            return None
+            raw = resp.get('response', '').strip()
+            try:
+                terms = json.loads(raw).get('terms', [])
+            except (json.JSONDecodeError, AttributeError):
+                # Modelo ignorou o formato: aceita o antigo 'Latim OR Inglês'
+                terms = raw.replace('"', '').split(' OR ')
+            return [str(t).strip() for t in terms if str(t).strip()][:MAX_SEARCH_TERMS]
+        except Exception:
+            return []
+
+    def _log_evidence(self, evidence_list):
+        for e in evidence_list:
+            self.stdout.write(f"  > Evidência: {e['source']} (termos: {', '.join(e['matched_terms'])})")
+
+    def _call_llm(self, prompt):
+        # Erros (HTTP/JSON) sobem para o pipeline e são reportados pelo sink
+        resp = ollama_client.generate(
+            settings.OLLAMA_GENERATION_MODEL, 
+            prompt, 
+            is_json=True,
+            options={"temperature": 0.1},
+            cache=self.llm_cache,
+            caller=LLMCallTrace.Caller.ENRICHMENT
+        )
+        return json.loads(resp.get('response', '{}'))
 
     def _apply_bone_changes(self, bone, data, evidence):
         """Aplica as mudanças e loga no AuditLog."""
@@ -1,18 +1,25 @@
 # backend/medical/management/commands/populate_muscle_actions_ai.py em 2025-12-14 11:48
 
 import json
-import httpx
 import re
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.db import transaction
 from medical.models import Muscle, JointMovement, MuscleAction, MuscleRole
+from core.models import LLMCallTrace
+from core.clients import ollama_client
+from core.llm_cache import LLMResponseCache
 
 class Command(BaseCommand):
     help = 'Popula a tabela MuscleAction usando IA Local (Ollama/Llama3) conectada ao banco.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--llm-cache', action='store_true', help='Reaproveita respostas idênticas do LLM de execuções anteriores (replay rápido).')
+        parser.add_argument('--llm-cache-ttl', type=float, default=None, help='Validade do cache em horas. Padrão: LLM_CACHE_TTL_HOURS.')
+
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.WARNING('Iniciando Inteligência Cinesiológica via Ollama...'))
+        llm_cache = LLMResponseCache('populate_muscle_actions_ai', ttl_hours=kwargs['llm_cache_ttl']) if kwargs['llm_cache'] else None
 
         # 1. Preparar Contexto
         movements_qs = JointMovement.objects.select_related('joint').all()
@@ -21,7 +28,6 @@ class Command(BaseCommand):
 
         self.stdout.write(f"Carregados {len(valid_movements_list)} movimentos válidos do banco.")
 
-        ollama_url = f"{settings.OLLAMA_BASE_URL}/api/generate"
         model = settings.OLLAMA_GENERATION_MODEL
 
         # 2. Processamento em Lotes
@@ -73,70 +79,67 @@ class Command(BaseCommand):
             """
 
             try:
-                with httpx.Client(timeout=120.0) as client:
-                    response = client.post(ollama_url, json={
-                        "model": model,
-                        "prompt": prompt,
-                        "format": "json",
-                        "stream": False,
-                        "options": {"temperature": 0.1}
-                    })
-                    
-                    if response.status_code != 200:
-                        self.stdout.write(self.style.ERROR(f"Erro Ollama: {response.text}"))
-                        continue
-
-                    response_json = response.json()
-                    raw_text = response_json.get('response', '')
-                    
-                    # --- SANITIZAÇÃO DA RESPOSTA (O Fix Crítico) ---
-                    ai_data = self._clean_and_parse_json(raw_text)
-
-                    if not ai_data:
-                        self.stdout.write(self.style.ERROR("  > JSON vazio ou inválido. Pulando."))
-                        continue
-
-                    with transaction.atomic():
-                        for item in ai_data:
-                            # Validação extra: item deve ser dict
-                            if not isinstance(item, dict):
-                                continue
-
-                            muscle_name = item.get('muscle')
-                            muscle_obj = Muscle.objects.filter(name__iexact=muscle_name).first()
+                response_json = ollama_client.generate(
+                    model,
+                    prompt,
+                    is_json=True,
+                    options={"temperature": 0.1},
+                    cache=llm_cache,
+                    caller=LLMCallTrace.Caller.ENRICHMENT,
+                    timeout=120.0
+                )
+                raw_text = response_json.get('response', '')
+
+                # --- SANITIZAÇÃO DA RESPOSTA (O Fix Crítico) ---
+                ai_data = self._clean_and_parse_json(raw_text)
+
+                if not ai_data:
+                    self.stdout.write(self.style.ERROR("  > JSON vazio ou inválido. Pulando."))
+                    continue
+
+                with transaction.atomic():
+                    for item in ai_data:
+                        # Validação extra: item deve ser dict
+                        if not isinstance(item, dict):
+                            continue
+
+                        muscle_name = item.get('muscle')
+                        muscle_obj = Muscle.objects.filter(name__iexact=muscle_name).first()
+                        
+                        if not muscle_obj:
+                            # Tenta match parcial se falhar o exato
+                            # self.stdout.write(self.style.WARNING(f"  > Músculo não encontrado: {muscle_name}"))
+                            continue
+
+                        for action in item.get('actions', []):
+                            if not isinstance(action, dict): continue
+                            
+                            mov_key = action.get('movement_name', '').upper()
+                            role_key = action.get('role', '').upper()
+                            
+                            movement_obj = movement_map.get(mov_key)
                             
-                            if not muscle_obj:
-                                # Tenta match parcial se falhar o exato
-                                # self.stdout.write(self.style.WARNING(f"  > Músculo não encontrado: {muscle_name}"))
-                                continue
-
-                            for action in item.get('actions', []):
-                                if not isinstance(action, dict): continue
-                                
-                                mov_key = action.get('movement_name', '').upper()
-                                role_key = action.get('role', '').upper()
-                                
-                                movement_obj = movement_map.get(mov_key)
-                                
-                                # Validação de Role
-                                valid_roles = [c[0] for c in MuscleRole.choices]
-                                if role_key not in valid_roles:
-                                    role_key = 'AGONISTA_SECUNDARIO' 
-
-                                if movement_obj:
-                                    MuscleAction.objects.update_or_create(
-                                        muscle=muscle_obj,
-                                        movement=movement_obj,
-                                        role=role_key,
-                                        defaults={'notes': action.get('notes', '')}
-                                    )
-                                    success_actions += 1
+                            # Validação de Role
+                            valid_roles = [c[0] for c in MuscleRole.choices]
+                            if role_key not in valid_roles:
+                                role_key = 'AGONISTA_SECUNDARIO' 
+
+                            if movement_obj:
+                                MuscleAction.objects.update_or_create(
+                                    muscle=muscle_obj,
+                                    movement=movement_obj,
+                                    role=role_key,
+                                    defaults={'notes': action.get('notes', '')}
+                                )
+                                success_actions += 1
 
                 processed_count += len(batch_muscles)
 
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"  > Erro no lote: {e}"))
 
+        if llm_cache:
+            self.stdout.write(llm_cache.stats_line())
         self.stdout.write(self.style.SUCCESS(f'Concluído! {success_actions} ações musculares registradas.'))
 
     def _clean_and_parse_json(self, raw_text):
@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from .models import WellnessPlan, DailySchedule, PrescribedActivity
+from core.pii import BatchDecryptListSerializer, ProfileNameField
 from core.serializers import UserSimpleSerializer
 
 class PrescribedActivitySerializer(serializers.ModelSerializer):
@@ -30,8 +31,10 @@ class WellnessPlanDetailSerializer(serializers.ModelSerializer):
 
 class WellnessPlanListSerializer(serializers.ModelSerializer):
     """Serializer leve para listagem no Dashboard."""
-    participant_name = serializers.CharField(source='participant.profile.full_name', read_only=True)
+    # Nomes decifrados em lote, um por participante distinto da página (core/pii.py)
+    participant_name = ProfileNameField(source='participant_id')
     
     class Meta:
         model = WellnessPlan
-        fields = ['id', 'title', 'status', 'participant_name', 'created_at']
\ No newline at end of file
+        fields = ['id', 'title', 'status', 'participant_name', 'created_at']
+        list_serializer_class = BatchDecryptListSerializer
\ No newline at end of file
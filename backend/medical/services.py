@@ -8,7 +8,7 @@ from django.conf import settings
 from django.db import transaction
 
 from core.clients import ollama_client
-from core.models import AuditLog
+from core.models import AuditLog, LLMCallTrace
 from medical.models import (
     MedicalExam, PhysicalEvaluation, 
     WellnessPlan, DailySchedule, PrescribedActivity, 
@@ -27,6 +27,7 @@ class WellnessMaestro:
         self.user = participant_user
         self.profile = participant_user.profile.participant_data
         self.model = settings.OLLAMA_GENERATION_MODEL
+        self.organization_id = participant_user.profile.primary_organization_id
 
     def generate_initial_plan(self, professional_user) -> WellnessPlan:
         """
@@ -118,7 +119,10 @@ class WellnessMaestro:
         }}
         """
         
-        response = ollama_client.generate(self.model, prompt, is_json=True)
+        response = ollama_client.generate(
+            self.model, prompt, is_json=True,
+            caller=LLMCallTrace.Caller.MAESTRO, organization_id=self.organization_id
+        )
         return json.loads(response.get('response', '{}'))
 
     def _persist_plan(self, ai_data, professional, context_snapshot):
@@ -10,6 +10,7 @@ from rest_framework.response import Response
 from django.utils import timezone
 from .models import DailySchedule, PrescribedActivity
 from .serializers import DailyScheduleSerializer, PrescribedActivitySerializer
+from core.rbac import permissions_for, require_permission
 
 class WellnessPlanViewSet(viewsets.ModelViewSet):
     """
@@ -19,8 +20,8 @@ class WellnessPlanViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        # Se for Profissional: Vê planos que ele gerencia
-        if user.profile.roles.filter(name__in=['Profissional de Saúde', 'Gestor de Clínica']).exists():
+        # Se for Profissional: Vê planos que ele gerencia (papéis compilados, sem consulta por requisição)
+        if permissions_for(user).has_role('Profissional de Saúde', 'Gestor de Clínica'):
             return WellnessPlan.objects.filter(responsible_professional=user)
         # Se for Participante: Vê seus próprios planos
         return WellnessPlan.objects.filter(participant=user)
@@ -30,11 +31,13 @@ class WellnessPlanViewSet(viewsets.ModelViewSet):
             return WellnessPlanDetailSerializer
         return WellnessPlanListSerializer
 
-    @action(detail=True, methods=['patch'])
+    @action(
+        detail=True, methods=['patch'],
+        permission_classes=[permissions.IsAuthenticated, require_permission('approve_wellness_plan')],
+    )
     def approve(self, request, pk=None):
         """Fluxo HITL: Profissional aprova o plano."""
         plan = self.get_object()
-        # Aqui adicionaríamos verificação de permissão granular
         plan.status = WellnessPlan.Status.ACTIVE
         plan.save()
         return Response({'status': 'ACTIVE', 'message': 'Plano aprovado e ativado com sucesso.'})
@@ -1,6 +1,7 @@
 # backend/social/serializers.py  em 2025-12-14 11:48
 
 from rest_framework import serializers
+from core.pii import BatchDecryptListSerializer, ProfileNameField
 from core.serializers import UserSimpleSerializer, ProfessionalProfile
 from .models import FamilyRecipe, Allergen
 
@@ -11,11 +12,12 @@ class AllergenSerializer(serializers.ModelSerializer):
 
 class ProfessionalSimpleSerializer(serializers.ModelSerializer):
     """Serializer simplificado para exibir quem validou a receita."""
-    name = serializers.CharField(source='profile.full_name', read_only=True)
+    name = ProfileNameField(source='profile_id', key='pk')
     
     class Meta:
         model = ProfessionalProfile
         fields = ['id', 'name', 'professional_level']
+        list_serializer_class = BatchDecryptListSerializer
 
 class FamilyRecipeReadSerializer(serializers.ModelSerializer):
     """
@@ -38,6 +40,8 @@ class FamilyRecipeReadSerializer(serializers.ModelSerializer):
             'status', 'status_display', 'is_public', 'likes_count',
             'author', 'validated_by', 'created_at_fmt'
         ]
+        # Nome de quem validou: decifrado em lote para a página inteira
+        list_serializer_class = BatchDecryptListSerializer
 
 class FamilyRecipeWriteSerializer(serializers.ModelSerializer):
     """
@@ -1,18 +1,21 @@
 # backend/social/services.py em 2025-12-14 11:48
 
 import json
-import httpx
 import logging
 from django.conf import settings
 from django.db import transaction
+from core.clients import ollama_client
+from core.llm_cache import LLMResponseCache
+from core.models import LLMCallTrace
 from .models import FamilyRecipe, Allergen
 
 logger = logging.getLogger(__name__)
 
 class RecipeAnalysisService:
     def __init__(self):
-        self.ollama_url = f"{settings.OLLAMA_BASE_URL}/api/generate"
         self.model = f"{settings.OLLAMA_GENERATION_MODEL}"
+        # Receitas com mesmo texto geram o mesmo prompt: reaproveita a análise anterior (opt-in)
+        self.llm_cache = LLMResponseCache('recipe_analysis') if settings.LLM_CACHE_RECIPE_ANALYSIS else None
         
     def analyze_recipe(self, recipe: FamilyRecipe):
         """
@@ -60,19 +63,17 @@ class RecipeAnalysisService:
 
         try:
             # 3. Chamada ao LLM
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "format": "json",
-                "options": {"temperature": 0.2} # Baixa temperatura para maior precisão
-            }
-            
-            with httpx.Client(timeout=60.0) as client:
-                response = client.post(self.ollama_url, json=payload)
-                response.raise_for_status()
-                ai_data = response.json().get('response', '{}')
-                result = json.loads(ai_data)
+            response = ollama_client.generate(
+                self.model,
+                prompt,
+                is_json=True,
+                options={"temperature": 0.2}, # Baixa temperatura para maior precisão
+                cache=self.llm_cache,
+                caller=LLMCallTrace.Caller.RECIPE,
+                organization_id=self._author_organization_id(recipe),
+                timeout=60.0 # Um Ollama travado não pode prender o worker Celery
+            )
+            result = json.loads(response.get('response', '{}'))
 
             # 4. Persistência dos Resultados
             self._apply_results(recipe, result, official_allergens)
@@ -84,6 +85,11 @@ class RecipeAnalysisService:
             logger.error(f"Erro na análise de IA da receita {recipe.id}: {e}", exc_info=True)
             return False
 
+    def _author_organization_id(self, recipe: FamilyRecipe):
+        """Organização do autor (para atribuição de custo de IA). Autores sem perfil ficam sem organização."""
+        profile = getattr(recipe.author, 'profile', None)
+        return profile.primary_organization_id if profile else None
+
     def _apply_results(self, recipe: FamilyRecipe, result: dict, official_list: list):
         with transaction.atomic():
             # Atualiza flags e nutrição
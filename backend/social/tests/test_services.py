@@ -30,7 +30,7 @@ class TestRecipeAnalysisService:
         
         return recipe
 
-    @patch("social.services.httpx.Client")
+    @patch("core.clients.httpx.Client")
     def test_analyze_recipe_detection_success(self, mock_client_cls, setup_data):
         """
         (P13) Teste de Integração com Mock:
@@ -77,7 +77,7 @@ class TestRecipeAnalysisService:
         # Verifica Flags
         assert "Risco de anafilaxia (Amendoim)" in recipe.safety_flags
 
-    @patch("social.services.httpx.Client")
+    @patch("core.clients.httpx.Client")
     def test_analyze_recipe_api_failure(self, mock_client_cls, setup_data):
         """
         Verifica o comportamento quando o Ollama falha.
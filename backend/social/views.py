@@ -10,6 +10,7 @@ from rest_framework.response import Response
 from django.db.models import Q
 from .models import CareConnection, FamilyRecipe
 from gamification.models import PointTransaction
+from core.pii import profile_names
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
     """Permite leitura para todos (no contexto permitido), mas edição apenas para o autor."""
@@ -30,10 +31,10 @@ class FamilyRecipeViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # Retorna receitas publicadas OU receitas que o próprio usuário criou (mesmo rascunho)
-        return FamilyRecipe.objects.filter(
+        return (FamilyRecipe.objects.filter(
             is_public=True,
             status=FamilyRecipe.Status.PUBLISHED
-        ) | FamilyRecipe.objects.filter(author=user)
+        ) | FamilyRecipe.objects.filter(author=user)).select_related('author', 'validated_by')
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -70,34 +71,37 @@ class ActivityFeedView(APIView):
         supporting_ids.append(user.id)
 
         # 2. Buscar Receitas (Publicadas pela rede ou públicas globais)
-        recipes = FamilyRecipe.objects.filter(
+        recipes = list(FamilyRecipe.objects.filter(
             Q(author_id__in=supporting_ids) | Q(is_public=True)
-        ).select_related('author', 'author__profile').order_by('-created_at')[:10]
+        ).order_by('-created_at')[:10])
+
+        # 3. Buscar Conquistas/Atividades (Gamificação)
+        # Apenas atividades relevantes (ex: Treino concluído)
+        transactions = list(PointTransaction.objects.filter(
+            user_id__in=supporting_ids,
+            transaction_type='ACTIVITY'
+        ).order_by('-created_at')[:15])
+
+        # Nomes dos autores: uma consulta e uma decifragem por usuário distinto (não por item)
+        names = profile_names([r.author_id for r in recipes] + [t.user_id for t in transactions])
 
         for r in recipes:
             feed_items.append({
                 "type": "RECIPE",
                 "id": str(r.id),
                 "title": f"Nova receita: {r.title}",
-                "author_name": r.author.profile.full_name,
+                "author_name": names[r.author_id],
                 "timestamp": r.created_at,
                 "details": {"image": None, "tags": r.safety_flags},
                 "likes_count": r.likes_count
             })
 
-        # 3. Buscar Conquistas/Atividades (Gamificação)
-        # Apenas atividades relevantes (ex: Treino concluído)
-        transactions = PointTransaction.objects.filter(
-            user_id__in=supporting_ids,
-            transaction_type='ACTIVITY'
-        ).select_related('user', 'user__profile').order_by('-created_at')[:15]
-
         for t in transactions:
             feed_items.append({
                 "type": "ACTIVITY",
                 "id": str(t.id),
                 "title": t.description, # ex: "Concluiu: Treino de Força A"
-                "author_name": t.user.profile.full_name,
+                "author_name": names[t.user_id],
                 "timestamp": t.created_at,
                 "details": {"points": t.amount},
                 "likes_count": 0 
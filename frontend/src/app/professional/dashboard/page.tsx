@@ -3,7 +3,7 @@
 'use client';
 
 import { useState } from 'react';
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery } from '@tanstack/react-query';
 import { Search, Loader2, User, Activity, AlertCircle } from 'lucide-react';
 
 import { ProtectedLayout } from '@/components/layout/ProtectedLayout';
@@ -20,11 +20,14 @@ export default function ProfessionalDashboard() {
   const [searchTerm, setSearchTerm] = useState('');
   const debouncedSearch = useDebounce(searchTerm, 500); // 500ms delay
 
-  const { data: patients, isLoading, isFetching } = useQuery({
+  const { data, isLoading, isFetching, fetchNextPage, hasNextPage, isFetchingNextPage } = useInfiniteQuery({
     queryKey: ['patients', debouncedSearch],
-    queryFn: () => usersApi.getPatients({ search: debouncedSearch || undefined }),
+    queryFn: ({ pageParam }) => usersApi.getPatients({ search: debouncedSearch || undefined }, pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next ?? undefined, // Cursor opaco do backend
     placeholderData: (prev) => prev, // Mantém a lista anterior enquanto busca a nova
   });
+  const patients = data?.pages.flatMap((page) => page.results);
 
   return (
     <ProtectedLayout>
@@ -114,6 +117,16 @@ export default function ProfessionalDashboard() {
             )}
           </div>
         )}
+
+        {/* Próxima página (paginação por cursor) */}
+        {hasNextPage && (
+          <div className="flex justify-center">
+            <Button variant="outline" onClick={() => fetchNextPage()} disabled={isFetchingNextPage}>
+              {isFetchingNextPage && <Loader2 className="h-4 w-4 animate-spin" />}
+              Carregar mais
+            </Button>
+          </div>
+        )}
       </div>
     </ProtectedLayout>
   );
@@ -1,17 +1,18 @@
 // frontend/src/features/users/usersApi.ts
 
 import api from '@/lib/api';
-import { UserProfile } from '@/types/auth'; // Usando os tipos gerados/aliased
+import { PatientPage, UserProfile } from '@/types/auth'; // Usando os tipos gerados/aliased
 
 export interface UserFilters {
   search?: string;
 }
 
 export const usersApi = {
-  getPatients: async (params?: UserFilters): Promise<UserProfile[]> => {
-    const { data } = await api.get<UserProfile[]>('/core/patients/', { 
-      params 
-    });
+  // A lista é paginada por cursor: a primeira página vem dos filtros, as seguintes da URL 'next'
+  getPatients: async (params?: UserFilters, next?: string | null): Promise<PatientPage> => {
+    const { data } = next
+      ? await api.get<PatientPage>(next)
+      : await api.get<PatientPage>('/core/patients/', { params });
     return data;
   },
 
@@ -19,4 +20,4 @@ export const usersApi = {
     const { data } = await api.get<UserProfile>(`/core/patients/${id}/`);
     return data;
   }
-};
\ No newline at end of file
+};
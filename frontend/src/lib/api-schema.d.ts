@@ -366,6 +366,13 @@ export interface components {
             /** @description Configurações visuais: cores, logo, terminologia. */
             theme_config?: unknown;
         };
+        PaginatedPatientListList: {
+            /** Format: uri */
+            next?: string | null;
+            /** Format: uri */
+            previous?: string | null;
+            results: components["schemas"]["PatientList"][];
+        };
         ParticipantProfile: {
             readonly id: number;
             autonomy_level?: components["schemas"]["AutonomyLevelEnum"];
@@ -412,6 +419,21 @@ export interface components {
          *     * `UNKNOWN` - Não Identificado
          * @enum {string}
          */
+        /**
+         * @description Linha da lista de pacientes: só colunas do próprio perfil + User (um JOIN, sem roles
+         *     nem perfis de participante/profissional). O detalhe completo é o UserProfileSerializer.
+         *     O 'user' aninhado tem o mesmo formato do detalhe (o frontend lê patient.user.username).
+         */
+        PatientList: {
+            readonly id: number;
+            readonly user: components["schemas"]["UserSimple"];
+            readonly full_name: string;
+            /** Format: uri */
+            avatar_url?: string | null;
+            primary_organization?: number | null;
+            /** Format: date-time */
+            readonly created_at: string;
+        };
         PersonalityTypeEnum: "ACHIEVER" | "SOCIALIZER" | "CAUTIOUS" | "EXPLORER" | "UNKNOWN";
         /**
          * @description * `TRAINEE` - Em Treinamento
@@ -595,7 +617,14 @@ export interface operations {
     };
     v1_core_patients_list: {
         parameters: {
-            query?: never;
+            query?: {
+                /** @description The pagination cursor value. */
+                cursor?: string;
+                /** @description Number of results to return per page. */
+                page_size?: number;
+                /** @description A search term. */
+                search?: string;
+            };
             header?: never;
             path?: never;
             cookie?: never;
@@ -607,7 +636,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["UserProfile"][];
+                    "application/json": components["schemas"]["PaginatedPatientListList"];
                 };
             };
         };
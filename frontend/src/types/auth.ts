@@ -2,6 +2,8 @@
 import { components } from "@/lib/api-schema";
 
 export type UserProfile = components["schemas"]["UserProfile"];
+export type PatientListItem = components["schemas"]["PatientList"];
+export type PatientPage = components["schemas"]["PaginatedPatientListList"];
 export type Role = components["schemas"]["Role"];
 export type Organization = components["schemas"]["OrganizationSimple"];
 